@@ -0,0 +1,440 @@
+"""
+Cache Codec - Compact binary encoding for cached cognitive results
+
+Both caches (RedisCacheManager and Database.set_cached) used to store
+json.dumps text, so large value hierarchies and narrative payloads were
+re-encoded and re-parsed as full JSON text on every access. CacheCodec
+serializes with orjson (or msgpack) and compresses anything above a size
+threshold with zstd, lz4 or zlib, behind a one-byte header:
+
+    bit 7    : always 1 (a JSON text, i.e. a legacy entry, starts with ASCII)
+    bits 5-6 : format version
+    bits 2-4 : serializer  (0 json, 1 msgpack)
+    bits 0-1 : compression (0 none, 1 zlib, 2 zstd, 3 lz4)
+
+decode() reads every header combination plus legacy JSON (str or bytes),
+so the format of existing entries does not need a migration.
+
+Benchmark on synthetic payloads, or on the entries of an existing cache:
+    python -m src.ml.cache_codec [--iterations N] [--json] [--db ./soma.db]
+"""
+
+import argparse
+import json
+import logging
+import random
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import msgpack
+    MSGPACK_AVAILABLE = True
+except ImportError:
+    MSGPACK_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    import lz4.frame
+    LZ4_AVAILABLE = True
+except ImportError:
+    LZ4_AVAILABLE = False
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 0
+
+SERIALIZERS = {'json': 0, 'msgpack': 1}
+COMPRESSIONS = {'none': 0, 'zlib': 1, 'zstd': 2, 'lz4': 3}
+
+_SERIALIZER_NAMES = {v: k for k, v in SERIALIZERS.items()}
+_COMPRESSION_NAMES = {v: k for k, v in COMPRESSIONS.items()}
+
+ZLIB_LEVEL = 1   # Speed over ratio: entries are read far more often than written
+ZSTD_LEVEL = 3
+
+_zstd_local = threading.local()  # zstandard (de)compressors are not thread-safe
+
+
+class CacheCodecError(ValueError):
+    """Entry cannot be decoded by this process (unknown version or codec)"""
+
+
+def available_serializers() -> List[str]:
+    return ['json'] + (['msgpack'] if MSGPACK_AVAILABLE else [])
+
+
+def available_compressions() -> List[str]:
+    return (
+        ['none', 'zlib']
+        + (['zstd'] if ZSTD_AVAILABLE else [])
+        + (['lz4'] if LZ4_AVAILABLE else [])
+    )
+
+
+def _zstd_compressor():
+    if not hasattr(_zstd_local, 'compressor'):
+        _zstd_local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+        _zstd_local.decompressor = zstandard.ZstdDecompressor()
+    return _zstd_local.compressor, _zstd_local.decompressor
+
+
+def _json_dumps(obj: Any) -> bytes:
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _json_loads(data: Union[bytes, str]) -> Any:
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class CacheCodec:
+    """
+    Header-tagged serializer + compressor for cache entries
+
+    Args:
+        serializer: 'json' (orjson when installed) or 'msgpack'
+        compression: 'auto' (zstd > lz4 > zlib), 'zstd', 'lz4', 'zlib' or 'none'
+        compress_min_bytes: Smaller payloads are stored uncompressed
+
+    A requested serializer/compression that is not installed falls back
+    (msgpack → json, zstd/lz4 → best available) with a warning.
+    """
+
+    def __init__(
+        self,
+        serializer: Optional[str] = None,
+        compression: Optional[str] = None,
+        compress_min_bytes: Optional[int] = None
+    ):
+        serializer = serializer or settings.CACHE_SERIALIZER
+        compression = compression or settings.CACHE_COMPRESSION
+        self.compress_min_bytes = (
+            settings.CACHE_COMPRESS_MIN_BYTES if compress_min_bytes is None else compress_min_bytes
+        )
+
+        if serializer not in SERIALIZERS:
+            raise ValueError(f"Unknown cache serializer: {serializer}")
+        if serializer not in available_serializers():
+            logger.warning(f"Cache serializer '{serializer}' not installed, using json")
+            serializer = 'json'
+
+        if compression != 'auto' and compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown cache compression: {compression}")
+        if compression == 'auto' or compression not in available_compressions():
+            if compression != 'auto':
+                logger.warning(f"Cache compression '{compression}' not installed, using best available")
+            compression = next(c for c in ('zstd', 'lz4', 'zlib') if c in available_compressions())
+
+        self.serializer = serializer
+        self.compression = compression
+        self._base_header = 0x80 | (FORMAT_VERSION << 5) | (SERIALIZERS[serializer] << 2)
+
+    # ==================== Encoding ====================
+
+    def _serialize(self, obj: Any) -> bytes:
+        if self.serializer == 'msgpack':
+            return msgpack.packb(obj, use_bin_type=True)
+        return _json_dumps(obj)
+
+    @staticmethod
+    def _compress(payload: bytes, compression: str) -> bytes:
+        if compression == 'zstd':
+            return _zstd_compressor()[0].compress(payload)
+        if compression == 'lz4':
+            return lz4.frame.compress(payload)
+        return zlib.compress(payload, ZLIB_LEVEL)
+
+    def encode(self, obj: Any) -> bytes:
+        """Serialize (and compress, if large enough and it helps) one entry"""
+        payload = self._serialize(obj)
+        compression = 'none'
+
+        if self.compression != 'none' and len(payload) >= self.compress_min_bytes:
+            compressed = self._compress(payload, self.compression)
+            if len(compressed) < len(payload):
+                payload, compression = compressed, self.compression
+
+        return bytes((self._base_header | COMPRESSIONS[compression],)) + payload
+
+    # ==================== Decoding ====================
+
+    @staticmethod
+    def parse_header(header: int) -> Tuple[int, str, str]:
+        """(version, serializer, compression) of a header byte"""
+        return (
+            (header >> 5) & 0x3,
+            _SERIALIZER_NAMES.get((header >> 2) & 0x7, 'unknown'),
+            _COMPRESSION_NAMES[header & 0x3]
+        )
+
+    @staticmethod
+    def _decompress(payload: bytes, compression: str) -> bytes:
+        if compression == 'zstd':
+            if not ZSTD_AVAILABLE:
+                raise CacheCodecError("Entry is zstd-compressed but zstandard is not installed")
+            return _zstd_compressor()[1].decompress(payload)
+        if compression == 'lz4':
+            if not LZ4_AVAILABLE:
+                raise CacheCodecError("Entry is lz4-compressed but lz4 is not installed")
+            return lz4.frame.decompress(payload)
+        return zlib.decompress(payload)
+
+    def decode(self, data: Union[bytes, str, None]) -> Any:
+        """
+        Decode an entry written by any codec configuration or as legacy JSON
+
+        Raises:
+            CacheCodecError: Unknown format version or codec not installed
+        """
+        if data is None:
+            return None
+        if isinstance(data, str) or not data or data[0] < 0x80:
+            return _json_loads(data)  # Legacy JSON entry
+
+        version, serializer, compression = self.parse_header(data[0])
+        if version != FORMAT_VERSION:
+            raise CacheCodecError(f"Unsupported cache entry format version {version}")
+
+        payload = data[1:]
+        if compression != 'none':
+            payload = self._decompress(payload, compression)
+
+        if serializer == 'msgpack':
+            if not MSGPACK_AVAILABLE:
+                raise CacheCodecError("Entry is msgpack-encoded but msgpack is not installed")
+            return msgpack.unpackb(payload, raw=False, strict_map_key=False)
+        if serializer == 'json':
+            return _json_loads(payload)
+        raise CacheCodecError(f"Unknown cache entry serializer in header 0x{data[0]:02x}")
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'serializer': self.serializer,
+            'json_backend': 'orjson' if ORJSON_AVAILABLE else 'json',
+            'compression': self.compression,
+            'compress_min_bytes': self.compress_min_bytes,
+            'format_version': FORMAT_VERSION
+        }
+
+
+_codec: Optional[CacheCodec] = None
+
+
+def get_codec() -> CacheCodec:
+    """Get or create the codec configured in settings"""
+    global _codec
+    if _codec is None:
+        _codec = CacheCodec()
+    return _codec
+
+
+# ==================== Benchmark ====================
+
+_VALUES = [
+    'honesty', 'family', 'achievement', 'freedom', 'security', 'creativity',
+    'health', 'knowledge', 'loyalty', 'adventure', 'compassion', 'independence'
+]
+
+
+def sample_payloads(seed: int = 7) -> Dict[str, Any]:
+    """
+    Synthetic payloads shaped like the cognitive modules' cached results
+
+    Generated from random words, not taken from real users: sizes follow
+    what a profile build produces for a light, a typical and a heavy user
+    (a handful of values vs. hundreds of beliefs, life events and graph
+    edges), but real text compresses differently. Use
+    load_cached_payloads (--db) to benchmark actual cache entries.
+    """
+    rng = random.Random(seed)
+
+    def sentence(n):
+        return ' '.join(rng.choice(_VALUES + ['because', 'I', 'always', 'think', 'that', 'my', 'work'])
+                        for _ in range(n))
+
+    def value_hierarchy(n_beliefs, n_edges):
+        return {
+            'values': [
+                {'value_name': v, 'priority_score': round(rng.random(), 4),
+                 'evidence_count': rng.randint(1, 200), 'confidence': round(rng.random(), 4),
+                 'examples': [sentence(12) for _ in range(3)]}
+                for v in _VALUES
+            ],
+            'conflicts': [
+                {'value_a': rng.choice(_VALUES), 'value_b': rng.choice(_VALUES),
+                 'resolution': rng.choice(_VALUES), 'context': sentence(20),
+                 'strength': round(rng.random(), 4)}
+                for _ in range(n_beliefs // 10)
+            ],
+            'beliefs': [
+                {'belief': sentence(15), 'category': rng.choice(['core', 'peripheral', 'derived']),
+                 'confidence': round(rng.random(), 4), 'source_message_id': rng.randint(1, 10 ** 6)}
+                for _ in range(n_beliefs)
+            ],
+            'value_graph': {
+                'nodes': [{'id': v, 'weight': round(rng.random(), 4)} for v in _VALUES],
+                'edges': [{'source': rng.choice(_VALUES), 'target': rng.choice(_VALUES),
+                           'weight': round(rng.random(), 4)} for _ in range(n_edges)]
+            }
+        }
+
+    def narrative(n_events):
+        return {
+            'life_events': [
+                {'event': sentence(18), 'event_type': rng.choice(['career', 'relationship', 'loss', 'growth']),
+                 'timestamp': f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T12:00:00",
+                 'emotional_valence': round(rng.uniform(-1, 1), 4), 'significance': round(rng.random(), 4),
+                 'meaning': sentence(25)}
+                for _ in range(n_events)
+            ],
+            'themes': {rng.choice(['redemption', 'agency', 'communion', 'contamination']): rng.randint(1, 50)
+                       for _ in range(8)},
+            'identity_summary': sentence(120)
+        }
+
+    return {
+        'emotion_state (small)': {
+            'primary_emotion': 'joy', 'intensity': 0.72, 'valence': 0.6, 'arousal': 0.4,
+            'secondary_emotions': ['trust', 'anticipation'], 'triggers': [sentence(8)]
+        },
+        'value_hierarchy (typical)': value_hierarchy(n_beliefs=120, n_edges=200),
+        'value_hierarchy (heavy)': value_hierarchy(n_beliefs=1500, n_edges=3000),
+        'narrative_identity (typical)': narrative(n_events=150),
+        'narrative_identity (heavy)': narrative(n_events=2000),
+    }
+
+
+def load_cached_payloads(db_path: str) -> Dict[str, Any]:
+    """
+    Real entries from the cognitive_cache table of an existing database
+
+    For each module the median-sized and the largest entry are decoded
+    (any codec configuration or legacy JSON). The database is opened
+    read-only.
+    """
+    codec = CacheCodec()
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        rows = conn.execute(
+            "SELECT id, module_name, LENGTH(output_data) FROM cognitive_cache "
+            "ORDER BY module_name, LENGTH(output_data)"
+        ).fetchall()
+
+        by_module: Dict[str, List[int]] = {}
+        for row_id, module_name, _ in rows:
+            by_module.setdefault(module_name, []).append(row_id)
+
+        payloads = {}
+        for module_name, ids in by_module.items():
+            samples = {ids[len(ids) // 2]: 'median', ids[-1]: 'largest'}  # Same id if only one
+            for row_id, label in samples.items():
+                name = f"{module_name} ({label})"
+                (data,) = conn.execute(
+                    "SELECT output_data FROM cognitive_cache WHERE id = ?", (row_id,)
+                ).fetchone()
+                try:
+                    payloads[name] = codec.decode(data)
+                except (CacheCodecError, ValueError) as e:
+                    logger.warning(f"Skipping undecodable cache entry {row_id}: {e}")
+    finally:
+        conn.close()
+
+    return payloads
+
+
+def _time_per_call(func, arg, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func(arg)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def benchmark(iterations: int = 200, payloads: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """
+    Size and encode/decode time (µs) of every installed codec vs. json text
+
+    payloads defaults to the synthetic sample_payloads(). Returns one row
+    per (payload, codec); 'json text' is the former format.
+    """
+    payloads = payloads or sample_payloads()
+    codecs = [
+        (f"{s}+{c}", CacheCodec(serializer=s, compression=c))
+        for s in available_serializers()
+        for c in available_compressions()
+    ]
+
+    rows = []
+    for name, payload in payloads.items():
+        legacy = json.dumps(payload)
+        baseline = len(legacy.encode('utf-8'))
+        rows.append({
+            'payload': name, 'codec': 'json text', 'bytes': baseline, 'ratio': 1.0,
+            'encode_us': round(_time_per_call(json.dumps, payload, iterations), 1),
+            'decode_us': round(_time_per_call(json.loads, legacy, iterations), 1)
+        })
+
+        for codec_name, codec in codecs:
+            encoded = codec.encode(payload)
+            rows.append({
+                'payload': name, 'codec': codec_name, 'bytes': len(encoded),
+                'ratio': round(len(encoded) / baseline, 3),
+                'encode_us': round(_time_per_call(codec.encode, payload, iterations), 1),
+                'decode_us': round(_time_per_call(codec.decode, encoded, iterations), 1)
+            })
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark cache codecs on cached-result payloads")
+    parser.add_argument('--iterations', type=int, default=200, help="Calls per timing")
+    parser.add_argument('--json', action='store_true', help="Print rows as JSON")
+    parser.add_argument('--db', help="Benchmark entries of this database's cognitive_cache "
+                                     "instead of synthetic payloads")
+    args = parser.parse_args(argv)
+
+    payloads = None
+    if args.db:
+        try:
+            payloads = load_cached_payloads(args.db)
+        except sqlite3.Error as e:
+            print(f"Cannot read cognitive_cache from {args.db}: {e}", file=sys.stderr)
+            return 1
+        if not payloads:
+            print(f"No cognitive_cache entries in {args.db}", file=sys.stderr)
+            return 1
+
+    rows = benchmark(iterations=args.iterations, payloads=payloads)
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+
+    print(f"{'payload':<30} {'codec':<16} {'bytes':>10} {'ratio':>7} {'encode µs':>11} {'decode µs':>11}")
+    for row in rows:
+        print(f"{row['payload']:<30} {row['codec']:<16} {row['bytes']:>10} {row['ratio']:>7.3f} "
+              f"{row['encode_us']:>11.1f} {row['decode_us']:>11.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,21 +8,45 @@ Replaces local SQLite cache with distributed Redis cache:
 - Predictive pre-loading
 - Intelligent eviction
 
+Two-tier lookup: an in-process L1 (LocalCache) serves hot keys without a
+network round trip; Redis is the shared L2. Writes and deletes are
+published on a pub/sub channel so the other instances evict their L1 copy
+(whether or not this instance has an L1 itself). L1 holds the encoded
+bytes and decodes on every hit, so callers never share mutable results.
+
+Every entry is also added to a per-user and a per-module index set, so
+invalidating a user or module touches only that user's/module's keys
+instead of running KEYS over the whole keyspace. Members of expired
+entries are pruned periodically by one instance at a time.
+
+get_or_compute() coalesces concurrent misses (one computation per key per
+process, one per cluster via a Redis lease) and serves expired entries
+for stale_ttl seconds while a single background refresh runs.
+
+Bulk lookups and writes (get_many, set_many, get_many_keys) take one
+pipelined round trip however many keys they touch.
+
 Performance Impact:
 - Cache hit rate: 92%+ (improved from 80%)
 - Warming accuracy: 85%+
 - Shared cache across all ML instances
-- Latency for cached requests: <50ms
+- Latency for cached requests: <50ms (L1 hits: microseconds)
 """
 
 import redis
 import json
 import time
 import hashlib
-from typing import Dict, Any, Optional, List
+import threading
+import uuid
+from collections import OrderedDict, namedtuple
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import Callable, Dict, Any, Optional, List, Tuple
 from datetime import datetime, timedelta
 import logging
 
+from .cache_codec import CacheCodec
+
 # Phase 7B.3: Import intelligent warming
 try:
     from .intelligent_cache_warming import IntelligentCacheWarmer
@@ -34,6 +58,102 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 
+_L1Entry = namedtuple('_L1Entry', ['value', 'cached_ts', 'expires_at', 'module', 'user_id'])
+
+
+class LocalCache:
+    """
+    In-process L1 cache: size-bounded LRU with per-entry expiry.
+    
+    Values are encoded entries (the same bytes as in Redis); the manager
+    decodes them per hit so no two callers get the same objects.
+    
+    Entries expire after `ttl` seconds, or earlier when their Redis TTL runs
+    out. Cross-instance coherence comes from invalidation messages (see
+    RedisCacheManager._listen_invalidations); the TTL bounds staleness if a
+    message is missed.
+    """
+    
+    def __init__(self, max_entries: int = 1024, ttl: float = 60):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: 'OrderedDict[str, _L1Entry]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: str) -> Optional[Tuple[bytes, Optional[float]]]:
+        """Return (encoded entry, cached_at timestamp) or None if absent/expired."""
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None or item.expires_at <= now:
+                if item is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return item.value, item.cached_ts
+    
+    def put(
+        self,
+        key: str,
+        value: bytes,
+        cached_ts: Optional[float],
+        module: str,
+        user_id: str,
+        max_age: Optional[float] = None
+    ):
+        """
+        Store an encoded entry.
+        
+        Args:
+            max_age: Seconds until the Redis copy expires (None: no expiry)
+        """
+        ttl = self.ttl if max_age is None else min(self.ttl, max_age)
+        if ttl <= 0:
+            return
+        
+        with self._lock:
+            self._entries[key] = _L1Entry(value, cached_ts, time.time() + ttl, module, user_id)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def invalidate(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+    
+    def invalidate_where(self, module: Optional[str] = None, user_id: Optional[str] = None) -> int:
+        """Drop every entry of a module and/or user. Returns the count dropped."""
+        with self._lock:
+            keys = [
+                key for key, item in self._entries.items()
+                if (module is None or item.module == module)
+                and (user_id is None or item.user_id == user_id)
+            ]
+            for key in keys:
+                del self._entries[key]
+        return len(keys)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            'enabled': True,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
 class RedisCacheManager:
     """
     Distributed cache manager using Redis.
@@ -44,14 +164,30 @@ class RedisCacheManager:
     - Intelligent cache warming (Phase 7B.3)
     - Hit/miss tracking
     - Predictive pre-loading
+    - In-process L1 with pub/sub invalidation
+    
+    L1 config keys: l1_enabled (True), l1_max_entries (1024),
+    l1_ttl (60s), l1_invalidation (True: subscribe to invalidations).
+    Codec config keys: serializer, compression, compress_min_bytes
+    (defaults from settings, see cache_codec.py).
+    scan_batch_size (500): keys per SCAN/SSCAN/UNLINK batch.
+    index_prune_interval (3600s, 0 disables): how often expired members are
+    pruned from the index sets (by whichever instance takes the lease).
+    Single-flight config keys: stale_ttl (300s past expiry that entries are
+    still served by get_or_compute), lease_ms (30000), refresh_workers (4).
     """
     
     def __init__(self, redis_url: str, config: Dict[str, Any]):
         self.redis_url = redis_url
         self.config = config
         
-        # Connect to Redis
-        self.redis_client = redis.from_url(redis_url, decode_responses=True)
+        # Connect to Redis (binary values, see cache_codec.py)
+        self.redis_client = redis.from_url(redis_url)
+        self.codec = CacheCodec(
+            serializer=config.get('serializer'),
+            compression=config.get('compression'),
+            compress_min_bytes=config.get('compress_min_bytes')
+        )
         
         # Cache configuration
         self.default_ttl = config.get('default_ttl', 3600)  # 1 hour
@@ -64,9 +200,55 @@ class RedisCacheManager:
         # Metrics
         self.hits = 0
         self.misses = 0
+        self.stale_hits = 0
+        self.coalesced = 0
+        self.computes = 0
         
         # Key prefix for namespacing
         self.prefix = "soma:ml:"
+        self.index_prefix = f"{self.prefix}idx:"
+        self.lease_prefix = f"{self.prefix}lease:"
+        self.scan_batch_size = config.get('scan_batch_size', 500)
+        self.index_prune_interval = config.get('index_prune_interval', 3600)
+        
+        # Single-flight: in-flight computations and stale-while-revalidate
+        self.stale_ttl = config.get('stale_ttl', 300)
+        self.lease_ms = config.get('lease_ms', 30000)
+        self.refresh_workers = config.get('refresh_workers', 4)
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        self._refresher = None
+        
+        # L1: in-process cache in front of Redis
+        self.l1 = None
+        if config.get('l1_enabled', True):
+            self.l1 = LocalCache(
+                max_entries=config.get('l1_max_entries', 1024),
+                ttl=config.get('l1_ttl', 60)
+            )
+        
+        # Invalidations from other instances evict their L1 entries
+        self.instance_id = uuid.uuid4().hex
+        self.invalidation_channel = f"{self.prefix}invalidate"
+        self._closed = threading.Event()
+        self._listener = None
+        if self.l1 is not None and config.get('l1_invalidation', True):
+            self._listener = threading.Thread(
+                target=self._listen_invalidations,
+                name='cache-invalidation',
+                daemon=True
+            )
+            self._listener.start()
+        
+        # Index sets only shrink through pruning (entries expire silently)
+        self._pruner = None
+        if self.index_prune_interval:
+            self._pruner = threading.Thread(
+                target=self._prune_periodically,
+                name='cache-index-prune',
+                daemon=True
+            )
+            self._pruner.start()
         
         # Phase 7B.3: Initialize intelligent warmer
         self.intelligent_warmer = None
@@ -83,6 +265,25 @@ class RedisCacheManager:
         """Create namespaced cache key."""
         return f"{self.prefix}{module}:{user_id}:{input_hash}"
     
+    def _index_key(self, kind: str, name: str) -> str:
+        """Index set of the cache keys of one user ('user') or module ('module')."""
+        return f"{self.index_prefix}{kind}:{name}"
+    
+    def _is_entry_key(self, key: bytes) -> bool:
+        """False for the manager's own index and lease keys."""
+        return not key.startswith((self.index_prefix.encode(), self.lease_prefix.encode()))
+    
+    def _parse_key(self, key) -> Optional[Tuple[str, str]]:
+        """(module, user_id) of a cache key (str or bytes); None if malformed."""
+        if isinstance(key, bytes):
+            key = key.decode()
+        try:
+            module, rest = key[len(self.prefix):].split(':', 1)
+            user_id, _ = rest.rsplit(':', 1)
+        except ValueError:
+            return None
+        return module, user_id
+    
     def _hash_input(self, data: Any) -> str:
         """
         Create deterministic hash of input data.
@@ -112,27 +313,44 @@ class RedisCacheManager:
         input_hash = self._hash_input(input_data)
         key = self._make_key(module, user_id, input_hash)
         
+        found = self._lookup(key, module, user_id, input_hash)
+        if found is None:
+            return None
+        
+        entry, cached_ts, fresh = found
+        if not fresh:
+            # Past its TTL, only kept for get_or_compute's stale serving
+            self.misses += 1
+            return None
+        return self._as_result(entry, cached_ts)
+    
+    def _lookup(
+        self,
+        key: str,
+        module: str,
+        user_id: str,
+        input_hash: str
+    ) -> Optional[Tuple[Dict[str, Any], Optional[float], bool]]:
+        """
+        Look an entry up in L1, then Redis.
+        
+        Fresh hits are counted and recorded; stale entries are left to the
+        caller to count.
+        
+        Returns:
+            (entry, cached_at timestamp, fresh) or None on a miss
+        """
+        local = self._l1_get(key)
+        if local is not None:
+            self.hits += 1
+            self._record_access(key, user_id, module, input_hash)
+            return local[0], local[1], True
+        
         try:
             cached = self.redis_client.get(key)
             
             if cached:
-                self.hits += 1
-                logger.debug(f"Cache HIT: {key}")
-                
-                # Phase 7B.3: Record access for intelligent warming
-                if self.intelligent_warmer:
-                    self.intelligent_warmer.record_access(
-                        key=key,
-                        user_id=user_id,
-                        module=module,
-                        input_hash=input_hash
-                    )
-                
-                result = json.loads(cached)
-                result['_from_cache'] = True
-                result['_cache_age'] = self._get_key_age(key)
-                
-                return result
+                return self._admit(key, module, user_id, input_hash, self.codec.decode(cached), cached)
             else:
                 self.misses += 1
                 logger.debug(f"Cache MISS: {key}")
@@ -143,6 +361,386 @@ class RedisCacheManager:
             self.misses += 1
             return None
     
+    def _admit(
+        self,
+        key: str,
+        module: str,
+        user_id: str,
+        input_hash: str,
+        entry: Dict[str, Any],
+        encoded: bytes
+    ) -> Tuple[Dict[str, Any], Optional[float], bool]:
+        """Classify an entry read from Redis; count, record and L1-cache it if fresh."""
+        cached_ts = self._cached_timestamp(entry)
+        remaining = self._remaining_ttl(entry, cached_ts)
+        if remaining is not None and remaining <= 0:
+            return entry, cached_ts, False
+        
+        self.hits += 1
+        logger.debug(f"Cache HIT: {key}")
+        
+        # Phase 7B.3: Record access for intelligent warming
+        self._record_access(key, user_id, module, input_hash)
+        
+        if self.l1 is not None:
+            self.l1.put(key, encoded, cached_ts, module, user_id, max_age=remaining)
+        
+        return entry, cached_ts, True
+    
+    def _l1_get(self, key: str) -> Optional[Tuple[Dict[str, Any], Optional[float]]]:
+        """Decoded L1 entry and its cached_at timestamp; None if not in L1."""
+        if self.l1 is None:
+            return None
+        local = self.l1.get(key)
+        if local is None:
+            return None
+        return self.codec.decode(local[0]), local[1]
+    
+    # ==================== Bulk operations ====================
+    
+    def get_many(self, requests: List[Tuple[str, str, Dict[str, Any]]]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Get many cached results in one round trip (L1, then a single MGET).
+        
+        Args:
+            requests: (module, user_id, input_data) tuples
+        
+        Returns:
+            Results in request order, None where get() would return None
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
+        pending = []
+        
+        for i, (module, user_id, input_data) in enumerate(requests):
+            input_hash = self._hash_input(input_data)
+            key = self._make_key(module, user_id, input_hash)
+            
+            local = self._l1_get(key)
+            if local is not None:
+                self.hits += 1
+                self._record_access(key, user_id, module, input_hash)
+                results[i] = self._as_result(*local)
+            else:
+                pending.append((i, key, module, user_id, input_hash))
+        
+        if not pending:
+            return results
+        
+        try:
+            values = self.redis_client.mget([key for _, key, _, _, _ in pending])
+        except Exception as e:
+            logger.error(f"Cache get_many error: {e}")
+            self.misses += len(pending)
+            return results
+        
+        for (i, key, module, user_id, input_hash), value in zip(pending, values):
+            entry = self._decode(value)
+            if entry is None:
+                self.misses += 1
+                continue
+            
+            entry, cached_ts, fresh = self._admit(key, module, user_id, input_hash, entry, value)
+            if fresh:
+                results[i] = self._as_result(entry, cached_ts)
+            else:
+                self.misses += 1
+        
+        return results
+    
+    def get_many_keys(
+        self,
+        keys: List[str],
+        with_ttl: bool = False,
+        promote: bool = False
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Raw entries of many cache keys in one round trip (MGET, plus TTL if asked).
+        
+        Unlike get_many this does not count hits or record accesses, so
+        warming and introspection do not skew the statistics.
+        
+        Args:
+            keys: Full cache keys (as recorded by the intelligent warmer)
+            with_ttl: Add each entry's Redis TTL as '_ttl'
+            promote: Load fresh entries into L1 (cache warming)
+        
+        Returns:
+            Decoded entries in key order, None where missing
+        """
+        if not keys:
+            return []
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.mget(keys)
+        if with_ttl:
+            for key in keys:
+                pipe.ttl(key)
+        replies = pipe.execute()
+        ttls = replies[1:] if with_ttl else [None] * len(keys)
+        
+        entries = []
+        for key, value, ttl in zip(keys, replies[0], ttls):
+            entry = self._decode(value)
+            
+            if entry is not None and promote and self.l1 is not None:
+                parsed = self._parse_key(key)
+                cached_ts = self._cached_timestamp(entry)
+                remaining = self._remaining_ttl(entry, cached_ts)
+                if parsed and (remaining is None or remaining > 0):
+                    key_str = key.decode() if isinstance(key, bytes) else key
+                    self.l1.put(key_str, value, cached_ts, *parsed, max_age=remaining)
+            
+            if entry is not None and with_ttl:
+                entry = {**entry, '_ttl': ttl}
+            entries.append(entry)
+        
+        return entries
+    
+    def set_many(self, entries: List[Tuple], strategy: str = 'warm') -> int:
+        """
+        Cache many results in one pipelined round trip.
+        
+        Args:
+            entries: (module, user_id, input_data, result) tuples; a fifth
+                     element overrides the strategy (and so the TTL) per entry
+            strategy: Default cache strategy
+        
+        Returns:
+            Number of entries written
+        """
+        if not entries:
+            return 0
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        cached_at = datetime.now()
+        written = []
+        
+        try:
+            for item in entries:
+                module, user_id, input_data, result = item[:4]
+                entry_strategy = item[4] if len(item) > 4 else strategy
+                written.append(self._queue_set(pipe, module, user_id, input_data, result, entry_strategy, cached_at))
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Cache set_many error: {e}")
+            return 0
+        
+        if self.l1 is not None:
+            for key, encoded, module, user_id, ttl in written:
+                self.l1.put(key, encoded, cached_at.timestamp(), module, user_id, max_age=ttl)
+        self._publish_invalidation('keys', [key for key, _, _, _, _ in written])
+        
+        logger.debug(f"Cached {len(written)} entries")
+        return len(written)
+    
+    def _queue_set(self, pipe, module, user_id, input_data, result, strategy, cached_at) -> Tuple:
+        """
+        Queue one entry's write and index updates on a pipeline.
+        
+        Returns:
+            (key, encoded entry, module, user_id, ttl)
+        """
+        key = self._make_key(module, user_id, self._hash_input(input_data))
+        
+        # Add metadata
+        cache_entry = {
+            **result,
+            '_cached_at': cached_at.isoformat(),
+            '_module': module,
+            '_strategy': strategy
+        }
+        
+        # Set with TTL, kept stale_ttl past expiry for stale-while-revalidate
+        ttl = self.ttl_by_strategy.get(strategy, self.default_ttl)
+        encoded = self.codec.encode(cache_entry)
+        pipe.set(key, encoded, ex=ttl + self.stale_ttl if ttl else None)
+        pipe.sadd(self._index_key('user', user_id), key)
+        pipe.sadd(self._index_key('module', module), key)
+        
+        return key, encoded, module, user_id, ttl
+    
+    def _decode(self, value: Optional[bytes]) -> Optional[Dict[str, Any]]:
+        """Decode a Redis value; None if missing or unreadable."""
+        if not value:
+            return None
+        try:
+            return self.codec.decode(value)
+        except Exception as e:
+            logger.warning(f"Cache decode error: {e}")
+            return None
+    
+    # ==================== Single-flight ====================
+    
+    def get_or_compute(
+        self,
+        module: str,
+        user_id: str,
+        input_data: Dict[str, Any],
+        compute: Callable[[], Dict[str, Any]],
+        strategy: str = 'warm',
+        wait_timeout: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Get a cached result, computing it at most once across concurrent callers.
+        
+        - Fresh hit: returned as get() would.
+        - Stale hit (expired less than stale_ttl ago): returned with
+          '_stale': True while one background refresh recomputes it.
+        - Miss: one caller per process computes while the others wait on its
+          future; across instances, the holder of a Redis lease computes and
+          the others poll Redis for its result.
+        
+        Args:
+            module: Cognitive module name
+            user_id: User identifier
+            input_data: Input parameters
+            compute: Zero-argument callable producing the result
+            strategy: Cache strategy for the computed result
+            wait_timeout: Max seconds to wait on another caller's computation
+                          (default: lease_ms)
+        
+        Returns:
+            Cached or freshly computed result
+        """
+        input_hash = self._hash_input(input_data)
+        key = self._make_key(module, user_id, input_hash)
+        
+        found = self._lookup(key, module, user_id, input_hash)
+        if found is not None:
+            entry, cached_ts, fresh = found
+            result = self._as_result(entry, cached_ts)
+            if not fresh:
+                self.stale_hits += 1
+                result['_stale'] = True
+                self._refresh_in_background(key, module, user_id, input_data, compute, strategy)
+            return result
+        
+        return self._single_flight(key, module, user_id, input_data, compute, strategy, wait_timeout)
+    
+    def _single_flight(self, key, module, user_id, input_data, compute, strategy, wait_timeout) -> Dict[str, Any]:
+        """Run compute once per key in this process; concurrent callers share its future."""
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        
+        if not leader:
+            timeout = wait_timeout if wait_timeout is not None else self.lease_ms / 1000
+            try:
+                result = future.result(timeout=timeout)
+            except FuturesTimeoutError:
+                # The leader outlived the wait: compute rather than fail the caller
+                logger.warning(f"Cache compute for {key} still running after {timeout}s, computing directly")
+                result = compute()
+                self.computes += 1
+                self.set(module, user_id, input_data, result, strategy)
+                return result
+            self.coalesced += 1
+            return dict(result)
+        
+        try:
+            result = self._compute_with_lease(key, module, user_id, input_data, compute, strategy)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+    
+    def _compute_with_lease(self, key, module, user_id, input_data, compute, strategy) -> Dict[str, Any]:
+        """
+        Compute under a Redis lease (SET NX PX) so one instance computes a key.
+        
+        Without the lease, wait for the holder's result; compute anyway if it
+        fails (lease released or expired without an entry).
+        """
+        lease_key = self.lease_prefix + key[len(self.prefix):]
+        token = f"{self.instance_id}:{uuid.uuid4().hex}"
+        
+        try:
+            acquired = bool(self.redis_client.set(lease_key, token, nx=True, px=self.lease_ms))
+        except Exception as e:
+            logger.warning(f"Cache lease error, computing without it: {e}")
+            acquired = False
+            lease_key = None
+        
+        if not acquired and lease_key is not None:
+            entry = self._wait_for_entry(key, lease_key)
+            if entry is not None:
+                self.coalesced += 1
+                return self._as_result(entry, self._cached_timestamp(entry))
+        
+        try:
+            result = compute()
+            self.computes += 1
+            self.set(module, user_id, input_data, result, strategy)
+            return result
+        finally:
+            if acquired:
+                self._release_lease(lease_key, token)
+    
+    def _wait_for_entry(self, key: str, lease_key: str) -> Optional[Dict[str, Any]]:
+        """Poll until the lease holder writes a fresh entry; None if it gives up."""
+        deadline = time.time() + self.lease_ms / 1000
+        interval = 0.05
+        
+        while time.time() < deadline:
+            time.sleep(interval)
+            interval = min(interval * 2, 0.5)
+            
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.exists(lease_key)
+            cached, leased = pipe.execute()
+            
+            if cached:
+                entry = self.codec.decode(cached)
+                remaining = self._remaining_ttl(entry, self._cached_timestamp(entry))
+                if remaining is None or remaining > 0:
+                    return entry
+            if not leased:
+                return None
+        
+        return None
+    
+    def _release_lease(self, lease_key: str, token: str):
+        """Delete the lease only if we still hold it (it may have expired and moved on)."""
+        try:
+            with self.redis_client.pipeline() as pipe:
+                pipe.watch(lease_key)
+                if pipe.get(lease_key) == token.encode():
+                    pipe.multi()
+                    pipe.delete(lease_key)
+                    pipe.execute()
+                else:
+                    pipe.unwatch()
+        except redis.WatchError:
+            pass
+        except Exception as e:
+            logger.warning(f"Cache lease release error: {e}")
+    
+    def _refresh_in_background(self, key, module, user_id, input_data, compute, strategy):
+        """Recompute a stale entry off the request path, once per key."""
+        with self._inflight_lock:
+            if key in self._inflight:
+                return
+            if self._refresher is None:
+                self._refresher = ThreadPoolExecutor(
+                    max_workers=self.refresh_workers,
+                    thread_name_prefix='cache-refresh'
+                )
+        
+        def refresh():
+            try:
+                self._single_flight(key, module, user_id, input_data, compute, strategy, None)
+            except Exception as e:
+                logger.error(f"Cache refresh error for {key}: {e}")
+        
+        self._refresher.submit(refresh)
+    
     def set(
         self,
         module: str,
@@ -161,30 +759,20 @@ class RedisCacheManager:
             result: Result to cache
             strategy: Cache strategy ('hot', 'warm', 'cold')
         """
-        input_hash = self._hash_input(input_data)
-        key = self._make_key(module, user_id, input_hash)
-        
         try:
-            # Add metadata
-            cache_entry = {
-                **result,
-                '_cached_at': datetime.now().isoformat(),
-                '_module': module,
-                '_strategy': strategy
-            }
-            
-            # Serialize
-            cached_str = json.dumps(cache_entry)
+            # Write the entry and index the key in one round trip
+            cached_at = datetime.now()
+            pipe = self.redis_client.pipeline(transaction=False)
+            key, encoded, _, _, ttl = self._queue_set(
+                pipe, module, user_id, input_data, result, strategy, cached_at
+            )
+            pipe.execute()
             
-            # Set with TTL
-            ttl = self.ttl_by_strategy.get(strategy, self.default_ttl)
+            logger.debug(f"Cached {key} (TTL: {ttl or 'none'}, strategy: {strategy})")
             
-            if ttl:
-                self.redis_client.setex(key, ttl, cached_str)
-                logger.debug(f"Cached {key} (TTL: {ttl}s, strategy: {strategy})")
-            else:
-                self.redis_client.set(key, cached_str)
-                logger.debug(f"Cached {key} (no expiry, strategy: hot)")
+            if self.l1 is not None:
+                self.l1.put(key, encoded, cached_at.timestamp(), module, user_id, max_age=ttl)
+            self._publish_invalidation('key', key)
         
         except Exception as e:
             logger.error(f"Cache set error: {e}")
@@ -194,35 +782,172 @@ class RedisCacheManager:
         input_hash = self._hash_input(input_data)
         key = self._make_key(module, user_id, input_hash)
         
+        if self.l1 is not None:
+            self.l1.invalidate(key)
+        
         try:
-            self.redis_client.delete(key)
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.unlink(key)
+            pipe.srem(self._index_key('user', user_id), key)
+            pipe.srem(self._index_key('module', module), key)
+            pipe.execute()
             logger.debug(f"Deleted cache key: {key}")
         except Exception as e:
             logger.error(f"Cache delete error: {e}")
+        
+        # After the delete, so other instances cannot reload the old entry
+        self._publish_invalidation('key', key)
     
     def delete_user_cache(self, user_id: str):
         """Delete all cache entries for a user."""
-        pattern = f"{self.prefix}*:{user_id}:*"
+        if self.l1 is not None:
+            self.l1.invalidate_where(user_id=user_id)
         
         try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                self.redis_client.delete(*keys)
-                logger.info(f"Deleted {len(keys)} cache entries for user {user_id}")
+            deleted = self._unlink_index(self._index_key('user', user_id))
+            if deleted:
+                logger.info(f"Deleted {deleted} cache entries for user {user_id}")
         except Exception as e:
             logger.error(f"User cache delete error: {e}")
+        
+        self._publish_invalidation('user', user_id)
     
     def delete_module_cache(self, module: str):
         """Delete all cache entries for a module."""
-        pattern = f"{self.prefix}{module}:*"
+        if self.l1 is not None:
+            self.l1.invalidate_where(module=module)
         
         try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                self.redis_client.delete(*keys)
-                logger.info(f"Deleted {len(keys)} cache entries for module {module}")
+            deleted = self._unlink_index(self._index_key('module', module))
+            if deleted:
+                logger.info(f"Deleted {deleted} cache entries for module {module}")
         except Exception as e:
             logger.error(f"Module cache delete error: {e}")
+        
+        self._publish_invalidation('module', module)
+    
+    # ==================== Index maintenance ====================
+    
+    def _unlink_batches(self, keys) -> int:
+        """UNLINK an iterable of keys in batches; returns how many existed."""
+        deleted = 0
+        batch = []
+        for key in keys:
+            batch.append(key)
+            if len(batch) >= self.scan_batch_size:
+                deleted += self.redis_client.unlink(*batch)
+                batch = []
+        if batch:
+            deleted += self.redis_client.unlink(*batch)
+        return deleted
+    
+    def _unlink_index(self, index_key: str) -> int:
+        """
+        Delete every key listed in an index set, then the set itself.
+        
+        The set is renamed first (O(1)), so entries cached meanwhile land in
+        a fresh index and are not lost. Members are read with SSCAN and
+        freed with UNLINK, so Redis is never blocked for long.
+        """
+        detached = f"{index_key}:unlinking:{uuid.uuid4().hex}"
+        try:
+            self.redis_client.rename(index_key, detached)
+        except redis.ResponseError:
+            return 0  # No index: nothing cached
+        
+        deleted = self._unlink_batches(
+            self.redis_client.sscan_iter(detached, count=self.scan_batch_size)
+        )
+        self.redis_client.unlink(detached)
+        return deleted
+    
+    def prune_indexes(self) -> Dict[str, int]:
+        """
+        SCAN-based cleanup of the index sets (run by _prune_periodically).
+        
+        Removes members whose entry expired or was deleted through the other
+        index, and finishes unlinks interrupted mid-way.
+        
+        Returns:
+            {'indexes': sets scanned, 'pruned': members removed,
+             'deleted': entries deleted by resumed unlinks}
+        """
+        stats = {'indexes': 0, 'pruned': 0, 'deleted': 0}
+        
+        for index_key in self.redis_client.scan_iter(match=f"{self.index_prefix}*", count=self.scan_batch_size):
+            stats['indexes'] += 1
+            
+            if b':unlinking:' in index_key:
+                stats['deleted'] += self._unlink_batches(
+                    self.redis_client.sscan_iter(index_key, count=self.scan_batch_size)
+                )
+                self.redis_client.unlink(index_key)
+                continue
+            
+            members = self.redis_client.sscan_iter(index_key, count=self.scan_batch_size)
+            batch = []
+            for member in members:
+                batch.append(member)
+                if len(batch) >= self.scan_batch_size:
+                    stats['pruned'] += self._prune_members(index_key, batch)
+                    batch = []
+            if batch:
+                stats['pruned'] += self._prune_members(index_key, batch)
+        
+        logger.info(f"Pruned cache indexes: {stats}")
+        return stats
+    
+    def _prune_periodically(self):
+        """
+        Background loop running prune_indexes every index_prune_interval.
+        
+        A lease (SET NX PX) that outlives the run makes one instance per
+        interval do the SCAN, however many instances are running.
+        """
+        lease_key = f"{self.lease_prefix}prune_indexes"
+        lease_ms = max(1, int(self.index_prune_interval * 1000))
+        while not self._closed.wait(self.index_prune_interval):
+            try:
+                if self.redis_client.set(lease_key, self.instance_id, nx=True, px=lease_ms):
+                    self.prune_indexes()
+            except Exception as e:
+                logger.warning(f"Cache index prune error: {e}")
+    
+    def rebuild_indexes(self) -> int:
+        """
+        Index entries written before index sets existed (one-off, SCAN-based).
+        
+        Returns:
+            Number of entries indexed
+        """
+        indexed = 0
+        
+        pipe = self.redis_client.pipeline(transaction=False)
+        for key in self.redis_client.scan_iter(match=f"{self.prefix}*", count=self.scan_batch_size):
+            parsed = self._parse_key(key) if self._is_entry_key(key) else None
+            if parsed is None:
+                continue
+            
+            module, user_id = parsed
+            pipe.sadd(self._index_key('user', user_id), key)
+            pipe.sadd(self._index_key('module', module), key)
+            indexed += 1
+            if indexed % self.scan_batch_size == 0:
+                pipe.execute()
+        pipe.execute()
+        
+        logger.info(f"Indexed {indexed} cache entries")
+        return indexed
+    
+    def _prune_members(self, index_key: bytes, members: List[bytes]) -> int:
+        """SREM the members of one batch whose entry no longer exists."""
+        pipe = self.redis_client.pipeline(transaction=False)
+        for member in members:
+            pipe.exists(member)
+        missing = [member for member, exists in zip(members, pipe.execute()) if not exists]
+        if missing:
+            self.redis_client.srem(index_key, *missing)
+        return len(missing)
     
     def warm_cache(
         self,
@@ -270,12 +995,15 @@ class RedisCacheManager:
             logger.warning("Model optimizer not available for cache warming")
             return
         
-        for input_data in common_inputs:
+        # Check which inputs are already cached in one round trip
+        cached = self.get_many([(module, user_id, input_data) for input_data in common_inputs])
+        
+        computed = []
+        for input_data, hit in zip(common_inputs, cached):
+            if hit:
+                continue
+            
             try:
-                # Check if already cached
-                if self.get(module, user_id, input_data):
-                    continue
-                
                 # Compute result
                 module_obj = optimizer.lazy_load_module(module)
                 # Assuming extract/analyze method exists
@@ -284,10 +1012,12 @@ class RedisCacheManager:
                 
                 if method:
                     result = method(user_id=user_id, **input_data)
-                    self.set(module, user_id, input_data, result, strategy='hot')
+                    computed.append((module, user_id, input_data, result))
             
             except Exception as e:
                 logger.error(f"Cache warming error: {e}")
+        
+        self.set_many(computed, strategy='hot')
     
     def _get_default_method(self, module: str) -> str:
         """Get default method name for a module."""
@@ -300,25 +1030,127 @@ class RedisCacheManager:
         }
         return method_map.get(module, 'process')
     
-    def _get_key_age(self, key: str) -> Optional[float]:
-        """Get age of a cached entry in seconds."""
+    def _record_access(self, key: str, user_id: str, module: str, input_hash: str):
+        """Phase 7B.3: Record a hit for intelligent warming."""
+        if self.intelligent_warmer:
+            self.intelligent_warmer.record_access(
+                key=key,
+                user_id=user_id,
+                module=module,
+                input_hash=input_hash
+            )
+    
+    @staticmethod
+    def _cached_timestamp(entry: Dict[str, Any]) -> Optional[float]:
+        """Epoch seconds of an entry's `_cached_at` (None if missing)."""
         try:
-            ttl = self.redis_client.ttl(key)
-            if ttl == -1:  # No expiry
-                return None
-            elif ttl == -2:  # Doesn't exist
-                return None
-            else:
-                # Calculate age from TTL
-                cached = self.redis_client.get(key)
-                if cached:
-                    data = json.loads(cached)
-                    cached_at = datetime.fromisoformat(data.get('_cached_at', datetime.now().isoformat()))
-                    age = (datetime.now() - cached_at).total_seconds()
-                    return age
-        except Exception:
+            return datetime.fromisoformat(entry['_cached_at']).timestamp()
+        except (KeyError, TypeError, ValueError):
             return None
     
+    def _remaining_ttl(self, entry: Dict[str, Any], cached_ts: Optional[float]) -> Optional[float]:
+        """Seconds until the Redis copy expires, from the entry's own metadata."""
+        ttl = self.ttl_by_strategy.get(entry.get('_strategy'), self.default_ttl)
+        if not ttl or cached_ts is None:
+            return None
+        return ttl - (time.time() - cached_ts)
+    
+    @staticmethod
+    def _as_result(entry: Dict[str, Any], cached_ts: Optional[float]) -> Dict[str, Any]:
+        """
+        Cached entry with the cache metadata callers read.
+        
+        Entries are decoded per lookup (L1 stores bytes), so the copy never
+        shares nested objects with another caller's result.
+        """
+        result = dict(entry)
+        result['_from_cache'] = True
+        result['_cache_age'] = time.time() - cached_ts if cached_ts is not None else None
+        return result
+    
+    # ==================== L1 invalidation ====================
+    
+    def _publish_invalidation(self, scope: str, value: Any = None):
+        """
+        Tell the other instances to evict L1 entries.
+        
+        Args:
+            scope: 'key', 'keys', 'user', 'module' or 'all'
+            value: Key, list of keys, user id or module name (None for 'all')
+        """
+        try:
+            self.redis_client.publish(
+                self.invalidation_channel,
+                json.dumps({'origin': self.instance_id, 'scope': scope, 'value': value})
+            )
+        except Exception as e:
+            logger.warning(f"Cache invalidation publish error: {e}")
+    
+    def _apply_invalidation(self, data: str):
+        """Evict the L1 entries named by an invalidation message."""
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        
+        # Our own writes were already applied locally
+        if message.get('origin') == self.instance_id:
+            return
+        
+        scope, value = message.get('scope'), message.get('value')
+        if scope == 'key':
+            self.l1.invalidate(value)
+        elif scope == 'keys':
+            for key in value:
+                self.l1.invalidate(key)
+        elif scope == 'user':
+            self.l1.invalidate_where(user_id=value)
+        elif scope == 'module':
+            self.l1.invalidate_where(module=value)
+        elif scope == 'all':
+            self.l1.clear()
+    
+    def _listen_invalidations(self):
+        """
+        Background subscriber for the invalidation channel.
+        
+        Reconnects with backoff while Redis is unreachable, and clears L1 on
+        every (re)subscribe since messages may have been missed meanwhile.
+        """
+        backoff = 1
+        while not self._closed.is_set():
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.invalidation_channel)
+                self.l1.clear()
+                backoff = 1
+                
+                while not self._closed.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get('type') == 'message':
+                        self._apply_invalidation(message['data'])
+            
+            except Exception as e:
+                logger.debug(f"Invalidation subscriber disconnected: {e}")
+                self._closed.wait(backoff)
+                backoff = min(backoff * 2, 30)
+            
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+    
+    def close(self):
+        """Stop the invalidation subscriber, index pruning and background refreshes."""
+        self._closed.set()
+        if self._listener is not None:
+            self._listener.join(timeout=2)
+        if self._pruner is not None:
+            self._pruner.join(timeout=2)
+        if self._refresher is not None:
+            self._refresher.shutdown(wait=False)
+    
     def get_hit_rate(self) -> float:
         """Get cache hit rate (0-1)."""
         total = self.hits + self.misses
@@ -335,10 +1167,15 @@ class RedisCacheManager:
                 'hits': self.hits,
                 'misses': self.misses,
                 'hit_rate': self.get_hit_rate(),
+                'stale_hits': self.stale_hits,
+                'coalesced': self.coalesced,
+                'computes': self.computes,
                 'redis_keys': info.get('db0', {}).get('keys', 0),
                 'redis_memory': info.get('used_memory_human', 'unknown'),
                 'redis_connected_clients': info.get('connected_clients', 0),
-                'uptime_seconds': info.get('uptime_in_seconds', 0)
+                'uptime_seconds': info.get('uptime_in_seconds', 0),
+                'codec': self.codec.describe(),
+                'l1': self.l1.get_stats() if self.l1 is not None else {'enabled': False}
             }
             
             # Phase 7B.3: Add intelligent warming stats
@@ -359,6 +1196,10 @@ class RedisCacheManager:
                 'hits': self.hits,
                 'misses': self.misses,
                 'hit_rate': self.get_hit_rate(),
+                'stale_hits': self.stale_hits,
+                'coalesced': self.coalesced,
+                'computes': self.computes,
+                'l1': self.l1.get_stats() if self.l1 is not None else {'enabled': False},
                 'error': str(e)
             }
     
@@ -372,14 +1213,20 @@ class RedisCacheManager:
     
     def flush_all(self):
         """Clear all cache entries (use with caution!)."""
+        if self.l1 is not None:
+            self.l1.clear()
+        
         try:
-            pattern = f"{self.prefix}*"
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                self.redis_client.delete(*keys)
-                logger.warning(f"Flushed {len(keys)} cache entries")
+            # Entries and index sets alike; SCAN keeps Redis responsive
+            deleted = self._unlink_batches(
+                self.redis_client.scan_iter(match=f"{self.prefix}*", count=self.scan_batch_size)
+            )
+            if deleted:
+                logger.warning(f"Flushed {deleted} cache keys")
         except Exception as e:
             logger.error(f"Cache flush error: {e}")
+        
+        self._publish_invalidation('all')
     
     def get_top_keys(self, limit: int = 10) -> List[Dict[str, Any]]:
         """
@@ -390,27 +1237,25 @@ class RedisCacheManager:
         """
         try:
             # This would require additional tracking in production
-            # For now, return recent keys
-            pattern = f"{self.prefix}*"
-            keys = self.redis_client.keys(pattern)[:limit]
+            # For now, return the first entries SCAN yields
+            keys = []
+            for key in self.redis_client.scan_iter(match=f"{self.prefix}*", count=self.scan_batch_size):
+                if self._is_entry_key(key):
+                    keys.append(key)
+                    if len(keys) >= limit:
+                        break
             
-            results = []
-            for key in keys:
-                try:
-                    ttl = self.redis_client.ttl(key)
-                    cached = self.redis_client.get(key)
-                    if cached:
-                        data = json.loads(cached)
-                        results.append({
-                            'key': key,
-                            'ttl': ttl,
-                            'strategy': data.get('_strategy', 'unknown'),
-                            'cached_at': data.get('_cached_at', 'unknown')
-                        })
-                except Exception:
-                    continue
-            
-            return results
+            # Entries and TTLs of all keys in one round trip
+            return [
+                {
+                    'key': key.decode(),
+                    'ttl': data['_ttl'],
+                    'strategy': data.get('_strategy', 'unknown'),
+                    'cached_at': data.get('_cached_at', 'unknown')
+                }
+                for key, data in zip(keys, self.get_many_keys(keys, with_ttl=True))
+                if data is not None
+            ]
         
         except Exception as e:
             logger.error(f"Failed to get top keys: {e}")
@@ -16,19 +16,39 @@ class Settings(BaseModel):
         str(Path(__file__).parent.parent.parent / "soma.db")
     )
     
+    # SQLite connection pool
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "8"))
+    DB_BUSY_TIMEOUT_SECONDS: float = 5.0
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0  # Max wait for a free pooled connection
+    DB_STATEMENT_CACHE_SIZE: int = 256  # Prepared statements kept per connection
+    DB_MMAP_SIZE: int = 256 * 1024 * 1024  # 256 MB
+    DB_CACHE_SIZE_KB: int = 64 * 1024  # Page cache per connection
+    
     # AI Models
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
     
     # spaCy model
     SPACY_MODEL: str = "en_core_web_sm"
+    SPACY_BATCH_SIZE: int = 256  # Texts per nlp.pipe batch
+    SPACY_N_PROCESS: int = int(os.getenv("SPACY_N_PROCESS", "1"))  # nlp.pipe worker processes
     
     # Cache settings
     ENABLE_CACHE: bool = True
     CACHE_TTL_SECONDS: int = 3600  # 1 hour
+    CACHE_SERIALIZER: str = os.getenv("CACHE_SERIALIZER", "json")  # json (orjson) | msgpack, see cache_codec.py
+    CACHE_COMPRESSION: str = os.getenv("CACHE_COMPRESSION", "auto")  # auto | zstd | lz4 | zlib | none
+    CACHE_COMPRESS_MIN_BYTES: int = 1024  # Smaller entries are stored uncompressed
     
     # Performance
     MAX_BATCH_SIZE: int = 32
+    KG_CACHE_MAX_USERS: int = 1000  # Per-user knowledge graphs kept in memory
+    KG_CACHE_MAX_EDGES: int = 2_000_000  # Total edge budget across cached graphs
+    KG_CACHE_MAX_AGE_SECONDS: float = float(os.getenv("KG_CACHE_MAX_AGE_SECONDS", "5"))  # Reload cached graphs older than this
+    MESSAGE_ANNOTATION_CACHE_SIZE: int = 20000  # Shared per-message annotations (see message_analysis.py)
+    PROFILE_BUILD_WORKERS: int = int(os.getenv("PROFILE_BUILD_WORKERS", "4"))  # Threads for /profile/build fan-out
+    PROFILE_BUILD_PROCESSES: int = int(os.getenv("PROFILE_BUILD_PROCESSES", "0"))  # >0: use a process pool instead
+    STREAM_CHUNK_SIZE: int = 100  # Messages per saved chunk in streaming (stream=true) extraction
     REASONING_DEPTH_LIMIT: int = 5  # Max reasoning chain depth
     TOM_RECURSION_LIMIT: int = 3  # Max "I think they think..." depth
     
@@ -45,6 +65,3 @@ class Settings(BaseModel):
 
 
 settings = Settings()
-
-# Ensure models directory exists
-settings.MODELS_DIR.mkdir(parents=True, exist_ok=True)
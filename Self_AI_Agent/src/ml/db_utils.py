@@ -3,33 +3,237 @@ Database utilities for ML services
 """
 import sqlite3
 import json
-from typing import Any, Dict, List, Optional, Tuple
+import queue
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from contextlib import contextmanager
 from datetime import datetime
 import hashlib
 
+from .cache_codec import CacheCodecError, get_codec
 from .config import settings
 
 
+class WatermarkConflict(RuntimeError):
+    """A module's watermark was advanced by a concurrent run"""
+
+
 class Database:
-    """Database wrapper for ML services"""
+    """
+    Database wrapper for ML services
     
-    def __init__(self, db_path: str = None):
+    Connections are pooled (created lazily, up to pool_size) and shared
+    across threads. Each connection runs in WAL mode with tuned pragmas
+    and keeps its own prepared-statement cache.
+    """
+    
+    def __init__(self, db_path: str = None, pool_size: int = None):
         self.db_path = db_path or settings.DATABASE_PATH
+        # Every ":memory:" connection is a separate database, so never pool more than one
+        if self.db_path == ":memory:":
+            self.pool_size = 1
+        else:
+            self.pool_size = max(1, pool_size or settings.DB_POOL_SIZE)
+        
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._pool_lock = threading.Lock()
+        self._created = 0
+        # Connection of the batch() transaction open on the current thread, if any
+        self._local = threading.local()
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open and configure a new pooled connection"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=settings.DB_BUSY_TIMEOUT_SECONDS,
+            check_same_thread=False,
+            cached_statements=settings.DB_STATEMENT_CACHE_SIZE
+        )
+        conn.row_factory = sqlite3.Row
+        if self.db_path != ":memory:":
+            conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(settings.DB_MMAP_SIZE)}")
+        conn.execute(f"PRAGMA cache_size=-{int(settings.DB_CACHE_SIZE_KB)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+    
+    def _acquire(self) -> sqlite3.Connection:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._pool_lock:
+            can_create = self._created < self.pool_size
+            if can_create:
+                self._created += 1
+        
+        if not can_create:
+            # Pool exhausted: wait for a connection to be returned
+            try:
+                return self._pool.get(timeout=settings.DB_POOL_TIMEOUT_SECONDS)
+            except queue.Empty:
+                raise TimeoutError(
+                    f"No database connection available after {settings.DB_POOL_TIMEOUT_SECONDS}s "
+                    f"(pool_size={self.pool_size}, all connections in use)"
+                ) from None
+        
+        try:
+            return self._connect()
+        except Exception:
+            with self._pool_lock:
+                self._created -= 1
+            raise
+    
+    def _release(self, conn: sqlite3.Connection):
+        self._pool.put(conn)
+    
+    def _discard(self, conn: sqlite3.Connection):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._pool_lock:
+            self._created -= 1
     
     @contextmanager
     def get_connection(self):
-        """Get database connection context manager"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """
+        Get pooled database connection context manager
+        
+        Inside a batch() on the same thread the batch's connection is
+        reused and nothing is committed until the batch exits. A nested
+        get_connection() on the same thread likewise reuses the outer
+        connection (and commits with it) instead of taking a second one
+        from the pool, which could otherwise wait on itself.
+        """
+        active = getattr(self._local, "conn", None) or getattr(self._local, "held", None)
+        if active is not None:
+            yield active
+            return
+        
+        conn = self._acquire()
+        self._local.held = conn
         try:
             yield conn
             conn.commit()
-        except Exception:
-            conn.rollback()
+        except BaseException:
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                # Connection is unusable, don't return it to the pool
+                self._discard(conn)
+                raise
+            self._release(conn)
             raise
+        else:
+            self._release(conn)
         finally:
-            conn.close()
+            self._local.held = None
+    
+    @contextmanager
+    def batch(self):
+        """
+        Unit of work: run many writes in a single transaction
+        
+        Every statement issued on this thread while the batch is open,
+        including plain execute_query/execute_update calls, shares one
+        connection and is committed once on exit (rolled back on error).
+        Nested batches join the outer transaction through a savepoint: if
+        one raises, only its own writes are rolled back, so a caller can
+        catch the error and still commit the rest of the outer batch.
+        
+        Usage:
+            with db.batch() as batch:
+                batch.executemany("INSERT INTO t VALUES (?, ?)", rows)
+                db.execute_update("UPDATE ...", params)
+        """
+        active = getattr(self._local, "conn", None)
+        if active is not None:
+            if not active.in_transaction:
+                active.execute("BEGIN")
+            depth = getattr(self._local, "depth", 0) + 1
+            savepoint = f"batch_{depth}"
+            self._local.depth = depth
+            active.execute(f"SAVEPOINT {savepoint}")
+            try:
+                yield BatchWriter(active)
+            except BaseException:
+                active.execute(f"ROLLBACK TO {savepoint}")
+                active.execute(f"RELEASE {savepoint}")
+                raise
+            else:
+                active.execute(f"RELEASE {savepoint}")
+            finally:
+                self._local.depth = depth - 1
+            return
+        
+        with self.get_connection() as conn:
+            self._local.conn = conn
+            try:
+                yield BatchWriter(conn)
+            finally:
+                self._local.conn = None
+    
+    def run_batch(
+        self,
+        kwargs_list: List[Dict],
+        prepare: Callable[..., Any],
+        save: Callable[[Any], None]
+    ) -> List[Any]:
+        """
+        Run several requests of a service as one unit of work
+        
+        Every request is prepared first (prepare(**kwargs): reads and
+        pattern scans, no writes) before the write transaction is opened.
+        All saves then share one transaction, each request in its own
+        savepoint: a failed request leaves none of its writes behind. A
+        request whose watermark an earlier request of the batch advanced
+        (WatermarkConflict) is prepared again inside the transaction.
+        
+        Returns:
+            The prepared value of each request, in order (the Exception for failed ones)
+        """
+        prepared = []
+        for kwargs in kwargs_list:
+            try:
+                prepared.append(prepare(**kwargs))
+            except Exception as e:
+                prepared.append(e)
+        
+        with self.batch():
+            for i, (kwargs, item) in enumerate(zip(kwargs_list, prepared)):
+                if isinstance(item, Exception):
+                    continue
+                try:
+                    try:
+                        with self.batch():
+                            save(item)
+                    except WatermarkConflict:
+                        item = prepare(**kwargs)
+                        with self.batch():
+                            save(item)
+                    prepared[i] = item
+                except Exception as e:
+                    prepared[i] = e
+        
+        return prepared
+    
+    def execute_many(self, query: str, params_seq) -> int:
+        """Execute a statement for every parameter tuple in one transaction"""
+        with self.get_connection() as conn:
+            cursor = conn.executemany(query, params_seq)
+            return cursor.rowcount
+    
+    def close(self):
+        """Close all idle pooled connections"""
+        while True:
+            try:
+                conn = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
     
     def execute_query(
         self, 
@@ -94,7 +298,10 @@ class Database:
         )
         
         if result:
-            return json.loads(result['output_data'])
+            try:
+                return get_codec().decode(result['output_data'])
+            except CacheCodecError:
+                return None  # Written by a codec this process lacks: treat as a miss
         return None
     
     def set_cached(
@@ -134,7 +341,7 @@ class Database:
                 user_id,
                 module_name,
                 input_hash,
-                json.dumps(output_data),
+                get_codec().encode(output_data),
                 computation_time_ms,
                 datetime.now().isoformat(),
                 expires_at
@@ -146,24 +353,47 @@ class Database:
         self, 
         user_id: str, 
         limit: int = 100,
-        include_context: bool = True
+        include_context: bool = True,
+        since_id: Optional[int] = None
     ) -> List[Dict]:
-        """Get user's conversation history"""
-        query = """
-            SELECT 
-                cm.id,
-                cm.conversation_id,
-                cm.role,
-                cm.content,
-                cm.timestamp,
-                cm.context_metadata
-            FROM conversation_memory cm
-            WHERE cm.user_id = ?
-            ORDER BY cm.timestamp DESC
-            LIMIT ?
         """
+        Get user's conversation history
         
-        rows = self.execute_query(query, (user_id, limit))
+        Newest first by default. With since_id, returns only messages with
+        a larger id, oldest first (for incremental processing).
+        """
+        if since_id is None:
+            query = """
+                SELECT 
+                    cm.id,
+                    cm.conversation_id,
+                    cm.role,
+                    cm.content,
+                    cm.timestamp,
+                    cm.context_metadata
+                FROM conversation_memory cm
+                WHERE cm.user_id = ?
+                ORDER BY cm.timestamp DESC
+                LIMIT ?
+            """
+            params = (user_id, limit)
+        else:
+            query = """
+                SELECT 
+                    cm.id,
+                    cm.conversation_id,
+                    cm.role,
+                    cm.content,
+                    cm.timestamp,
+                    cm.context_metadata
+                FROM conversation_memory cm
+                WHERE cm.user_id = ? AND cm.id > ?
+                ORDER BY cm.id ASC
+                LIMIT ?
+            """
+            params = (user_id, since_id, limit)
+        
+        rows = self.execute_query(query, params)
         
         if include_context and rows:
             for row in rows:
@@ -172,6 +402,161 @@ class Database:
         
         return rows
     
+    # Incremental processing watermarks
+    def get_watermark(self, user_id: str, module_name: str) -> Optional[Dict]:
+        """Get the last processed conversation position (and state) for a module"""
+        result = self.execute_query(
+            """
+            SELECT last_conversation_id, last_timestamp, state, updated_at
+            FROM cognitive_watermarks
+            WHERE user_id = ? AND module_name = ?
+            """,
+            (user_id, module_name),
+            fetch_one=True
+        )
+        
+        if result:
+            result['state'] = json.loads(result['state']) if result.get('state') else {}
+        return result
+    
+    def set_watermark(
+        self,
+        user_id: str,
+        module_name: str,
+        last_conversation_id: int,
+        last_timestamp: str = None,
+        state: Dict = None
+    ):
+        """Record the last processed conversation position (and state) for a module"""
+        now = datetime.now().isoformat()
+        state_json = json.dumps(state) if state is not None else None
+        
+        self.execute_update(
+            """
+            INSERT INTO cognitive_watermarks
+            (user_id, module_name, last_conversation_id, last_timestamp, state, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, module_name)
+            DO UPDATE SET
+                last_conversation_id = ?,
+                last_timestamp = ?,
+                state = ?,
+                updated_at = ?
+            """,
+            (
+                user_id, module_name, last_conversation_id, last_timestamp, state_json, now,
+                # For UPDATE
+                last_conversation_id, last_timestamp, state_json, now
+            )
+        )
+    
+    def get_new_conversations(
+        self,
+        user_id: str,
+        module_name: str,
+        conversations: List[Dict] = None,
+        limit: Optional[int] = None,
+        page_size: int = 500
+    ) -> Tuple[List[Dict], Optional[Dict]]:
+        """
+        Conversations not yet processed by a module, plus its current watermark
+        
+        Loads from conversation_memory past the watermark, or filters the
+        given conversations by id when the caller supplies them.
+        
+        Loaded conversations come oldest first (id ASC) so the watermark can
+        advance without gaps. Without `limit` the whole backlog is loaded,
+        `page_size` rows per query; with `limit` only the oldest `limit`
+        rows are returned and the caller pages until fewer come back.
+        
+        Pass the returned watermark to advance_watermark unchanged: it is the
+        expected value for the compare-and-set there.
+        """
+        watermark = self.get_watermark(user_id, module_name)
+        last_id = watermark['last_conversation_id'] if watermark else 0
+        
+        if conversations is not None:
+            new = [c for c in conversations if c.get('id') is None or c['id'] > last_id]
+            return new, watermark
+        
+        if limit is not None:
+            return self.get_user_conversations(user_id, limit=limit, since_id=last_id), watermark
+        
+        new = []
+        while True:
+            page = self.get_user_conversations(user_id, limit=page_size, since_id=last_id)
+            new.extend(page)
+            if len(page) < page_size:
+                return new, watermark
+            last_id = page[-1]['id']
+    
+    def advance_watermark(
+        self,
+        user_id: str,
+        module_name: str,
+        conversations: List[Dict],
+        watermark: Optional[Dict] = None,
+        state: Dict = None
+    ) -> Dict:
+        """
+        Move a module's watermark past the given (processed) conversations
+        
+        Compare-and-set against `watermark` (as returned by
+        get_new_conversations): if another run advanced the watermark in the
+        meantime, raises WatermarkConflict so the surrounding batch rolls back
+        instead of committing the same conversations twice.
+        
+        Returns:
+            The new watermark, to pass to the next advance_watermark call
+        """
+        expected_id = watermark['last_conversation_id'] if watermark else None
+        last_id = watermark['last_conversation_id'] if watermark else 0
+        last_timestamp = watermark['last_timestamp'] if watermark else None
+        
+        ids = [c['id'] for c in conversations if c.get('id') is not None]
+        if ids and max(ids) > last_id:
+            last_id = max(ids)
+            last_timestamp = max(
+                (c['timestamp'] for c in conversations if c.get('timestamp')),
+                default=last_timestamp
+            )
+        
+        now = datetime.now().isoformat()
+        state_json = json.dumps(state) if state is not None else None
+        
+        if expected_id is None:
+            updated = self.execute_update(
+                """
+                INSERT INTO cognitive_watermarks
+                (user_id, module_name, last_conversation_id, last_timestamp, state, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(user_id, module_name) DO NOTHING
+                """,
+                (user_id, module_name, last_id, last_timestamp, state_json, now)
+            )
+        else:
+            updated = self.execute_update(
+                """
+                UPDATE cognitive_watermarks
+                SET last_conversation_id = ?, last_timestamp = ?, state = ?, updated_at = ?
+                WHERE user_id = ? AND module_name = ? AND last_conversation_id = ?
+                """,
+                (last_id, last_timestamp, state_json, now, user_id, module_name, expected_id)
+            )
+        
+        if not updated:
+            raise WatermarkConflict(
+                f"Watermark for {user_id}/{module_name} moved past {expected_id} "
+                "during processing"
+            )
+        
+        return {
+            'last_conversation_id': last_id,
+            'last_timestamp': last_timestamp,
+            'state': state if state is not None else {},
+            'updated_at': now
+        }
+    
     def get_relationship_profiles(self, user_id: str) -> List[Dict]:
         """Get all relationship profiles for user"""
         query = """
@@ -237,5 +622,37 @@ class Database:
         print("Phase 5 ML schema initialized successfully")
 
 
+class BatchWriter:
+    """Statement helpers bound to the connection of an open Database.batch()"""
+    
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+    
+    def execute(self, query: str, params: Tuple = ()) -> int:
+        """Execute a statement and return affected rows"""
+        return self.conn.execute(query, params).rowcount
+    
+    def executemany(self, query: str, params_seq) -> int:
+        """Execute a statement for every parameter tuple"""
+        return self.conn.executemany(query, params_seq).rowcount
+    
+    def insert_and_get_id(self, query: str, params: Tuple = ()) -> int:
+        """Execute insert and return last inserted id"""
+        return self.conn.execute(query, params).lastrowid
+    
+    def query(
+        self,
+        query: str,
+        params: Tuple = (),
+        fetch_one: bool = False
+    ) -> Optional[List[Dict]]:
+        """Run a query inside the transaction (sees uncommitted writes)"""
+        cursor = self.conn.execute(query, params)
+        if fetch_one:
+            row = cursor.fetchone()
+            return dict(row) if row else None
+        return [dict(row) for row in cursor.fetchall()]
+
+
 # Global database instance
 db = Database()
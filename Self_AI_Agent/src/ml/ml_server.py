@@ -3,19 +3,30 @@ FastAPI Server for ML Services
 Provides REST API for TypeScript to call Python ML modules
 """
 
-from fastapi import FastAPI, HTTPException
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, List, Optional
 import uvicorn
 
-from services import (
-    reasoning_extractor,
-    value_builder,
-    emotional_engine,
-    theory_of_mind,
-    narrative_builder
-)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Service instances are built on first use (or at startup via --preload)
+from services import get_service, registry
+from services.profile_pipeline import DEFAULT_PROFILE_MODULES, PROFILE_METHODS, get_profile_pipeline
+from services.registry import parse_service_list
 from db_utils import db
 
 app = FastAPI(title="Soma ML Services", version="1.0.0")
@@ -30,6 +41,50 @@ app.add_middleware(
 )
 
 
+@app.on_event("startup")
+def preload_services():
+    """Warm-load services named in ML_PRELOAD_SERVICES ('all' or comma separated)"""
+    names = parse_service_list(os.getenv("ML_PRELOAD_SERVICES"))
+    if names:
+        load_seconds = registry.preload(names)
+        print(f"✅ Preloaded services: " + ", ".join(
+            f"{name} ({load_seconds[name]*1000:.0f}ms)" for name in names
+        ))
+
+
+# ============================================================================
+# Streaming (NDJSON)
+# ============================================================================
+
+def dumps_record(record: Dict) -> bytes:
+    """Serialize one record as a JSON line (orjson when installed)"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(
+            record,
+            default=str,
+            option=orjson.OPT_APPEND_NEWLINE | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+    return (json.dumps(record, default=str) + "\n").encode("utf-8")
+
+
+def ndjson_response(records) -> StreamingResponse:
+    """
+    Stream records from a generator extractor as NDJSON
+
+    The generator runs in the threadpool one record at a time, so nothing
+    is materialized beyond what the extractor holds. A failure mid-stream
+    is reported as a final {"type": "error"} line.
+    """
+    def body():
+        try:
+            for record in records:
+                yield dumps_record(record)
+        except Exception as e:
+            yield dumps_record({"type": "error", "error": str(e)})
+
+    return StreamingResponse(body(), media_type="application/x-ndjson")
+
+
 # ============================================================================
 # Request/Response Models
 # ============================================================================
@@ -37,11 +92,15 @@ app.add_middleware(
 class ExtractReasoningRequest(BaseModel):
     user_id: str
     conversations: Optional[List[Dict]] = None
+    incremental: bool = False  # Only process conversations since the last run
+    stream: bool = False  # NDJSON records as they are extracted
 
 
 class BuildValueHierarchyRequest(BaseModel):
     user_id: str
     conversations: Optional[List[Dict]] = None
+    incremental: bool = False  # Only process conversations since the last run
+    stream: bool = False  # NDJSON records as they are extracted
 
 
 class AnalyzeEmotionRequest(BaseModel):
@@ -49,6 +108,7 @@ class AnalyzeEmotionRequest(BaseModel):
     text: str
     context: Optional[Dict] = None
     conversation_id: Optional[str] = None
+    message_id: Optional[str] = None  # Reuses the shared annotation of this message
 
 
 class BuildMentalModelRequest(BaseModel):
@@ -56,11 +116,24 @@ class BuildMentalModelRequest(BaseModel):
     target_person: str
     conversations: Optional[List[Dict]] = None
     context: Optional[Dict] = None
+    incremental: bool = False  # Only process conversations since the last run
 
 
 class ExtractNarrativeRequest(BaseModel):
     user_id: str
     conversations: Optional[List[Dict]] = None
+    incremental: bool = False  # Only process conversations since the last run
+    stream: bool = False  # NDJSON records as they are extracted
+
+
+class BuildProfileRequest(BaseModel):
+    user_id: str
+    conversations: Optional[List[Dict]] = None
+    modules: List[str] = list(DEFAULT_PROFILE_MODULES)
+    tom_targets: List[str] = []  # Theory of mind runs once per target person
+    incremental: bool = False
+    limit: int = 500
+    format: str = "ndjson"  # "ndjson" or "sse"
 
 
 class PredictDecisionRequest(BaseModel):
@@ -106,10 +179,17 @@ def health_check():
 @app.post("/reasoning/extract")
 def extract_reasoning(request: ExtractReasoningRequest):
     """Extract reasoning chains from user conversations"""
+    if request.stream:
+        return ndjson_response(get_service('reasoning_extractor').iter_reasoning_chains(
+            request.user_id,
+            request.conversations,
+            incremental=request.incremental
+        ))
     try:
-        chains = reasoning_extractor.extract_reasoning_chains(
+        chains = get_service('reasoning_extractor').extract_reasoning_chains(
             request.user_id,
-            request.conversations
+            request.conversations,
+            incremental=request.incremental
         )
         return {"success": True, "data": chains}
     except Exception as e:
@@ -120,7 +200,7 @@ def extract_reasoning(request: ExtractReasoningRequest):
 def get_reasoning_patterns(user_id: str):
     """Get user's reasoning pattern statistics"""
     try:
-        patterns = reasoning_extractor.get_reasoning_patterns(user_id)
+        patterns = get_service('reasoning_extractor').get_reasoning_patterns(user_id)
         return {"success": True, "data": patterns}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -130,7 +210,7 @@ def get_reasoning_patterns(user_id: str):
 def query_knowledge_graph(user_id: str, concept: str, max_depth: int = 2):
     """Query knowledge graph for related concepts"""
     try:
-        results = reasoning_extractor.query_knowledge_graph(
+        results = get_service('reasoning_extractor').query_knowledge_graph(
             user_id,
             concept,
             max_depth
@@ -147,10 +227,17 @@ def query_knowledge_graph(user_id: str, concept: str, max_depth: int = 2):
 @app.post("/values/build")
 def build_value_hierarchy(request: BuildValueHierarchyRequest):
     """Build user's value hierarchy"""
+    if request.stream:
+        return ndjson_response(get_service('value_builder').iter_value_hierarchy(
+            request.user_id,
+            request.conversations,
+            incremental=request.incremental
+        ))
     try:
-        hierarchy = value_builder.build_value_hierarchy(
+        hierarchy = get_service('value_builder').build_value_hierarchy(
             request.user_id,
-            request.conversations
+            request.conversations,
+            incremental=request.incremental
         )
         return {"success": True, "data": hierarchy}
     except Exception as e:
@@ -161,7 +248,7 @@ def build_value_hierarchy(request: BuildValueHierarchyRequest):
 def get_value_hierarchy(user_id: str):
     """Get user's value hierarchy"""
     try:
-        hierarchy = value_builder.get_value_hierarchy(user_id)
+        hierarchy = get_service('value_builder').get_value_hierarchy(user_id)
         return {"success": True, "data": hierarchy}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -171,7 +258,7 @@ def get_value_hierarchy(user_id: str):
 def predict_decision(request: PredictDecisionRequest):
     """Predict which option user will choose"""
     try:
-        prediction = value_builder.predict_decision(
+        prediction = get_service('value_builder').predict_decision(
             request.user_id,
             request.option_a,
             request.option_b
@@ -189,11 +276,12 @@ def predict_decision(request: PredictDecisionRequest):
 def analyze_emotion(request: AnalyzeEmotionRequest):
     """Analyze emotional state from text"""
     try:
-        state = emotional_engine.analyze_emotional_state(
+        state = get_service('emotional_engine').analyze_emotional_state(
             request.user_id,
             request.text,
             request.context,
-            request.conversation_id
+            request.conversation_id,
+            request.message_id
         )
         return {"success": True, "data": state}
     except Exception as e:
@@ -204,7 +292,7 @@ def analyze_emotion(request: AnalyzeEmotionRequest):
 def get_emotional_trajectory(user_id: str, days: int = 30):
     """Get emotional trajectory over time"""
     try:
-        trajectory = emotional_engine.get_emotional_trajectory(user_id, days)
+        trajectory = get_service('emotional_engine').get_emotional_trajectory(user_id, days)
         return {"success": True, "data": trajectory}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -214,7 +302,7 @@ def get_emotional_trajectory(user_id: str, days: int = 30):
 def predict_emotion(request: PredictEmotionRequest):
     """Predict emotional response to situation"""
     try:
-        prediction = emotional_engine.predict_emotional_response(
+        prediction = get_service('emotional_engine').predict_emotional_response(
             request.user_id,
             request.situation,
             request.context
@@ -232,11 +320,12 @@ def predict_emotion(request: PredictEmotionRequest):
 def build_mental_model(request: BuildMentalModelRequest):
     """Build mental model of target person"""
     try:
-        model = theory_of_mind.build_mental_model(
+        model = get_service('theory_of_mind').build_mental_model(
             request.user_id,
             request.target_person,
             request.conversations,
-            request.context
+            request.context,
+            incremental=request.incremental
         )
         return {"success": True, "data": model}
     except Exception as e:
@@ -247,7 +336,7 @@ def build_mental_model(request: BuildMentalModelRequest):
 def get_mental_model(user_id: str, target_person: str):
     """Get mental model of target person"""
     try:
-        model = theory_of_mind.get_mental_model(user_id, target_person)
+        model = get_service('theory_of_mind').get_mental_model(user_id, target_person)
         if not model:
             raise HTTPException(status_code=404, detail="Mental model not found")
         return {"success": True, "data": model}
@@ -261,7 +350,7 @@ def get_mental_model(user_id: str, target_person: str):
 def predict_reaction(request: PredictReactionRequest):
     """Predict how target will react"""
     try:
-        prediction = theory_of_mind.predict_reaction(
+        prediction = get_service('theory_of_mind').predict_reaction(
             request.user_id,
             request.target_person,
             request.situation
@@ -275,7 +364,7 @@ def predict_reaction(request: PredictReactionRequest):
 def get_all_mental_models(user_id: str):
     """Get all mental models for user"""
     try:
-        models = theory_of_mind.get_all_mental_models(user_id)
+        models = get_service('theory_of_mind').get_all_mental_models(user_id)
         return {"success": True, "data": models}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -288,10 +377,17 @@ def get_all_mental_models(user_id: str):
 @app.post("/narrative/extract")
 def extract_narrative(request: ExtractNarrativeRequest):
     """Extract narrative identity"""
+    if request.stream:
+        return ndjson_response(get_service('narrative_builder').iter_narrative_identity(
+            request.user_id,
+            request.conversations,
+            incremental=request.incremental
+        ))
     try:
-        narrative = narrative_builder.extract_narrative_identity(
+        narrative = get_service('narrative_builder').extract_narrative_identity(
             request.user_id,
-            request.conversations
+            request.conversations,
+            incremental=request.incremental
         )
         return {"success": True, "data": narrative}
     except Exception as e:
@@ -302,7 +398,7 @@ def extract_narrative(request: ExtractNarrativeRequest):
 def get_narrative(user_id: str):
     """Get user's narrative identity"""
     try:
-        narrative = narrative_builder.get_narrative_identity(user_id)
+        narrative = get_service('narrative_builder').get_narrative_identity(user_id)
         return {"success": True, "data": narrative}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -312,16 +408,61 @@ def get_narrative(user_id: str):
 def analyze_themes(user_id: str):
     """Analyze identity themes"""
     try:
-        analysis = narrative_builder.analyze_identity_themes(user_id)
+        analysis = get_service('narrative_builder').analyze_identity_themes(user_id)
         return {"success": True, "data": analysis}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============================================================================
+# Full Profile Endpoint
+# ============================================================================
+
+@app.post("/profile/build")
+async def build_profile(request: BuildProfileRequest, http_request: Request):
+    """
+    Build reasoning, values, narrative and theory of mind in one request
+
+    Conversations are loaded once and the modules run concurrently; each
+    module's result is streamed as soon as it completes (NDJSON, or SSE
+    with format="sse" / Accept: text/event-stream).
+    """
+    unknown = [m for m in request.modules if m not in PROFILE_METHODS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown modules: {', '.join(unknown)}")
+
+    sse = request.format == "sse" or "text/event-stream" in http_request.headers.get("accept", "")
+
+    events = get_profile_pipeline().run(
+        request.user_id,
+        request.conversations,
+        modules=request.modules,
+        tom_targets=request.tom_targets,
+        incremental=request.incremental,
+        limit=request.limit
+    )
+
+    async def body():
+        async for event in events:
+            line = dumps_record(event)
+            yield b"event: " + event['event'].encode() + b"\ndata: " + line + b"\n" if sse else line
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream" if sse else "application/x-ndjson"
+    )
+
+
 # ============================================================================
 # Database Management
 # ============================================================================
 
+@app.get("/admin/services")
+def service_status():
+    """Which services are loaded and how long each took to construct"""
+    return {"success": True, "data": registry.get_stats()}
+
+
 @app.post("/admin/init-schema")
 def initialize_schema():
     """Initialize Phase 5 database schema"""
@@ -332,14 +473,113 @@ def initialize_schema():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# ============================================================================
+# Import-time Profile
+# ============================================================================
+
+def profile_imports(module: str = "ml_server") -> Dict:
+    """
+    Import a module in a fresh interpreter under `python -X importtime`
+
+    Returns:
+        Total import time and per-module self/cumulative times (microseconds)
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=str(Path(__file__).parent),
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        modules.append({
+            "module": name.strip(),
+            "depth": (len(name) - len(name.lstrip()) - 1) // 2,
+            "self_us": int(self_us),
+            "cumulative_us": int(cumulative_us)
+        })
+
+    return {
+        "module": module,
+        "total_us": sum(m["self_us"] for m in modules),
+        "module_count": len(modules),
+        "modules": modules
+    }
+
+
+def print_import_profile(profile: Dict, top: int = 20):
+    """Print top-level packages by cumulative time and slowest modules by self time"""
+    print(f"Import profile: {profile['module']}")
+    print(f"  Total: {profile['total_us']/1000:.1f}ms across {profile['module_count']} modules\n")
+
+    top_level = [m for m in profile["modules"] if m["depth"] == 0]
+    print(f"  {'cumulative':>12}  top-level import")
+    for m in sorted(top_level, key=lambda m: -m["cumulative_us"])[:top]:
+        print(f"  {m['cumulative_us']/1000:>10.1f}ms  {m['module']}")
+
+    print(f"\n  {'self':>12}  module")
+    for m in sorted(profile["modules"], key=lambda m: -m["self_us"])[:top]:
+        print(f"  {m['self_us']/1000:>10.1f}ms  {m['module']}")
+
+
 # ============================================================================
 # Server Entry Point
 # ============================================================================
 
-if __name__ == "__main__":
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Soma ML Services")
+    subparsers = parser.add_subparsers(dest="command")
+
+    serve = subparsers.add_parser("serve", help="Run the API server (default)")
+    serve.add_argument("--host", default="0.0.0.0")
+    serve.add_argument("--port", type=int, default=8788)
+    serve.add_argument("--no-reload", action="store_true", help="Disable auto-reload")
+    serve.add_argument(
+        "--preload", default=os.getenv("ML_PRELOAD_SERVICES", ""),
+        help="Services to build at startup: 'all' or comma separated names"
+    )
+
+    importtime = subparsers.add_parser("importtime", help="Summarize `python -X importtime` for ml_server")
+    importtime.add_argument("--module", default="ml_server")
+    importtime.add_argument("--top", type=int, default=20)
+    importtime.add_argument("--json", action="store_true", help="Print the raw profile as JSON")
+    importtime.add_argument(
+        "--max-ms", type=float, default=None,
+        help="Exit non-zero if total import time exceeds this budget"
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.command == "importtime":
+        profile = profile_imports(args.module)
+        if args.json:
+            print(json.dumps(profile, indent=2))
+        else:
+            print_import_profile(profile, args.top)
+        if args.max_ms is not None and profile["total_us"] / 1000 > args.max_ms:
+            print(f"❌ Import time {profile['total_us']/1000:.1f}ms exceeds budget {args.max_ms}ms")
+            sys.exit(1)
+        return
+
+    if args.command is None:
+        args = serve.parse_args([])
+
+    # Validate now; uvicorn re-imports the app (and runs the startup hook) in its own process
+    os.environ["ML_PRELOAD_SERVICES"] = ",".join(parse_service_list(args.preload))
+
     uvicorn.run(
         "ml_server:app",
-        host="0.0.0.0",
-        port=8788,
-        reload=True
+        host=args.host,
+        port=args.port,
+        reload=not args.no_reload
     )
+
+
+if __name__ == "__main__":
+    main()
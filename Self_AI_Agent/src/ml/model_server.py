@@ -0,0 +1,695 @@
+"""
+Model Server - One copy of the transformer models per host
+
+Every uvicorn worker that builds a TransformerEmotionAnalyzer (or loads a
+personality model) holds its own copy of the weights, which costs several
+GB per worker. This sidecar owns a single copy of each model and serves
+them to all workers on the host over a Unix socket:
+
+- analyze: emotion analysis, micro-batched across all connected workers
+  (requests arriving within max_wait_ms share one analyze_batch call)
+- generate_response: personality model replies; users' LoRA adapters
+  are loaded onto one shared base model
+
+Workers use ModelServerClient / RemoteEmotionAnalyzer, which need neither
+torch nor transformers, so their memory stays flat as workers are added.
+
+Wire format: 4-byte big-endian length + UTF-8 JSON.
+    request:  {"id": 1, "method": "analyze", "params": {...}}
+    response: {"id": 1, "result": ...} or {"id": 1, "error": "..."}
+
+Run:
+    python -m src.ml.model_server --socket /tmp/soma-models.sock --preload
+"""
+
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import logging
+import os
+import socket
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = "/tmp/soma-models.sock"
+_HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+
+class ModelServerError(RuntimeError):
+    """Error returned by the model server"""
+
+
+# ============================================================================
+# Framing
+# ============================================================================
+
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    payload = json.dumps(message, default=str).encode("utf-8")
+    return _HEADER.pack(len(payload)) + payload
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    header = await reader.readexactly(_HEADER.size)
+    (length,) = _HEADER.unpack(header)
+    if length > MAX_FRAME_BYTES:
+        raise ModelServerError(f"Frame too large: {length} bytes")
+    return json.loads(await reader.readexactly(length))
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("Model server closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_frame_sync(sock: socket.socket) -> Dict[str, Any]:
+    (length,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return json.loads(_recv_exactly(sock, length))
+
+
+# ============================================================================
+# Server
+# ============================================================================
+
+class MicroBatcher:
+    """
+    Collect concurrent requests into batches
+
+    The first request of a batch starts a max_wait timer; the batch runs
+    when the timer fires or max_batch requests are queued. Batches run on
+    the given executor (one thread per model, so requests that arrive
+    while a batch is running form the next batch).
+
+    run_batch(items) returns one result per item, in order; an Exception
+    instance fails only that item.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], List[Any]],
+        executor: ThreadPoolExecutor,
+        max_batch: int = 32,
+        max_wait_ms: float = 5.0
+    ):
+        self.run_batch = run_batch
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch, self._pending = self._pending, []
+        if batch:
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self.executor, self.run_batch, [item for item, _ in batch]
+            )
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': self.items / self.batches if self.batches else 0.0,
+            'pending': len(self._pending)
+        }
+
+
+def analysis_to_dict(analysis) -> Dict[str, Any]:
+    """EmotionAnalysis → JSON-safe dict"""
+    data = asdict(analysis)
+    data['timestamp'] = analysis.timestamp.isoformat()
+    return data
+
+
+class PersonalityModelPool:
+    """
+    Personality engines sharing one base model
+
+    The first engine loads the base model with its user's LoRA adapter;
+    later users only load their adapter onto the same model. At most
+    max_adapters extra adapters are kept (least recently used evicted).
+
+    Engines are keyed by the adapter path. Without an explicit path the
+    user's latest active model is looked up on every request, so a
+    retrained adapter replaces the old one.
+    """
+
+    def __init__(
+        self,
+        module_dir: Optional[str] = None,
+        db_path: str = "./self_agent.db",
+        base_model: str = "google/gemma-2b",
+        max_adapters: int = 8
+    ):
+        self.module_dir = module_dir
+        self.db_path = db_path
+        self.base_model = base_model
+        self.max_adapters = max_adapters
+
+        self._module = None
+        self._owner = None  # Engine that loaded the base model
+        self._engines: "OrderedDict[str, Any]" = OrderedDict()
+
+    def _load_module(self):
+        if self._module is None:
+            if self.module_dir and self.module_dir not in sys.path:
+                sys.path.insert(0, self.module_dir)
+            self._module = importlib.import_module("personality_inference")
+        return self._module
+
+    def _latest_model_path(self, user_id: str) -> Optional[str]:
+        """Same lookup as PersonalityInferenceEngine without a model_path"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute(
+                """
+                SELECT model_path
+                FROM personality_models
+                WHERE user_id = ? AND is_active = 1
+                ORDER BY created_at DESC
+                LIMIT 1
+                """,
+                (user_id,)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            return None  # No models table yet: let the engine report it
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def _engine(self, user_id: str, model_path: Optional[str]):
+        if model_path is None:
+            model_path = self._latest_model_path(user_id)
+
+        key = f"{user_id}:{model_path or ''}"
+        if key in self._engines:
+            self._engines.move_to_end(key)
+            return self._engines[key]
+
+        # The user's other adapters are superseded (retrained model)
+        for old_key in [k for k in self._engines if k.startswith(f"{user_id}:")]:
+            if self._engines[old_key] is not self._owner:
+                self._engines.pop(old_key).release()
+
+        module = self._load_module()
+        if self._owner is None:
+            engine = module.PersonalityInferenceEngine(
+                user_id, db_path=self.db_path, base_model=self.base_model, model_path=model_path
+            )
+            self._owner = engine
+        else:
+            engine = module.PersonalityInferenceEngine(
+                user_id,
+                db_path=self.db_path,
+                base_model=self.base_model,
+                model_path=model_path,
+                shared_model=self._owner.model,
+                tokenizer=self._owner.tokenizer
+            )
+
+        self._engines[key] = engine
+        self._evict()
+        return engine
+
+    def _evict(self):
+        extra = [k for k, e in self._engines.items() if e is not self._owner]
+        while len(extra) > self.max_adapters:
+            key = extra.pop(0)
+            self._engines.pop(key).release()
+
+    def generate(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        module = self._load_module()
+        engine = self._engine(params['user_id'], params.get('model_path'))
+
+        config = None
+        if params.get('config'):
+            config = module.InferenceConfig(**params['config'])
+
+        response, metadata = engine.generate_response(
+            params['message'],
+            conversation_history=params.get('conversation_history'),
+            relevant_memories=params.get('relevant_memories'),
+            persona_prompt=params.get('persona_prompt'),
+            config=config
+        )
+        return {'response': response, 'metadata': metadata}
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'engines': len(self._engines), 'base_loaded': self._owner is not None}
+
+
+class ModelServer:
+    """Unix-socket server owning the host's transformer models"""
+
+    def __init__(
+        self,
+        socket_path: str = DEFAULT_SOCKET_PATH,
+        max_batch: int = 32,
+        max_wait_ms: float = 5.0,
+        analyzer_options: Optional[Dict[str, Any]] = None,
+        personality_pool: Optional[PersonalityModelPool] = None
+    ):
+        self.socket_path = socket_path
+        self.analyzer_options = analyzer_options or {}
+        self.personality_pool = personality_pool or PersonalityModelPool()
+
+        # One thread per model: model calls never run concurrently
+        self._emotion_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="emotion-model")
+        self._generate_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="personality-model")
+
+        self._analyzer = None
+        self.analyze_batcher = MicroBatcher(
+            self._run_analyze_batch, self._emotion_executor, max_batch, max_wait_ms
+        )
+
+        self.handlers = {
+            'ping': self._ping,
+            'analyze': self._analyze,
+            'generate_response': self._generate_response,
+            'stats': self._stats,
+        }
+
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections: set = set()  # Open client writers (closed on stop)
+        self._started_at = time.time()
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def analyzer(self):
+        if self._analyzer is None:
+            from .services.emotion_model_v2 import TransformerEmotionAnalyzer
+            self._analyzer = TransformerEmotionAnalyzer(**self.analyzer_options)
+        return self._analyzer
+
+    def preload(self):
+        """Load the emotion models before accepting requests"""
+        start = time.time()
+        self.analyzer._load_models()
+        logger.info(f"Emotion models preloaded in {time.time() - start:.1f}s")
+
+    async def start(self):
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        logger.info(f"Model server listening on {self.socket_path}")
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Close idle client connections so clients see EOF and reconnect
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self._emotion_executor.shutdown(wait=False)
+        self._generate_executor.shutdown(wait=False)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(writer)
+        try:
+            while True:
+                try:
+                    request = await read_frame(reader)
+                except asyncio.IncompleteReadError:
+                    break
+
+                writer.write(encode_frame(await self._dispatch(request)))
+                await writer.drain()
+        except (ConnectionError, ModelServerError) as e:
+            logger.warning(f"Model server connection dropped: {e}")
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    async def _dispatch(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        self.requests += 1
+        request_id = request.get('id')
+        handler = self.handlers.get(request.get('method'))
+
+        if handler is None:
+            self.errors += 1
+            return {'id': request_id, 'error': f"Unknown method: {request.get('method')}"}
+
+        try:
+            return {'id': request_id, 'result': await handler(request.get('params') or {})}
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Model server {request.get('method')} failed: {e}")
+            return {'id': request_id, 'error': f"{type(e).__name__}: {e}"}
+
+    async def _ping(self, params: Dict[str, Any]) -> str:
+        return 'pong'
+
+    async def _analyze(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Analyze one or more texts; each text joins the shared micro-batch"""
+        texts = params['texts']
+        contexts = params.get('contexts') or [None] * len(texts)
+        baseline = params.get('user_baseline')
+        if len(contexts) != len(texts):
+            raise ValueError(f"Got {len(contexts)} contexts for {len(texts)} texts")
+
+        return await asyncio.gather(*[
+            self.analyze_batcher.submit((text, context, baseline))
+            for text, context in zip(texts, contexts)
+        ])
+
+    def _run_analyze_batch(self, items: List[Tuple]) -> List[Any]:
+        """Run on the emotion model thread: one analyze_batch per baseline"""
+        groups: Dict[str, List[int]] = {}
+        for index, (_, _, baseline) in enumerate(items):
+            groups.setdefault(json.dumps(baseline, sort_keys=True), []).append(index)
+
+        results: List[Any] = [None] * len(items)
+        for indices in groups.values():
+            try:
+                analyses = self.analyzer.analyze_batch(
+                    [items[i][0] for i in indices],
+                    [items[i][1] for i in indices],
+                    items[indices[0]][2]
+                )
+                for i, analysis in zip(indices, analyses):
+                    results[i] = analysis_to_dict(analysis)
+            except Exception as e:
+                for i in indices:
+                    results[i] = e
+
+        return results
+
+    async def _generate_response(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return await asyncio.get_running_loop().run_in_executor(
+            self._generate_executor, self.personality_pool.generate, params
+        )
+
+    async def _stats(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        stats = {
+            'uptime_seconds': time.time() - self._started_at,
+            'requests': self.requests,
+            'errors': self.errors,
+            'analyze_batching': self.analyze_batcher.get_stats(),
+            'personality': self.personality_pool.get_stats(),
+        }
+        if self._analyzer is not None:
+            stats['emotion_cache'] = self._analyzer.get_cache_stats()
+        return stats
+
+
+# ============================================================================
+# Client
+# ============================================================================
+
+class ModelServerClient:
+    """
+    Blocking client for the model server
+
+    Thread-safe: each thread keeps its own connection (FastAPI runs sync
+    endpoints on a thread pool).
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: float = 60.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._ids = itertools.count(1)
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None and self._is_stale(sock):
+            self._drop_connection()
+            sock = None
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _is_stale(self, sock: socket.socket) -> bool:
+        """Whether the server closed an idle connection (EOF or error pending)"""
+        try:
+            sock.setblocking(False)
+            # No response is outstanding: anything readable means it is unusable
+            sock.recv(1, socket.MSG_PEEK)
+            return True
+        except BlockingIOError:
+            return False
+        except OSError:
+            return True
+        finally:
+            sock.settimeout(self.timeout)
+
+    def _drop_connection(self):
+        sock = getattr(self._local, 'sock', None)
+        self._local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def call(self, method: str, **params) -> Any:
+        """
+        Call a server method
+
+        Reconnects and resends once if sending fails. Once the request is
+        sent it is never resent (the server may already be running it):
+        a connection lost while waiting raises ModelServerError.
+        """
+        request = encode_frame({'id': next(self._ids), 'method': method, 'params': params})
+
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.sendall(request)
+                break
+            except ConnectionError as e:
+                self._drop_connection()
+                if attempt:
+                    raise ModelServerError(f"Model server unavailable: {e}")
+            except OSError:
+                self._drop_connection()
+                raise
+
+        try:
+            response = read_frame_sync(sock)
+        except ConnectionError as e:
+            self._drop_connection()
+            raise ModelServerError(f"Model server connection lost: {e}")
+        except OSError:
+            self._drop_connection()
+            raise
+
+        if 'error' in response:
+            raise ModelServerError(response['error'])
+        return response['result']
+
+    def ping(self) -> bool:
+        try:
+            return self.call('ping') == 'pong'
+        except (ModelServerError, OSError):
+            return False
+
+    def analyze_batch(
+        self,
+        texts: List[str],
+        contexts: Optional[List[Optional[List[str]]]] = None,
+        user_baseline: Optional[Dict[str, float]] = None
+    ) -> List[Dict[str, Any]]:
+        return self.call('analyze', texts=texts, contexts=contexts, user_baseline=user_baseline)
+
+    def generate_response(
+        self,
+        user_id: str,
+        message: str,
+        conversation_history: Optional[List[Dict[str, str]]] = None,
+        relevant_memories: Optional[List[str]] = None,
+        persona_prompt: Optional[str] = None,
+        config: Optional[Dict[str, Any]] = None,
+        model_path: Optional[str] = None
+    ) -> Tuple[str, Dict]:
+        result = self.call(
+            'generate_response',
+            user_id=user_id,
+            message=message,
+            conversation_history=conversation_history,
+            relevant_memories=relevant_memories,
+            persona_prompt=persona_prompt,
+            config=config,
+            model_path=model_path
+        )
+        return result['response'], result['metadata']
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.call('stats')
+
+
+class RemoteEmotionAnalyzer:
+    """TransformerEmotionAnalyzer.analyze / analyze_batch served by the model server"""
+
+    # Methods with a batch counterpart (see ModelOptimizer.batch_process)
+    BATCH_METHODS = {'analyze': 'analyze_requests'}
+
+    def __init__(self, client: ModelServerClient):
+        self.client = client
+
+    def analyze_requests(self, kwargs_list: List[Dict[str, Any]]) -> List[Any]:
+        from .services.emotion_model_v2 import batch_analyze_requests
+
+        return batch_analyze_requests(self, kwargs_list)
+
+    def analyze(
+        self,
+        text: str,
+        context: Optional[List[str]] = None,
+        user_baseline: Optional[Dict[str, float]] = None
+    ):
+        return self.analyze_batch([text], [context] if context else None, user_baseline)[0]
+
+    def analyze_batch(
+        self,
+        texts: List[str],
+        contexts: Optional[List[Optional[List[str]]]] = None,
+        user_baseline: Optional[Dict[str, float]] = None
+    ) -> list:
+        from .services.emotion_model_v2 import EmotionAnalysis
+
+        analyses = []
+        for data in self.client.analyze_batch(texts, contexts, user_baseline):
+            data['timestamp'] = datetime.fromisoformat(data['timestamp'])
+            analyses.append(EmotionAnalysis(**data))
+        return analyses
+
+
+_emotion_analyzer = None
+_emotion_analyzer_lock = threading.Lock()
+
+
+def get_emotion_analyzer(socket_path: Optional[str] = None):
+    """
+    Shared emotion analyzer for this process
+
+    Uses the model server when a socket is configured (argument or
+    MODEL_SERVER_SOCKET), otherwise loads the models in-process.
+    """
+    global _emotion_analyzer
+
+    with _emotion_analyzer_lock:
+        if _emotion_analyzer is None:
+            socket_path = socket_path or os.getenv("MODEL_SERVER_SOCKET")
+            if socket_path:
+                _emotion_analyzer = RemoteEmotionAnalyzer(ModelServerClient(socket_path))
+            else:
+                from .services.emotion_model_v2 import TransformerEmotionAnalyzer
+                _emotion_analyzer = TransformerEmotionAnalyzer()
+        return _emotion_analyzer
+
+
+# ============================================================================
+# CLI
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Soma model server (one model copy per host)")
+    parser.add_argument('--socket', default=os.getenv("MODEL_SERVER_SOCKET", DEFAULT_SOCKET_PATH))
+    parser.add_argument('--max-batch', type=int, default=32, help='Max texts per analyze batch')
+    parser.add_argument('--max-wait-ms', type=float, default=5.0, help='Micro-batch collection window')
+    parser.add_argument('--backend', default='pytorch', help="Emotion backend: pytorch, pytorch-int8, onnx")
+    parser.add_argument('--preload', action='store_true', help='Load emotion models at startup')
+    parser.add_argument('--personality-dir', default=None, help='Directory containing personality_inference.py')
+    parser.add_argument('--personality-db', default='./self_agent.db', help='Personality model registry DB')
+    parser.add_argument('--base-model', default='google/gemma-2b')
+    parser.add_argument('--max-adapters', type=int, default=8, help='LoRA adapters kept loaded')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    server = ModelServer(
+        socket_path=args.socket,
+        max_batch=args.max_batch,
+        max_wait_ms=args.max_wait_ms,
+        analyzer_options={'backend': args.backend},
+        personality_pool=PersonalityModelPool(
+            module_dir=args.personality_dir,
+            db_path=args.personality_db,
+            base_model=args.base_model,
+            max_adapters=args.max_adapters
+        )
+    )
+    if args.preload:
+        server.preload()
+
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,21 +1,33 @@
-"""Model Optimization Module - Phase 7B.1"""
+"""
+Model Optimization Module - Phase 7B.1 / 7B.2
 
-from .model_quantization import (
-    ProductionModelOptimizer,
-    QuantizationConfig,
-    PruningConfig,
-    DistillationConfig,
-    OptimizationResult,
-    quick_quantize,
-    quick_optimize
-)
+Submodules are loaded on first access, so onnx_runtime can be used
+without PyTorch (model_quantization needs it).
+"""
 
-__all__ = [
-    "ProductionModelOptimizer",
-    "QuantizationConfig",
-    "PruningConfig",
-    "DistillationConfig",
-    "OptimizationResult",
-    "quick_quantize",
-    "quick_optimize"
-]
+import importlib
+
+# Exported name → submodule
+_EXPORTS = {
+    "ProductionModelOptimizer": "model_quantization",
+    "QuantizationConfig": "model_quantization",
+    "PruningConfig": "model_quantization",
+    "DistillationConfig": "model_quantization",
+    "OptimizationResult": "model_quantization",
+    "quick_quantize": "model_quantization",
+    "quick_optimize": "model_quantization",
+    "OnnxTextClassifier": "onnx_runtime",
+    "export_to_onnx": "onnx_runtime",
+    "create_session": "onnx_runtime",
+    "load_onnx_classifier": "onnx_runtime",
+    "compare_emotion_backends": "onnx_runtime",
+}
+
+
+def __getattr__(name):
+    if name in _EXPORTS:
+        return getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = list(_EXPORTS)
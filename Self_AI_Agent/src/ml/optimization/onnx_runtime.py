@@ -0,0 +1,407 @@
+"""
+ONNX Runtime Inference Backend - Phase 7B.2
+CPU推理后端: ONNX导出 + INT8动态量化 + ONNX Runtime
+
+核心功能:
+1. 将HF序列分类模型导出为ONNX (动态batch/序列长度)
+2. INT8动态量化 (权重量化, 激活运行时量化)
+3. 调优的ONNX Runtime会话 (intra-op线程, 图优化)
+4. 与transformers pipeline输出格式兼容的分类器
+5. 精度 vs 延迟 / 内存对比报告
+
+说明:
+- PyTorch动态量化后的模块 (quantize_dynamic) 无法再导出为ONNX,
+  所以ONNX路径使用ONNX Runtime自带的动态量化 (同样是INT8权重 + 动态激活)。
+- 导出结果缓存在磁盘上，只在首次使用时导出。
+
+预期提升 (CPU):
+- 单请求延迟: 2-4x 降低
+- 内存占用 (RSS): ~4x 降低
+"""
+
+import importlib.util
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ONNX_DIR = Path("./optimized_models/onnx")
+ONNX_OPSET = 14
+
+
+def _model_dir(model_name: str, onnx_dir: Path) -> Path:
+    """模型的导出目录 (按模型名)"""
+    return Path(onnx_dir) / model_name.replace('/', '__')
+
+
+def onnx_backend_available(
+    model_name: str,
+    onnx_dir: Union[str, Path] = DEFAULT_ONNX_DIR,
+    quantize: bool = True
+) -> bool:
+    """
+    能否用ONNX Runtime运行该模型 (不加载模型)
+
+    需要onnxruntime，以及已导出的模型或用于导出的PyTorch。
+    """
+    if not ONNXRUNTIME_AVAILABLE:
+        return False
+
+    model_dir = _model_dir(model_name, onnx_dir)
+    target = model_dir / ("model.int8.onnx" if quantize else "model.onnx")
+    if target.exists() or (model_dir / "model.onnx").exists():
+        return True
+    return importlib.util.find_spec("torch") is not None
+
+
+def export_to_onnx(
+    model_name: str,
+    onnx_dir: Union[str, Path] = DEFAULT_ONNX_DIR,
+    quantize: bool = True,
+    max_length: int = 512
+) -> Path:
+    """
+    导出HF序列分类模型为ONNX (已导出则直接返回)
+
+    同时保存tokenizer和config，加载ONNX模型时不再需要PyTorch权重。
+
+    Args:
+        model_name: HF模型名
+        onnx_dir: 导出根目录
+        quantize: 是否做INT8动态量化
+        max_length: tokenizer最大长度 (记录在导出目录中)
+
+    Returns:
+        ONNX文件路径 (quantize时为INT8模型)
+    """
+    model_dir = _model_dir(model_name, onnx_dir)
+    fp32_path = model_dir / "model.onnx"
+    int8_path = model_dir / "model.int8.onnx"
+    target = int8_path if quantize else fp32_path
+
+    if target.exists():
+        return target
+
+    model_dir.mkdir(parents=True, exist_ok=True)
+
+    if not fp32_path.exists():
+        import torch
+        from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+        logger.info(f"📦 Exporting {model_name} to ONNX...")
+        start = time.time()
+
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        model.eval()
+
+        sample = tokenizer(["ONNX export sample text"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask") if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["logits"] = {0: "batch"}
+
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                tuple(sample[name] for name in input_names),
+                str(fp32_path),
+                input_names=input_names,
+                output_names=["logits"],
+                dynamic_axes=dynamic_axes,
+                opset_version=ONNX_OPSET,
+                do_constant_folding=True
+            )
+
+        tokenizer.save_pretrained(str(model_dir))
+        model.config.save_pretrained(str(model_dir))
+        with open(model_dir / "export.json", "w") as f:
+            json.dump({"model_name": model_name, "max_length": max_length, "opset": ONNX_OPSET}, f)
+
+        logger.info(f"✅ Exported {model_name} in {time.time() - start:.1f}s")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        logger.info(f"🔧 Quantizing {model_name} (INT8 dynamic)...")
+        quantize_dynamic(str(fp32_path), str(int8_path), weight_type=QuantType.QInt8)
+
+        fp32_mb = fp32_path.stat().st_size / 1024**2
+        int8_mb = int8_path.stat().st_size / 1024**2
+        logger.info(f"✅ Quantized: {fp32_mb:.1f} MB → {int8_mb:.1f} MB")
+
+    return target
+
+
+def create_session(
+    onnx_path: Union[str, Path],
+    intra_op_threads: Optional[int] = None
+) -> "ort.InferenceSession":
+    """
+    创建调优的CPU推理会话
+
+    Args:
+        onnx_path: ONNX文件路径
+        intra_op_threads: 单算子并行线程数 (默认: 环境变量ORT_INTRA_OP_THREADS或CPU核数)
+    """
+    if not ONNXRUNTIME_AVAILABLE:
+        raise ImportError("onnxruntime is not installed")
+
+    if intra_op_threads is None:
+        intra_op_threads = int(os.environ.get("ORT_INTRA_OP_THREADS", os.cpu_count() or 1))
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+    options.intra_op_num_threads = intra_op_threads
+    # 单个模型的算子顺序执行，不需要inter-op并行
+    options.inter_op_num_threads = 1
+
+    return ort.InferenceSession(
+        str(onnx_path),
+        sess_options=options,
+        providers=["CPUExecutionProvider"]
+    )
+
+
+class OnnxTextClassifier:
+    """
+    ONNX Runtime文本分类器
+
+    调用方式与输出格式同transformers的text-classification pipeline:
+    - top_k=None: 每条文本返回所有标签得分 (降序)
+    - top_k=1: 每条文本返回最高分的 {'label', 'score'}
+    """
+
+    def __init__(
+        self,
+        session: "ort.InferenceSession",
+        tokenizer,
+        config,
+        top_k: Optional[int] = 1,
+        max_length: int = 512
+    ):
+        self.session = session
+        self.tokenizer = tokenizer
+        self.top_k = top_k
+        self.max_length = max_length
+        self.input_names = [i.name for i in session.get_inputs()]
+        self.id2label = {int(k): v for k, v in config.id2label.items()}
+
+        # 与pipeline相同: 多标签或单输出用sigmoid，否则softmax
+        self.multi_label = (
+            getattr(config, "problem_type", None) == "multi_label_classification"
+            or config.num_labels == 1
+        )
+
+    def __call__(self, texts: Union[str, Sequence[str]], batch_size: int = 32) -> List[Any]:
+        if isinstance(texts, str):
+            texts = [texts]
+
+        results = []
+        for start in range(0, len(texts), batch_size):
+            chunk = list(texts[start:start + batch_size])
+            # 动态padding: 只pad到本batch的最长文本
+            encoded = self.tokenizer(
+                chunk,
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self.input_names}
+            logits = self.session.run(["logits"], feeds)[0]
+            results.extend(self._postprocess(logits))
+
+        return results
+
+    def _postprocess(self, logits: np.ndarray) -> List[Any]:
+        if self.multi_label:
+            scores = 1.0 / (1.0 + np.exp(-logits))
+        else:
+            shifted = logits - logits.max(axis=-1, keepdims=True)
+            exp = np.exp(shifted)
+            scores = exp / exp.sum(axis=-1, keepdims=True)
+
+        outputs = []
+        for row in scores:
+            ranked = [
+                {"label": self.id2label[i], "score": float(row[i])}
+                for i in np.argsort(-row)
+            ]
+            if self.top_k is None:
+                outputs.append(ranked)
+            elif self.top_k == 1:
+                outputs.append(ranked[0])
+            else:
+                outputs.append(ranked[:self.top_k])
+        return outputs
+
+
+def load_onnx_classifier(
+    model_name: str,
+    onnx_dir: Union[str, Path] = DEFAULT_ONNX_DIR,
+    quantize: bool = True,
+    top_k: Optional[int] = 1,
+    intra_op_threads: Optional[int] = None,
+    max_length: int = 512
+) -> OnnxTextClassifier:
+    """
+    加载 (必要时先导出) ONNX分类器
+
+    Args:
+        model_name: HF模型名
+        onnx_dir: 导出根目录
+        quantize: 使用INT8模型
+        top_k: 返回格式 (None=所有标签, 1=最高分)
+        intra_op_threads: ONNX Runtime intra-op线程数
+    """
+    from transformers import AutoConfig, AutoTokenizer
+
+    onnx_path = export_to_onnx(model_name, onnx_dir, quantize=quantize, max_length=max_length)
+    model_dir = onnx_path.parent
+
+    return OnnxTextClassifier(
+        create_session(onnx_path, intra_op_threads),
+        AutoTokenizer.from_pretrained(str(model_dir)),
+        AutoConfig.from_pretrained(str(model_dir)),
+        top_k=top_k,
+        max_length=max_length
+    )
+
+
+# ==================== 对比报告 ====================
+
+def _benchmark_backend(
+    backend: str,
+    texts: List[str],
+    runs: int,
+    onnx_dir: str
+) -> Dict[str, Any]:
+    """在独立进程中加载一个后端并测量 (RSS互不干扰)"""
+    import resource
+    from ..services.emotion_model_v2 import TransformerEmotionAnalyzer
+
+    def peak_rss_mb() -> float:
+        # Linux上ru_maxrss单位为KB
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    rss_before = peak_rss_mb()
+    analyzer = TransformerEmotionAnalyzer(device="cpu", backend=backend, onnx_dir=onnx_dir, cache_size=0)
+
+    start = time.time()
+    analyzer._load_models()
+    load_seconds = time.time() - start
+
+    # 预热
+    analyzer.analyze(texts[0])
+
+    latencies = []
+    outputs = []
+    for _ in range(runs):
+        outputs = []
+        for text in texts:
+            start = time.perf_counter()
+            outputs.append(analyzer.analyze(text))
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "backend": analyzer.backend,
+        "load_seconds": load_seconds,
+        "latency_ms_mean": float(np.mean(latencies)),
+        "latency_ms_p50": float(np.percentile(latencies, 50)),
+        "latency_ms_p95": float(np.percentile(latencies, 95)),
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_increase_mb": peak_rss_mb() - rss_before,
+        "predictions": [
+            {"primary_emotion": r.primary_emotion, "all_emotions": r.all_emotions,
+             "is_sarcastic": r.is_sarcastic}
+            for r in outputs
+        ]
+    }
+
+
+def compare_emotion_backends(
+    texts: List[str],
+    backends: Sequence[str] = ("pytorch", "onnx"),
+    runs: int = 3,
+    onnx_dir: Union[str, Path] = DEFAULT_ONNX_DIR,
+    report_path: Optional[Union[str, Path]] = None
+) -> Dict[str, Any]:
+    """
+    情感模型后端对比: 精度 vs 延迟 vs 内存
+
+    每个后端在独立进程中运行。精度以第一个后端为基准:
+    - primary_agreement: 主情感一致的比例
+    - mean_abs_score_diff: 各情感得分的平均绝对误差
+    - sarcasm_agreement: 讽刺判定一致的比例
+
+    Args:
+        texts: 评测文本
+        backends: 要对比的后端 (第一个为基准)
+        runs: 每条文本的重复次数
+        onnx_dir: ONNX导出目录
+        report_path: 可选，写入JSON报告
+
+    Returns:
+        {'backends': {...}, 'reference': 基准后端}
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    for backend in backends:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            results[backend] = pool.submit(
+                _benchmark_backend, backend, list(texts), runs, str(onnx_dir)
+            ).result()
+        logger.info(f"📊 {backend}: p50 {results[backend]['latency_ms_p50']:.1f}ms, "
+                    f"RSS +{results[backend]['rss_increase_mb']:.0f}MB")
+
+    reference = backends[0]
+    ref_predictions = results[reference]["predictions"]
+    for backend, result in results.items():
+        predictions = result.pop("predictions")
+        diffs = [
+            abs(p["all_emotions"].get(label, 0.0) - score)
+            for p, ref in zip(predictions, ref_predictions)
+            for label, score in ref["all_emotions"].items()
+        ]
+        result["primary_agreement"] = float(np.mean([
+            p["primary_emotion"] == ref["primary_emotion"]
+            for p, ref in zip(predictions, ref_predictions)
+        ]))
+        result["sarcasm_agreement"] = float(np.mean([
+            p["is_sarcastic"] == ref["is_sarcastic"]
+            for p, ref in zip(predictions, ref_predictions)
+        ]))
+        result["mean_abs_score_diff"] = float(np.mean(diffs)) if diffs else 0.0
+        result["speedup_vs_reference"] = (
+            results[reference]["latency_ms_p50"] / result["latency_ms_p50"]
+            if result["latency_ms_p50"] else 0.0
+        )
+        result["rss_ratio_vs_reference"] = (
+            results[reference]["rss_increase_mb"] / result["rss_increase_mb"]
+            if result["rss_increase_mb"] else 0.0
+        )
+
+    report = {"reference": reference, "num_texts": len(texts), "runs": runs, "backends": results}
+
+    if report_path:
+        with open(report_path, "w") as f:
+            json.dump(report, f, indent=2)
+        logger.info(f"💾 Report saved to {report_path}")
+
+    return report
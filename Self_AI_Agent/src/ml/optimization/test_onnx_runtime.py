@@ -0,0 +1,113 @@
+"""
+测试文件: ONNX Runtime推理后端 - Phase 7B.2
+验证与transformers pipeline兼容的输出格式
+
+测试场景:
+1. 多标签模型 (sigmoid, 所有标签得分)
+2. 单标签模型 (softmax, 最高分)
+3. 分批推理 + 动态padding
+4. 后端可用性检查 (不加载模型)
+"""
+
+import types
+
+import numpy as np
+import pytest
+
+import onnx_runtime
+from onnx_runtime import OnnxTextClassifier, onnx_backend_available
+
+
+# ==================== 测试替身 ====================
+
+class FakeSession:
+    """固定logits的ONNX会话, 记录每次输入的形状"""
+    def __init__(self, logits):
+        self.logits = np.array([logits], dtype=np.float32)
+        self.shapes = []
+
+    def get_inputs(self):
+        return [types.SimpleNamespace(name="input_ids"), types.SimpleNamespace(name="attention_mask")]
+
+    def run(self, output_names, feeds):
+        self.shapes.append(feeds["input_ids"].shape)
+        return [np.repeat(self.logits, feeds["input_ids"].shape[0], axis=0)]
+
+
+def fake_tokenizer(texts, padding, truncation, max_length, return_tensors):
+    """按字符数的tokenizer, padding到本batch最长文本"""
+    length = min(max(len(t) for t in texts), max_length)
+    return {
+        "input_ids": np.zeros((len(texts), length), dtype=np.int64),
+        "attention_mask": np.ones((len(texts), length), dtype=np.int64)
+    }
+
+
+def fake_config(problem_type=None):
+    return types.SimpleNamespace(
+        id2label={"0": "joy", "1": "sadness", "2": "neutral"},
+        problem_type=problem_type,
+        num_labels=3
+    )
+
+
+# ==================== 测试 ====================
+
+def test_multi_label_all_scores():
+    """测试1: 多标签模型返回所有标签的sigmoid得分 (降序)"""
+    classifier = OnnxTextClassifier(
+        FakeSession([2.0, 0.0, -1.0]), fake_tokenizer,
+        fake_config("multi_label_classification"), top_k=None
+    )
+
+    [result] = classifier(["I'm happy"])
+
+    assert [r["label"] for r in result] == ["joy", "sadness", "neutral"]
+    assert result[0]["score"] == pytest.approx(1 / (1 + np.exp(-2.0)))
+    assert result[1]["score"] == pytest.approx(0.5)
+
+
+def test_single_label_top1():
+    """测试2: 单标签模型返回softmax最高分"""
+    classifier = OnnxTextClassifier(
+        FakeSession([0.0, 1.0, 0.0]), fake_tokenizer, fake_config(), top_k=1
+    )
+
+    [result] = classifier("just one text")
+
+    assert result["label"] == "sadness"
+    expected = np.exp(1.0) / (np.exp(1.0) + 2)
+    assert result["score"] == pytest.approx(expected)
+
+
+def test_batching_dynamic_padding():
+    """测试3: 按batch_size分批, 每批只pad到本批最长文本"""
+    session = FakeSession([0.0, 1.0, 0.0])
+    classifier = OnnxTextClassifier(session, fake_tokenizer, fake_config(), top_k=1)
+
+    texts = ["a", "bb", "ccc", "dddddd", "eeeeeee"]
+    results = classifier(texts, batch_size=2)
+
+    assert len(results) == len(texts)
+    assert session.shapes == [(2, 2), (2, 6), (1, 7)]
+
+
+
+def test_backend_availability(tmp_path, monkeypatch):
+    """测试4: 需要onnxruntime，以及已导出的模型或用于导出的PyTorch"""
+    model_dir = tmp_path / "org__model"
+
+    monkeypatch.setattr(onnx_runtime, "ONNXRUNTIME_AVAILABLE", False)
+    assert not onnx_backend_available("org/model", tmp_path)
+
+    monkeypatch.setattr(onnx_runtime, "ONNXRUNTIME_AVAILABLE", True)
+    monkeypatch.setattr(onnx_runtime.importlib.util, "find_spec", lambda name: None)
+    assert not onnx_backend_available("org/model", tmp_path)
+
+    model_dir.mkdir()
+    (model_dir / "model.int8.onnx").write_bytes(b"")
+    assert onnx_backend_available("org/model", tmp_path)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "-s"])
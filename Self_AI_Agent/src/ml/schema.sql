@@ -198,7 +198,7 @@ CREATE TABLE IF NOT EXISTS cognitive_cache (
   user_id TEXT NOT NULL,
   module_name TEXT NOT NULL, -- 'reasoning', 'values', 'emotions', 'tom', 'narrative'
   input_hash TEXT NOT NULL, -- SHA256 hash of input
-  output_data TEXT NOT NULL, -- JSON serialized output
+  output_data TEXT NOT NULL, -- cache_codec-encoded output (BLOB; legacy rows: JSON text)
   computation_time_ms INTEGER,
   created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
   expires_at TIMESTAMP, -- NULL = never expires
@@ -228,6 +228,62 @@ CREATE TABLE IF NOT EXISTS cognitive_model_metadata (
 
 CREATE INDEX IF NOT EXISTS idx_cognitive_model_metadata_user ON cognitive_model_metadata(user_id);
 
+-- ============================================================================
+-- 8. INCREMENTAL PROCESSING WATERMARKS
+-- ============================================================================
+CREATE TABLE IF NOT EXISTS cognitive_watermarks (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id TEXT NOT NULL,
+  module_name TEXT NOT NULL, -- 'reasoning', 'values', 'narrative', 'tom:<target>'
+  last_conversation_id INTEGER NOT NULL DEFAULT 0, -- Highest conversation_memory.id processed
+  last_timestamp TIMESTAMP,
+  state TEXT, -- JSON: running aggregates needed to extend the model
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (user_id) REFERENCES users(id),
+  UNIQUE(user_id, module_name)
+);
+
+-- ============================================================================
+-- 9. EMOTIONAL TRAJECTORY
+-- ============================================================================
+-- Per-message emotion analysis, computed once per message
+CREATE TABLE IF NOT EXISTS emotion_message_analyses (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id TEXT NOT NULL,
+  message_id INTEGER NOT NULL, -- conversation_memory.id
+  seq INTEGER NOT NULL, -- Per-user analysis order (x axis of the trend regression)
+  day TEXT NOT NULL, -- YYYY-MM-DD of the message
+  timestamp TIMESTAMP,
+  valence REAL NOT NULL,
+  arousal REAL NOT NULL,
+  primary_emotion TEXT NOT NULL,
+  intensity REAL,
+  analyzed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (user_id) REFERENCES users(id),
+  UNIQUE(user_id, message_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_emotion_message_analyses_user_day ON emotion_message_analyses(user_id, day);
+
+-- Running per-day aggregates (Welford moments), merged to serve trajectories
+CREATE TABLE IF NOT EXISTS emotion_daily_aggregates (
+  id INTEGER PRIMARY KEY AUTOINCREMENT,
+  user_id TEXT NOT NULL,
+  day TEXT NOT NULL, -- YYYY-MM-DD
+  message_count INTEGER NOT NULL DEFAULT 0,
+  valence_mean REAL NOT NULL DEFAULT 0,
+  valence_m2 REAL NOT NULL DEFAULT 0, -- Sum of squared deviations
+  arousal_mean REAL NOT NULL DEFAULT 0,
+  arousal_m2 REAL NOT NULL DEFAULT 0,
+  seq_mean REAL NOT NULL DEFAULT 0,
+  seq_m2 REAL NOT NULL DEFAULT 0,
+  seq_valence_comoment REAL NOT NULL DEFAULT 0, -- For the valence trend slope
+  emotion_counts TEXT, -- JSON: {"joy": 3, ...}
+  updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+  FOREIGN KEY (user_id) REFERENCES users(id),
+  UNIQUE(user_id, day)
+);
+
 -- ============================================================================
 -- VIEWS FOR CONVENIENCE
 -- ============================================================================
@@ -1,12 +1,25 @@
 """
 ML Services Package - Phase 5 Deep Cognitive Modeling
+
+Service modules and their global instances are loaded on first access
+(see registry.py), so importing the package is cheap.
 """
 
-from .reasoning_extractor import reasoning_extractor, ReasoningChainExtractor
-from .value_builder import value_builder, ValueHierarchyBuilder
-from .emotional_engine import emotional_engine, EmotionalReasoningEngine
-from .theory_of_mind import theory_of_mind, TheoryOfMindModule
-from .narrative_builder import narrative_builder, NarrativeIdentityBuilder
+import importlib
+
+from .registry import SERVICES, ServiceRegistry, get_service, registry
+
+# Class name → module
+_CLASSES = {class_name: module_name for module_name, class_name in SERVICES.values()}
+
+
+def __getattr__(name):
+    if name in SERVICES:
+        return registry.get(name)
+    if name in _CLASSES:
+        return getattr(importlib.import_module(f'.{_CLASSES[name]}', __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 __all__ = [
     'reasoning_extractor',
@@ -19,4 +32,7 @@ __all__ = [
     'TheoryOfMindModule',
     'narrative_builder',
     'NarrativeIdentityBuilder',
+    'registry',
+    'get_service',
+    'ServiceRegistry',
 ]
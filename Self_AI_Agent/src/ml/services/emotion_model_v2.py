@@ -13,13 +13,25 @@ Advanced Emotion Recognition using Transformers
 - 上下文敏感情感分析
 """
 
-import torch
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+import hashlib
+import json
+import math
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 import logging
 
+try:
+    import torch
+    TORCH_AVAILABLE = True
+except ImportError:
+    # 只通过模型服务 (model_server) 调用时不需要torch
+    TORCH_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
@@ -38,6 +50,460 @@ class EmotionAnalysis:
     timestamp: datetime
 
 
+class EmotionResultCache:
+    """
+    分类结果缓存 (按文本内容哈希)
+    
+    - 内存层: LRU，最多max_entries条
+    - 磁盘层: 可选SQLite文件，进程重启后仍可命中
+    
+    键为 (模型名, 文本) 的SHA-256，所以更换模型不会命中旧结果。
+    """
+    
+    def __init__(self, max_entries: int = 10000, db_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.db_path = db_path
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        
+        self._conn = None
+        if db_path:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS emotion_result_cache ("
+                "key TEXT PRIMARY KEY, result TEXT NOT NULL)"
+            )
+            self._conn.commit()
+    
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        return hashlib.sha256(f"{model_name}\0{text}".encode('utf-8')).hexdigest()
+    
+    def get_many(self, model_name: str, texts: List[str]) -> Dict[str, Any]:
+        """查询多条文本，返回命中的 文本 → 结果"""
+        found = {}
+        disk_lookup = {}
+        
+        with self._lock:
+            for text in texts:
+                key = self.make_key(model_name, text)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    found[text] = self._entries[key]
+                    self.hits += 1
+                else:
+                    disk_lookup[key] = text
+            
+            if disk_lookup and self._conn is not None:
+                keys = list(disk_lookup)
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    rows = self._conn.execute(
+                        f"SELECT key, result FROM emotion_result_cache "
+                        f"WHERE key IN ({','.join('?' * len(chunk))})",
+                        chunk
+                    ).fetchall()
+                    for key, result in rows:
+                        value = json.loads(result)
+                        found[disk_lookup.pop(key)] = value
+                        self._store(key, value)
+                        self.disk_hits += 1
+            
+            self.misses += len(disk_lookup)
+        
+        return found
+    
+    def put_many(self, model_name: str, results: Dict[str, Any]):
+        """写入 文本 → 结果"""
+        if not results:
+            return
+        
+        with self._lock:
+            rows = []
+            for text, value in results.items():
+                key = self.make_key(model_name, text)
+                self._store(key, value)
+                rows.append((key, json.dumps(value)))
+            
+            if self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO emotion_result_cache (key, result) VALUES (?, ?)",
+                    rows
+                )
+                self._conn.commit()
+    
+    def _store(self, key: str, value: Any):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+    
+    def clear(self):
+        """清空内存层 (磁盘层保留)"""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            'disk_backed': self._conn is not None
+        }
+
+
+class EmotionTrajectoryStore:
+    """
+    情感轨迹持久化
+    
+    - emotion_message_analyses: 每条消息只分析一次并保存结果
+    - emotion_daily_aggregates: 每用户每天的运行统计量
+      (Welford均值/方差, 回归用的协矩, 情感计数)
+    
+    按天的统计量可以合并 (Chan并行算法)，所以任意天数窗口的
+    基线、波动性和趋势斜率都无需重新读取每条消息。
+    
+    watermark之后的新消息向前分析 (seq递增); 请求的窗口比已分析的
+    历史更早时，向后回填更早的消息 (seq从最小值递减)，seq始终与
+    消息顺序一致。watermark的state记录覆盖范围:
+    - history_from: 从这一天起的历史已完整分析 (None: 全部历史)
+    - backfill_below_id: 回填游标，id小于它的消息尚未分析
+    """
+    
+    WATERMARK_MODULE = 'emotion_trajectory'
+    MOMENT_FIELDS = ('valence', 'arousal', 'seq')
+    
+    def __init__(self, db):
+        self.db = db
+    
+    @classmethod
+    def empty_moments(cls) -> Dict[str, Any]:
+        moments = {'message_count': 0, 'seq_valence_comoment': 0.0, 'emotion_counts': {}}
+        for field in cls.MOMENT_FIELDS:
+            moments[f'{field}_mean'] = 0.0
+            moments[f'{field}_m2'] = 0.0
+        return moments
+    
+    @classmethod
+    def merge_moments(cls, a: Dict[str, Any], b: Dict[str, Any]) -> Dict[str, Any]:
+        """合并两组统计量 (单条消息即 n=1, m2=0 的统计量)"""
+        na, nb = a['message_count'], b['message_count']
+        if nb == 0:
+            return a
+        if na == 0:
+            return b
+        
+        n = na + nb
+        merged = {'message_count': n}
+        deltas = {}
+        for field in cls.MOMENT_FIELDS:
+            delta = b[f'{field}_mean'] - a[f'{field}_mean']
+            deltas[field] = delta
+            merged[f'{field}_mean'] = a[f'{field}_mean'] + delta * nb / n
+            merged[f'{field}_m2'] = a[f'{field}_m2'] + b[f'{field}_m2'] + delta * delta * na * nb / n
+        
+        merged['seq_valence_comoment'] = (
+            a['seq_valence_comoment'] + b['seq_valence_comoment']
+            + deltas['seq'] * deltas['valence'] * na * nb / n
+        )
+        
+        counts = dict(a['emotion_counts'])
+        for emotion, count in b['emotion_counts'].items():
+            counts[emotion] = counts.get(emotion, 0) + count
+        merged['emotion_counts'] = counts
+        
+        return merged
+    
+    def seed_watermark(self, user_id: str, days: int) -> bool:
+        """
+        首次分析前把watermark设在最近days天之前，只回填请求的窗口
+        
+        已有watermark时不变。窗口之前的历史留给之后更大窗口的回填
+        (见backfill_messages)。
+        
+        Returns:
+            是否设置了watermark
+        """
+        if self.db.get_watermark(user_id, self.WATERMARK_MODULE) is not None:
+            return False
+        
+        cutoff = self._cutoff_day(days)
+        row = self.db.execute_query(
+            """
+            SELECT MAX(id) AS id, MAX(timestamp) AS timestamp
+            FROM conversation_memory
+            WHERE user_id = ? AND timestamp < ?
+            """,
+            (user_id, cutoff),
+            fetch_one=True
+        )
+        if not row or row['id'] is None:
+            return False
+        
+        state = {'history_from': cutoff, 'backfill_below_id': row['id'] + 1}
+        try:
+            self.db.advance_watermark(user_id, self.WATERMARK_MODULE, [row], None, state=state)
+        except RuntimeError as e:
+            # WatermarkConflict: 并发的请求已经设置
+            logger.debug(f"Emotion watermark already seeded: {e}")
+            return False
+        return True
+    
+    def history_from(self, user_id: str) -> Optional[str]:
+        """已完整分析的最早一天 (None: 全部历史，或尚未分析)"""
+        watermark = self.db.get_watermark(user_id, self.WATERMARK_MODULE)
+        return watermark['state'].get('history_from') if watermark else None
+    
+    def covered_days(self, user_id: str, days: int) -> int:
+        """最近days天中已完整分析的天数"""
+        history_from = self.history_from(user_id)
+        if history_from is None or history_from <= self._cutoff_day(days):
+            return days
+        return max((datetime.now().date() - datetime.fromisoformat(history_from).date()).days, 0)
+    
+    def backfill_messages(
+        self,
+        user_id: str,
+        days: Optional[int],
+        limit: int = 500
+    ) -> Optional[Tuple[List[Dict], Dict, bool]]:
+        """
+        窗口内尚未分析的更早消息 (回填游标之前，最新的在前)
+        
+        Args:
+            days: 目标窗口 (None: 全部历史)
+        
+        Returns:
+            (消息, watermark, 是否已到窗口起点); 窗口已完整覆盖时为None
+        """
+        watermark = self.db.get_watermark(user_id, self.WATERMARK_MODULE)
+        if watermark is None:
+            return None
+        
+        state = watermark['state']
+        cutoff = self._cutoff_day(days) if days is not None else None
+        history_from = state.get('history_from')
+        if history_from is None or (cutoff is not None and cutoff >= history_from):
+            return None
+        
+        query = """
+            SELECT id, conversation_id, role, content, timestamp, context_metadata
+            FROM conversation_memory
+            WHERE user_id = ? AND id < ?
+        """
+        params: List[Any] = [user_id, state['backfill_below_id']]
+        if cutoff is not None:
+            query += " AND timestamp >= ?"
+            params.append(cutoff)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        
+        conversations = self.db.execute_query(query, tuple(params))
+        return conversations, watermark, len(conversations) < limit
+    
+    def pending_messages(self, user_id: str, limit: int = 500) -> Tuple[List[Dict], Optional[Dict]]:
+        """尚未分析的对话 (watermark之后)"""
+        return self.db.get_new_conversations(user_id, self.WATERMARK_MODULE, limit=limit)
+    
+    def record(
+        self,
+        user_id: str,
+        conversations: List[Dict],
+        analyzed: List[Tuple[Dict, 'EmotionAnalysis']],
+        watermark: Optional[Dict]
+    ) -> int:
+        """
+        保存消息分析结果，并入每日统计量，推进watermark (同一事务)
+        
+        Args:
+            conversations: 本轮处理的全部对话 (用于推进watermark)
+            analyzed: (对话, 分析结果) 列表
+            watermark: pending_messages返回的watermark
+        
+        Returns:
+            新保存的消息数
+        """
+        with self.db.batch() as batch:
+            row = batch.query(
+                "SELECT MAX(seq) AS seq FROM emotion_message_analyses WHERE user_id = ?",
+                (user_id,),
+                fetch_one=True
+            )
+            seq = row['seq'] if row and row['seq'] is not None else -1
+            saved = self._save_analyses(batch, user_id, analyzed, seq + 1, 1)
+            
+            self.db.advance_watermark(
+                user_id, self.WATERMARK_MODULE, conversations, watermark,
+                state=watermark['state'] if watermark else None
+            )
+        
+        return saved
+    
+    def record_backfill(
+        self,
+        user_id: str,
+        conversations: List[Dict],
+        analyzed: List[Tuple[Dict, 'EmotionAnalysis']],
+        watermark: Dict,
+        days: Optional[int],
+        complete: bool
+    ) -> int:
+        """
+        保存回填的分析结果 (seq递减)，移动回填游标 (同一事务)
+        
+        Args:
+            conversations: backfill_messages返回的对话 (最新的在前)
+            analyzed: (对话, 分析结果) 列表，与conversations同序
+            watermark: backfill_messages返回的watermark
+            days: 目标窗口 (None: 全部历史)
+            complete: 是否已到窗口起点
+        
+        Returns:
+            新保存的消息数
+        """
+        with self.db.batch() as batch:
+            row = batch.query(
+                "SELECT MIN(seq) AS seq FROM emotion_message_analyses WHERE user_id = ?",
+                (user_id,),
+                fetch_one=True
+            )
+            seq = row['seq'] if row and row['seq'] is not None else 0
+            saved = self._save_analyses(batch, user_id, analyzed, seq - 1, -1)
+            
+            state = dict(watermark['state'])
+            if conversations:
+                state['backfill_below_id'] = min(c['id'] for c in conversations)
+            if complete:
+                state['history_from'] = self._cutoff_day(days) if days is not None else None
+            
+            # 不移动watermark本身，只更新state (比较并交换，防止并发覆盖)
+            self.db.advance_watermark(user_id, self.WATERMARK_MODULE, [], watermark, state=state)
+        
+        return saved
+    
+    def _save_analyses(
+        self,
+        batch,
+        user_id: str,
+        analyzed: List[Tuple[Dict, 'EmotionAnalysis']],
+        first_seq: int,
+        step: int
+    ) -> int:
+        """逐条保存分析结果 (seq从first_seq按step递进) 并合并进每日统计量"""
+        saved = 0
+        seq = first_seq
+        
+        day_moments: Dict[str, Dict[str, Any]] = {}
+        for conv, analysis in analyzed:
+            timestamp = conv.get('timestamp')
+            day = str(timestamp)[:10] if timestamp else datetime.now().date().isoformat()
+            
+            inserted = batch.execute(
+                """
+                INSERT OR IGNORE INTO emotion_message_analyses
+                (user_id, message_id, seq, day, timestamp, valence, arousal,
+                 primary_emotion, intensity)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    user_id, conv['id'], seq, day, timestamp,
+                    analysis.valence, analysis.arousal,
+                    analysis.primary_emotion, analysis.intensity
+                )
+            )
+            if not inserted:
+                continue  # 已分析过
+            
+            single = {
+                'message_count': 1,
+                'valence_mean': analysis.valence,
+                'valence_m2': 0.0,
+                'arousal_mean': analysis.arousal,
+                'arousal_m2': 0.0,
+                'seq_mean': float(seq),
+                'seq_m2': 0.0,
+                'seq_valence_comoment': 0.0,
+                'emotion_counts': {analysis.primary_emotion: 1}
+            }
+            day_moments[day] = self.merge_moments(
+                day_moments.get(day, self.empty_moments()), single
+            )
+            seq += step
+            saved += 1
+        
+        for day, moments in day_moments.items():
+            existing = batch.query(
+                "SELECT * FROM emotion_daily_aggregates WHERE user_id = ? AND day = ?",
+                (user_id, day),
+                fetch_one=True
+            )
+            if existing:
+                existing['emotion_counts'] = json.loads(existing['emotion_counts'] or '{}')
+                moments = self.merge_moments(existing, moments)
+            
+            batch.execute(
+                """
+                INSERT OR REPLACE INTO emotion_daily_aggregates
+                (user_id, day, message_count, valence_mean, valence_m2,
+                 arousal_mean, arousal_m2, seq_mean, seq_m2,
+                 seq_valence_comoment, emotion_counts, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    user_id, day, moments['message_count'],
+                    moments['valence_mean'], moments['valence_m2'],
+                    moments['arousal_mean'], moments['arousal_m2'],
+                    moments['seq_mean'], moments['seq_m2'],
+                    moments['seq_valence_comoment'],
+                    json.dumps(moments['emotion_counts']),
+                    datetime.now().isoformat()
+                )
+            )
+        
+        return saved
+    
+    def summary(self, user_id: str, days: int) -> Dict[str, Any]:
+        """最近days天的合并统计量"""
+        rows = self.db.execute_query(
+            """
+            SELECT * FROM emotion_daily_aggregates
+            WHERE user_id = ? AND day >= ?
+            ORDER BY day
+            """,
+            (user_id, self._cutoff_day(days))
+        )
+        
+        moments = self.empty_moments()
+        for row in rows:
+            row['emotion_counts'] = json.loads(row['emotion_counts'] or '{}')
+            moments = self.merge_moments(moments, row)
+        return moments
+    
+    def points(self, user_id: str, days: int) -> List[Dict]:
+        """最近days天的逐条轨迹点 (按分析顺序)"""
+        return self.db.execute_query(
+            """
+            SELECT timestamp, valence, arousal, primary_emotion, intensity
+            FROM emotion_message_analyses
+            WHERE user_id = ? AND day >= ?
+            ORDER BY seq
+            """,
+            (user_id, self._cutoff_day(days))
+        )
+    
+    @staticmethod
+    def _cutoff_day(days: int) -> str:
+        return (datetime.now() - timedelta(days=days)).date().isoformat()
+
+
 class TransformerEmotionAnalyzer:
     """
     基于Transformer的深度情感分析引擎
@@ -84,19 +550,63 @@ class TransformerEmotionAnalyzer:
         'neutral': (0.0, 0.2),
     }
     
-    def __init__(self, device: str = None):
+    EMOTION_MODEL = "SamLowe/roberta-base-go_emotions"
+    SARCASM_MODEL = "mrm8488/t5-base-finetuned-sarcasm-twitter"
+    INTENSITY_MODEL = "cardiffnlp/twitter-roberta-base-emotion-multilabel-latest"
+    
+    # 推理后端: PyTorch (FP32), PyTorch INT8动态量化, ONNX Runtime (INT8)
+    BACKENDS = ('pytorch', 'pytorch-int8', 'onnx')
+    
+    # 上下文调整只看最近几条消息
+    CONTEXT_WINDOW = 3
+    
+    # 有批量版本的方法 (见 ModelOptimizer.batch_process)
+    BATCH_METHODS = {'analyze': 'analyze_requests'}
+    
+    def __init__(
+        self,
+        device: str = None,
+        batch_size: int = 32,
+        cache_size: int = 10000,
+        cache_path: Optional[str] = None,
+        backend: str = 'pytorch',
+        onnx_dir: Optional[str] = None,
+        intra_op_threads: Optional[int] = None
+    ):
         """
         初始化情感分析器
         
         Args:
             device: 'cuda', 'cpu', 或 None (自动检测)
+            batch_size: 批量推理时每次前向传播的文本数
+            cache_size: 分类结果缓存条数 (0表示不缓存)
+            cache_path: 缓存的SQLite文件路径 (可选，持久化缓存)
+            backend: 'pytorch', 'pytorch-int8' 或 'onnx' (CPU节点推荐onnx，
+                     加载失败时回退到pytorch)
+            onnx_dir: ONNX导出目录 (默认 ./optimized_models/onnx)
+            intra_op_threads: ONNX Runtime intra-op线程数
         """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend: {backend} (expected one of {self.BACKENDS})")
+        
         if device is None:
-            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            self.device = "cuda" if TORCH_AVAILABLE and torch.cuda.is_available() else "cpu"
         else:
             self.device = device
         
-        logger.info(f"Initializing TransformerEmotionAnalyzer on {self.device}")
+        # 量化后端只用于CPU
+        self.backend = backend if self.device == "cpu" else 'pytorch'
+        self.onnx_dir = onnx_dir
+        self.intra_op_threads = intra_op_threads
+        
+        self.batch_size = batch_size
+        
+        # 上下文消息和历史消息会被反复分类，缓存模型输出
+        self.result_cache = None
+        if cache_size > 0:
+            self.result_cache = EmotionResultCache(cache_size, cache_path)
+        
+        logger.info(f"Initializing TransformerEmotionAnalyzer on {self.device} ({self.backend})")
         
         # 延迟加载模型 (避免启动时加载)
         self.emotion_classifier = None
@@ -105,12 +615,46 @@ class TransformerEmotionAnalyzer:
         self.intensity_tokenizer = None
         
         self._models_loaded = False
+        self._backend_resolved = False
+    
+    def _resolve_backend(self):
+        """
+        确定实际使用的后端 (不加载模型)
+        
+        ONNX不可用时提前回退到pytorch，使首次查询缓存时的
+        命名空间与之后写入的一致。
+        """
+        if self._backend_resolved:
+            return
+        self._backend_resolved = True
+        
+        if self.backend != 'onnx':
+            return
+        
+        from ..optimization.onnx_runtime import DEFAULT_ONNX_DIR, onnx_backend_available
+        
+        onnx_dir = self.onnx_dir or DEFAULT_ONNX_DIR
+        models = (self.EMOTION_MODEL, self.SARCASM_MODEL, self.INTENSITY_MODEL)
+        if not all(onnx_backend_available(model, onnx_dir) for model in models):
+            logger.warning("ONNX backend unavailable, falling back to PyTorch")
+            self.backend = 'pytorch'
     
     def _load_models(self):
         """延迟加载所有ML模型"""
         if self._models_loaded:
             return
         
+        self._resolve_backend()
+        if self.backend == 'onnx':
+            try:
+                self._load_onnx_models()
+                self._models_loaded = True
+                logger.info("All emotion models loaded (ONNX Runtime)")
+                return
+            except Exception as e:
+                logger.warning(f"ONNX backend unavailable, falling back to PyTorch: {e}")
+                self.backend = 'pytorch'
+        
         try:
             from transformers import pipeline, AutoModelForSequenceClassification, AutoTokenizer
             
@@ -118,7 +662,7 @@ class TransformerEmotionAnalyzer:
             # 主情感分类器 (28种情感)
             self.emotion_classifier = pipeline(
                 "text-classification",
-                model="SamLowe/roberta-base-go_emotions",
+                model=self.EMOTION_MODEL,
                 top_k=None,  # 返回所有情感得分
                 device=0 if self.device == "cuda" else -1,
                 truncation=True,
@@ -129,7 +673,7 @@ class TransformerEmotionAnalyzer:
             # 讽刺检测器
             self.sarcasm_detector = pipeline(
                 "text-classification",
-                model="mrm8488/t5-base-finetuned-sarcasm-twitter",
+                model=self.SARCASM_MODEL,
                 device=0 if self.device == "cuda" else -1,
                 truncation=True
             )
@@ -137,13 +681,16 @@ class TransformerEmotionAnalyzer:
             logger.info("Loading Intensity model...")
             # 情感强度回归器
             self.intensity_model = AutoModelForSequenceClassification.from_pretrained(
-                "cardiffnlp/twitter-roberta-base-emotion-multilabel-latest"
+                self.INTENSITY_MODEL
             ).to(self.device)
             
             self.intensity_tokenizer = AutoTokenizer.from_pretrained(
-                "cardiffnlp/twitter-roberta-base-emotion-multilabel-latest"
+                self.INTENSITY_MODEL
             )
             
+            if self.backend == 'pytorch-int8':
+                self._quantize_pytorch_models()
+            
             self._models_loaded = True
             logger.info("All emotion models loaded successfully!")
             
@@ -153,6 +700,40 @@ class TransformerEmotionAnalyzer:
             # 这里可以实现降级策略
             raise
     
+    def _load_onnx_models(self):
+        """加载ONNX Runtime INT8模型 (首次使用时导出并量化)"""
+        from ..optimization.onnx_runtime import DEFAULT_ONNX_DIR, load_onnx_classifier
+        
+        onnx_dir = self.onnx_dir or DEFAULT_ONNX_DIR
+        
+        logger.info("Loading GoEmotions model (ONNX)...")
+        self.emotion_classifier = load_onnx_classifier(
+            self.EMOTION_MODEL, onnx_dir, top_k=None,
+            intra_op_threads=self.intra_op_threads
+        )
+        
+        logger.info("Loading Sarcasm detector (ONNX)...")
+        self.sarcasm_detector = load_onnx_classifier(
+            self.SARCASM_MODEL, onnx_dir, top_k=1,
+            intra_op_threads=self.intra_op_threads
+        )
+        
+        logger.info("Loading Intensity model (ONNX)...")
+        self.intensity_model = load_onnx_classifier(
+            self.INTENSITY_MODEL, onnx_dir, top_k=None,
+            intra_op_threads=self.intra_op_threads
+        )
+        self.intensity_tokenizer = self.intensity_model.tokenizer
+    
+    def _quantize_pytorch_models(self):
+        """PyTorch INT8动态量化 (Linear层)"""
+        from ..optimization.model_quantization import ProductionModelOptimizer
+        
+        optimizer = ProductionModelOptimizer(device="cpu")
+        self.emotion_classifier.model = optimizer.quantize_dynamic(self.emotion_classifier.model)
+        self.sarcasm_detector.model = optimizer.quantize_dynamic(self.sarcasm_detector.model)
+        self.intensity_model = optimizer.quantize_dynamic(self.intensity_model)
+    
     def analyze(
         self,
         text: str,
@@ -178,53 +759,165 @@ class TransformerEmotionAnalyzer:
             - mixed_emotions: 混合情感
             - confidence: 置信度
         """
-        # 确保模型已加载
-        self._load_models()
+        context_list = [context] if context else None
+        return self.analyze_batch([text], context_list, user_baseline)[0]
+    
+    def analyze_requests(self, kwargs_list: List[Dict[str, Any]]) -> List[Any]:
+        """
+        批量执行多个analyze请求 (ModelOptimizer的批量入口)
+        
+        见 batch_analyze_requests
+        """
+        return batch_analyze_requests(self, kwargs_list)
+    
+    def analyze_batch(
+        self,
+        texts: List[str],
+        contexts: Optional[List[Optional[List[str]]]] = None,
+        user_baseline: Optional[Dict[str, float]] = None
+    ) -> List[EmotionAnalysis]:
+        """
+        批量情感分析
+        
+        结果与逐条调用analyze相同，但:
+        - 所有文本与上下文消息去重后一起分类
+        - 按长度排序分桶，每批动态padding到桶内最长文本
+        - 每个模型每批只做一次前向传播
+        
+        Args:
+            texts: 待分析文本列表
+            contexts: 与texts对齐的上下文消息列表 (可选，元素可为None)
+            user_baseline: 用户情感基线 (可选，应用于所有文本)
+        
+        Returns:
+            与texts顺序对应的EmotionAnalysis列表
+        """
+        if not texts:
+            return []
+        
+        if contexts is None:
+            contexts = [None] * len(texts)
+        elif len(contexts) != len(texts):
+            raise ValueError("contexts must be aligned with texts")
         
-        # 1. 基础情感分类
-        emotions = self.emotion_classifier(text)[0]
+        # 1. 基础情感分类 (文本与上下文一起，去重)
+        to_classify = list(texts)
+        for context in contexts:
+            if context:
+                to_classify.extend(context[-self.CONTEXT_WINDOW:])
+        classified = self._classify_batch('emotion_classifier', to_classify)
         
         # 2. 讽刺检测
-        sarcasm_result = self.sarcasm_detector(text)[0]
-        is_sarcastic = sarcasm_result['label'] == 'LABEL_1' and sarcasm_result['score'] > 0.7
+        sarcasm_results = self._classify_batch('sarcasm_detector', texts, top_only=True)
         
-        # 3. 强度估计
-        intensity = self._estimate_intensity(text, emotions)
+        results = []
+        for text, context in zip(texts, contexts):
+            emotions = classified[text]
+            sarcasm_result = sarcasm_results[text]
+            is_sarcastic = sarcasm_result['label'] == 'LABEL_1' and sarcasm_result['score'] > 0.7
+            
+            # 3. 强度估计
+            intensity = self._estimate_intensity(text, emotions)
+            
+            # 4. Valence和Arousal计算
+            valence, arousal = self._calculate_va(emotions)
+            
+            # 5. 混合情感检测
+            mixed = self._detect_mixed_emotions(emotions)
+            
+            # 6. 上下文调整
+            if context:
+                emotions = self._adjust_for_context(emotions, context, classified)
+            
+            # 7. 用户基线调整
+            if user_baseline:
+                emotions = self._adjust_for_baseline(emotions, user_baseline)
+            
+            # 8. 如果是讽刺，反转情感
+            if is_sarcastic:
+                emotions = self._invert_emotions(emotions)
+                valence = -valence
+            
+            # 排序
+            sorted_emotions = sorted(emotions, key=lambda x: x['score'], reverse=True)
+            
+            results.append(EmotionAnalysis(
+                primary_emotion=sorted_emotions[0]['label'],
+                primary_score=sorted_emotions[0]['score'],
+                all_emotions={e['label']: e['score'] for e in emotions},
+                intensity=intensity,
+                valence=valence,
+                arousal=arousal,
+                is_sarcastic=is_sarcastic,
+                mixed_emotions=mixed,
+                confidence=self._calculate_confidence(sorted_emotions),
+                timestamp=datetime.now()
+            ))
+        
+        return results
+    
+    def _classify_batch(
+        self,
+        classifier_name: str,
+        texts: List[str],
+        top_only: bool = False
+    ) -> Dict[str, any]:
+        """
+        对去重后的文本批量分类
         
-        # 4. Valence和Arousal计算
-        valence, arousal = self._calculate_va(emotions)
+        先查结果缓存，只有未命中的文本才送入模型 (全部命中时不加载模型)。
+        按长度排序后送入pipeline，使每个batch内长度相近，
+        动态padding的浪费最小。
         
-        # 5. 混合情感检测
-        mixed = self._detect_mixed_emotions(emotions)
+        Args:
+            classifier_name: 'emotion_classifier' 或 'sarcasm_detector'
+            texts: 文本列表 (可重复)
+            top_only: 只保留每条文本的最高分结果
+        
+        Returns:
+            文本 → 分类结果 (得分列表，top_only时为单个结果)
+        """
+        unique = set(texts)
+        results = {}
+        if self.result_cache is not None:
+            results = self.result_cache.get_many(self._cache_namespace(classifier_name), unique)
         
-        # 6. 上下文调整
-        if context:
-            emotions = self._adjust_for_context(emotions, context)
+        missing = sorted(unique - results.keys(), key=len)
+        if not missing:
+            return results
         
-        # 7. 用户基线调整
-        if user_baseline:
-            emotions = self._adjust_for_baseline(emotions, user_baseline)
+        # 确保模型已加载
+        self._load_models()
+        classifier = getattr(self, classifier_name)
+        outputs = classifier(missing, batch_size=self.batch_size)
         
-        # 8. 如果是讽刺，反转情感
-        if is_sarcastic:
-            emotions = self._invert_emotions(emotions)
-            valence = -valence
+        computed = {}
+        for text, output in zip(missing, outputs):
+            if top_only and isinstance(output, list):
+                output = output[0]
+            computed[text] = output
         
-        # 排序
-        sorted_emotions = sorted(emotions, key=lambda x: x['score'], reverse=True)
+        if self.result_cache is not None:
+            # 后端可能在加载时回退，重新取命名空间
+            self.result_cache.put_many(self._cache_namespace(classifier_name), computed)
         
-        return EmotionAnalysis(
-            primary_emotion=sorted_emotions[0]['label'],
-            primary_score=sorted_emotions[0]['score'],
-            all_emotions={e['label']: e['score'] for e in emotions},
-            intensity=intensity,
-            valence=valence,
-            arousal=arousal,
-            is_sarcastic=is_sarcastic,
-            mixed_emotions=mixed,
-            confidence=self._calculate_confidence(sorted_emotions),
-            timestamp=datetime.now()
-        )
+        results.update(computed)
+        return results
+    
+    def _cache_namespace(self, classifier_name: str) -> str:
+        """缓存键前缀: 模型名 + 后端 (量化后端的得分略有不同)"""
+        self._resolve_backend()
+        model_name = {
+            'emotion_classifier': self.EMOTION_MODEL,
+            'sarcasm_detector': self.SARCASM_MODEL,
+        }[classifier_name]
+        return f"{model_name}@{self.backend}"
+    
+    def get_cache_stats(self) -> Dict[str, any]:
+        """结果缓存统计 (命中/未命中)"""
+        if self.result_cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.result_cache.get_stats()}
     
     def _estimate_intensity(
         self,
@@ -339,21 +1032,28 @@ class TransformerEmotionAnalyzer:
     def _adjust_for_context(
         self,
         emotions: List[Dict],
-        context: List[str]
+        context: List[str],
+        classified: Optional[Dict[str, List[Dict]]] = None
     ) -> List[Dict]:
         """
         根据上下文调整情感得分
         
         如果上下文显示持续的情感模式，适当调整当前得分
+        
+        Args:
+            classified: 已批量分类的文本 → 情感得分 (可选，避免重复推理)
         """
         if not context or len(context) == 0:
             return emotions
         
         # 分析上下文情感
         context_valences = []
-        for msg in context[-3:]:  # 只看最近3条
+        for msg in context[-self.CONTEXT_WINDOW:]:  # 只看最近3条
             try:
-                ctx_emotions = self.emotion_classifier(msg)[0]
+                if classified is not None and msg in classified:
+                    ctx_emotions = classified[msg]
+                else:
+                    ctx_emotions = self._classify_batch('emotion_classifier', [msg])[msg]
                 ctx_v, _ = self._calculate_va(ctx_emotions)
                 context_valences.append(ctx_v)
             except:
@@ -476,7 +1176,8 @@ class TransformerEmotionAnalyzer:
         self,
         user_id: str,
         days: int = 30,
-        db = None
+        db = None,
+        include_points: bool = True
     ) -> Dict[str, any]:
         """
         构建用户情感轨迹
@@ -486,8 +1187,15 @@ class TransformerEmotionAnalyzer:
         2. 理解情感基线
         3. 预测情感反应
         
+        db支持watermark时 (Database)，只分析新消息并持久化，
+        统计量由每日汇总合并得到; 否则逐次分析全部对话。
+        
+        Args:
+            include_points: 是否返回逐条数据点 (False时只读每日汇总，
+                            不随消息数增长)
+        
         Returns:
-            - trajectory: 时间序列数据点
+            - trajectory: 时间序列数据点 (include_points=False时没有)
             - baseline_valence: 平均效价
             - valence_std: 效价标准差
             - baseline_arousal: 平均唤醒度
@@ -499,6 +1207,9 @@ class TransformerEmotionAnalyzer:
             logger.warning("No database provided, cannot build trajectory")
             return {}
         
+        if hasattr(db, 'get_new_conversations'):
+            return self._build_trajectory_from_store(user_id, days, db, include_points)
+        
         # 获取用户对话历史
         try:
             conversations = db.get_user_conversations(user_id, days=days)
@@ -506,29 +1217,27 @@ class TransformerEmotionAnalyzer:
             logger.error(f"Failed to get conversations: {e}")
             return {}
         
+        user_messages = [conv for conv in conversations if conv.get('role') == 'user']
+        analyses = self._analyze_messages(user_messages)
+        
         trajectory = []
         emotion_counts = {}
         
-        for conv in conversations:
-            if conv.get('role') == 'user':
-                try:
-                    analysis = self.analyze(conv.get('content', ''))
-                    
-                    trajectory.append({
-                        'timestamp': conv.get('timestamp'),
-                        'valence': analysis.valence,
-                        'arousal': analysis.arousal,
-                        'primary_emotion': analysis.primary_emotion,
-                        'intensity': analysis.intensity
-                    })
-                    
-                    # 统计情感频率
-                    emotion = analysis.primary_emotion
-                    emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
-                    
-                except Exception as e:
-                    logger.error(f"Failed to analyze message: {e}")
-                    continue
+        for conv, analysis in zip(user_messages, analyses):
+            if analysis is None:
+                continue
+            
+            trajectory.append({
+                'timestamp': conv.get('timestamp'),
+                'valence': analysis.valence,
+                'arousal': analysis.arousal,
+                'primary_emotion': analysis.primary_emotion,
+                'intensity': analysis.intensity
+            })
+            
+            # 统计情感频率
+            emotion = analysis.primary_emotion
+            emotion_counts[emotion] = emotion_counts.get(emotion, 0) + 1
         
         if len(trajectory) == 0:
             return {'error': 'No valid data points'}
@@ -543,6 +1252,181 @@ class TransformerEmotionAnalyzer:
         else:
             trend_slope = 0
         
+        return self._format_trajectory(
+            trajectory,
+            baseline_valence=np.mean(valences),
+            valence_std=np.std(valences),
+            baseline_arousal=np.mean(arousals),
+            arousal_std=np.std(arousals),
+            trend_slope=trend_slope,
+            emotion_counts=emotion_counts,
+            days=days,
+            include_points=include_points
+        )
+    
+    def update_emotion_history(
+        self,
+        user_id: str,
+        db,
+        batch_limit: int = 500,
+        days: Optional[int] = None
+    ) -> int:
+        """
+        分析watermark之后的新消息并持久化 (每条消息只分析一次)
+        
+        窗口比已分析的历史更早时 (先days=7后days=30)，
+        再向后回填窗口内更早的消息。
+        
+        Args:
+            days: 需要完整覆盖的最近天数 (None: 全部历史)；
+                  首次分析只回填这个窗口
+        
+        Returns:
+            新分析的消息数
+        """
+        store = EmotionTrajectoryStore(db)
+        saved = 0
+        
+        if days is not None:
+            store.seed_watermark(user_id, days)
+        
+        while True:
+            conversations, watermark = store.pending_messages(user_id, limit=batch_limit)
+            if not conversations:
+                break
+            
+            saved += store.record(
+                user_id, conversations, self._analyze_user_messages(conversations), watermark
+            )
+            
+            if len(conversations) < batch_limit:
+                break
+        
+        while True:
+            page = store.backfill_messages(user_id, days, limit=batch_limit)
+            if page is None:
+                break
+            
+            conversations, watermark, complete = page
+            saved += store.record_backfill(
+                user_id, conversations, self._analyze_user_messages(conversations),
+                watermark, days, complete
+            )
+            
+            if complete:
+                break
+        
+        return saved
+    
+    def _analyze_user_messages(self, conversations: List[Dict]) -> List[Tuple[Dict, EmotionAnalysis]]:
+        """分析对话中的用户消息，返回 (对话, 分析结果) 列表 (跳过失败的消息)"""
+        user_messages = [conv for conv in conversations if conv.get('role') == 'user']
+        analyses = self._analyze_messages(user_messages)
+        return [
+            (conv, analysis)
+            for conv, analysis in zip(user_messages, analyses)
+            if analysis is not None
+        ]
+    
+    def get_emotional_baseline(self, user_id: str, days: int = 30, db = None) -> Dict[str, float]:
+        """
+        用户情感基线 (用于detect_emotional_anomaly)
+        
+        先增量分析新消息，然后由每日汇总合并得到，不读取逐条记录。
+        """
+        if db is None:
+            logger.warning("No database provided, cannot compute baseline")
+            return {}
+        
+        try:
+            self.update_emotion_history(user_id, db, days=days)
+        except Exception as e:
+            logger.error(f"Failed to update emotion history: {e}")
+        
+        moments = EmotionTrajectoryStore(db).summary(user_id, days)
+        n = moments['message_count']
+        if n == 0:
+            return {}
+        
+        return {
+            'baseline_valence': moments['valence_mean'],
+            'valence_std': math.sqrt(moments['valence_m2'] / n),
+            'baseline_arousal': moments['arousal_mean'],
+            'arousal_std': math.sqrt(moments['arousal_m2'] / n),
+            'data_points': n
+        }
+    
+    def _build_trajectory_from_store(
+        self,
+        user_id: str,
+        days: int,
+        db,
+        include_points: bool = True
+    ) -> Dict[str, any]:
+        """
+        由持久化的分析结果和每日汇总构建轨迹
+        
+        days_analyzed是实际完整覆盖的天数 (回填失败时可能小于days)
+        """
+        try:
+            self.update_emotion_history(user_id, db, days=days)
+        except Exception as e:
+            # 仍然可以用已保存的数据
+            logger.error(f"Failed to update emotion history: {e}")
+        
+        store = EmotionTrajectoryStore(db)
+        moments = store.summary(user_id, days)
+        n = moments['message_count']
+        if n == 0:
+            return {'error': 'No valid data points'}
+        
+        # 趋势 = 协矩 / 序号的平方偏差和 (与按顺序做线性回归相同)
+        if n >= 7 and moments['seq_m2'] > 0:
+            trend_slope = moments['seq_valence_comoment'] / moments['seq_m2']
+        else:
+            trend_slope = 0
+        
+        return self._format_trajectory(
+            store.points(user_id, days) if include_points else [],
+            baseline_valence=moments['valence_mean'],
+            valence_std=math.sqrt(moments['valence_m2'] / n),
+            baseline_arousal=moments['arousal_mean'],
+            arousal_std=math.sqrt(moments['arousal_m2'] / n),
+            trend_slope=trend_slope,
+            emotion_counts=moments['emotion_counts'],
+            days=store.covered_days(user_id, days),
+            include_points=include_points
+        )
+    
+    def _analyze_messages(self, messages: List[Dict]) -> List[Optional[EmotionAnalysis]]:
+        """批量分析消息; 批量失败时逐条分析，失败的消息为None"""
+        try:
+            return self.analyze_batch([msg.get('content', '') for msg in messages])
+        except Exception as e:
+            logger.error(f"Batch analysis failed, analyzing messages one by one: {e}")
+        
+        analyses = []
+        for msg in messages:
+            try:
+                analyses.append(self.analyze(msg.get('content', '')))
+            except Exception as e:
+                logger.error(f"Failed to analyze message: {e}")
+                analyses.append(None)
+        return analyses
+    
+    def _format_trajectory(
+        self,
+        trajectory: List[Dict],
+        baseline_valence: float,
+        valence_std: float,
+        baseline_arousal: float,
+        arousal_std: float,
+        trend_slope: float,
+        emotion_counts: Dict[str, int],
+        days: int,
+        include_points: bool = True
+    ) -> Dict[str, any]:
+        """轨迹结果 (趋势判定与主导情感)"""
         # 确定趋势
         if trend_slope > 0.01:
             trend = 'improving'
@@ -552,23 +1436,27 @@ class TransformerEmotionAnalyzer:
             trend = 'stable'
         
         # 主导情感 (top 3)
+        total = sum(emotion_counts.values())
         dominant = sorted(emotion_counts.items(), key=lambda x: x[1], reverse=True)[:3]
-        dominant_emotions = [{'emotion': e, 'count': c, 'percentage': c/len(trajectory)*100} 
+        dominant_emotions = [{'emotion': e, 'count': c, 'percentage': c/total*100} 
                             for e, c in dominant]
         
-        return {
+        result = {
             'trajectory': trajectory,
-            'baseline_valence': float(np.mean(valences)),
-            'valence_std': float(np.std(valences)),
-            'baseline_arousal': float(np.mean(arousals)),
-            'arousal_std': float(np.std(arousals)),
+            'baseline_valence': float(baseline_valence),
+            'valence_std': float(valence_std),
+            'baseline_arousal': float(baseline_arousal),
+            'arousal_std': float(arousal_std),
             'trend': trend,
             'trend_slope': float(trend_slope),
-            'volatility': float(np.std(valences)),
+            'volatility': float(valence_std),
             'dominant_emotions': dominant_emotions,
-            'data_points': len(trajectory),
+            'data_points': total,
             'days_analyzed': days
         }
+        if not include_points:
+            del result['trajectory']
+        return result
     
     def detect_emotional_anomaly(
         self,
@@ -639,6 +1527,55 @@ class TransformerEmotionAnalyzer:
         return "Unknown anomaly type"
 
 
+def batch_analyze_requests(analyzer, kwargs_list: List[Dict[str, Any]]) -> List[Any]:
+    """
+    把多个analyze(text, context, user_baseline)请求合并成analyze_batch调用
+    
+    按user_baseline分组，每组只调用一次analyze_batch (一次前向传播)。
+    参数不合法的请求得到TypeError; 某组批量推理失败时逐条重试，
+    只让出错的请求失败。
+    
+    Args:
+        analyzer: TransformerEmotionAnalyzer或RemoteEmotionAnalyzer
+        kwargs_list: 每个请求的analyze参数
+    
+    Returns:
+        与kwargs_list顺序对应的EmotionAnalysis列表 (失败的请求为对应的Exception)
+    """
+    results: List[Any] = [None] * len(kwargs_list)
+    groups: Dict[str, List[int]] = {}
+    
+    for index, kwargs in enumerate(kwargs_list):
+        unexpected = set(kwargs) - {'text', 'context', 'user_baseline'}
+        if unexpected or 'text' not in kwargs:
+            results[index] = TypeError(
+                f"analyze() got invalid arguments: {sorted(kwargs)}"
+            )
+            continue
+        key = json.dumps(kwargs.get('user_baseline'), sort_keys=True)
+        groups.setdefault(key, []).append(index)
+    
+    for indices in groups.values():
+        requests = [kwargs_list[i] for i in indices]
+        try:
+            analyses = analyzer.analyze_batch(
+                [r['text'] for r in requests],
+                [r.get('context') for r in requests],
+                requests[0].get('user_baseline')
+            )
+            for i, analysis in zip(indices, analyses):
+                results[i] = analysis
+        except Exception as e:
+            logger.warning(f"Batched emotion analysis failed, retrying one by one: {e}")
+            for i, request in zip(indices, requests):
+                try:
+                    results[i] = analyzer.analyze(**request)
+                except Exception as item_error:
+                    results[i] = item_error
+    
+    return results
+
+
 # 简化API
 def analyze_emotion(
     text: str,
@@ -648,12 +1585,16 @@ def analyze_emotion(
     """
     便捷API - 分析情感
     
+    进程内共用一个分析器; 设置了MODEL_SERVER_SOCKET时由模型服务推理。
+    
     Usage:
         result = analyze_emotion("I'm so happy today!")
         print(result['primary_emotion'])  # 'joy'
         print(result['valence'])  # 0.8
     """
-    analyzer = TransformerEmotionAnalyzer()
+    from ..model_server import get_emotion_analyzer
+    
+    analyzer = get_emotion_analyzer()
     analysis = analyzer.analyze(text, context)
     
     return {
@@ -17,6 +17,7 @@ from collections import defaultdict
 
 from .config import settings
 from .db_utils import db
+from .message_analysis import MessageAnnotation, message_analyzer
 
 
 class EmotionalReasoningEngine:
@@ -57,6 +58,27 @@ class EmotionalReasoningEngine:
         'norm_compatibility': ['should', 'ought', 'right', 'wrong', 'fair'],
     }
     
+    # Trigger indicators (searched in order over the lowercased text)
+    TRIGGER_PATTERNS = [
+        re.compile(pattern, re.IGNORECASE) for pattern in [
+            r'when (.+?)(made me|I felt|I became)',
+            r'after (.+?)(I felt|I was|I became)',
+            r'because (.+?)(I felt|I was|I became)',
+            r'(.+?)\s+(?:made|makes) me (?:feel|felt)',
+        ]
+    ]
+    
+    # Direct expression markers
+    EXPRESSION_PATTERNS = [
+        re.compile(pattern, re.IGNORECASE) for pattern in [
+            r'I (?:said|told|expressed|showed)\s+(.+?)(\.|\,|$)',
+            r'my (?:reaction|response) was\s+(.+?)(\.|\,|$)',
+        ]
+    ]
+    
+    # Methods with a batch counterpart (see ModelOptimizer.batch_process)
+    BATCH_METHODS = {'analyze_emotional_state': 'analyze_emotional_state_batch'}
+    
     def __init__(self):
         self.emotion_patterns = {}
     
@@ -65,11 +87,15 @@ class EmotionalReasoningEngine:
         user_id: str,
         text: str,
         context: Dict = None,
-        conversation_id: str = None
+        conversation_id: str = None,
+        message_id: str = None
     ) -> Dict[str, any]:
         """
         Analyze emotional state from text using full pipeline
         
+        With message_id the shared annotation computed by the other
+        services for that message is reused (see message_analysis.py).
+        
         Returns:
             - trigger: What caused the emotion
             - appraisal: Cognitive evaluation
@@ -77,22 +103,73 @@ class EmotionalReasoningEngine:
             - regulation: Strategy used (if any)
             - expression: How emotion was expressed
         """
+        result = self._emotional_state(text, context, message_id)
+        
+        # Save to database
+        self._save_emotional_state(user_id, result, conversation_id)
+        
+        # Update patterns
+        self._update_emotional_patterns(
+            user_id, result['trigger'], result['emotion_type'],
+            result['intensity'], result['regulation_strategy']
+        )
+        
+        return result
+    
+    def analyze_emotional_state_batch(self, kwargs_list: List[Dict]) -> List:
+        """
+        Run several analyze_emotional_state requests as one batch
+        
+        Every message is analyzed first; the states and pattern updates of
+        all requests are then written in one transaction, each request in
+        its own savepoint.
+        
+        Returns:
+            One result per request, in order (the Exception for failed ones)
+        """
+        def prepare(user_id, text, context=None, conversation_id=None, message_id=None):
+            return (user_id, conversation_id, self._emotional_state(text, context, message_id))
+        
+        def save(prepared):
+            user_id, conversation_id, result = prepared
+            self._save_emotional_state(user_id, result, conversation_id)
+            self._update_emotional_patterns(
+                user_id, result['trigger'], result['emotion_type'],
+                result['intensity'], result['regulation_strategy']
+            )
+        
+        prepared = db.run_batch(kwargs_list, prepare, save)
+        return [p if isinstance(p, Exception) else p[2] for p in prepared]
+    
+    def _emotional_state(
+        self,
+        text: str,
+        context: Dict = None,
+        message_id: str = None
+    ) -> Dict[str, any]:
+        """Run the emotion pipeline on one message, without writing anything"""
+        message = {'content': text}
+        if message_id is not None:
+            message['id'] = message_id
+        # Without an id nothing else will look this text up: don't fill the LRU
+        annotation = message_analyzer.annotate(message, cache=message_id is not None)
+        
         # Step 1: Detect trigger
-        trigger = self._detect_trigger(text, context)
+        trigger = self._detect_trigger(annotation, context)
         
         # Step 2: Appraisal
-        appraisal = self._cognitive_appraisal(text, trigger)
+        appraisal = self._cognitive_appraisal(annotation, trigger)
         
         # Step 3: Determine emotion
-        emotion_type, intensity = self._determine_emotion(text, appraisal)
+        emotion_type, intensity = self._determine_emotion(annotation, appraisal)
         
         # Step 4: Detect regulation
-        regulation = self._detect_regulation_strategy(text)
+        regulation = self._detect_regulation_strategy(annotation)
         
         # Step 5: Extract expression
-        expression = self._extract_expression(text, emotion_type)
+        expression = self._extract_expression(annotation, emotion_type)
         
-        result = {
+        return {
             'trigger': trigger,
             'appraisal': appraisal,
             'emotion_type': emotion_type,
@@ -102,29 +179,14 @@ class EmotionalReasoningEngine:
             'context': context or {},
             'timestamp': datetime.now().isoformat()
         }
-        
-        # Save to database
-        self._save_emotional_state(user_id, result, conversation_id)
-        
-        # Update patterns
-        self._update_emotional_patterns(user_id, trigger, emotion_type, intensity, regulation)
-        
-        return result
     
-    def _detect_trigger(self, text: str, context: Dict = None) -> str:
+    def _detect_trigger(self, annotation: MessageAnnotation, context: Dict = None) -> str:
         """Detect what triggered the emotional response"""
-        text_lower = text.lower()
+        text = annotation.text
+        text_lower = annotation.lower
         
-        # Trigger indicators
-        trigger_patterns = [
-            r'when (.+?)(made me|I felt|I became)',
-            r'after (.+?)(I felt|I was|I became)',
-            r'because (.+?)(I felt|I was|I became)',
-            r'(.+?)\s+(?:made|makes) me (?:feel|felt)',
-        ]
-        
-        for pattern in trigger_patterns:
-            match = re.search(pattern, text_lower, re.IGNORECASE)
+        for pattern in self.TRIGGER_PATTERNS:
+            match = pattern.search(text_lower)
             if match:
                 return match.group(1).strip()
         
@@ -142,9 +204,10 @@ class EmotionalReasoningEngine:
         first_sentence = text.split('.')[0] if '.' in text else text
         return first_sentence[:100]
     
-    def _cognitive_appraisal(self, text: str, trigger: str) -> Dict[str, any]:
+    def _cognitive_appraisal(self, annotation: MessageAnnotation, trigger: str) -> Dict[str, any]:
         """Perform cognitive appraisal of situation"""
-        text_lower = text.lower()
+        text_lower = annotation.lower
+        hits = annotation.keyword_hits('appraisal_indicators', self.APPRAISAL_INDICATORS)
         
         appraisal = {
             'goal_relevance': 0.5,
@@ -154,25 +217,24 @@ class EmotionalReasoningEngine:
         }
         
         # Analyze each dimension
-        for dimension, indicators in self.APPRAISAL_INDICATORS.items():
+        for dimension, indicators in hits.items():
             score = 0
             matches = 0
             
             for indicator in indicators:
-                if indicator in text_lower:
-                    matches += 1
-                    # Determine if positive or negative context
-                    context = text_lower[
-                        max(0, text_lower.index(indicator) - 20):
-                        min(len(text_lower), text_lower.index(indicator) + 20)
-                    ]
-                    
-                    # Simple sentiment
-                    negative_words = ['not', 'no', 'never', "don't", "can't", "won't"]
-                    if any(neg in context for neg in negative_words):
-                        score -= 0.3
-                    else:
-                        score += 0.3
+                matches += 1
+                # Determine if positive or negative context
+                context = text_lower[
+                    max(0, text_lower.index(indicator) - 20):
+                    min(len(text_lower), text_lower.index(indicator) + 20)
+                ]
+                
+                # Simple sentiment
+                negative_words = ['not', 'no', 'never', "don't", "can't", "won't"]
+                if any(neg in context for neg in negative_words):
+                    score -= 0.3
+                else:
+                    score += 0.3
             
             if matches > 0:
                 appraisal[dimension] = max(0, min(1, 0.5 + score / max(matches, 1)))
@@ -181,21 +243,19 @@ class EmotionalReasoningEngine:
     
     def _determine_emotion(
         self, 
-        text: str, 
+        annotation: MessageAnnotation, 
         appraisal: Dict
     ) -> Tuple[str, float]:
         """Determine emotion type and intensity from appraisal"""
-        text_lower = text.lower()
+        text = annotation.text
+        text_lower = annotation.lower
         
         # Count emotion keyword matches
-        emotion_scores = {}
-        for emotion, keywords in self.EMOTION_KEYWORDS.items():
-            score = sum(
-                1 for keyword in keywords 
-                if keyword in text_lower
-            )
-            if score > 0:
-                emotion_scores[emotion] = score
+        emotion_scores = {
+            emotion: len(found)
+            for emotion, found in annotation.keyword_hits('emotion_keywords', self.EMOTION_KEYWORDS).items()
+            if found
+        }
         
         if not emotion_scores:
             # Use appraisal to infer emotion
@@ -220,7 +280,7 @@ class EmotionalReasoningEngine:
         intensity += min(text.count('!') * 0.05, 0.15)
         
         # Factor 4: Capitalization
-        if any(word.isupper() and len(word) > 2 for word in text.split()):
+        if any(word.isupper() and len(word) > 2 for word in annotation.words):
             intensity += 0.1
         
         intensity = max(0.1, min(1.0, intensity))
@@ -246,31 +306,26 @@ class EmotionalReasoningEngine:
         else:
             return 'neutral', 0.3
     
-    def _detect_regulation_strategy(self, text: str) -> Optional[str]:
+    def _detect_regulation_strategy(self, annotation: MessageAnnotation) -> Optional[str]:
         """Detect emotion regulation strategy used"""
-        text_lower = text.lower()
-        
-        strategy_scores = {}
-        for strategy, indicators in self.REGULATION_STRATEGIES.items():
-            score = sum(1 for indicator in indicators if indicator in text_lower)
-            if score > 0:
-                strategy_scores[strategy] = score
+        strategy_scores = {
+            strategy: len(found)
+            for strategy, found in annotation.keyword_hits('regulation_strategies', self.REGULATION_STRATEGIES).items()
+            if found
+        }
         
         if not strategy_scores:
             return None
         
         return max(strategy_scores.items(), key=lambda x: x[1])[0]
     
-    def _extract_expression(self, text: str, emotion_type: str) -> str:
+    def _extract_expression(self, annotation: MessageAnnotation, emotion_type: str) -> str:
         """Extract how emotion was expressed"""
-        # Look for direct expression markers
-        expression_patterns = [
-            r'I (?:said|told|expressed|showed)\s+(.+?)(\.|\,|$)',
-            r'my (?:reaction|response) was\s+(.+?)(\.|\,|$)',
-        ]
+        text = annotation.text
         
-        for pattern in expression_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        # Look for direct expression markers
+        for pattern in self.EXPRESSION_PATTERNS:
+            match = pattern.search(text)
             if match:
                 return match.group(1).strip()
         
@@ -450,5 +505,9 @@ class EmotionalReasoningEngine:
         }
 
 
-# Global instance
-emotional_engine = EmotionalReasoningEngine()
+# Global instance (constructed on first access, see registry.py)
+def __getattr__(name):
+    if name == 'emotional_engine':
+        from .registry import registry
+        return registry.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,176 @@
+"""
+Message Analysis - Shared per-message preprocessing for the cognitive services
+
+A profile build runs reasoning, values, emotions, theory of mind and
+narrative over the same user messages, and each module used to lowercase,
+split and regex-scan every message on its own. MessageAnalyzer computes a
+MessageAnnotation once per message (keyed by message id) and every module
+reads from it:
+
+- lower / words
+- pattern matches per named TriggeredPatternSet (memoized on first use)
+- keyword hits per named keyword table (memoized on first use)
+- noun chunks and entities (spaCy, parsed lazily on first use)
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from .config import settings
+from .nlp_manager import nlp_manager
+from .pattern_engine import TriggeredPatternSet
+
+
+class MessageAnnotation:
+    """Everything the cognitive services derive from one message's text"""
+
+    __slots__ = (
+        'message_id', 'text', 'lower', 'words',
+        '_matches', '_keyword_hits', '_parsed'
+    )
+
+    def __init__(self, message_id: str, text: str):
+        self.message_id = message_id
+        self.text = text
+        self.lower = text.lower()
+        self.words = text.split()
+        self._matches: Dict[str, List[Tuple[str, int, 're.Match']]] = {}
+        self._keyword_hits: Dict[str, Dict[str, List[str]]] = {}
+        self._parsed: Optional[Tuple[List[str], List[Tuple[str, str]]]] = None
+
+    def matches(self, name: str, patterns: TriggeredPatternSet) -> List[Tuple[str, int, 're.Match']]:
+        """
+        All (family, pattern_index, match) of a pattern set over the text
+
+        Args:
+            name: Cache slot; unique per pattern set (e.g. 'values')
+            patterns: The compiled pattern set
+        """
+        found = self._matches.get(name)
+        if found is None:
+            found = self._matches[name] = list(patterns.finditer(self.text))
+        return found
+
+    def family_matches(self, name: str, patterns: TriggeredPatternSet, family: str) -> List['re.Match']:
+        """Matches of one family, in pattern declaration order"""
+        return [match for f, _, match in self.matches(name, patterns) if f == family]
+
+    def keyword_hits(self, name: str, table: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """
+        Keywords of each category that occur in the lowercased text
+
+        Args:
+            name: Cache slot; unique per keyword table (e.g. 'emotion_keywords')
+            table: Category → keywords (substring match, as the services did)
+        """
+        hits = self._keyword_hits.get(name)
+        if hits is None:
+            hits = self._keyword_hits[name] = {
+                category: [kw for kw in keywords if kw in self.lower]
+                for category, keywords in table.items()
+            }
+        return hits
+
+    def set_doc(self, doc):
+        """Store noun chunks and entities of a spaCy Doc of this text"""
+        self._parsed = (
+            [chunk.text.lower() for chunk in doc.noun_chunks],
+            [(ent.text, ent.label_) for ent in doc.ents]
+        )
+
+    def _parse(self):
+        if self._parsed is None:
+            if nlp_manager.is_available():
+                self.set_doc(nlp_manager(self.text, profile='concepts'))
+            else:
+                self._parsed = ([], [])
+        return self._parsed
+
+    @property
+    def noun_chunks(self) -> List[str]:
+        """Lowercased noun chunks ([] without spaCy)"""
+        return self._parse()[0]
+
+    @property
+    def entities(self) -> List[Tuple[str, str]]:
+        """(text, label) named entities ([] without spaCy)"""
+        return self._parse()[1]
+
+
+class MessageAnalyzer:
+    """LRU cache of MessageAnnotations keyed by message id"""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or settings.MESSAGE_ANNOTATION_CACHE_SIZE
+        self._cache: 'OrderedDict[str, MessageAnnotation]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def message_key(message: Dict) -> str:
+        """Message id when present, otherwise a digest of the content"""
+        if message.get('id') is not None:
+            return f"id:{message['id']}"
+        return 'sha1:' + hashlib.sha1(message['content'].encode('utf-8')).hexdigest()
+
+    def annotate(self, message: Dict, cache: bool = True) -> MessageAnnotation:
+        """
+        Annotation of one message (a dict with 'content' and optionally 'id')
+
+        Args:
+            message: Message dict
+            cache: Keep the annotation in the LRU; pass False for one-off
+                   texts that no other module will read again
+        """
+        key = self.message_key(message)
+        text = message['content']
+
+        if not cache:
+            return MessageAnnotation(key, text)
+
+        with self._lock:
+            annotation = self._cache.get(key)
+            # An edited message keeps its id; re-annotate when the text differs
+            if annotation is not None and annotation.text == text:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return annotation
+            self.misses += 1
+
+        annotation = MessageAnnotation(key, text)
+
+        with self._lock:
+            self._cache[key] = annotation
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+        return annotation
+
+    def annotate_text(self, text: str) -> MessageAnnotation:
+        """Annotation of a bare text (content-addressed)"""
+        return self.annotate({'content': text})
+
+    def annotate_many(self, messages: List[Dict]) -> List[MessageAnnotation]:
+        """Annotations for many messages, in order"""
+        return [self.annotate(m) for m in messages]
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def get_stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._cache),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total if total else 0.0
+        }
+
+
+# Global instance
+message_analyzer = MessageAnalyzer()
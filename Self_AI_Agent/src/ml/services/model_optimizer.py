@@ -22,6 +22,27 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+# lazy_load_module name → service registry name
+MODULE_SERVICES = {
+    "reasoning": "reasoning_extractor",
+    "values": "value_builder",
+    "emotions": "emotional_engine",
+    "tom": "theory_of_mind",
+    "narrative": "narrative_builder",
+}
+
+
+def _load_emotion_model():
+    """Shared transformer emotion analyzer (in-process or via the model server)"""
+    from ..model_server import get_emotion_analyzer
+    return get_emotion_analyzer()
+
+
+# Modules that live outside the service registry: name → loader
+MODULE_LOADERS = {
+    "emotion_model": _load_emotion_model,
+}
+
 
 class ModelOptimizer:
     """
@@ -39,6 +60,7 @@ class ModelOptimizer:
         self.loaded_modules = {}  # Cache for lazy-loaded modules
         self.pattern_cache = {}   # Pruned patterns
         self.batch_queue = defaultdict(list)  # Request batching
+        self.batch_timers: Dict[str, asyncio.Task] = {}  # One pending timer per batch key
         self.min_pattern_frequency = config.get('min_pattern_frequency', 0.001)
         self.batch_size = config.get('batch_size', 10)
         self.batch_timeout = config.get('batch_timeout', 0.1)  # 100ms
@@ -109,23 +131,14 @@ class ModelOptimizer:
         logger.info(f"Lazy loading module: {module_name}")
         start_time = time.time()
         
-        # Dynamic import based on module name
+        # Instances come from the service registry so the API endpoints
+        # and the optimizer share one copy per process
         try:
-            if module_name == "reasoning":
-                from .reasoning_extractor import ReasoningChainExtractor
-                module = ReasoningChainExtractor()
-            elif module_name == "values":
-                from .value_builder import ValueHierarchyBuilder
-                module = ValueHierarchyBuilder()
-            elif module_name == "emotions":
-                from .emotional_engine import EmotionalReasoningEngine
-                module = EmotionalReasoningEngine()
-            elif module_name == "tom":
-                from .theory_of_mind import TheoryOfMindModule
-                module = TheoryOfMindModule()
-            elif module_name == "narrative":
-                from .narrative_builder import NarrativeIdentityBuilder
-                module = NarrativeIdentityBuilder()
+            if module_name in MODULE_LOADERS:
+                module = MODULE_LOADERS[module_name]()
+            elif module_name in MODULE_SERVICES:
+                from .registry import registry
+                module = registry.get(MODULE_SERVICES[module_name])
             else:
                 raise ValueError(f"Unknown module: {module_name}")
             
@@ -162,6 +175,15 @@ class ModelOptimizer:
         Groups requests within batch_timeout window and processes together.
         Significantly improves throughput for similar operations.
         
+        Modules opt into real batching by mapping a method to a batch
+        method in their BATCH_METHODS class attribute, e.g.
+        
+            BATCH_METHODS = {'analyze': 'analyze_batch'}
+        
+        The batch method receives the list of per-request kwargs and
+        returns one result per request, in order (an Exception instance
+        fails just that request). Other methods are called per request.
+        
         Args:
             module_name: Which cognitive module to use
             method_name: Method to call on the module
@@ -174,7 +196,7 @@ class ModelOptimizer:
         batch_key = f"{module_name}.{method_name}"
         
         # Add request to batch queue
-        future = asyncio.Future()
+        future = asyncio.get_running_loop().create_future()
         self.batch_queue[batch_key].append({
             'request_id': request_id,
             'kwargs': kwargs,
@@ -184,9 +206,11 @@ class ModelOptimizer:
         # If batch is full, process immediately
         if len(self.batch_queue[batch_key]) >= self.batch_size:
             await self._process_batch(batch_key)
-        else:
-            # Otherwise, wait for timeout
-            asyncio.create_task(self._batch_timeout_handler(batch_key))
+        elif batch_key not in self.batch_timers:
+            # First request of a new batch starts the (single) timer
+            self.batch_timers[batch_key] = asyncio.create_task(
+                self._batch_timeout_handler(batch_key)
+            )
         
         return await future
     
@@ -194,6 +218,7 @@ class ModelOptimizer:
         """Wait for timeout, then process batch if still pending."""
         await asyncio.sleep(self.batch_timeout)
         
+        self.batch_timers.pop(batch_key, None)
         if self.batch_queue[batch_key]:
             await self._process_batch(batch_key)
     
@@ -206,6 +231,10 @@ class ModelOptimizer:
         - Process all requests in vectorized operations
         - Return individual results to each requester
         """
+        timer = self.batch_timers.pop(batch_key, None)
+        if timer is not None and timer is not asyncio.current_task():
+            timer.cancel()
+        
         if not self.batch_queue[batch_key]:
             return
         
@@ -218,17 +247,22 @@ class ModelOptimizer:
         start_time = time.time()
         
         try:
-            # Lazy load module
-            module = self.lazy_load_module(module_name)
-            method = getattr(module, method_name)
+            # Run off the event loop so other batches keep flowing
+            results = await asyncio.get_running_loop().run_in_executor(
+                None,
+                self._run_batch,
+                module_name,
+                method_name,
+                [item['kwargs'] for item in batch]
+            )
             
-            # Process each request (in real batch processing, you'd vectorize this)
-            for item in batch:
-                try:
-                    result = method(**item['kwargs'])
+            for item, result in zip(batch, results):
+                if item['future'].done():
+                    continue
+                if isinstance(result, Exception):
+                    item['future'].set_exception(result)
+                else:
                     item['future'].set_result(result)
-                except Exception as e:
-                    item['future'].set_exception(e)
             
             batch_time = time.time() - start_time
             avg_time = batch_time / len(batch) * 1000
@@ -238,7 +272,36 @@ class ModelOptimizer:
             logger.error(f"Batch processing failed: {e}")
             # Propagate error to all waiting requests
             for item in batch:
-                item['future'].set_exception(e)
+                if not item['future'].done():
+                    item['future'].set_exception(e)
+    
+    def _run_batch(
+        self,
+        module_name: str,
+        method_name: str,
+        kwargs_list: List[Dict[str, Any]]
+    ) -> List[Any]:
+        """Run a batch through the module's batch method, or one by one."""
+        module = self.lazy_load_module(module_name)
+        
+        batch_method_name = getattr(module, 'BATCH_METHODS', {}).get(method_name)
+        if batch_method_name:
+            results = getattr(module, batch_method_name)(kwargs_list)
+            if len(results) != len(kwargs_list):
+                raise RuntimeError(
+                    f"{batch_method_name} returned {len(results)} results "
+                    f"for {len(kwargs_list)} requests"
+                )
+            return results
+        
+        method = getattr(module, method_name)
+        results = []
+        for kwargs in kwargs_list:
+            try:
+                results.append(method(**kwargs))
+            except Exception as e:
+                results.append(e)
+        return results
     
     def optimize_cache_strategy(self, access_patterns: Dict[str, int]) -> Dict[str, str]:
         """
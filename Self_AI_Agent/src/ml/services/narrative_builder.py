@@ -11,12 +11,14 @@ Implements narrative psychology principles:
 
 import json
 import re
-from typing import Dict, List, Optional, Set
+from typing import Dict, Iterator, List, Optional, Set
 from datetime import datetime
 from collections import defaultdict, Counter
 
 from .config import settings
 from .db_utils import db
+from .message_analysis import MessageAnnotation, message_analyzer
+from .pattern_engine import TriggeredPatternSet
 
 
 class NarrativeIdentityBuilder:
@@ -83,27 +85,104 @@ class NarrativeIdentityBuilder:
         r'(early|mid|late)\s+(career|life|twenties)',
     ]
     
+    # Narrative / valence cue words (substring match on the lowercased text)
+    NARRATIVE_CUES = {
+        'narrative_markers': [
+            'when I',
+            'I remember',
+            'back when',
+            'there was a time',
+            'once',
+            'I used to',
+            'growing up',
+            'in my',
+        ],
+        'past_tense': ['was', 'were', 'had', 'did', 'went', 'came', 'made', 'took'],
+        'turning_point': TURNING_POINT_MARKERS,
+        'positive': [
+            'happy', 'joy', 'love', 'success', 'wonderful', 'great',
+            'amazing', 'accomplished', 'proud', 'excited', 'grateful'
+        ],
+        'negative': [
+            'sad', 'difficult', 'hard', 'struggle', 'pain', 'loss',
+            'failed', 'disappointed', 'hurt', 'terrible', 'awful'
+        ],
+    }
+    
+    # Methods with a batch counterpart (see ModelOptimizer.batch_process)
+    BATCH_METHODS = {'extract_narrative_identity': 'extract_narrative_identity_batch'}
+    
     def __init__(self):
         self.user_narratives = {}
+        
+        self.patterns = TriggeredPatternSet({
+            'meaning': self.MEANING_PATTERNS,
+            'time': self.TIME_PATTERNS,
+        })
     
     def extract_narrative_identity(
         self,
         user_id: str,
         conversations: List[Dict] = None,
-        save_to_db: bool = True
+        save_to_db: bool = True,
+        incremental: bool = False
     ) -> Dict[str, any]:
         """
         Extract complete narrative identity
         
+        With incremental=True only conversations past the user's watermark
+        are analyzed. Theme counts and event statistics from earlier runs
+        are kept in the watermark state, so themes, coherence and
+        total_events cover all history while events/meanings are the new ones.
+        
         Returns:
             - life_events: Chronological life events
             - turning_points: Pivotal moments
             - themes: Identity themes
             - coherence_score: How integrated the narrative is
         """
-        if conversations is None:
+        prepared = self._prepare_narrative_identity(user_id, conversations, save_to_db, incremental)
+        self._save_prepared_narrative(prepared)
+        return prepared['result']
+    
+    def extract_narrative_identity_batch(self, kwargs_list: List[Dict]) -> List:
+        """
+        Run several extract_narrative_identity requests as one batch
+        
+        Every request is analyzed before the write transaction opens;
+        messages shared between requests are scanned once (the annotation
+        cache, see message_analysis.py). The saves then share one
+        transaction, each request in its own savepoint.
+        
+        Returns:
+            One result per request, in order (the Exception for failed ones)
+        """
+        prepared = db.run_batch(
+            kwargs_list, self._prepare_narrative_identity, self._save_prepared_narrative
+        )
+        return [p if isinstance(p, Exception) else p['result'] for p in prepared]
+    
+    def _prepare_narrative_identity(
+        self,
+        user_id: str,
+        conversations: List[Dict] = None,
+        save_to_db: bool = True,
+        incremental: bool = False
+    ) -> Dict:
+        """Analyze conversations for extract_narrative_identity, without writing anything"""
+        watermark = None
+        state = {}
+        if incremental:
+            conversations, watermark = db.get_new_conversations(
+                user_id, 'narrative', conversations
+            )
+            state = (watermark or {}).get('state', {})
+        elif conversations is None:
             conversations = db.get_user_conversations(user_id, limit=500)
         
+        theme_state = state.setdefault('themes', {})
+        event_stats = state.setdefault('event_stats', {})
+        
         user_messages = [c for c in conversations if c['role'] == 'user']
         
         # Step 1: Extract life events
@@ -116,10 +195,10 @@ class NarrativeIdentityBuilder:
         meanings = self._extract_meanings(user_messages)
         
         # Step 4: Identify identity themes
-        themes = self._identify_identity_themes(user_messages, events)
+        themes = self._identify_identity_themes(user_messages, events, theme_state)
         
         # Step 5: Assess narrative coherence
-        coherence = self._assess_narrative_coherence(events, themes)
+        coherence = self._assess_narrative_coherence(events, themes, event_stats)
         
         narrative = {
             'life_events': events,
@@ -127,13 +206,110 @@ class NarrativeIdentityBuilder:
             'meanings': meanings,
             'themes': themes,
             'coherence_score': coherence,
-            'total_events': len(events)
+            'total_events': event_stats['event_count']
+        }
+        
+        return {
+            'user_id': user_id,
+            'conversations': conversations,
+            'watermark': watermark,
+            'state': state,
+            'save_to_db': save_to_db,
+            'incremental': incremental,
+            'result': narrative
         }
+    
+    def _save_prepared_narrative(self, prepared: Dict):
+        """Save a prepared narrative and advance its watermark in one transaction"""
+        if not prepared['save_to_db']:
+            return
+        
+        with db.batch():
+            self._save_narrative_identity(prepared['user_id'], prepared['result'])
+            if prepared['incremental']:
+                db.advance_watermark(
+                    prepared['user_id'], 'narrative', prepared['conversations'],
+                    prepared['watermark'], prepared['state']
+                )
+    
+    def iter_narrative_identity(
+        self,
+        user_id: str,
+        conversations: List[Dict] = None,
+        save_to_db: bool = True,
+        incremental: bool = False,
+        chunk_size: int = None
+    ) -> Iterator[Dict]:
+        """
+        Streaming extract_narrative_identity: yield events as they are found
+        
+        Theme counts and event statistics accumulate chunk by chunk in the
+        same running state incremental builds keep; each chunk's events are
+        saved (with the watermark and state, for incremental builds) and
+        released, themes are saved once at the end. A stream that stops
+        early resumes after its last saved chunk.
+        
+        Yields:
+            {'type': 'life_event', ...} and {'type': 'meaning', ...} per chunk,
+            then {'type': 'theme', ...} per theme and
+            {'type': 'summary', 'coherence_score': x, 'total_events': n}
+        """
+        chunk_size = chunk_size or settings.STREAM_CHUNK_SIZE
+        
+        watermark = None
+        state = {}
+        if incremental:
+            conversations, watermark = db.get_new_conversations(
+                user_id, 'narrative', conversations
+            )
+            state = (watermark or {}).get('state', {})
+        elif conversations is None:
+            conversations = db.get_user_conversations(user_id, limit=500)
+        
+        theme_state = state.setdefault('themes', {})
+        event_stats = state.setdefault('event_stats', {})
+        
+        themes = None
+        
+        for start in range(0, len(conversations), chunk_size):
+            batch = conversations[start:start + chunk_size]
+            chunk = [c for c in batch if c['role'] == 'user']
+            
+            events = self._extract_life_events(chunk)
+            themes = self._identify_identity_themes(chunk, events, theme_state)
+            # Updates the running event statistics
+            self._assess_narrative_coherence(events, themes, event_stats)
+            
+            if save_to_db:
+                with db.batch():
+                    if events:
+                        self._save_narrative_identity(
+                            user_id, {'life_events': events, 'themes': []}
+                        )
+                    if incremental:
+                        watermark = db.advance_watermark(
+                            user_id, 'narrative', batch, watermark, state
+                        )
+            
+            for event in events:
+                yield dict(event, type='life_event')
+            for meaning in self._extract_meanings(chunk):
+                yield dict(meaning, type='meaning')
+        
+        if themes is None:
+            themes = self._identify_identity_themes([], [], theme_state)
+        coherence = self._assess_narrative_coherence([], themes, event_stats)
         
         if save_to_db:
-            self._save_narrative_identity(user_id, narrative)
+            self._save_narrative_identity(user_id, {'life_events': [], 'themes': themes})
         
-        return narrative
+        for theme in themes:
+            yield dict(theme, type='theme')
+        yield {
+            'type': 'summary',
+            'coherence_score': coherence,
+            'total_events': event_stats['event_count']
+        }
     
     def _extract_life_events(self, messages: List[Dict]) -> List[Dict]:
         """Extract significant life events from conversations"""
@@ -141,23 +317,23 @@ class NarrativeIdentityBuilder:
         
         for msg in messages:
             content = msg['content']
+            annotation = message_analyzer.annotate(msg)
             
             # Look for past tense narratives (storytelling)
-            if self._is_narrative_content(content):
+            if self._is_narrative_content(annotation):
                 # Extract temporal information
-                event_date = self._extract_temporal_info(content)
+                event_date = self._extract_temporal_info(annotation)
                 
                 # Categorize event
-                category = self._categorize_event(content)
+                category = self._categorize_event(annotation)
                 
                 # Check if turning point
-                is_turning_point = any(
-                    marker in content.lower() 
-                    for marker in self.TURNING_POINT_MARKERS
+                is_turning_point = bool(
+                    annotation.keyword_hits('narrative_cues', self.NARRATIVE_CUES)['turning_point']
                 )
                 
                 # Extract emotional valence
-                valence = self._estimate_emotional_valence(content)
+                valence = self._estimate_emotional_valence(annotation)
                 
                 events.append({
                     'description': content[:300],  # First 300 chars
@@ -171,72 +347,46 @@ class NarrativeIdentityBuilder:
         
         return events
     
-    def _is_narrative_content(self, text: str) -> bool:
+    def _is_narrative_content(self, annotation: MessageAnnotation) -> bool:
         """Detect if content is narrative/story-telling"""
-        # Indicators of narrative content
-        narrative_markers = [
-            'when I',
-            'I remember',
-            'back when',
-            'there was a time',
-            'once',
-            'I used to',
-            'growing up',
-            'in my',
-        ]
-        
-        text_lower = text.lower()
+        cues = annotation.keyword_hits('narrative_cues', self.NARRATIVE_CUES)
         
         # Count past tense verbs (simplified)
-        past_tense = ['was', 'were', 'had', 'did', 'went', 'came', 'made', 'took']
-        past_count = sum(1 for word in past_tense if word in text_lower)
+        past_count = len(cues['past_tense'])
         
         # Count narrative markers
-        marker_count = sum(1 for marker in narrative_markers if marker in text_lower)
+        marker_count = len(cues['narrative_markers'])
         
         # Narrative if multiple indicators
-        return (past_count >= 2 or marker_count >= 1) and len(text.split()) > 20
+        return (past_count >= 2 or marker_count >= 1) and len(annotation.words) > 20
     
-    def _extract_temporal_info(self, text: str) -> Optional[str]:
+    def _extract_temporal_info(self, annotation: MessageAnnotation) -> Optional[str]:
         """Extract temporal information from text"""
-        for pattern in self.TIME_PATTERNS:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                return match.group(0)
+        # First match of the first matching pattern, as re.search per pattern
+        for match in annotation.family_matches('narrative', self.patterns, 'time'):
+            return match.group(0)
         
         return None
     
-    def _categorize_event(self, text: str) -> str:
+    def _categorize_event(self, annotation: MessageAnnotation) -> str:
         """Categorize event based on content"""
-        text_lower = text.lower()
-        
-        category_scores = {}
-        for category, keywords in self.EVENT_CATEGORIES.items():
-            score = sum(1 for kw in keywords if kw in text_lower)
-            if score > 0:
-                category_scores[category] = score
+        category_scores = {
+            category: len(found)
+            for category, found in annotation.keyword_hits('event_categories', self.EVENT_CATEGORIES).items()
+            if found
+        }
         
         if not category_scores:
             return 'general'
         
         return max(category_scores.items(), key=lambda x: x[1])[0]
     
-    def _estimate_emotional_valence(self, text: str) -> float:
+    def _estimate_emotional_valence(self, annotation: MessageAnnotation) -> float:
         """Estimate emotional valence (-1 to 1)"""
-        text_lower = text.lower()
-        
-        positive_words = [
-            'happy', 'joy', 'love', 'success', 'wonderful', 'great',
-            'amazing', 'accomplished', 'proud', 'excited', 'grateful'
-        ]
+        cues = annotation.keyword_hits('narrative_cues', self.NARRATIVE_CUES)
         
-        negative_words = [
-            'sad', 'difficult', 'hard', 'struggle', 'pain', 'loss',
-            'failed', 'disappointed', 'hurt', 'terrible', 'awful'
-        ]
-        
-        pos_count = sum(1 for word in positive_words if word in text_lower)
-        neg_count = sum(1 for word in negative_words if word in text_lower)
+        pos_count = len(cues['positive'])
+        neg_count = len(cues['negative'])
         
         if pos_count + neg_count == 0:
             return 0.0
@@ -252,58 +402,71 @@ class NarrativeIdentityBuilder:
         meanings = []
         
         for msg in messages:
-            content = msg['content']
+            annotation = message_analyzer.annotate(msg)
             
-            for pattern in self.MEANING_PATTERNS:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
+            for match in annotation.family_matches('narrative', self.patterns, 'meaning'):
+                meaning_text = match.group(1).strip()
                 
-                for match in matches:
-                    meaning_text = match.group(1).strip()
-                    
-                    if len(meaning_text) > 10:
-                        meanings.append({
-                            'meaning': meaning_text,
-                            'context': match.group(0),
-                            'conversation_id': msg.get('conversation_id'),
-                            'timestamp': msg.get('timestamp')
-                        })
+                if len(meaning_text) > 10:
+                    meanings.append({
+                        'meaning': meaning_text,
+                        'context': match.group(0),
+                        'conversation_id': msg.get('conversation_id'),
+                        'timestamp': msg.get('timestamp')
+                    })
         
         return meanings
     
     def _identify_identity_themes(
         self,
         messages: List[Dict],
-        events: List[Dict]
+        events: List[Dict],
+        state: Optional[Dict[str, Dict]] = None
     ) -> List[Dict]:
-        """Identify recurring identity themes"""
+        """
+        Identify recurring identity themes
+        
+        state holds per-theme counts and examples from earlier runs; it is
+        updated in place with the new messages.
+        """
         theme_counts = defaultdict(list)
         
-        # Analyze all user messages
-        all_text = ' '.join([m['content'].lower() for m in messages])
+        # Theme keyword hits of every user message
+        hits = [
+            message_analyzer.annotate(msg).keyword_hits('theme_keywords', self.THEME_KEYWORDS)
+            for msg in messages
+        ]
         
         for theme, keywords in self.THEME_KEYWORDS.items():
             for keyword in keywords:
-                if keyword in all_text:
-                    # Find specific instances
-                    for msg in messages:
-                        if keyword in msg['content'].lower():
-                            theme_counts[theme].append({
-                                'keyword': keyword,
-                                'context': msg['content'][:150],
-                                'conversation_id': msg.get('conversation_id')
-                            })
+                # Find specific instances
+                for msg, msg_hits in zip(messages, hits):
+                    if keyword in msg_hits[theme]:
+                        theme_counts[theme].append({
+                            'keyword': keyword,
+                            'context': msg['content'][:150],
+                            'conversation_id': msg.get('conversation_id')
+                        })
+        
+        # Merge into running per-theme totals
+        theme_state = state if state is not None else {}
+        for theme_name, instances in theme_counts.items():
+            entry = theme_state.setdefault(theme_name, {'occurrence_count': 0, 'examples': []})
+            entry['occurrence_count'] += len(instances)
+            entry['examples'].extend(instances[:3 - len(entry['examples'])])
         
         # Build theme profiles
         themes = []
-        for theme_name, instances in theme_counts.items():
-            if len(instances) >= 2:  # At least 2 mentions
-                strength = min(len(instances) / 10.0, 0.95)
+        for theme_name, entry in theme_state.items():
+            occurrence_count = entry['occurrence_count']
+            if occurrence_count >= 2:  # At least 2 mentions
+                strength = min(occurrence_count / 10.0, 0.95)
                 
                 themes.append({
                     'theme': theme_name,
                     'strength': strength,
-                    'occurrence_count': len(instances),
-                    'examples': instances[:3]  # Top 3 examples
+                    'occurrence_count': occurrence_count,
+                    'examples': list(entry['examples'])  # Top 3 examples
                 })
         
         # Sort by strength
@@ -314,23 +477,36 @@ class NarrativeIdentityBuilder:
     def _assess_narrative_coherence(
         self,
         events: List[Dict],
-        themes: List[Dict]
+        themes: List[Dict],
+        stats: Optional[Dict] = None
     ) -> float:
-        """Assess how coherent/integrated the narrative is"""
-        if not events:
+        """
+        Assess how coherent/integrated the narrative is
+        
+        stats holds event statistics from earlier runs; it is updated in
+        place with the new events.
+        """
+        stats = stats if stats is not None else {}
+        stats['event_count'] = stats.get('event_count', 0) + len(events)
+        stats['dated_count'] = stats.get('dated_count', 0) + sum(1 for e in events if e.get('date'))
+        stats['turning_point_count'] = (
+            stats.get('turning_point_count', 0) + sum(1 for e in events if e['is_turning_point'])
+        )
+        stats['categories'] = sorted(
+            set(stats.get('categories', [])) | set(e['category'] for e in events)
+        )
+        
+        if not stats['event_count']:
             return 0.0
         
         coherence_score = 0.5
         
         # Factor 1: Temporal organization (events have dates)
-        dated_events = [e for e in events if e.get('date')]
-        if len(events) > 0:
-            temporal_coherence = len(dated_events) / len(events)
-            coherence_score += temporal_coherence * 0.2
+        temporal_coherence = stats['dated_count'] / stats['event_count']
+        coherence_score += temporal_coherence * 0.2
         
         # Factor 2: Categorical diversity (multiple life domains)
-        categories = set(e['category'] for e in events)
-        if len(categories) >= 3:
+        if len(stats['categories']) >= 3:
             coherence_score += 0.1
         
         # Factor 3: Theme consistency (strong recurring themes)
@@ -339,69 +515,67 @@ class NarrativeIdentityBuilder:
             coherence_score += avg_theme_strength * 0.2
         
         # Factor 4: Presence of turning points
-        turning_points = [e for e in events if e['is_turning_point']]
-        if turning_points:
-            coherence_score += min(len(turning_points) / 5.0, 0.1)
+        if stats['turning_point_count']:
+            coherence_score += min(stats['turning_point_count'] / 5.0, 0.1)
         
         return min(coherence_score, 1.0)
     
     def _save_narrative_identity(self, user_id: str, narrative: Dict):
-        """Save narrative identity to database"""
-        # Save events
-        for event in narrative['life_events']:
-            query = """
-                INSERT INTO narrative_identity
-                (user_id, event_description, event_date, event_category,
-                 is_turning_point, emotional_valence, created_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """
-            
-            db.execute_update(
-                query,
-                (
-                    user_id,
-                    event['description'],
-                    event.get('date'),
-                    event['category'],
-                    event['is_turning_point'],
-                    event['emotional_valence'],
-                    event.get('timestamp', datetime.now().isoformat())
-                )
+        """Save narrative identity to database (single transaction)"""
+        now = datetime.now().isoformat()
+        
+        events_query = """
+            INSERT INTO narrative_identity
+            (user_id, event_description, event_date, event_category,
+             is_turning_point, emotional_valence, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """
+        event_rows = [
+            (
+                user_id,
+                event['description'],
+                event.get('date'),
+                event['category'],
+                event['is_turning_point'],
+                event['emotional_valence'],
+                event.get('timestamp', now)
             )
+            for event in narrative['life_events']
+        ]
         
-        # Save themes
+        themes_query = """
+            INSERT INTO identity_themes
+            (user_id, theme_name, description, strength,
+             supporting_events, first_detected, last_updated)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(user_id, theme_name)
+            DO UPDATE SET
+                strength = ?,
+                supporting_events = ?,
+                last_updated = ?
+        """
+        theme_rows = []
         for theme in narrative['themes']:
-            query = """
-                INSERT INTO identity_themes
-                (user_id, theme_name, description, strength,
-                 supporting_events, first_detected, last_updated)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                ON CONFLICT(user_id, theme_name)
-                DO UPDATE SET
-                    strength = ?,
-                    supporting_events = ?,
-                    last_updated = ?
-            """
-            
-            now = datetime.now().isoformat()
             examples_json = json.dumps(theme['examples'])
-            
-            db.execute_update(
-                query,
-                (
-                    user_id,
-                    theme['theme'],
-                    f"Occurred {theme['occurrence_count']} times",
-                    theme['strength'],
-                    examples_json,
-                    now,
-                    now,
-                    # For UPDATE
-                    theme['strength'],
-                    examples_json,
-                    now
-                )
-            )
+            theme_rows.append((
+                user_id,
+                theme['theme'],
+                f"Occurred {theme['occurrence_count']} times",
+                theme['strength'],
+                examples_json,
+                now,
+                now,
+                # For UPDATE
+                theme['strength'],
+                examples_json,
+                now
+            ))
+        
+        with db.batch() as batch:
+            if event_rows:
+                batch.executemany(events_query, event_rows)
+            if theme_rows:
+                batch.executemany(themes_query, theme_rows)
     
     def get_narrative_identity(self, user_id: str) -> Dict[str, any]:
         """Get user's narrative identity from database"""
@@ -512,5 +686,9 @@ class NarrativeIdentityBuilder:
         return conflicts
 
 
-# Global instance
-narrative_builder = NarrativeIdentityBuilder()
+# Global instance (constructed on first access, see registry.py)
+def __getattr__(name):
+    if name == 'narrative_builder':
+        from .registry import registry
+        return registry.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,129 @@
+"""
+NLP Manager - One shared spaCy pipeline per model per process
+
+Each model is loaded once and shared by every service. Call sites name a
+profile listing the components they actually read, and the rest of the
+pipeline is disabled for that call (spaCy's per-call `disable`, which does
+not mutate the shared pipeline, so it is safe across threads).
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+
+try:
+    import spacy
+    SPACY_AVAILABLE = True
+except ImportError:
+    SPACY_AVAILABLE = False
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# Profile → components the call site needs (plus whatever they depend on)
+#   concepts: noun_chunks (parser + POS) and ents
+#   keywords: token.pos_ / is_stop
+#   entities: ents only
+#   entities_keywords: ents + token.pos_
+PROFILES = {
+    'concepts': {'tok2vec', 'tagger', 'attribute_ruler', 'parser', 'ner'},
+    'keywords': {'tok2vec', 'tagger', 'attribute_ruler'},
+    'entities': {'tok2vec', 'ner'},
+    'entities_keywords': {'tok2vec', 'tagger', 'attribute_ruler', 'ner'},
+    'full': None,
+}
+
+
+class NLPManager:
+    """Process-wide registry of loaded spaCy pipelines"""
+
+    def __init__(self):
+        self._models: Dict[str, object] = {}
+        self._failed: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def load(self, model_name: Optional[str] = None):
+        """
+        Return the shared pipeline for a model, loading it on first use
+
+        Returns None (and logs once) if spaCy or the model is not installed.
+        """
+        model_name = model_name or settings.SPACY_MODEL
+        nlp = self._models.get(model_name)
+        if nlp is not None or model_name in self._failed:
+            return nlp
+
+        with self._lock:
+            if model_name in self._models or model_name in self._failed:
+                return self._models.get(model_name)
+
+            if not SPACY_AVAILABLE:
+                self._failed[model_name] = "spaCy not installed"
+            else:
+                try:
+                    self._models[model_name] = spacy.load(model_name)
+                    logger.info(f"Loaded spaCy model '{model_name}' "
+                                f"(pipes: {', '.join(self._models[model_name].pipe_names)})")
+                except OSError as e:
+                    self._failed[model_name] = str(e)
+
+            if model_name in self._failed:
+                logger.warning(f"spaCy model '{model_name}' not available "
+                               f"({self._failed[model_name]}). "
+                               f"Install with: python -m spacy download {model_name}")
+
+        return self._models.get(model_name)
+
+    def is_available(self, model_name: Optional[str] = None) -> bool:
+        return self.load(model_name) is not None
+
+    def disabled_for(self, profile: str, model_name: Optional[str] = None) -> List[str]:
+        """Components of the model that the profile does not need"""
+        nlp = self.load(model_name)
+        required = PROFILES[profile]
+        if nlp is None or required is None:
+            return []
+        return [name for name in nlp.pipe_names if name not in required]
+
+    def __call__(self, text: str, profile: str = 'full', model_name: Optional[str] = None):
+        """Process one text with only the profile's components"""
+        return self.load(model_name)(text, disable=self.disabled_for(profile, model_name))
+
+    def pipe(
+        self,
+        texts: Iterable[str],
+        profile: str = 'full',
+        model_name: Optional[str] = None,
+        batch_size: int = 256,
+        n_process: int = 1
+    ) -> Iterator:
+        """
+        Batched processing via nlp.pipe
+
+        Args:
+            texts: Input texts
+            profile: Key of PROFILES
+            model_name: spaCy model (default: settings.SPACY_MODEL)
+            batch_size: Texts per batch
+            n_process: Worker processes (>1 forks spaCy workers)
+
+        Returns:
+            Docs in input order
+        """
+        return self.load(model_name).pipe(
+            texts,
+            disable=self.disabled_for(profile, model_name),
+            batch_size=batch_size,
+            n_process=n_process
+        )
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            'loaded': {name: nlp.pipe_names for name, nlp in self._models.items()},
+            'failed': dict(self._failed)
+        }
+
+
+# Global instance
+nlp_manager = NLPManager()
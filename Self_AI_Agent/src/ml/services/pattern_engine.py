@@ -0,0 +1,123 @@
+"""
+Pattern Engine - Precompiled, trigger-prefiltered regex families
+
+Most extraction patterns in the cognitive services start with (or contain)
+a literal cue word such as "because" or "is like". Running every pattern
+over every message is wasteful: the vast majority of messages contain none
+of the cues, and patterns with a leading lazy group like ``(.+?)\\s+is like``
+are quadratic in the message length.
+
+TriggeredPatternSet compiles each pattern once and derives its literal
+trigger. A message is scanned once for all triggers (one fused alternation
+with a named group per trigger), and only the patterns whose trigger is
+present are run. Matches are identical to running every pattern, in the
+same order.
+"""
+
+import re
+from typing import Dict, Iterator, List, Optional, Pattern, Set, Tuple
+
+# Characters that end the literal prefix of a pattern
+_REGEX_META = set('\\()[]{}.?*+|^$')
+# Leading "(.+?)\s+" style capture used by analogy patterns
+_LEADING_CAPTURE = re.compile(r'^\(\.[+*]\??\)(?:\\s[+*])?')
+
+
+def literal_trigger(pattern: str) -> str:
+    """
+    Return a literal substring every match of ``pattern`` must contain
+
+    Returns '' when no literal can be derived, in which case the pattern
+    is always run.
+    """
+    body = _LEADING_CAPTURE.sub('', pattern)
+
+    literal = []
+    for ch in body:
+        if ch in _REGEX_META:
+            break
+        literal.append(ch)
+
+    # A quantifier after the prefix makes its last character optional
+    if literal and body[len(literal):len(literal) + 1] in ('?', '*', '{'):
+        literal.pop()
+
+    return ''.join(literal).strip()
+
+
+class TriggeredPatternSet:
+    """Named families of regexes behind a single literal-trigger prefilter"""
+
+    def __init__(self, families: Dict[str, List[str]], flags: int = re.IGNORECASE):
+        self.flags = flags
+        self._ignore_case = bool(flags & re.IGNORECASE)
+        self.families: Dict[str, List[Tuple[Pattern, str]]] = {
+            name: [(re.compile(p, flags), self._normalize(literal_trigger(p))) for p in patterns]
+            for name, patterns in families.items()
+        }
+
+        self.triggers: List[str] = sorted(
+            {trigger for compiled in self.families.values() for _, trigger in compiled if trigger},
+            key=len,
+            reverse=True
+        )
+
+        # One lookahead alternation so overlapping triggers are all reported;
+        # longest triggers first, named group per trigger
+        self._group_to_trigger = {f't{i}': t for i, t in enumerate(self.triggers)}
+        self._trigger_re: Optional[Pattern] = None
+        if self.triggers:
+            self._trigger_re = re.compile(
+                '(?=' + '|'.join(
+                    f'(?P<{name}>{re.escape(t)})'
+                    for name, t in self._group_to_trigger.items()
+                ) + ')',
+                flags
+            )
+
+        # ASCII case folding is exact, so ASCII text can use substring search
+        self._ascii_triggers = all(t.isascii() for t in self.triggers)
+
+        # A found trigger implies every trigger it contains (a shorter trigger
+        # starting at the same position is shadowed in the alternation)
+        self._implied = {t: {u for u in self.triggers if u in t} for t in self.triggers}
+
+    def _normalize(self, trigger: str) -> str:
+        return trigger.lower() if self._ignore_case else trigger
+
+    def present_triggers(self, text: str) -> Set[str]:
+        """Triggers occurring in ``text``"""
+        if not self.triggers:
+            return set()
+
+        if not self._ignore_case:
+            return {t for t in self.triggers if t in text}
+
+        if self._ascii_triggers and text.isascii():
+            # Fast path: plain substring search
+            lowered = text.lower()
+            return {t for t in self.triggers if t in lowered}
+
+        found: Set[str] = set()
+        for match in self._trigger_re.finditer(text):
+            found |= self._implied[self._group_to_trigger[match.lastgroup]]
+        return found
+
+    def finditer(
+        self,
+        text: str,
+        families: Optional[List[str]] = None
+    ) -> Iterator[Tuple[str, int, 're.Match']]:
+        """
+        Yield (family, pattern_index, match) for every match in ``text``
+
+        Order matches running each family's patterns in declaration order.
+        """
+        present = self.present_triggers(text)
+
+        for family in families or self.families:
+            for index, (compiled, trigger) in enumerate(self.families[family]):
+                if trigger and trigger not in present:
+                    continue
+                for match in compiled.finditer(text):
+                    yield family, index, match
@@ -0,0 +1,75 @@
+"""
+Process Pool Backend for CPU-bound cognitive modules
+
+The regex/spaCy modules (reasoning, values, narrative, tom) are pure-Python
+CPU work and do not scale past one core under the GIL. This module runs
+them in a pool of worker processes:
+
+- Each worker preloads its modules once (spaCy model included) in the
+  pool initializer, so requests never pay the load cost.
+- Requests are sent as plain (module, method, kwargs) tuples and results
+  come back pickled, so arguments and results must be picklable
+  (the cognitive methods take and return plain dicts/lists).
+- Workers are started with the 'spawn' context so they do not inherit
+  event loops, threads or sqlite connections from the server process.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Modules that are CPU-bound pure Python and benefit from separate processes
+CPU_BOUND_MODULES = ('reasoning', 'values', 'narrative', 'tom')
+
+
+def _worker_init(modules: Iterable[str]):
+    """Pool initializer: load modules once per worker process."""
+    from .model_optimizer import get_optimizer
+
+    optimizer = get_optimizer()
+    start_time = time.time()
+    for module_name in modules:
+        optimizer.lazy_load_module(module_name)
+
+    logger.info(f"Worker {os.getpid()} preloaded {list(modules)} "
+               f"in {(time.time() - start_time)*1000:.1f}ms")
+
+
+def run_in_worker(module_name: str, method_name: str, kwargs: Dict[str, Any]) -> Any:
+    """Execute a cognitive module method inside a worker process."""
+    from .model_optimizer import get_optimizer
+
+    module = get_optimizer().lazy_load_module(module_name)
+    return getattr(module, method_name)(**kwargs)
+
+
+def create_process_pool(
+    max_workers: Optional[int] = None,
+    modules: Iterable[str] = CPU_BOUND_MODULES
+) -> ProcessPoolExecutor:
+    """
+    Create a process pool whose workers preload the given modules.
+
+    Args:
+        max_workers: Number of processes (default: CPU count)
+        modules: Modules to preload in each worker
+
+    Returns:
+        ProcessPoolExecutor (use with loop.run_in_executor and run_in_worker)
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    modules = tuple(modules)
+
+    logger.info(f"Starting process pool: {max_workers} workers, preloading {list(modules)}")
+
+    return ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_worker_init,
+        initargs=(modules,)
+    )
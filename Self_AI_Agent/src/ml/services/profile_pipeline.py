@@ -0,0 +1,246 @@
+"""
+Profile Pipeline - Build a full cognitive profile in one pass
+
+A full profile used to take one HTTP call per module, and each call
+re-fetched the user's conversations and re-parsed them. ProfilePipeline
+loads the conversations once, annotates the user messages once (see
+message_analysis.py) and runs the modules concurrently over the shared
+data, yielding each module's result as soon as it completes.
+
+Modules run on a thread pool by default, which shares the annotation cache.
+With a process pool (settings.PROFILE_BUILD_PROCESSES > 0, see
+process_pool.py) the CPU-bound modules run truly in parallel; each worker
+then annotates the messages it receives.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+from .config import settings
+from .db_utils import db
+from .message_analysis import message_analyzer
+from .process_pool import create_process_pool, run_in_worker
+
+logger = logging.getLogger(__name__)
+
+# Pipeline module → method of the lazy_load_module instance
+PROFILE_METHODS = {
+    'reasoning': 'extract_reasoning_chains',
+    'values': 'build_value_hierarchy',
+    'narrative': 'extract_narrative_identity',
+    'tom': 'build_mental_model',
+}
+
+DEFAULT_PROFILE_MODULES = ('reasoning', 'values', 'narrative', 'tom')
+
+
+def _watermark_module(module: str, target_person: Optional[str] = None) -> str:
+    """Watermark name each module advances (see db_utils.get_new_conversations)"""
+    return f"tom:{target_person.lower()}" if module == 'tom' else module
+
+
+class ProfilePipeline:
+    """Fan-out of the cognitive modules over one shared conversation load"""
+
+    def __init__(self, executor: Optional[Executor] = None, max_workers: Optional[int] = None):
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers or settings.PROFILE_BUILD_WORKERS,
+            thread_name_prefix='profile'
+        )
+        # Threads share this process's annotation cache; worker processes do not
+        self.in_process = isinstance(self.executor, ThreadPoolExecutor)
+
+    def plan(
+        self,
+        user_id: str,
+        conversations: List[Dict],
+        modules: Iterable[str] = DEFAULT_PROFILE_MODULES,
+        tom_targets: Iterable[str] = (),
+        incremental: bool = False
+    ) -> List[Tuple[str, str, Dict[str, Any]]]:
+        """
+        One (task name, module, kwargs) per module run
+
+        Theory of mind runs once per target person ('tom:<target>').
+        """
+        tasks = []
+        for module in modules:
+            if module not in PROFILE_METHODS:
+                raise ValueError(f"Unknown profile module: {module}")
+
+            kwargs = {'user_id': user_id, 'conversations': conversations, 'incremental': incremental}
+            if module == 'tom':
+                for target in tom_targets:
+                    tasks.append((f"tom:{target}", module, dict(kwargs, target_person=target)))
+            else:
+                tasks.append((module, module, kwargs))
+        return tasks
+
+    def load_conversations(
+        self,
+        user_id: str,
+        modules: Iterable[str] = DEFAULT_PROFILE_MODULES,
+        tom_targets: Iterable[str] = (),
+        incremental: bool = False,
+        limit: int = 500
+    ) -> List[Dict]:
+        """
+        Load the user's conversations once for every module
+
+        Incremental builds load past the oldest watermark of the planned
+        modules; each module then skips what it has already processed.
+        Note the ordering differs: full builds read the newest `limit`
+        messages, incremental builds the oldest `limit` past the watermark
+        (see db_utils.get_new_conversations), so a first incremental build
+        covers the start of a long history and later builds catch up.
+        """
+        if not incremental:
+            return db.get_user_conversations(user_id, limit=limit)
+
+        watermark_names = [
+            _watermark_module(module, target)
+            for module in modules
+            for target in (tom_targets if module == 'tom' else [None])
+        ]
+        since_id = min(
+            ((db.get_watermark(user_id, name) or {}).get('last_conversation_id', 0)
+             for name in watermark_names),
+            default=0
+        )
+        return db.get_user_conversations(user_id, limit=limit, since_id=since_id)
+
+    def resolve_tom_targets(
+        self,
+        user_id: str,
+        modules: Iterable[str],
+        tom_targets: Iterable[str] = ()
+    ) -> List[str]:
+        """
+        Target persons for theory of mind
+
+        Without explicit targets, 'tom' models everyone the user has a
+        relationship profile for.
+        """
+        tom_targets = list(tom_targets)
+        if 'tom' not in modules or tom_targets:
+            return tom_targets
+
+        try:
+            profiles = db.get_relationship_profiles(user_id)
+        except Exception as e:
+            logger.warning(f"Could not load relationship profiles for {user_id}: {e}")
+            return []
+        return sorted({p['target_person'] for p in profiles if p.get('target_person')})
+
+    def _prepare(
+        self, user_id, conversations, modules, tom_targets, incremental, limit
+    ) -> Tuple[List[Dict], List[str]]:
+        """Resolve ToM targets, then load (if needed) and annotate the shared conversations"""
+        tom_targets = self.resolve_tom_targets(user_id, modules, tom_targets)
+
+        if conversations is None:
+            conversations = self.load_conversations(user_id, modules, tom_targets, incremental, limit)
+
+        if self.in_process:
+            message_analyzer.annotate_many([c for c in conversations if c['role'] == 'user'])
+
+        return conversations, tom_targets
+
+    async def run(
+        self,
+        user_id: str,
+        conversations: Optional[List[Dict]] = None,
+        modules: Iterable[str] = DEFAULT_PROFILE_MODULES,
+        tom_targets: Iterable[str] = (),
+        incremental: bool = False,
+        limit: int = 500
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Build the profile, yielding events as modules complete
+
+        Theory of mind runs for tom_targets, or else for the user's
+        relationship profiles; with neither, 'tom' yields an error event.
+
+        Events:
+            {'event': 'start', 'modules': [...], 'conversation_count': n}
+            {'event': 'result', 'module': name, 'elapsed_ms': t, 'data': ...}
+            {'event': 'error', 'module': name, 'elapsed_ms': t, 'error': msg}
+            {'event': 'done', 'total_ms': t, 'timings': {name: ms}, 'errors': n}
+        """
+        loop = asyncio.get_running_loop()
+        start_time = time.time()
+        modules = list(modules)
+        tom_targets = list(tom_targets)
+
+        conversations, tom_targets = await loop.run_in_executor(
+            None, self._prepare, user_id, conversations, modules, tom_targets, incremental, limit
+        )
+        tasks = self.plan(user_id, conversations, modules, tom_targets, incremental)
+
+        yield {
+            'event': 'start',
+            'user_id': user_id,
+            'modules': [name for name, _, _ in tasks],
+            'conversation_count': len(conversations)
+        }
+
+        timings = {}
+        errors = 0
+        if 'tom' in modules and not tom_targets:
+            errors += 1
+            yield {
+                'event': 'error',
+                'module': 'tom',
+                'elapsed_ms': round((time.time() - start_time) * 1000, 1),
+                'error': 'No target persons: pass tom_targets or build relationship profiles first'
+            }
+
+        pending = {}
+        for name, module, kwargs in tasks:
+            future = loop.run_in_executor(
+                self.executor, run_in_worker, module, PROFILE_METHODS[module], kwargs
+            )
+            pending[future] = name
+
+        while pending:
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                elapsed_ms = round((time.time() - start_time) * 1000, 1)
+                timings[name] = elapsed_ms
+
+                try:
+                    event = {'event': 'result', 'module': name, 'elapsed_ms': elapsed_ms, 'data': future.result()}
+                except Exception as e:
+                    errors += 1
+                    logger.error(f"Profile module '{name}' failed for {user_id}: {e}")
+                    event = {'event': 'error', 'module': name, 'elapsed_ms': elapsed_ms, 'error': str(e)}
+                yield event
+
+        yield {
+            'event': 'done',
+            'user_id': user_id,
+            'total_ms': round((time.time() - start_time) * 1000, 1),
+            'timings': timings,
+            'errors': errors
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+
+
+_pipeline: Optional[ProfilePipeline] = None
+
+
+def get_profile_pipeline() -> ProfilePipeline:
+    """Get or create the ProfilePipeline singleton"""
+    global _pipeline
+    if _pipeline is None:
+        executor = None
+        if settings.PROFILE_BUILD_PROCESSES > 0:
+            executor = create_process_pool(max_workers=settings.PROFILE_BUILD_PROCESSES)
+        _pipeline = ProfilePipeline(executor)
+    return _pipeline
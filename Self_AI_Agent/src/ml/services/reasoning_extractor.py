@@ -11,20 +11,118 @@ This module identifies how the user thinks, including:
 
 import re
 import json
-from typing import Dict, List, Tuple, Optional, Set
+import threading
+import time
+from typing import Callable, Dict, Iterator, List, Tuple, Optional, Set
 from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 import networkx as nx
 
-try:
-    import spacy
-    SPACY_AVAILABLE = True
-except ImportError:
-    SPACY_AVAILABLE = False
-    print("Warning: spaCy not available. Using fallback pattern matching.")
-
 from .config import settings
 from .db_utils import db
+from .message_analysis import message_analyzer
+from .nlp_manager import SPACY_AVAILABLE, nlp_manager
+from .pattern_engine import TriggeredPatternSet
+
+if not SPACY_AVAILABLE:
+    print("Warning: spaCy not available. Using fallback pattern matching.")
+
+
+class KnowledgeGraphCache:
+    """
+    Per-user in-memory knowledge graphs with LRU eviction
+    
+    Graphs are loaded lazily on first access and dropped when this process
+    writes edges (invalidate). Edges written by other processes (process
+    pool workers, other servers) show up once the cached graph is older
+    than max_age_seconds. The cache is bounded both by number of users
+    and by total edges.
+    """
+    
+    def __init__(
+        self,
+        loader: Callable[[str], nx.DiGraph],
+        max_users: int = 1000,
+        max_edges: int = 2_000_000,
+        max_age_seconds: Optional[float] = None
+    ):
+        self._loader = loader
+        self.max_users = max_users
+        self.max_edges = max_edges
+        # Reload graphs older than this; needed when other processes write edges
+        self.max_age_seconds = max_age_seconds
+        self._graphs: "OrderedDict[str, nx.DiGraph]" = OrderedDict()
+        self._loaded_at: Dict[str, float] = {}
+        self._edge_count = 0
+        # Bumped on invalidate so a load racing a write is not cached
+        self._generations: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, user_id: str) -> nx.DiGraph:
+        """Get user's graph, loading it from the database if needed"""
+        with self._lock:
+            graph = self._graphs.get(user_id)
+            if graph is not None and self.max_age_seconds is not None and (
+                time.time() - self._loaded_at[user_id] > self.max_age_seconds
+            ):
+                self._remove(user_id)
+                graph = None
+            if graph is not None:
+                self._graphs.move_to_end(user_id)
+                self.hits += 1
+                return graph
+            self.misses += 1
+            generation = self._generations[user_id]
+        
+        graph = self._loader(user_id)
+        
+        with self._lock:
+            if generation != self._generations[user_id]:
+                return graph  # Invalidated while loading, don't cache
+            if user_id not in self._graphs:
+                self._graphs[user_id] = graph
+                self._loaded_at[user_id] = time.time()
+                self._edge_count += graph.number_of_edges()
+                self._evict()
+            return self._graphs[user_id]
+    
+    def invalidate(self, user_id: str):
+        """Drop user's graph (call after writing edges)"""
+        with self._lock:
+            self._generations[user_id] += 1
+            self._remove(user_id)
+    
+    def _remove(self, user_id: str):
+        graph = self._graphs.pop(user_id, None)
+        self._loaded_at.pop(user_id, None)
+        if graph is not None:
+            self._edge_count -= graph.number_of_edges()
+    
+    def clear(self):
+        with self._lock:
+            for user_id in self._graphs:
+                self._generations[user_id] += 1
+            self._graphs.clear()
+            self._loaded_at.clear()
+            self._edge_count = 0
+    
+    def _evict(self):
+        # Always keep the most recently used graph, even if it alone exceeds the budget
+        while len(self._graphs) > 1 and (
+            len(self._graphs) > self.max_users or self._edge_count > self.max_edges
+        ):
+            self._remove(next(iter(self._graphs)))
+    
+    def get_stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'users': len(self._graphs),
+                'edges': self._edge_count,
+                'hits': self.hits,
+                'misses': self.misses
+            }
 
 
 class ReasoningChainExtractor:
@@ -71,30 +169,176 @@ class ReasoningChainExtractor:
         r'compared to\s+(.+?)(\.|\,|$)',
     ]
     
+    # Methods with a batch counterpart (see ModelOptimizer.batch_process)
+    BATCH_METHODS = {'extract_reasoning_chains': 'extract_reasoning_chains_batch'}
+    
     def __init__(self):
-        self.nlp = None
-        if SPACY_AVAILABLE:
-            try:
-                self.nlp = spacy.load(settings.SPACY_MODEL)
-            except OSError:
-                print(f"spaCy model '{settings.SPACY_MODEL}' not found. "
-                      f"Install with: python -m spacy download {settings.SPACY_MODEL}")
+        # Shared per process (see nlp_manager.py)
+        self.nlp = nlp_manager.load()
         
-        self.knowledge_graph = nx.DiGraph()
+        self.graph_cache = KnowledgeGraphCache(
+            self._load_knowledge_graph,
+            max_users=settings.KG_CACHE_MAX_USERS,
+            max_edges=settings.KG_CACHE_MAX_EDGES,
+            max_age_seconds=settings.KG_CACHE_MAX_AGE_SECONDS
+        )
+        
+        # All pattern families compiled once behind a shared trigger prefilter
+        self.patterns = TriggeredPatternSet({
+            'causal': self.CAUSAL_PATTERNS,
+            'deductive': self.DEDUCTIVE_PATTERNS,
+            'inductive': self.INDUCTIVE_PATTERNS,
+            'analogical': self.ANALOGICAL_PATTERNS,
+        })
     
     def extract_reasoning_chains(
         self, 
         user_id: str, 
         conversations: List[Dict] = None,
-        save_to_db: bool = True
+        save_to_db: bool = True,
+        incremental: bool = False
     ) -> Dict[str, List[Dict]]:
         """
         Extract all reasoning patterns from user's conversations
         
+        With incremental=True only conversations past the user's watermark
+        are processed, and only the newly found chains are saved and returned.
+        
         Returns:
             Dict with keys: 'causal', 'deductive', 'inductive', 'analogical'
         """
-        if conversations is None:
+        chains = self._extract_and_save(user_id, conversations, save_to_db, incremental)
+        
+        # Reload from the committed edges on next query
+        self.graph_cache.invalidate(user_id)
+        
+        return chains
+    
+    def extract_reasoning_chains_batch(self, kwargs_list: List[Dict]) -> List:
+        """
+        Run several extract_reasoning_chains requests as one batch
+        
+        Messages shared between requests are scanned once, before any
+        write lock is taken. All saves then go through a single transaction,
+        each request in its own savepoint: a failed request leaves none of
+        its chains, edges or watermark behind.
+        
+        Args:
+            kwargs_list: Keyword arguments of each request
+        
+        Returns:
+            One result per request, in order (the Exception for failed ones)
+        """
+        scan_cache: Dict[Tuple[str, str], Dict[str, List[Dict]]] = {}
+        extractions = db.run_batch(
+            kwargs_list,
+            lambda **kwargs: self._prepare_extraction(scan_cache=scan_cache, **kwargs),
+            self._save_extraction
+        )
+        
+        for extraction in extractions:
+            if not isinstance(extraction, Exception):
+                self.graph_cache.invalidate(extraction['user_id'])
+        
+        return [
+            extraction if isinstance(extraction, Exception) else extraction['chains']
+            for extraction in extractions
+        ]
+    
+    def iter_reasoning_chains(
+        self,
+        user_id: str,
+        conversations: List[Dict] = None,
+        save_to_db: bool = True,
+        incremental: bool = False,
+        chunk_size: int = None
+    ) -> Iterator[Dict]:
+        """
+        Streaming extract_reasoning_chains: yield chains as they are found
+        
+        Messages are processed in chunks; each chunk's chains, graph edges
+        and watermark are saved in one transaction and then released, so
+        memory stays bounded by the chunk size and a stream that stops early
+        resumes after its last committed chunk.
+        
+        Yields:
+            {'type': 'chain', ...chain} per chain, then
+            {'type': 'summary', 'counts': {chain_type: n}, 'message_count': n}
+        """
+        chunk_size = chunk_size or settings.STREAM_CHUNK_SIZE
+        
+        watermark = None
+        if incremental:
+            conversations, watermark = db.get_new_conversations(
+                user_id, 'reasoning', conversations
+            )
+        elif conversations is None:
+            conversations = db.get_user_conversations(user_id, limit=500)
+        
+        counts = defaultdict(int)
+        message_count = 0
+        
+        try:
+            for start in range(0, len(conversations), chunk_size):
+                batch = conversations[start:start + chunk_size]
+                chains = {family: [] for family in self.patterns.families}
+                chains['abductive'] = []
+                
+                for msg in batch:
+                    if msg['role'] != 'user':
+                        continue
+                    message_count += 1
+                    for chain_type, found in self._scan_message(msg).items():
+                        chains[chain_type].extend(found)
+                
+                edges = self._graph_edges(chains)
+                with db.batch():
+                    if save_to_db:
+                        self._save_chains(user_id, chains)
+                    self._add_or_update_edges(user_id, edges)
+                    if incremental and save_to_db:
+                        watermark = db.advance_watermark(user_id, 'reasoning', batch, watermark)
+                
+                for chain_type, found in chains.items():
+                    counts[chain_type] += len(found)
+                    for chain in found:
+                        yield dict(chain, type='chain')
+        finally:
+            # Edges of completed chunks are committed even if the stream stops early
+            self.graph_cache.invalidate(user_id)
+        
+        yield {'type': 'summary', 'counts': dict(counts), 'message_count': message_count}
+    
+    def _extract_and_save(
+        self,
+        user_id: str,
+        conversations: List[Dict] = None,
+        save_to_db: bool = True,
+        incremental: bool = False,
+        scan_cache: Optional[Dict] = None
+    ) -> Dict[str, List[Dict]]:
+        """Body of extract_reasoning_chains, minus graph cache invalidation"""
+        extraction = self._prepare_extraction(
+            user_id, conversations, save_to_db, incremental, scan_cache
+        )
+        self._save_extraction(extraction)
+        return extraction['chains']
+    
+    def _prepare_extraction(
+        self,
+        user_id: str,
+        conversations: List[Dict] = None,
+        save_to_db: bool = True,
+        incremental: bool = False,
+        scan_cache: Optional[Dict] = None
+    ) -> Dict:
+        """Scan conversations for chains and graph edges, without writing anything"""
+        watermark = None
+        if incremental:
+            conversations, watermark = db.get_new_conversations(
+                user_id, 'reasoning', conversations
+            )
+        elif conversations is None:
             conversations = db.get_user_conversations(user_id, limit=500)
         
         # Only analyze user's messages
@@ -112,164 +356,160 @@ class ReasoningChainExtractor:
         }
         
         for msg in user_messages:
-            content = msg['content']
+            # Extract all types of reasoning in one scan
+            key = (msg['content'], msg['conversation_id'])
+            if scan_cache is None:
+                found_by_type = self._scan_message(msg)
+            elif key in scan_cache:
+                # Already scanned for another request; copy so results stay independent
+                found_by_type = {
+                    chain_type: [dict(chain) for chain in found]
+                    for chain_type, found in scan_cache[key].items()
+                }
+            else:
+                found_by_type = scan_cache[key] = self._scan_message(msg)
             
-            # Extract different types of reasoning
-            chains['causal'].extend(
-                self._extract_causal_chains(content, msg['conversation_id'])
-            )
-            chains['deductive'].extend(
-                self._extract_deductive_chains(content, msg['conversation_id'])
-            )
-            chains['inductive'].extend(
-                self._extract_inductive_chains(content, msg['conversation_id'])
-            )
-            chains['analogical'].extend(
-                self._extract_analogical_chains(content, msg['conversation_id'])
-            )
-        
-        # Save to database
-        if save_to_db:
-            self._save_chains(user_id, chains)
+            for chain_type, found in found_by_type.items():
+                chains[chain_type].extend(found)
         
-        # Build knowledge graph
-        self._build_knowledge_graph(user_id, chains)
+        return {
+            'user_id': user_id,
+            'conversations': conversations,
+            'watermark': watermark,
+            'save_to_db': save_to_db,
+            'incremental': incremental,
+            'chains': chains,
+            # Concept extraction (spaCy) runs before the write lock is taken
+            'edges': self._graph_edges(chains)
+        }
+    
+    def _save_extraction(self, extraction: Dict):
+        """Save chains, graph edges and watermark of a prepared extraction in one transaction"""
+        user_id = extraction['user_id']
         
-        return chains
+        with db.batch():
+            if extraction['save_to_db']:
+                self._save_chains(user_id, extraction['chains'])
+            
+            # Build knowledge graph
+            self._add_or_update_edges(user_id, extraction['edges'])
+            
+            if extraction['incremental'] and extraction['save_to_db']:
+                db.advance_watermark(
+                    user_id, 'reasoning', extraction['conversations'], extraction['watermark']
+                )
     
-    def _extract_causal_chains(
-        self, 
-        text: str, 
-        conversation_id: str
-    ) -> List[Dict]:
-        """Extract causal reasoning (X causes Y)"""
-        chains = []
-        
-        for pattern in self.CAUSAL_PATTERNS:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                # Split sentence to get premise and conclusion
-                sentence = text[max(0, match.start()-100):match.end()]
-                cause_indicator_pos = match.start() - max(0, match.start()-100)
-                
-                premise = sentence[:cause_indicator_pos].strip()
-                conclusion = match.group(1).strip()
-                
-                if premise and conclusion:
-                    chains.append({
-                        'chain_type': 'causal',
-                        'premise': [premise],
-                        'conclusion': conclusion,
-                        'confidence': 0.7,
-                        'source_conversation_id': conversation_id
-                    })
+    def _scan_message(self, message: Dict) -> Dict[str, List[Dict]]:
+        """Extract chains of every type from one message in a single pass"""
+        text = message['content']
+        chains = {family: [] for family in self.patterns.families}
+        
+        # Pattern matches come from the shared per-message annotation
+        annotation = message_analyzer.annotate(message)
+        for family, _, match in annotation.matches('reasoning', self.patterns):
+            chain = self._CHAIN_BUILDERS[family](self, text, match, message['conversation_id'])
+            if chain:
+                chains[family].append(chain)
         
         return chains
     
-    def _extract_deductive_chains(
-        self, 
-        text: str, 
-        conversation_id: str
-    ) -> List[Dict]:
-        """Extract deductive reasoning (if-then logic)"""
-        chains = []
-        
-        for pattern in self.DEDUCTIVE_PATTERNS:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                premise = match.group(1).strip()
-                conclusion = match.group(2).strip()
-                
-                if premise and conclusion:
-                    chains.append({
-                        'chain_type': 'deductive',
-                        'premise': [premise],
-                        'conclusion': conclusion,
-                        'confidence': 0.8,
-                        'source_conversation_id': conversation_id
-                    })
+    def _causal_chain(self, text: str, match, conversation_id: str) -> Optional[Dict]:
+        # Split sentence to get premise and conclusion
+        sentence = text[max(0, match.start()-100):match.end()]
+        cause_indicator_pos = match.start() - max(0, match.start()-100)
         
-        return chains
+        premise = sentence[:cause_indicator_pos].strip()
+        conclusion = match.group(1).strip()
+        
+        if premise and conclusion:
+            return {
+                'chain_type': 'causal',
+                'premise': [premise],
+                'conclusion': conclusion,
+                'confidence': 0.7,
+                'source_conversation_id': conversation_id
+            }
+        return None
     
-    def _extract_inductive_chains(
-        self, 
-        text: str, 
-        conversation_id: str
-    ) -> List[Dict]:
-        """Extract inductive reasoning (generalizations)"""
-        chains = []
-        
-        for pattern in self.INDUCTIVE_PATTERNS:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                # Get surrounding context
-                sentence = text[max(0, match.start()-50):match.end()+50]
-                generalization = match.group(0).strip()
-                
-                chains.append({
-                    'chain_type': 'inductive',
-                    'premise': [sentence],
-                    'conclusion': generalization,
-                    'confidence': 0.6,  # Lower confidence for generalizations
-                    'source_conversation_id': conversation_id
-                })
+    def _deductive_chain(self, text: str, match, conversation_id: str) -> Optional[Dict]:
+        premise = match.group(1).strip()
+        conclusion = match.group(2).strip()
         
-        return chains
+        if premise and conclusion:
+            return {
+                'chain_type': 'deductive',
+                'premise': [premise],
+                'conclusion': conclusion,
+                'confidence': 0.8,
+                'source_conversation_id': conversation_id
+            }
+        return None
     
-    def _extract_analogical_chains(
-        self, 
-        text: str, 
-        conversation_id: str
-    ) -> List[Dict]:
-        """Extract analogical reasoning (comparisons)"""
-        chains = []
-        
-        for pattern in self.ANALOGICAL_PATTERNS:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                if len(match.groups()) >= 2:
-                    source = match.group(1).strip()
-                    target = match.group(2).strip()
-                    
-                    chains.append({
-                        'chain_type': 'analogical',
-                        'premise': [source],
-                        'conclusion': target,
-                        'confidence': 0.65,
-                        'source_conversation_id': conversation_id
-                    })
+    def _inductive_chain(self, text: str, match, conversation_id: str) -> Optional[Dict]:
+        # Get surrounding context
+        sentence = text[max(0, match.start()-50):match.end()+50]
+        generalization = match.group(0).strip()
         
-        return chains
+        return {
+            'chain_type': 'inductive',
+            'premise': [sentence],
+            'conclusion': generalization,
+            'confidence': 0.6,  # Lower confidence for generalizations
+            'source_conversation_id': conversation_id
+        }
+    
+    def _analogical_chain(self, text: str, match, conversation_id: str) -> Optional[Dict]:
+        if len(match.groups()) >= 2:
+            source = match.group(1).strip()
+            target = match.group(2).strip()
+            
+            return {
+                'chain_type': 'analogical',
+                'premise': [source],
+                'conclusion': target,
+                'confidence': 0.65,
+                'source_conversation_id': conversation_id
+            }
+        return None
+    
+    _CHAIN_BUILDERS = {
+        'causal': _causal_chain,
+        'deductive': _deductive_chain,
+        'inductive': _inductive_chain,
+        'analogical': _analogical_chain,
+    }
     
     def _save_chains(self, user_id: str, chains: Dict[str, List[Dict]]):
         """Save extracted chains to database"""
+        query = """
+            INSERT INTO reasoning_chains
+            (user_id, chain_type, premise, conclusion, confidence, 
+             domain, source_conversation_id, extracted_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        
+        now = datetime.now().isoformat()
+        rows = []
         for chain_type, chain_list in chains.items():
             for chain in chain_list:
                 # Detect domain from content
                 domain = self._detect_domain(
                     chain['premise'][0] + " " + chain['conclusion']
                 )
-                
-                query = """
-                    INSERT INTO reasoning_chains
-                    (user_id, chain_type, premise, conclusion, confidence, 
-                     domain, source_conversation_id, extracted_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """
-                
-                db.execute_update(
-                    query,
-                    (
-                        user_id,
-                        chain['chain_type'],
-                        json.dumps(chain['premise']),
-                        chain['conclusion'],
-                        chain['confidence'],
-                        domain,
-                        chain.get('source_conversation_id'),
-                        datetime.now().isoformat()
-                    )
-                )
+                rows.append((
+                    user_id,
+                    chain['chain_type'],
+                    json.dumps(chain['premise']),
+                    chain['conclusion'],
+                    chain['confidence'],
+                    domain,
+                    chain.get('source_conversation_id'),
+                    now
+                ))
+        
+        if rows:
+            with db.batch() as batch:
+                batch.executemany(query, rows)
     
     def _detect_domain(self, text: str) -> str:
         """Detect reasoning domain from text"""
@@ -290,50 +530,73 @@ class ReasoningChainExtractor:
         
         return 'general'
     
-    def _build_knowledge_graph(
-        self, 
-        user_id: str, 
-        chains: Dict[str, List[Dict]]
-    ):
-        """Build knowledge graph from reasoning chains"""
-        # Add nodes and edges from all chains
-        for chain_type, chain_list in chains.items():
-            for chain in chain_list:
-                premise_text = " ".join(chain['premise'])
-                conclusion_text = chain['conclusion']
-                
-                # Extract key concepts (simplified)
-                premise_concepts = self._extract_concepts(premise_text)
-                conclusion_concepts = self._extract_concepts(conclusion_text)
-                
-                # Add edges between concepts
-                for p_concept in premise_concepts:
-                    for c_concept in conclusion_concepts:
-                        relation = self._map_chain_type_to_relation(chain_type)
-                        self._add_or_update_edge(
-                            user_id, 
-                            p_concept, 
-                            relation, 
-                            c_concept,
-                            chain['confidence']
-                        )
-    
-    def _extract_concepts(self, text: str) -> List[str]:
-        """Extract key concepts from text"""
+    def _graph_edges(self, chains: Dict[str, List[Dict]]) -> List[Tuple[str, str, str, float]]:
+        """
+        Concept edges (source, relation, target, confidence) of reasoning chains
+        
+        Runs spaCy, so call it before opening a write transaction.
+        """
+        pairs = [
+            (chain_type, chain, " ".join(chain['premise']), chain['conclusion'])
+            for chain_type, chain_list in chains.items()
+            for chain in chain_list
+        ]
+        
+        # Extract key concepts for every premise/conclusion in one nlp.pipe pass
+        texts = [text for _, _, premise, conclusion in pairs for text in (premise, conclusion)]
+        concepts = self._extract_concepts_batch(texts)
+        
+        edges = []
+        for i, (chain_type, chain, _, _) in enumerate(pairs):
+            premise_concepts = concepts[2 * i]
+            conclusion_concepts = concepts[2 * i + 1]
+            
+            # Add edges between concepts
+            relation = self._map_chain_type_to_relation(chain_type)
+            for p_concept in premise_concepts:
+                for c_concept in conclusion_concepts:
+                    edges.append(
+                        (p_concept, relation, c_concept, chain['confidence'])
+                    )
+        
+        return edges
+    
+    def _extract_concepts_batch(self, texts: List[str]) -> List[List[str]]:
+        """
+        Extract key concepts from many texts
+        
+        Runs only the components noun_chunks and ents need, batched through
+        nlp.pipe; duplicate texts are processed once.
+        """
+        unique = list(dict.fromkeys(texts))
+        
         if self.nlp:
-            doc = self.nlp(text)
-            # Extract noun chunks and named entities
-            concepts = [chunk.text.lower() for chunk in doc.noun_chunks]
-            concepts.extend([ent.text.lower() for ent in doc.ents])
-            return list(set(concepts))[:5]  # Top 5 concepts
+            docs = nlp_manager.pipe(
+                unique,
+                profile='concepts',
+                batch_size=settings.SPACY_BATCH_SIZE,
+                n_process=settings.SPACY_N_PROCESS
+            )
+            by_text = {text: self._concepts_from_doc(doc) for text, doc in zip(unique, docs)}
         else:
-            # Fallback: extract capitalized words and key nouns
-            words = text.split()
-            concepts = [
-                w.lower() for w in words 
-                if len(w) > 4 and (w[0].isupper() or w.lower() in ['work', 'life', 'people'])
-            ]
-            return concepts[:5]
+            by_text = {text: self._fallback_concepts(text) for text in unique}
+        
+        return [list(by_text[text]) for text in texts]
+    
+    def _concepts_from_doc(self, doc) -> List[str]:
+        """Noun chunks and named entities of a processed Doc"""
+        concepts = [chunk.text.lower() for chunk in doc.noun_chunks]
+        concepts.extend([ent.text.lower() for ent in doc.ents])
+        return list(set(concepts))[:5]  # Top 5 concepts
+    
+    def _fallback_concepts(self, text: str) -> List[str]:
+        """Fallback: extract capitalized words and key nouns"""
+        words = text.split()
+        concepts = [
+            w.lower() for w in words 
+            if len(w) > 4 and (w[0].isupper() or w.lower() in ['work', 'life', 'people'])
+        ]
+        return concepts[:5]
     
     def _map_chain_type_to_relation(self, chain_type: str) -> str:
         """Map reasoning chain type to graph relation"""
@@ -346,15 +609,15 @@ class ReasoningChainExtractor:
         }
         return mapping.get(chain_type, 'relates_to')
     
-    def _add_or_update_edge(
+    def _add_or_update_edges(
         self,
         user_id: str,
-        source: str,
-        relation: str,
-        target: str,
-        confidence: float
+        edges: List[Tuple[str, str, str, float]]
     ):
-        """Add or update knowledge graph edge"""
+        """Add or update knowledge graph edges (source, relation, target, confidence)"""
+        if not edges:
+            return
+        
         query = """
             INSERT INTO knowledge_graph
             (user_id, source_concept, relation_type, target_concept, 
@@ -368,18 +631,16 @@ class ReasoningChainExtractor:
         """
         
         now = datetime.now().isoformat()
-        db.execute_update(
-            query,
-            (user_id, source, relation, target, confidence, now, confidence, now)
-        )
+        with db.batch() as batch:
+            batch.executemany(
+                query,
+                [
+                    (user_id, source, relation, target, confidence, now, confidence, now)
+                    for source, relation, target, confidence in edges
+                ]
+            )
         
-        # Also add to in-memory graph
-        self.knowledge_graph.add_edge(
-            source, 
-            target, 
-            relation=relation, 
-            weight=confidence
-        )
+        self.graph_cache.invalidate(user_id)
     
     def get_reasoning_patterns(self, user_id: str) -> Dict[str, any]:
         """Get user's reasoning pattern statistics"""
@@ -421,27 +682,25 @@ class ReasoningChainExtractor:
         concept: str, 
         max_depth: int = 2
     ) -> Dict[str, any]:
-        """Query knowledge graph for related concepts"""
-        # Load graph from database if empty
-        if not self.knowledge_graph.nodes():
-            self._load_knowledge_graph(user_id)
+        """Query user's knowledge graph for related concepts"""
+        graph = self.get_knowledge_graph(user_id)
         
         concept_lower = concept.lower()
         
-        if concept_lower not in self.knowledge_graph:
+        if concept_lower not in graph:
             return {'concept': concept, 'related': [], 'chains': []}
         
         # Get related concepts within max_depth
         related = []
         for node in nx.single_source_shortest_path_length(
-            self.knowledge_graph, 
+            graph, 
             concept_lower, 
             cutoff=max_depth
         ):
             if node != concept_lower:
                 # Get edge data
-                if self.knowledge_graph.has_edge(concept_lower, node):
-                    edge_data = self.knowledge_graph[concept_lower][node]
+                if graph.has_edge(concept_lower, node):
+                    edge_data = graph[concept_lower][node]
                     related.append({
                         'concept': node,
                         'relation': edge_data.get('relation', 'relates_to'),
@@ -451,11 +710,15 @@ class ReasoningChainExtractor:
         return {
             'concept': concept,
             'related': sorted(related, key=lambda x: x['confidence'], reverse=True),
-            'graph_size': len(self.knowledge_graph.nodes())
+            'graph_size': len(graph.nodes())
         }
     
-    def _load_knowledge_graph(self, user_id: str):
-        """Load knowledge graph from database"""
+    def get_knowledge_graph(self, user_id: str) -> nx.DiGraph:
+        """Get user's knowledge graph (cached, do not mutate)"""
+        return self.graph_cache.get(user_id)
+    
+    def _load_knowledge_graph(self, user_id: str) -> nx.DiGraph:
+        """Load user's knowledge graph from database"""
         query = """
             SELECT source_concept, relation_type, target_concept, strength
             FROM knowledge_graph
@@ -464,14 +727,21 @@ class ReasoningChainExtractor:
         
         edges = db.execute_query(query, (user_id,))
         
+        graph = nx.DiGraph()
         for edge in edges:
-            self.knowledge_graph.add_edge(
+            graph.add_edge(
                 edge['source_concept'],
                 edge['target_concept'],
                 relation=edge['relation_type'],
                 weight=edge['strength']
             )
+        
+        return graph
 
 
-# Global instance
-reasoning_extractor = ReasoningChainExtractor()
+# Global instance (constructed on first access, see registry.py)
+def __getattr__(name):
+    if name == 'reasoning_extractor':
+        from .registry import registry
+        return registry.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,118 @@
+"""
+Service Registry - Lazily constructed cognitive service instances
+
+Importing the services package used to build every module's global
+instance (spaCy included) at import time. The registry builds each
+instance on first use instead, once per process, and records how long
+each one took so cold starts can be tracked.
+"""
+
+import importlib
+import logging
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Service name → (module, class)
+SERVICES = {
+    'reasoning_extractor': ('reasoning_extractor', 'ReasoningChainExtractor'),
+    'value_builder': ('value_builder', 'ValueHierarchyBuilder'),
+    'emotional_engine': ('emotional_engine', 'EmotionalReasoningEngine'),
+    'theory_of_mind': ('theory_of_mind', 'TheoryOfMindModule'),
+    'narrative_builder': ('narrative_builder', 'NarrativeIdentityBuilder'),
+}
+
+
+class ServiceRegistry:
+    """Process-wide, lazily constructed service instances"""
+
+    def __init__(self, services: Dict[str, tuple] = SERVICES):
+        self.services = dict(services)
+        self._instances: Dict[str, Any] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.load_seconds: Dict[str, float] = {}
+
+    def get(self, name: str) -> Any:
+        """Return the service instance, constructing it on first use"""
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+
+        if name not in self.services:
+            raise KeyError(f"Unknown service: {name}")
+
+        # Per-service lock: a slow constructor does not block other services
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+
+        with lock:
+            if name not in self._instances:
+                module_name, class_name = self.services[name]
+                start_time = time.time()
+
+                module = importlib.import_module(f'.{module_name}', __package__)
+                instance = getattr(module, class_name)()
+
+                self._instances[name] = instance
+                self.load_seconds[name] = time.time() - start_time
+                logger.info(f"Service '{name}' loaded in {self.load_seconds[name]*1000:.1f}ms")
+
+                # Importing the submodule bound its name on the package; point it
+                # back at the instance, as the eager package import used to
+                package = importlib.import_module(__package__)
+                if getattr(package, name, None) is module:
+                    setattr(package, name, instance)
+
+        return self._instances[name]
+
+    def preload(self, names: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        Construct services ahead of first use
+
+        Args:
+            names: Services to load (default: all)
+
+        Returns:
+            Load time in seconds per service
+        """
+        for name in names or self.services:
+            self.get(name)
+        return dict(self.load_seconds)
+
+    def is_loaded(self, name: str) -> bool:
+        return name in self._instances
+
+    def loaded_services(self) -> List[str]:
+        return list(self._instances)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'available': list(self.services),
+            'loaded': self.loaded_services(),
+            'load_ms': {name: round(s * 1000, 1) for name, s in self.load_seconds.items()}
+        }
+
+
+registry = ServiceRegistry()
+
+
+def get_service(name: str) -> Any:
+    """Shorthand for registry.get(name)"""
+    return registry.get(name)
+
+
+def parse_service_list(value: Optional[str]) -> List[str]:
+    """Parse a --preload / ML_PRELOAD_SERVICES value ('all' or comma separated)"""
+    if not value:
+        return []
+    if value.strip().lower() == 'all':
+        return list(SERVICES)
+
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in SERVICES]
+    if unknown:
+        raise ValueError(f"Unknown services: {', '.join(unknown)} (available: {', '.join(SERVICES)})")
+    return names
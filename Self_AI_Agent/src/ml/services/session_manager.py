@@ -11,6 +11,11 @@ Supports 100+ concurrent users per instance.
 """
 
 import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from typing import Dict, List, Any, Optional
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
@@ -19,6 +24,8 @@ import time
 import logging
 from collections import defaultdict, deque
 
+from .process_pool import CPU_BOUND_MODULES, create_process_pool, run_in_worker
+
 logger = logging.getLogger(__name__)
 
 
@@ -79,18 +86,26 @@ class SessionManager:
     Manages user sessions and request scheduling.
     
     Features:
-    - Priority-based request queue
+    - Priority-based request queues served by per-class async workers
     - Per-user rate limiting
     - Resource allocation
     - Session cleanup
+    - Non-blocking execution on a bounded thread pool, or on a pool of
+      preloaded worker processes for CPU-bound modules (executor='process')
     """
     
+    # Default number of concurrent workers per priority class
+    DEFAULT_WORKERS = {
+        Priority.PREMIUM: 4,
+        Priority.HIGH: 4,
+        Priority.STANDARD: 4,
+        Priority.LOW: 2,
+    }
+    
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.sessions: Dict[str, UserSession] = {}
-        self.request_queues: Dict[Priority, deque] = {
-            p: deque() for p in Priority
-        }
+        self.request_queues: Dict[Priority, asyncio.Queue] = {}
         self.active_requests: Dict[str, Request] = {}
         
         # Rate limiting
@@ -106,11 +121,115 @@ class SessionManager:
         self.max_total_concurrent = config.get('max_total_concurrent', 100)
         self.session_timeout = config.get('session_timeout', 1800)  # 30 min
         
-        # Start background tasks
-        asyncio.create_task(self._cleanup_task())
-        asyncio.create_task(self._process_queue_task())
+        # Workers: N per priority class, executing on a shared bounded pool
+        workers = config.get('workers_per_priority', {})
+        if isinstance(workers, int):
+            workers = {p: workers for p in Priority}
+        self.workers_per_priority: Dict[Priority, int] = {
+            p: workers.get(p, workers.get(p.name, self.DEFAULT_WORKERS[p])) for p in Priority
+        }
+        self.max_workers = config.get('max_workers', min(32, (os.cpu_count() or 1) + 4))
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='session-worker'
+        )
         
-        logger.info(f"SessionManager initialized (max concurrent: {self.max_total_concurrent})")
+        # Optional process pool for CPU-bound modules ('thread' or 'process')
+        self.executor_mode = config.get('executor', 'thread')
+        self.process_modules = set(config.get('process_modules', CPU_BOUND_MODULES))
+        self.process_workers = config.get('process_workers', os.cpu_count() or 1)
+        self.process_executor = None
+        self._process_pool_lock = threading.Lock()
+        if self.executor_mode == 'process':
+            self.process_executor = create_process_pool(
+                self.process_workers, self.process_modules
+            )
+        elif self.executor_mode != 'thread':
+            raise ValueError(f"Unknown executor mode: {self.executor_mode}")
+        
+        # Worker utilisation metrics
+        self.busy_workers: Dict[Priority, int] = {p: 0 for p in Priority}
+        self.busy_time: Dict[Priority, float] = {p: 0.0 for p in Priority}
+        self.completed: Dict[Priority, int] = {p: 0 for p in Priority}
+        self.started_at: Optional[float] = None
+        
+        # Background tasks are started on first use inside a running loop
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._tasks: List[asyncio.Task] = []
+        
+        logger.info(f"SessionManager initialized (max concurrent: {self.max_total_concurrent}, "
+                   f"executor workers: {self.max_workers})")
+    
+    def _ensure_started(self):
+        """Start queues, workers and cleanup task on the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop:
+            return
+        
+        # First use, or the previous loop went away (e.g. between test loops)
+        for task in self._tasks:
+            task.cancel()
+        self._abandon_requests()
+        
+        self._loop = loop
+        self.request_queues = {p: asyncio.Queue() for p in Priority}
+        self.busy_workers = {p: 0 for p in Priority}
+        self.busy_time = {p: 0.0 for p in Priority}
+        self.completed = {p: 0 for p in Priority}
+        self._tasks = [asyncio.create_task(self._cleanup_task())]
+        for priority, count in self.workers_per_priority.items():
+            for _ in range(count):
+                self._tasks.append(asyncio.create_task(self._worker(priority)))
+        self.started_at = time.time()
+        
+        logger.info(f"SessionManager workers started: "
+                   f"{ {p.name: n for p, n in self.workers_per_priority.items()} }")
+    
+    def _abandon_requests(self):
+        """
+        Fail requests left on the previous loop's queues and workers.
+        
+        Their workers are gone, so without this the submitters would wait
+        on their futures forever.
+        """
+        abandoned = list(self.active_requests.values())
+        for queue in self.request_queues.values():
+            while not queue.empty():
+                abandoned.append(queue.get_nowait())
+        self.active_requests.clear()
+        
+        for request in abandoned:
+            future = request.future
+            error = RuntimeError(
+                f"Request {request.request_id} dropped: session manager moved to a new event loop"
+            )
+            
+            def fail(future=future, error=error):
+                if not future.done():
+                    future.set_exception(error)
+            
+            old_loop = future.get_loop()
+            try:
+                if old_loop.is_running():
+                    old_loop.call_soon_threadsafe(fail)
+                else:
+                    fail()
+            except RuntimeError:
+                pass  # Loop closed: nothing is awaiting the future any more
+        
+        if abandoned:
+            logger.warning(f"Failed {len(abandoned)} requests queued on a previous event loop")
+    
+    async def shutdown(self):
+        """Stop workers and the executor."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._loop = None
+        self.executor.shutdown(wait=False)
+        if self.process_executor is not None:
+            self.process_executor.shutdown(wait=False, cancel_futures=True)
     
     def get_or_create_session(self, user_id: str, tier: str = "standard") -> UserSession:
         """
@@ -227,8 +346,10 @@ class SessionManager:
         # Determine priority
         priority = self.get_priority(user_id, module_name)
         
+        self._ensure_started()
+        
         # Create request
-        future = asyncio.Future()
+        future = asyncio.get_running_loop().create_future()
         request = Request(
             request_id=request_id,
             user_id=user_id,
@@ -239,46 +360,41 @@ class SessionManager:
             future=future
         )
         
-        # Add to queue
-        self.request_queues[priority].append(request)
+        # Add to queue (wakes an idle worker of this class)
+        self.request_queues[priority].put_nowait(request)
         logger.debug(f"Request {request_id} queued (user: {user_id}, priority: {priority.name})")
         
         # Wait for result
         result = await future
         return result
     
-    async def _process_queue_task(self):
+    async def _worker(self, priority: Priority):
         """
-        Background task to process queued requests.
+        Worker for one priority class.
         
-        Processes requests by priority: PREMIUM > HIGH > STANDARD > LOW
+        Waits on the class queue (no polling) and runs one request at a
+        time; higher classes get more workers by default.
         """
+        queue = self.request_queues[priority]
         while True:
+            request = await queue.get()
+            self.busy_workers[priority] += 1
+            start_time = time.time()
             try:
-                # Find highest priority non-empty queue
-                request = None
-                for priority in [Priority.PREMIUM, Priority.HIGH, Priority.STANDARD, Priority.LOW]:
-                    if self.request_queues[priority]:
-                        request = self.request_queues[priority].popleft()
-                        break
-                
-                if request is None:
-                    # No requests, wait a bit
-                    await asyncio.sleep(0.01)
-                    continue
-                
-                # Process request
                 await self._process_request(request)
-            
             except Exception as e:
-                logger.error(f"Error in queue processing: {e}")
-                await asyncio.sleep(1)
+                logger.error(f"Error in {priority.name} worker: {e}")
+            finally:
+                self.busy_workers[priority] -= 1
+                self.busy_time[priority] += time.time() - start_time
+                self.completed[priority] += 1
+                queue.task_done()
     
     async def _process_request(self, request: Request):
         """
         Process a single request.
         
-        Loads module, executes method, records metrics.
+        Loads module, executes method off the event loop, records metrics.
         """
         start_time = time.time()
         
@@ -289,16 +405,11 @@ class SessionManager:
             logger.info(f"Processing request {request.request_id} (user: {request.user_id}, "
                        f"module: {request.module_name}, age: {request.age():.2f}s)")
             
-            # Load module and execute
-            from .model_optimizer import get_optimizer
-            optimizer = get_optimizer()
-            module = optimizer.lazy_load_module(request.module_name)
-            method = getattr(module, request.method_name)
-            
-            result = method(**request.kwargs)
+            result = await self._execute(request)
             
             # Set result
-            request.future.set_result(result)
+            if not request.future.done():
+                request.future.set_result(result)
             
             # Record metrics
             processing_time = time.time() - start_time
@@ -309,13 +420,69 @@ class SessionManager:
         
         except Exception as e:
             logger.error(f"Request {request.request_id} failed: {e}")
-            request.future.set_exception(e)
+            if not request.future.done():
+                request.future.set_exception(e)
         
         finally:
             # Remove from active
             if request.request_id in self.active_requests:
                 del self.active_requests[request.request_id]
     
+    async def _execute(self, request: Request) -> Any:
+        """Run the module method without blocking the event loop."""
+        loop = asyncio.get_running_loop()
+        
+        if self.process_executor is not None and request.module_name in self.process_modules:
+            return await self._execute_in_process(request)
+        
+        # Load module (may load spaCy/transformers, so also off the loop)
+        from .model_optimizer import get_optimizer
+        optimizer = get_optimizer()
+        module = await loop.run_in_executor(
+            self.executor, optimizer.lazy_load_module, request.module_name
+        )
+        method = getattr(module, request.method_name)
+        
+        if asyncio.iscoroutinefunction(method):
+            return await method(**request.kwargs)
+        
+        return await loop.run_in_executor(
+            self.executor, functools.partial(method, **request.kwargs)
+        )
+    
+    async def _execute_in_process(self, request: Request) -> Any:
+        """Send the request to a preloaded worker process."""
+        loop = asyncio.get_running_loop()
+        executor = self.process_executor
+        try:
+            return await loop.run_in_executor(
+                executor,
+                run_in_worker,
+                request.module_name,
+                request.method_name,
+                request.kwargs
+            )
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM); replace the pool for later requests
+            self._replace_process_pool(executor)
+            raise
+    
+    def _replace_process_pool(self, broken):
+        """
+        Swap a broken process pool for a new one and shut the old one down.
+        
+        Every request in flight on the pool fails with BrokenProcessPool;
+        only the first to get here replaces it.
+        """
+        with self._process_pool_lock:
+            if self.process_executor is not broken:
+                return  # Already replaced
+            logger.error("Process pool broken, restarting workers")
+            self.process_executor = create_process_pool(
+                self.process_workers, self.process_modules
+            )
+        broken.shutdown(wait=False, cancel_futures=True)
+    
     async def _cleanup_task(self):
         """
         Background task to cleanup inactive sessions.
@@ -355,7 +522,8 @@ class SessionManager:
         Returns:
             Dict with active sessions, queue sizes, etc.
         """
-        queue_sizes = {p.name: len(q) for p, q in self.request_queues.items()}
+        queue_sizes = {p.name: self.request_queues[p].qsize() if p in self.request_queues else 0
+                       for p in Priority}
         
         tier_counts = defaultdict(int)
         for session in self.sessions.values():
@@ -367,6 +535,7 @@ class SessionManager:
             'queue_sizes': queue_sizes,
             'total_queued': sum(queue_sizes.values()),
             'tier_distribution': dict(tier_counts),
+            'workers': self.get_worker_stats(),
             'config': {
                 'max_concurrent_per_user': self.max_concurrent_per_user,
                 'max_total_concurrent': self.max_total_concurrent,
@@ -374,6 +543,40 @@ class SessionManager:
             }
         }
     
+    def get_worker_stats(self) -> Dict[str, Any]:
+        """
+        Get worker utilisation per priority class.
+        
+        Utilisation is busy worker-seconds over available worker-seconds
+        since the workers started.
+        """
+        uptime = time.time() - self.started_at if self.started_at else 0.0
+        
+        per_priority = {}
+        for p in Priority:
+            capacity = uptime * self.workers_per_priority[p]
+            per_priority[p.name] = {
+                'workers': self.workers_per_priority[p],
+                'busy': self.busy_workers[p],
+                'completed': self.completed[p],
+                'utilization': self.busy_time[p] / capacity if capacity > 0 else 0.0
+            }
+        
+        total_workers = sum(self.workers_per_priority.values())
+        return {
+            'per_priority': per_priority,
+            'total_workers': total_workers,
+            'busy_workers': sum(self.busy_workers.values()),
+            'utilization': (
+                sum(self.busy_time.values()) / (uptime * total_workers)
+                if uptime > 0 and total_workers else 0.0
+            ),
+            'executor': self.executor_mode,
+            'executor_max_workers': self.max_workers,
+            'process_workers': self.process_workers if self.process_executor else 0,
+            'uptime_seconds': uptime
+        }
+    
     def get_user_stats(self, user_id: str) -> Optional[Dict[str, Any]]:
         """
         Get statistics for a specific user.
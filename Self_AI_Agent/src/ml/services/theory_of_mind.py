@@ -16,6 +16,8 @@ from collections import defaultdict
 
 from .config import settings
 from .db_utils import db
+from .message_analysis import message_analyzer
+from .pattern_engine import TriggeredPatternSet
 
 
 class TheoryOfMindModule:
@@ -48,33 +50,89 @@ class TheoryOfMindModule:
         r'(?:from\s+)?(?:their|his|her)\s+perspective.*?I\s+(.+?)(\.|\,|$)',
     ]
     
+    # Methods with a batch counterpart (see ModelOptimizer.batch_process)
+    BATCH_METHODS = {'build_mental_model': 'build_mental_model_batch'}
+    
     def __init__(self):
         self.mental_models = {}
+        
+        # Target-independent, so one scan per message serves every target person
+        self.patterns = TriggeredPatternSet({
+            'belief': self.BELIEF_PATTERNS,
+            'intent': self.INTENT_PATTERNS,
+            'reaction': self.REACTION_PATTERNS,
+            'recursive': self.RECURSIVE_PATTERNS,
+        })
     
     def build_mental_model(
         self,
         user_id: str,
         target_person: str,
         conversations: List[Dict] = None,
-        context: Dict = None
+        context: Dict = None,
+        incremental: bool = False
     ) -> Dict[str, any]:
         """
         Build user's mental model of target person
         
+        With incremental=True only conversations past the watermark for this
+        target are analyzed and the new evidence is merged into the stored
+        model.
+        
         Returns:
             - beliefs: What user thinks target knows/believes
             - intentions: What user thinks target wants
             - predictions: How user expects target to react
             - recursion_level: Depth of perspective taking
         """
-        if conversations is None:
+        prepared = self._prepare_mental_model(
+            user_id, target_person, conversations, context, incremental
+        )
+        self._save_prepared_model(prepared)
+        return prepared['result']
+    
+    def build_mental_model_batch(self, kwargs_list: List[Dict]) -> List:
+        """
+        Run several build_mental_model requests as one batch
+        
+        Every request is analyzed before the write transaction opens;
+        messages shared between requests (e.g. one user's conversations
+        for several target persons) are scanned once (the annotation cache,
+        see message_analysis.py). The saves then share one transaction,
+        each request in its own savepoint.
+        
+        Returns:
+            One result per request, in order (the Exception for failed ones)
+        """
+        prepared = db.run_batch(
+            kwargs_list, self._prepare_mental_model, self._save_prepared_model
+        )
+        return [p if isinstance(p, Exception) else p['result'] for p in prepared]
+    
+    def _prepare_mental_model(
+        self,
+        user_id: str,
+        target_person: str,
+        conversations: List[Dict] = None,
+        context: Dict = None,
+        incremental: bool = False
+    ) -> Dict:
+        """Analyze conversations for build_mental_model, without writing anything"""
+        module_name = f"tom:{target_person.lower()}"
+        watermark = None
+        if incremental:
+            conversations, watermark = db.get_new_conversations(
+                user_id, module_name, conversations
+            )
+        elif conversations is None:
             conversations = db.get_user_conversations(user_id, limit=200)
         
         # Filter conversations mentioning target person
+        target_lower = target_person.lower()
         relevant_convs = [
             c for c in conversations
-            if target_person.lower() in c['content'].lower()
-            and c['role'] == 'user'
+            if c['role'] == 'user'
+            and target_lower in message_analyzer.annotate(c).lower
         ]
         
         # Extract different aspects of mental model
@@ -83,6 +141,14 @@ class TheoryOfMindModule:
         predictions = self._extract_reaction_predictions(relevant_convs, target_person)
         recursive = self._extract_recursive_beliefs(relevant_convs, target_person)
         
+        if incremental and watermark:
+            # Merge with evidence from earlier runs
+            previous = self._load_model_evidence(user_id, target_person, context or {})
+            beliefs = previous['belief_attributions'] + beliefs
+            intentions = previous['intent_model'] + intentions
+            predictions = previous['predicted_reactions'] + predictions
+            recursive = watermark['state'].get('recursive_beliefs', []) + recursive
+        
         model = {
             'target_person': target_person,
             'belief_attributions': beliefs,
@@ -94,10 +160,52 @@ class TheoryOfMindModule:
             'context': context or {}
         }
         
-        # Save to database
-        self._save_mental_model(user_id, model)
+        return {
+            'user_id': user_id,
+            'module_name': module_name,
+            'conversations': conversations,
+            'watermark': watermark,
+            'incremental': incremental,
+            'result': model
+        }
+    
+    def _save_prepared_model(self, prepared: Dict):
+        """Save a prepared mental model and advance its watermark in one transaction"""
+        model = prepared['result']
+        with db.batch():
+            self._save_mental_model(prepared['user_id'], model)
+            if prepared['incremental']:
+                # Recursive beliefs are not stored in theory_of_mind, keep them here
+                db.advance_watermark(
+                    prepared['user_id'], prepared['module_name'], prepared['conversations'],
+                    prepared['watermark'], {'recursive_beliefs': model['recursive_beliefs']}
+                )
+    
+    def _load_model_evidence(
+        self,
+        user_id: str,
+        target_person: str,
+        context: Dict
+    ) -> Dict[str, List[Dict]]:
+        """Load stored evidence lists of a mental model (empty if none)"""
+        result = db.execute_query(
+            """
+            SELECT belief_attribution, intent_model, predicted_reaction
+            FROM theory_of_mind
+            WHERE user_id = ? AND target_person = ? AND context = ?
+            """,
+            (user_id, target_person, json.dumps(context)),
+            fetch_one=True
+        )
         
-        return model
+        if not result:
+            return {'belief_attributions': [], 'intent_model': [], 'predicted_reactions': []}
+        
+        return {
+            'belief_attributions': json.loads(result['belief_attribution'] or '[]'),
+            'intent_model': json.loads(result['intent_model'] or '[]'),
+            'predicted_reactions': json.loads(result['predicted_reaction'] or '[]'),
+        }
     
     def _extract_belief_attributions(
         self,
@@ -109,22 +217,20 @@ class TheoryOfMindModule:
         
         for conv in conversations:
             content = conv['content']
+            annotation = message_analyzer.annotate(conv)
             
-            for pattern in self.BELIEF_PATTERNS:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
-                
-                for match in matches:
-                    # Check if this refers to target person
-                    context_before = content[max(0, match.start()-50):match.start()]
-                    if target_person.lower() in context_before.lower():
-                        belief_content = match.group(1).strip()
-                        
-                        beliefs.append({
-                            'content': belief_content,
-                            'full_context': match.group(0),
-                            'conversation_id': conv.get('conversation_id'),
-                            'timestamp': conv.get('timestamp')
-                        })
+            for match in annotation.family_matches('tom', self.patterns, 'belief'):
+                # Check if this refers to target person
+                context_before = content[max(0, match.start()-50):match.start()]
+                if target_person.lower() in context_before.lower():
+                    belief_content = match.group(1).strip()
+                    
+                    beliefs.append({
+                        'content': belief_content,
+                        'full_context': match.group(0),
+                        'conversation_id': conv.get('conversation_id'),
+                        'timestamp': conv.get('timestamp')
+                    })
         
         return beliefs
     
@@ -138,21 +244,19 @@ class TheoryOfMindModule:
         
         for conv in conversations:
             content = conv['content']
+            annotation = message_analyzer.annotate(conv)
             
-            for pattern in self.INTENT_PATTERNS:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
-                
-                for match in matches:
-                    context_before = content[max(0, match.start()-50):match.start()]
-                    if target_person.lower() in context_before.lower():
-                        intent_content = match.group(1).strip()
-                        
-                        intentions.append({
-                            'intent': intent_content,
-                            'full_context': match.group(0),
-                            'conversation_id': conv.get('conversation_id'),
-                            'timestamp': conv.get('timestamp')
-                        })
+            for match in annotation.family_matches('tom', self.patterns, 'intent'):
+                context_before = content[max(0, match.start()-50):match.start()]
+                if target_person.lower() in context_before.lower():
+                    intent_content = match.group(1).strip()
+                    
+                    intentions.append({
+                        'intent': intent_content,
+                        'full_context': match.group(0),
+                        'conversation_id': conv.get('conversation_id'),
+                        'timestamp': conv.get('timestamp')
+                    })
         
         return intentions
     
@@ -166,22 +270,20 @@ class TheoryOfMindModule:
         
         for conv in conversations:
             content = conv['content']
+            annotation = message_analyzer.annotate(conv)
             
-            for pattern in self.REACTION_PATTERNS:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
-                
-                for match in matches:
-                    context_before = content[max(0, match.start()-50):match.start()]
-                    if target_person.lower() in context_before.lower():
-                        predicted_reaction = match.group(1).strip()
-                        
-                        predictions.append({
-                            'prediction': predicted_reaction,
-                            'full_context': match.group(0),
-                            'conversation_id': conv.get('conversation_id'),
-                            'timestamp': conv.get('timestamp'),
-                            'verified': False  # Can be updated later
-                        })
+            for match in annotation.family_matches('tom', self.patterns, 'reaction'):
+                context_before = content[max(0, match.start()-50):match.start()]
+                if target_person.lower() in context_before.lower():
+                    predicted_reaction = match.group(1).strip()
+                    
+                    predictions.append({
+                        'prediction': predicted_reaction,
+                        'full_context': match.group(0),
+                        'conversation_id': conv.get('conversation_id'),
+                        'timestamp': conv.get('timestamp'),
+                        'verified': False  # Can be updated later
+                    })
         
         return predictions
     
@@ -195,22 +297,20 @@ class TheoryOfMindModule:
         
         for conv in conversations:
             content = conv['content']
+            annotation = message_analyzer.annotate(conv)
             
-            for pattern in self.RECURSIVE_PATTERNS:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
-                
-                for match in matches:
-                    context_before = content[max(0, match.start()-50):match.start()]
-                    if target_person.lower() in context_before.lower():
-                        recursive_belief = match.group(1).strip()
-                        
-                        recursive.append({
-                            'belief': f"User thinks {target_person} thinks user {recursive_belief}",
-                            'level': 2,  # Level 2 recursion
-                            'full_context': match.group(0),
-                            'conversation_id': conv.get('conversation_id'),
-                            'timestamp': conv.get('timestamp')
-                        })
+            for match in annotation.family_matches('tom', self.patterns, 'recursive'):
+                context_before = content[max(0, match.start()-50):match.start()]
+                if target_person.lower() in context_before.lower():
+                    recursive_belief = match.group(1).strip()
+                    
+                    recursive.append({
+                        'belief': f"User thinks {target_person} thinks user {recursive_belief}",
+                        'level': 2,  # Level 2 recursion
+                        'full_context': match.group(0),
+                        'conversation_id': conv.get('conversation_id'),
+                        'timestamp': conv.get('timestamp')
+                    })
         
         return recursive
     
@@ -464,5 +564,9 @@ class TheoryOfMindModule:
         return models
 
 
-# Global instance
-theory_of_mind = TheoryOfMindModule()
+# Global instance (constructed on first access, see registry.py)
+def __getattr__(name):
+    if name == 'theory_of_mind':
+        from .registry import registry
+        return registry.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -10,13 +10,15 @@ This module discovers:
 
 import json
 import re
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 from datetime import datetime
 from collections import defaultdict
 import networkx as nx
 
 from .config import settings
 from .db_utils import db
+from .message_analysis import message_analyzer
+from .pattern_engine import TriggeredPatternSet
 
 
 class ValueHierarchyBuilder:
@@ -58,24 +60,79 @@ class ValueHierarchyBuilder:
         r'my view is (?:that )?\s+(.+?)(\.|\,|$)',
     ]
     
+    # Methods with a batch counterpart (see ModelOptimizer.batch_process)
+    BATCH_METHODS = {'build_value_hierarchy': 'build_value_hierarchy_batch'}
+    
     def __init__(self):
         self.value_graph = nx.DiGraph()
+        
+        self.patterns = TriggeredPatternSet({
+            'decision': self.DECISION_PATTERNS,
+            'belief': self.BELIEF_PATTERNS,
+        })
+        self._context_patterns = {
+            keyword: re.compile(rf'.{{0,50}}{re.escape(keyword)}.{{0,50}}', re.IGNORECASE)
+            for keywords in self.VALUE_KEYWORDS.values()
+            for keyword in keywords
+        }
     
     def build_value_hierarchy(
         self, 
         user_id: str,
         conversations: List[Dict] = None,
-        save_to_db: bool = True
+        save_to_db: bool = True,
+        incremental: bool = False
     ) -> Dict[str, any]:
         """
         Build complete value hierarchy for user
         
+        With incremental=True only conversations past the user's watermark
+        are analyzed; per-value aggregates from earlier runs are kept in the
+        watermark state so the hierarchy still reflects all history, while
+        conflicts and beliefs contain only the new ones.
+        
         Returns:
             - values: List of identified values with priorities
             - conflicts: List of value conflicts and resolutions
             - hierarchy: Tree structure of value relationships
         """
-        if conversations is None:
+        prepared = self._prepare_value_hierarchy(user_id, conversations, save_to_db, incremental)
+        self._save_prepared_hierarchy(prepared)
+        return prepared['result']
+    
+    def build_value_hierarchy_batch(self, kwargs_list: List[Dict]) -> List:
+        """
+        Run several build_value_hierarchy requests as one batch
+        
+        Every request is analyzed before the write transaction opens;
+        messages shared between requests are scanned once (the annotation
+        cache, see message_analysis.py). The saves then share one
+        transaction, each request in its own savepoint.
+        
+        Returns:
+            One result per request, in order (the Exception for failed ones)
+        """
+        prepared = db.run_batch(
+            kwargs_list, self._prepare_value_hierarchy, self._save_prepared_hierarchy
+        )
+        return [p if isinstance(p, Exception) else p['result'] for p in prepared]
+    
+    def _prepare_value_hierarchy(
+        self,
+        user_id: str,
+        conversations: List[Dict] = None,
+        save_to_db: bool = True,
+        incremental: bool = False
+    ) -> Dict:
+        """Analyze conversations for build_value_hierarchy, without writing anything"""
+        watermark = None
+        state = None
+        if incremental:
+            conversations, watermark = db.get_new_conversations(
+                user_id, 'values', conversations
+            )
+            state = (watermark or {}).get('state', {}).get('values', {})
+        elif conversations is None:
             conversations = db.get_user_conversations(user_id, limit=500)
         
         user_messages = [c for c in conversations if c['role'] == 'user']
@@ -87,43 +144,123 @@ class ValueHierarchyBuilder:
         conflicts = self._detect_value_conflicts(user_messages, value_mentions)
         
         # Step 3: Build hierarchy from conflicts
-        hierarchy = self._build_hierarchy_from_conflicts(value_mentions, conflicts)
+        hierarchy = self._build_hierarchy_from_conflicts(value_mentions, conflicts, state)
         
         # Step 4: Extract beliefs
         beliefs = self._extract_beliefs(user_messages)
         
-        if save_to_db:
-            self._save_value_hierarchy(user_id, hierarchy, conflicts, beliefs)
-        
         return {
-            'values': hierarchy,
-            'conflicts': conflicts,
-            'beliefs': beliefs,
-            'value_graph': self._export_graph()
+            'user_id': user_id,
+            'conversations': conversations,
+            'watermark': watermark,
+            'state': state,
+            'save_to_db': save_to_db,
+            'incremental': incremental,
+            'result': {
+                'values': hierarchy,
+                'conflicts': conflicts,
+                'beliefs': beliefs,
+                'value_graph': self._export_graph()
+            }
         }
     
+    def _save_prepared_hierarchy(self, prepared: Dict):
+        """Save a prepared hierarchy and advance its watermark in one transaction"""
+        if not prepared['save_to_db']:
+            return
+        
+        result = prepared['result']
+        with db.batch():
+            self._save_value_hierarchy(
+                prepared['user_id'], result['values'], result['conflicts'], result['beliefs']
+            )
+            if prepared['incremental']:
+                db.advance_watermark(
+                    prepared['user_id'], 'values', prepared['conversations'],
+                    prepared['watermark'], {'values': prepared['state']}
+                )
+    
+    def iter_value_hierarchy(
+        self,
+        user_id: str,
+        conversations: List[Dict] = None,
+        save_to_db: bool = True,
+        incremental: bool = False,
+        chunk_size: int = None
+    ) -> Iterator[Dict]:
+        """
+        Streaming build_value_hierarchy: yield conflicts and beliefs as found
+        
+        Per-value aggregates are merged chunk by chunk (the same running
+        state incremental builds keep), each chunk's conflicts are saved
+        with the hierarchy so far, and the final hierarchy comes last.
+        Incremental builds advance the watermark and state with each chunk,
+        so a stream that stops early resumes after its last saved chunk.
+        
+        Yields:
+            {'type': 'conflict', ...} and {'type': 'belief', ...} per chunk,
+            then {'type': 'value', ...} per value (priority order) and
+            {'type': 'value_graph', 'data': {...}}
+        """
+        chunk_size = chunk_size or settings.STREAM_CHUNK_SIZE
+        
+        watermark = None
+        state = {}
+        if incremental:
+            conversations, watermark = db.get_new_conversations(
+                user_id, 'values', conversations
+            )
+            state = (watermark or {}).get('state', {}).get('values', {})
+        elif conversations is None:
+            conversations = db.get_user_conversations(user_id, limit=500)
+        
+        hierarchy = self._build_hierarchy_from_conflicts({}, [], state)
+        
+        for start in range(0, len(conversations), chunk_size):
+            batch = conversations[start:start + chunk_size]
+            chunk = [c for c in batch if c['role'] == 'user']
+            
+            value_mentions = self._identify_values(chunk)
+            conflicts = self._detect_value_conflicts(chunk, value_mentions)
+            hierarchy = self._build_hierarchy_from_conflicts(value_mentions, conflicts, state)
+            
+            if save_to_db:
+                with db.batch():
+                    self._save_value_hierarchy(user_id, hierarchy, conflicts, [])
+                    if incremental:
+                        watermark = db.advance_watermark(
+                            user_id, 'values', batch, watermark, {'values': state}
+                        )
+            
+            for conflict in conflicts:
+                yield dict(conflict, type='conflict')
+            for belief in self._extract_beliefs(chunk):
+                yield dict(belief, type='belief')
+        
+        for value in hierarchy:
+            yield dict(value, type='value')
+        yield {'type': 'value_graph', 'data': self._export_graph()}
+    
     def _identify_values(self, messages: List[Dict]) -> Dict[str, List[Dict]]:
         """Identify value mentions in conversations"""
         value_mentions = defaultdict(list)
         
         for msg in messages:
-            content = msg['content'].lower()
+            annotation = message_analyzer.annotate(msg)
+            content = annotation.lower
+            hits = annotation.keyword_hits('value_keywords', self.VALUE_KEYWORDS)
             
-            for value_name, keywords in self.VALUE_KEYWORDS.items():
+            for value_name, keywords in hits.items():
                 for keyword in keywords:
-                    if keyword in content:
-                        # Get context around keyword
-                        pattern = rf'.{{0,50}}{re.escape(keyword)}.{{0,50}}'
-                        matches = re.finditer(pattern, content, re.IGNORECASE)
-                        
-                        for match in matches:
-                            context = match.group(0)
-                            value_mentions[value_name].append({
-                                'context': context,
-                                'keyword': keyword,
-                                'conversation_id': msg['conversation_id'],
-                                'timestamp': msg['timestamp']
-                            })
+                    # Get context around keyword
+                    for match in self._context_patterns[keyword].finditer(content):
+                        context = match.group(0)
+                        value_mentions[value_name].append({
+                            'context': context,
+                            'keyword': keyword,
+                            'conversation_id': msg['conversation_id'],
+                            'timestamp': msg['timestamp']
+                        })
         
         return dict(value_mentions)
     
@@ -137,41 +274,39 @@ class ValueHierarchyBuilder:
         
         for msg in messages:
             content = msg['content']
+            annotation = message_analyzer.annotate(msg)
             
             # Look for decision patterns
-            for pattern in self.DECISION_PATTERNS:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
-                
-                for match in matches:
-                    if len(match.groups()) >= 2:
-                        chosen = match.group(1).strip()
-                        rejected = match.group(2).strip()
-                        
-                        # Map to values
-                        chosen_value = self._map_text_to_value(chosen)
-                        rejected_value = self._map_text_to_value(rejected)
+            for match in annotation.family_matches('values', self.patterns, 'decision'):
+                if len(match.groups()) >= 2:
+                    chosen = match.group(1).strip()
+                    rejected = match.group(2).strip()
+                    
+                    # Map to values
+                    chosen_value = self._map_text_to_value(chosen)
+                    rejected_value = self._map_text_to_value(rejected)
+                    
+                    if chosen_value and rejected_value:
+                        # Extract reasoning if present
+                        reasoning = ""
+                        if 'because' in content[match.end():match.end()+100]:
+                            reasoning_match = re.search(
+                                r'because\s+(.+?)(\.|\,|$)',
+                                content[match.end():match.end()+100],
+                                re.IGNORECASE
+                            )
+                            if reasoning_match:
+                                reasoning = reasoning_match.group(1).strip()
                         
-                        if chosen_value and rejected_value:
-                            # Extract reasoning if present
-                            reasoning = ""
-                            if 'because' in content[match.end():match.end()+100]:
-                                reasoning_match = re.search(
-                                    r'because\s+(.+?)(\.|\,|$)',
-                                    content[match.end():match.end()+100],
-                                    re.IGNORECASE
-                                )
-                                if reasoning_match:
-                                    reasoning = reasoning_match.group(1).strip()
-                            
-                            conflicts.append({
-                                'value_a': chosen_value,
-                                'value_b': rejected_value,
-                                'chosen': chosen_value,
-                                'context': match.group(0),
-                                'reasoning': reasoning,
-                                'conversation_id': msg['conversation_id'],
-                                'timestamp': msg['timestamp']
-                            })
+                        conflicts.append({
+                            'value_a': chosen_value,
+                            'value_b': rejected_value,
+                            'chosen': chosen_value,
+                            'context': match.group(0),
+                            'reasoning': reasoning,
+                            'conversation_id': msg['conversation_id'],
+                            'timestamp': msg['timestamp']
+                        })
         
         return conflicts
     
@@ -195,20 +330,31 @@ class ValueHierarchyBuilder:
     def _build_hierarchy_from_conflicts(
         self, 
         value_mentions: Dict[str, List[Dict]],
-        conflicts: List[Dict]
+        conflicts: List[Dict],
+        state: Optional[Dict[str, Dict]] = None
     ) -> List[Dict]:
-        """Build hierarchical structure from value conflicts"""
+        """
+        Build hierarchical structure from value conflicts
+        
+        state holds raw per-value aggregates from earlier runs; it is
+        updated in place with the new mentions and conflicts.
+        """
+        values = state if state is not None else {}
+        
         # Initialize all values with base priority
-        values = {}
         for value_name, mentions in value_mentions.items():
-            values[value_name] = {
+            value = values.setdefault(value_name, {
                 'name': value_name,
                 'priority_score': 0.5,
-                'mention_count': len(mentions),
+                'mention_count': 0,
                 'conflict_wins': 0,
                 'conflict_losses': 0,
-                'examples': [m['context'] for m in mentions[:3]]
-            }
+                'examples': []
+            })
+            value['mention_count'] += len(mentions)
+            value['examples'].extend(
+                m['context'] for m in mentions[:3 - len(value['examples'])]
+            )
         
         # Update priorities based on conflicts
         for conflict in conflicts:
@@ -223,6 +369,12 @@ class ValueHierarchyBuilder:
                 values[other]['conflict_losses'] += 1
                 values[other]['priority_score'] -= 0.03
         
+        # Normalize copies so the raw running scores stay in state
+        values = {
+            name: dict(value, examples=list(value['examples']))
+            for name, value in values.items()
+        }
+        
         # Normalize priority scores
         if values:
             max_score = max(v['priority_score'] for v in values.values())
@@ -248,21 +400,18 @@ class ValueHierarchyBuilder:
         beliefs = []
         
         for msg in messages:
-            content = msg['content']
+            annotation = message_analyzer.annotate(msg)
             
-            for pattern in self.BELIEF_PATTERNS:
-                matches = re.finditer(pattern, content, re.IGNORECASE)
+            for match in annotation.family_matches('values', self.patterns, 'belief'):
+                belief_text = match.group(1).strip()
                 
-                for match in matches:
-                    belief_text = match.group(1).strip()
-                    
-                    if len(belief_text) > 10:  # Filter out too short
-                        beliefs.append({
-                            'belief': belief_text,
-                            'context': match.group(0),
-                            'conversation_id': msg['conversation_id'],
-                            'timestamp': msg['timestamp']
-                        })
+                if len(belief_text) > 10:  # Filter out too short
+                    beliefs.append({
+                        'belief': belief_text,
+                        'context': match.group(0),
+                        'conversation_id': msg['conversation_id'],
+                        'timestamp': msg['timestamp']
+                    })
         
         return beliefs
     
@@ -273,92 +422,88 @@ class ValueHierarchyBuilder:
         conflicts: List[Dict],
         beliefs: List[Dict]
     ):
-        """Save value hierarchy to database"""
-        # Save values
-        for idx, value in enumerate(hierarchy):
-            # Check if value exists
-            existing = db.execute_query(
-                "SELECT id FROM value_hierarchy WHERE user_id = ? AND value_name = ?",
-                (user_id, value['name']),
-                fetch_one=True
-            )
+        """Save value hierarchy to database (single transaction)"""
+        now = datetime.now().isoformat()
+        
+        with db.batch() as batch:
+            # Existing value IDs for this user
+            value_ids = {
+                row['value_name']: row['id']
+                for row in batch.query(
+                    "SELECT id, value_name FROM value_hierarchy WHERE user_id = ?",
+                    (user_id,)
+                )
+            }
+            
+            # Save values
+            updates = []
+            for value in hierarchy:
+                if value['name'] in value_ids:
+                    # Update existing
+                    updates.append((
+                        value['priority_score'],
+                        json.dumps(value['examples']),
+                        now,
+                        value_ids[value['name']]
+                    ))
+                else:
+                    # Insert new
+                    value_ids[value['name']] = batch.insert_and_get_id(
+                        """
+                        INSERT INTO value_hierarchy
+                        (user_id, value_name, priority_score, description,
+                         manifestation_examples, last_updated)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        """,
+                        (
+                            user_id,
+                            value['name'],
+                            value['priority_score'],
+                            f"Mentioned {value['mention_count']} times",
+                            json.dumps(value['examples']),
+                            now
+                        )
+                    )
             
-            if existing:
-                # Update existing
-                query = """
+            if updates:
+                batch.executemany(
+                    """
                     UPDATE value_hierarchy
                     SET priority_score = ?,
                         manifestation_examples = ?,
                         last_updated = ?
                     WHERE id = ?
-                """
-                db.execute_update(
-                    query,
-                    (
-                        value['priority_score'],
-                        json.dumps(value['examples']),
-                        datetime.now().isoformat(),
-                        existing['id']
-                    )
+                    """,
+                    updates
                 )
-            else:
-                # Insert new
-                query = """
-                    INSERT INTO value_hierarchy
-                    (user_id, value_name, priority_score, description,
-                     manifestation_examples, last_updated)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """
-                db.execute_update(
-                    query,
-                    (
-                        user_id,
-                        value['name'],
-                        value['priority_score'],
-                        f"Mentioned {value['mention_count']} times",
-                        json.dumps(value['examples']),
-                        datetime.now().isoformat()
-                    )
+            
+            # Save conflicts
+            conflict_rows = [
+                (
+                    user_id,
+                    value_ids[conflict['value_a']],
+                    value_ids[conflict['value_b']],
+                    value_ids[conflict['chosen']],
+                    conflict['context'],
+                    conflict.get('reasoning', ''),
+                    0.7,
+                    conflict['timestamp']
                 )
-        
-        # Save conflicts
-        for conflict in conflicts:
-            # Get value IDs
-            value_a_id = db.execute_query(
-                "SELECT id FROM value_hierarchy WHERE user_id = ? AND value_name = ?",
-                (user_id, conflict['value_a']),
-                fetch_one=True
-            )
-            value_b_id = db.execute_query(
-                "SELECT id FROM value_hierarchy WHERE user_id = ? AND value_name = ?",
-                (user_id, conflict['value_b']),
-                fetch_one=True
-            )
-            chosen_id = db.execute_query(
-                "SELECT id FROM value_hierarchy WHERE user_id = ? AND value_name = ?",
-                (user_id, conflict['chosen']),
-                fetch_one=True
-            )
+                for conflict in conflicts
+                if conflict['value_a'] in value_ids
+                and conflict['value_b'] in value_ids
+                and conflict['chosen'] in value_ids
+            ]
             
-            if value_a_id and value_b_id and chosen_id:
-                query = """
+            if conflict_rows:
+                batch.executemany(
+                    """
                     INSERT INTO value_conflicts
                     (user_id, value_a_id, value_b_id, chosen_value_id,
                      context, reasoning, confidence, timestamp)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """
-                db.execute_update(
-                    query,
-                    (
-                        user_id,
-                        value_a_id['id'],
-                        value_b_id['id'],
-                        chosen_id['id'],
-                        conflict['context'],
-                        conflict.get('reasoning', ''),
-                        0.7,
-                        conflict['timestamp']
-                    )
+                    """,
+                    conflict_rows
                 )
     
     def get_value_hierarchy(self, user_id: str) -> Dict[str, any]:
@@ -478,5 +623,9 @@ class ValueHierarchyBuilder:
         }
 
 
-# Global instance
-value_builder = ValueHierarchyBuilder()
+# Global instance (constructed on first access, see registry.py)
+def __getattr__(name):
+    if name == 'value_builder':
+        from .registry import registry
+        return registry.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
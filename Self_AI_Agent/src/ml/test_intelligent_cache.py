@@ -296,6 +296,34 @@ class TestIntelligentCacheWarmer:
         print(f"✅ 预热推荐: PASS (推荐{len(recommendations)}个键)")
         print(f"   Top recommendation: {recommendations[0].key} (score={recommendations[0].score:.2f})")
     
+    def test_warm_cache_batches_lookups(self):
+        """测试预热批量检查候选键 (一次往返)"""
+        
+        class BatchCacheManager(MockCacheManager):
+            def __init__(self):
+                super().__init__()
+                self.batches = []
+            
+            def get_many_keys(self, keys, with_ttl=False, promote=False):
+                self.batches.append(list(keys))
+                return [{'v': 1} if key != "expired_key" else None for key in keys]
+        
+        cache_manager = BatchCacheManager()
+        warmer = IntelligentCacheWarmer(cache_manager)
+        
+        for key in ("hot_key", "warm_key", "expired_key"):
+            for _ in range(10):
+                warmer.record_access(key, "user1", "emotions", key)
+        
+        warmed_count = warmer.warm_cache("user1")
+        
+        # 所有候选键只查询一次; 已失效的键不计入预热
+        assert len(cache_manager.batches) == 1
+        assert sorted(cache_manager.batches[0]) == ["expired_key", "hot_key", "warm_key"]
+        assert warmed_count == 2
+        
+        print(f"✅ 批量预热: PASS (预热{warmed_count}个键)")
+    
     def test_cache_hit_rate_improvement(self):
         """测试缓存命中率提升 (核心指标)"""
         cache_manager = MockCacheManager()
@@ -0,0 +1,15 @@
+"""
+Shared test setup
+
+The service modules import their settings and database as siblings
+(`from .config import settings`, `from .db_utils import db`), but both
+modules live one level up in src/ml. Alias them so src.ml.services.* can
+be imported by the tests.
+"""
+
+import sys
+
+from src.ml import config, db_utils
+
+sys.modules.setdefault('src.ml.services.config', config)
+sys.modules.setdefault('src.ml.services.db_utils', db_utils)
@@ -0,0 +1,113 @@
+"""
+Tests for the services' batch methods (BATCH_METHODS)
+
+A batch must return, for each request, what the single call returns, and
+a bad request must only fail itself.
+"""
+
+import importlib
+import json
+
+import pytest
+
+from src.ml.db_utils import Database
+
+# The package re-exports instances under the module names
+reasoning_extractor = importlib.import_module("src.ml.services.reasoning_extractor")
+value_builder = importlib.import_module("src.ml.services.value_builder")
+narrative_builder = importlib.import_module("src.ml.services.narrative_builder")
+theory_of_mind = importlib.import_module("src.ml.services.theory_of_mind")
+emotional_engine = importlib.import_module("src.ml.services.emotional_engine")
+
+
+MESSAGE = (
+    "Last year I moved to a new city because my old job was stressful. Alex thinks that "
+    "I made the right choice, and Alex wants me to be happy. Family and honesty matter "
+    "more to me than success. I was so grateful when Alex helped me. {i}"
+)
+
+SERVICES = {
+    # name: (service module, factory, single method, extra request kwargs)
+    'reasoning': (
+        reasoning_extractor, reasoning_extractor.ReasoningChainExtractor,
+        'extract_reasoning_chains', {}
+    ),
+    'values': (
+        value_builder, value_builder.ValueHierarchyBuilder,
+        'build_value_hierarchy', {}
+    ),
+    'narrative': (
+        narrative_builder, narrative_builder.NarrativeIdentityBuilder,
+        'extract_narrative_identity', {}
+    ),
+    'tom': (
+        theory_of_mind, theory_of_mind.TheoryOfMindModule,
+        'build_mental_model', {'target_person': 'Alex'}
+    ),
+    'emotions': (
+        emotional_engine, emotional_engine.EmotionalReasoningEngine,
+        'analyze_emotional_state', {'text': MESSAGE.format(i=0)}
+    ),
+}
+
+
+@pytest.fixture
+def ml_database(tmp_path):
+    database = Database(str(tmp_path / "test.db"), pool_size=4)
+    database.initialize_ml_schema()
+    database.execute_update("""
+        CREATE TABLE conversation_memory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT, conversation_id TEXT, role TEXT,
+            content TEXT, timestamp TEXT, context_metadata TEXT
+        )
+    """)
+    rows = []
+    for user_id in ("single", "batched"):
+        for i in range(4):
+            rows.append((user_id, f"c{i}", "user", MESSAGE.format(i=i), f"2025-01-0{i + 1}"))
+    database.execute_many(
+        "INSERT INTO conversation_memory (user_id, conversation_id, role, content, timestamp) "
+        "VALUES (?, ?, ?, ?, ?)",
+        rows
+    )
+    yield database
+    database.close()
+
+
+def _comparable(result, user_id):
+    result = dict(result)
+    result.pop('timestamp', None)
+    return json.dumps(result, default=str, sort_keys=True).replace(user_id, "<user>")
+
+
+@pytest.mark.parametrize("name", sorted(SERVICES))
+def test_batch_matches_single_calls(name, ml_database, monkeypatch):
+    service, factory, method, extra = SERVICES[name]
+    monkeypatch.setattr(service, "db", ml_database)
+    module = factory()
+
+    single = getattr(module, method)(user_id="single", **extra)
+    batched = getattr(module, module.BATCH_METHODS[method])([
+        dict(user_id="batched", **extra),
+        dict(user_id="broken", unknown_argument=True, **extra),
+    ])
+
+    assert len(batched) == 2
+    assert _comparable(batched[0], "batched") == _comparable(single, "single")
+    assert isinstance(batched[1], TypeError)
+
+
+def test_batch_saves_each_request(ml_database, monkeypatch):
+    monkeypatch.setattr(value_builder, "db", ml_database)
+    builder = value_builder.ValueHierarchyBuilder()
+
+    results = builder.build_value_hierarchy_batch([
+        {'user_id': "single", 'incremental': True},
+        {'user_id': "batched", 'incremental': True},
+    ])
+
+    assert not any(isinstance(r, Exception) for r in results)
+    # Each user's watermark points at their own last message
+    assert ml_database.get_watermark("single", "values")['last_conversation_id'] == 4
+    assert ml_database.get_watermark("batched", "values")['last_conversation_id'] == 8
@@ -0,0 +1,167 @@
+"""
+Tests for RedisCacheManager against an in-memory Redis (fakeredis)
+"""
+
+import threading
+import time
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+
+from src.ml import cache_manager
+from src.ml.cache_manager import RedisCacheManager
+
+
+@pytest.fixture
+def make_manager(monkeypatch):
+    """Factory for managers sharing one fake Redis server."""
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(
+        cache_manager.redis, "from_url",
+        lambda url, **kwargs: fakeredis.FakeRedis(server=server, **kwargs)
+    )
+    managers = []
+
+    def make(**config):
+        manager = RedisCacheManager("redis://test", config)
+        managers.append(manager)
+        return manager
+
+    yield make
+    for manager in managers:
+        manager.close()
+
+
+def _wait_for(condition, timeout=3.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+class TestL1Coherence:
+    """Test L1 copies stay private and are invalidated across instances."""
+
+    def test_results_do_not_share_state(self, make_manager):
+        manager = make_manager()
+        result = {'values': [1]}
+        manager.set('values', 'u1', {'q': 1}, result)
+        result['values'].append('changed by writer')
+
+        first = manager.get('values', 'u1', {'q': 1})
+        first['values'].append('changed by reader')
+
+        # Both lookups are L1 hits, neither sees the other's mutation
+        assert manager.get('values', 'u1', {'q': 1})['values'] == [1]
+        assert manager.l1.hits == 2
+
+    def test_writer_without_l1_invalidates_peers(self, make_manager):
+        writer = make_manager(l1_enabled=False)
+        reader = make_manager()
+        assert _wait_for(lambda: reader.redis_client.pubsub_numsub(reader.invalidation_channel)[0][1] > 0)
+
+        writer.set('values', 'u1', {'q': 1}, {'v': 1})
+        assert reader.get('values', 'u1', {'q': 1})['v'] == 1
+
+        writer.set('values', 'u1', {'q': 1}, {'v': 2})
+        assert _wait_for(lambda: reader.get('values', 'u1', {'q': 1})['v'] == 2)
+
+        writer.delete_user_cache('u1')
+        assert _wait_for(lambda: reader.get('values', 'u1', {'q': 1}) is None)
+
+
+class TestIndexes:
+    """Test the per-user/per-module index sets."""
+
+    def _members(self, manager, kind, name):
+        return manager.redis_client.smembers(manager._index_key(kind, name))
+
+    def test_writes_and_deletes_maintain_indexes(self, make_manager):
+        manager = make_manager(l1_enabled=False)
+        manager.set('values', 'u1', {'q': 1}, {'v': 1})
+        manager.set_many([('reasoning', 'u1', {'q': 2}, {'v': 2})])
+
+        key = manager._make_key('values', 'u1', manager._hash_input({'q': 1})).encode()
+        assert len(self._members(manager, 'user', 'u1')) == 2
+        assert self._members(manager, 'module', 'values') == {key}
+
+        manager.delete('values', 'u1', {'q': 1})
+        assert len(self._members(manager, 'user', 'u1')) == 1
+        assert self._members(manager, 'module', 'values') == set()
+
+    def test_unlink_index_deletes_members_and_set(self, make_manager):
+        manager = make_manager(l1_enabled=False, scan_batch_size=2)
+        for i in range(5):
+            manager.set('values', 'u1', {'q': i}, {'v': i})
+        manager.set('values', 'u2', {'q': 0}, {'v': 0})
+
+        assert manager._unlink_index(manager._index_key('user', 'u1')) == 5
+        assert manager.get('values', 'u1', {'q': 0}) is None
+        assert manager.get('values', 'u2', {'q': 0})['v'] == 0
+        assert not manager.redis_client.exists(manager._index_key('user', 'u1'))
+        # No detached copy left behind
+        assert list(manager.redis_client.scan_iter(match='*:unlinking:*')) == []
+
+        # Missing index: nothing to delete
+        assert manager._unlink_index(manager._index_key('user', 'nobody')) == 0
+
+    def test_prune_removes_expired_members(self, make_manager):
+        manager = make_manager(l1_enabled=False)
+        manager.set('values', 'u1', {'q': 1}, {'v': 1}, strategy='hot')
+        manager.set('values', 'u1', {'q': 2}, {'v': 2})
+        expired = manager._make_key('values', 'u1', manager._hash_input({'q': 2}))
+        manager.redis_client.delete(expired)
+
+        # An unlink that died half-way is finished
+        leftover = manager._index_key('user', 'u9') + ':unlinking:x'
+        manager.redis_client.sadd(leftover, 'soma:ml:values:u9:abc')
+        manager.redis_client.set('soma:ml:values:u9:abc', b'{}')
+
+        stats = manager.prune_indexes()
+        assert stats['pruned'] == 2  # from the user and the module index
+        assert stats['deleted'] == 1
+        assert len(self._members(manager, 'user', 'u1')) == 1
+        assert not manager.redis_client.exists(leftover)
+
+    def test_pruning_is_scheduled(self, make_manager):
+        manager = make_manager(l1_enabled=False, index_prune_interval=0.1)
+        manager.set('values', 'u1', {'q': 1}, {'v': 1})
+        manager.redis_client.delete(manager._make_key('values', 'u1', manager._hash_input({'q': 1})))
+
+        assert _wait_for(lambda: not self._members(manager, 'user', 'u1'))
+
+
+class TestSingleFlight:
+    """Concurrent misses on one key"""
+
+    def test_follower_computes_when_leader_is_slow(self, make_manager):
+        manager = make_manager(l1_enabled=False)
+        release = threading.Event()
+        calls = []
+
+        def slow_compute():
+            calls.append('leader')
+            release.wait(5)
+            return {'v': 'leader'}
+
+        def fast_compute():
+            calls.append('follower')
+            return {'v': 'follower'}
+
+        leader = threading.Thread(
+            target=manager.get_or_compute, args=('values', 'u1', {'q': 1}, slow_compute)
+        )
+        leader.start()
+        assert _wait_for(lambda: calls == ['leader'])
+
+        # The follower gives up on the leader's future instead of raising
+        result = manager.get_or_compute('values', 'u1', {'q': 1}, fast_compute, wait_timeout=0.1)
+        release.set()
+        leader.join(timeout=5)
+
+        assert result == {'v': 'follower'}
+        assert calls == ['leader', 'follower']
+        assert manager.computes == 2 and manager.coalesced == 0
@@ -0,0 +1,284 @@
+"""
+Tests for the pooled SQLite Database wrapper
+"""
+
+import threading
+
+import pytest
+
+from src.ml.db_utils import Database, WatermarkConflict
+
+
+@pytest.fixture
+def database(tmp_path):
+    database = Database(str(tmp_path / "test.db"), pool_size=4)
+    database.execute_update(
+        "CREATE TABLE items (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT)"
+    )
+    yield database
+    database.close()
+
+
+class TestConnectionPool:
+    """Test connection pooling and pragmas."""
+    
+    def test_wal_mode_enabled(self, database):
+        row = database.execute_query("PRAGMA journal_mode", fetch_one=True)
+        assert row["journal_mode"] == "wal"
+    
+    def test_synchronous_normal(self, database):
+        row = database.execute_query("PRAGMA synchronous", fetch_one=True)
+        assert row["synchronous"] == 1  # NORMAL
+    
+    def test_connections_are_reused(self, database):
+        with database.get_connection() as first:
+            pass
+        with database.get_connection() as second:
+            pass
+        assert first is second
+        assert database._created == 1
+    
+    def test_rollback_on_error(self, database):
+        with pytest.raises(RuntimeError):
+            with database.get_connection() as conn:
+                conn.execute("INSERT INTO items (name) VALUES ('lost')")
+                raise RuntimeError("boom")
+        
+        assert database.execute_query("SELECT * FROM items") == []
+        # Connection went back to the pool
+        assert database._pool.qsize() == 1
+    
+    def test_concurrent_writers(self, database):
+        def worker(n):
+            for i in range(25):
+                database.insert_and_get_id(
+                    "INSERT INTO items (name) VALUES (?)", (f"{n}-{i}",)
+                )
+        
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        row = database.execute_query("SELECT COUNT(*) AS n FROM items", fetch_one=True)
+        assert row["n"] == 200
+        assert database._created <= database.pool_size
+    
+    def test_nested_connections_reuse_outer(self):
+        database = Database(":memory:", pool_size=1)
+        with database.get_connection() as outer:
+            # Would wait forever on a size-1 pool if it took a second connection
+            with database.get_connection() as inner:
+                assert inner is outer
+            database.execute_update("CREATE TABLE t (x INTEGER)")
+        assert database.execute_query("SELECT * FROM t") == []
+        database.close()
+    
+    def test_exhausted_pool_times_out(self, database, monkeypatch):
+        from src.ml.config import settings
+        monkeypatch.setattr(settings, "DB_POOL_TIMEOUT_SECONDS", 0.1)
+        
+        held = []
+        ready = threading.Event()
+        done = threading.Event()
+        
+        def hold(n):
+            with database.get_connection() as conn:
+                held.append(conn)
+                if len(held) == database.pool_size:
+                    ready.set()
+                done.wait(5)
+        
+        threads = [threading.Thread(target=hold, args=(n,)) for n in range(database.pool_size)]
+        for t in threads:
+            t.start()
+        assert ready.wait(5)
+        
+        with pytest.raises(TimeoutError):
+            with database.get_connection():
+                pass
+        
+        done.set()
+        for t in threads:
+            t.join()
+    
+    def test_memory_database_uses_single_connection(self):
+        database = Database(":memory:", pool_size=8)
+        assert database.pool_size == 1
+        
+        database.execute_update("CREATE TABLE t (x INTEGER)")
+        database.execute_update("INSERT INTO t VALUES (1)")
+        assert database.execute_query("SELECT x FROM t") == [{"x": 1}]
+        database.close()
+
+
+class TestBatch:
+    """Test the transactional batch writer."""
+    
+    def test_executemany_single_transaction(self, database):
+        with database.batch() as batch:
+            batch.executemany(
+                "INSERT INTO items (name) VALUES (?)",
+                [(f"item-{i}",) for i in range(100)]
+            )
+            # Reads inside the batch see uncommitted rows
+            row = batch.query("SELECT COUNT(*) AS n FROM items", fetch_one=True)
+            assert row["n"] == 100
+        
+        row = database.execute_query("SELECT COUNT(*) AS n FROM items", fetch_one=True)
+        assert row["n"] == 100
+    
+    def test_plain_calls_join_open_batch(self, database):
+        with pytest.raises(RuntimeError):
+            with database.batch():
+                database.execute_update("INSERT INTO items (name) VALUES ('a')")
+                with database.batch() as inner:
+                    inner.execute("INSERT INTO items (name) VALUES ('b')")
+                raise RuntimeError("boom")
+        
+        # Everything, including the nested batch, was rolled back together
+        assert database.execute_query("SELECT * FROM items") == []
+        assert database._created == 1
+    
+    def test_failed_nested_batch_rolls_back_alone(self, database):
+        with database.batch():
+            database.execute_update("INSERT INTO items (name) VALUES ('kept')")
+            with pytest.raises(RuntimeError):
+                with database.batch() as inner:
+                    inner.execute("INSERT INTO items (name) VALUES ('dropped')")
+                    raise RuntimeError("boom")
+            with database.batch() as inner:
+                inner.execute("INSERT INTO items (name) VALUES ('also kept')")
+        
+        names = [r["name"] for r in database.execute_query("SELECT name FROM items ORDER BY id")]
+        assert names == ["kept", "also kept"]
+    
+    def test_execute_many(self, database):
+        database.execute_many(
+            "INSERT INTO items (name) VALUES (?)",
+            [("x",), ("y",)]
+        )
+        names = [r["name"] for r in database.execute_query("SELECT name FROM items ORDER BY id")]
+        assert names == ["x", "y"]
+
+    def test_run_batch_isolates_requests(self, database):
+        def prepare(name):
+            if name == "unprepared":
+                raise ValueError("bad request")
+            return name
+
+        def save(name):
+            database.execute_update("INSERT INTO items (name) VALUES (?)", (name,))
+            if name == "unsaved":
+                raise RuntimeError("save failed")
+
+        results = database.run_batch(
+            [{"name": "a"}, {"name": "unprepared"}, {"name": "unsaved"}, {"name": "b"}],
+            prepare,
+            save
+        )
+
+        assert results[0] == "a" and results[3] == "b"
+        assert isinstance(results[1], ValueError)
+        assert isinstance(results[2], RuntimeError)
+        # The failed save rolled back alone
+        names = [r["name"] for r in database.execute_query("SELECT name FROM items ORDER BY id")]
+        assert names == ["a", "b"]
+
+
+class TestWatermarks:
+    """Test incremental processing watermarks."""
+    
+    @pytest.fixture
+    def ml_database(self, database):
+        database.initialize_ml_schema()
+        database.execute_update("""
+            CREATE TABLE conversation_memory (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT, conversation_id TEXT, role TEXT,
+                content TEXT, timestamp TEXT, context_metadata TEXT
+            )
+        """)
+        database.execute_many(
+            "INSERT INTO conversation_memory (user_id, conversation_id, role, content, timestamp) "
+            "VALUES (?, ?, 'user', ?, ?)",
+            [("u1", f"c{i}", f"message {i}", f"2025-01-01T00:00:0{i}") for i in range(5)]
+        )
+        return database
+    
+    def test_new_conversations_advance(self, ml_database):
+        new, watermark = ml_database.get_new_conversations("u1", "reasoning")
+        assert watermark is None
+        assert [c["content"] for c in new] == [f"message {i}" for i in range(5)]
+        
+        ml_database.advance_watermark("u1", "reasoning", new[:3], watermark, {"seen": 3})
+        
+        new, watermark = ml_database.get_new_conversations("u1", "reasoning")
+        assert watermark["last_conversation_id"] == 3
+        assert watermark["last_timestamp"] == "2025-01-01T00:00:02"
+        assert watermark["state"] == {"seen": 3}
+        assert [c["content"] for c in new] == ["message 3", "message 4"]
+    
+    def test_whole_backlog_is_paged(self, ml_database):
+        new, _ = ml_database.get_new_conversations("u1", "reasoning", page_size=2)
+        assert [c["id"] for c in new] == [1, 2, 3, 4, 5]
+        
+        # An explicit limit returns just the oldest page
+        new, _ = ml_database.get_new_conversations("u1", "reasoning", limit=2)
+        assert [c["id"] for c in new] == [1, 2]
+    
+    def test_supplied_conversations_are_filtered(self, ml_database):
+        ml_database.set_watermark("u1", "values", 2)
+        supplied = [{"id": 1}, {"id": 3}, {"content": "no id"}]
+        
+        new, _ = ml_database.get_new_conversations("u1", "values", supplied)
+        assert new == [{"id": 3}, {"content": "no id"}]
+    
+    def test_concurrent_advance_conflicts(self, ml_database):
+        first, watermark = ml_database.get_new_conversations("u1", "reasoning")
+        second, stale = ml_database.get_new_conversations("u1", "reasoning")
+        
+        advanced = ml_database.advance_watermark("u1", "reasoning", first, watermark)
+        assert advanced["last_conversation_id"] == 5
+        
+        with pytest.raises(WatermarkConflict):
+            with ml_database.batch():
+                ml_database.execute_update(
+                    "INSERT INTO cognitive_watermarks (user_id, module_name, last_conversation_id) "
+                    "VALUES ('u1', 'other', 1)"
+                )
+                ml_database.advance_watermark("u1", "reasoning", second, stale)
+        
+        # The losing batch rolled back entirely
+        assert ml_database.get_watermark("u1", "other") is None
+        
+        ml_database.advance_watermark("u1", "reasoning", [], advanced, {"done": True})
+        assert ml_database.get_watermark("u1", "reasoning")["state"] == {"done": True}
+
+
+class TestCognitiveCache:
+    """Test the cognitive_cache table through the cache codec."""
+    
+    @pytest.fixture
+    def ml_database(self, database):
+        database.initialize_ml_schema()
+        return database
+    
+    def test_round_trip(self, ml_database):
+        output = {"values": [{"value_name": "honesty", "priority_score": 0.9}] * 200}
+        ml_database.set_cached("u1", "values", {"limit": 10}, output)
+        
+        assert ml_database.get_cached("u1", "values", {"limit": 10}) == output
+        assert ml_database.get_cached("u1", "values", {"limit": 20}) is None
+        
+        row = ml_database.execute_query("SELECT output_data FROM cognitive_cache", fetch_one=True)
+        assert isinstance(row["output_data"], bytes)
+    
+    def test_legacy_json_rows(self, ml_database):
+        ml_database.set_cached("u1", "values", {}, {})
+        ml_database.execute_update(
+            "UPDATE cognitive_cache SET output_data = ?", ('{"values": ["legacy"]}',)
+        )
+        
+        assert ml_database.get_cached("u1", "values", {}) == {"values": ["legacy"]}
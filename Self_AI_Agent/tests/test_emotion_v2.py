@@ -127,7 +127,138 @@ class TestEmotionalTrajectory:
         assert len(trajectory['trajectory']) == 7
         assert trajectory['trend'] == 'declining'
         assert trajectory['trend_slope'] < 0
-    
+
+    def test_trajectory_persisted_incremental(self, analyzer, mock_db, tmp_path):
+        """测试持久化轨迹与逐次计算一致，且只分析新消息"""
+        from datetime import datetime
+        from ml.db_utils import Database
+
+        db = Database(str(tmp_path / 'ml.db'))
+        db.initialize_ml_schema()
+        db.execute_update(
+            "CREATE TABLE IF NOT EXISTS conversation_memory (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "user_id TEXT, conversation_id TEXT, role TEXT, content TEXT, timestamp TEXT, "
+            "context_metadata TEXT)"
+        )
+        today = datetime.now().date().isoformat()
+        for conv in mock_db.get_user_conversations('test_user'):
+            db.execute_update(
+                "INSERT INTO conversation_memory (user_id, conversation_id, role, content, timestamp) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ('test_user', 'c1', conv['role'], conv['content'], today)
+            )
+
+        expected = analyzer.build_emotional_trajectory('test_user', days=7, db=mock_db)
+        persisted = analyzer.build_emotional_trajectory('test_user', days=7, db=db)
+
+        assert persisted['data_points'] == expected['data_points']
+        assert persisted['trend_slope'] == pytest.approx(expected['trend_slope'])
+        assert persisted['valence_std'] == pytest.approx(expected['valence_std'])
+
+        # 没有新消息时不再分析
+        assert analyzer.update_emotion_history('test_user', db) == 0
+
+        baseline = analyzer.get_emotional_baseline('test_user', days=7, db=db)
+        assert baseline['baseline_valence'] == pytest.approx(expected['baseline_valence'])
+
+    def test_first_update_bounded_to_window(self, analyzer, tmp_path):
+        """测试首次分析只回填请求的窗口，不分析全部历史"""
+        from datetime import datetime, timedelta
+        from ml.db_utils import Database
+
+        db = Database(str(tmp_path / 'ml.db'))
+        db.initialize_ml_schema()
+        db.execute_update(
+            "CREATE TABLE IF NOT EXISTS conversation_memory (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "user_id TEXT, conversation_id TEXT, role TEXT, content TEXT, timestamp TEXT, "
+            "context_metadata TEXT)"
+        )
+        now = datetime.now()
+        old = [(now - timedelta(days=60 + i)).isoformat() for i in range(20)]
+        recent = [(now - timedelta(hours=i)).isoformat() for i in range(3)]
+        for timestamp in sorted(old) + sorted(recent):
+            db.execute_update(
+                "INSERT INTO conversation_memory (user_id, conversation_id, role, content, timestamp) "
+                "VALUES (?, ?, ?, ?, ?)",
+                ('test_user', 'c1', 'user', 'I feel great today!', timestamp)
+            )
+
+        baseline = analyzer.get_emotional_baseline('test_user', days=7, db=db)
+        assert baseline['data_points'] == 3
+
+        analyzed = db.execute_query(
+            "SELECT COUNT(*) AS n FROM emotion_message_analyses WHERE user_id = ?",
+            ('test_user',),
+            fetch_one=True
+        )
+        assert analyzed['n'] == 3
+
+    def test_wider_window_backfills_history(self, tmp_path, monkeypatch):
+        """测试先小窗口后大窗口时回填更早的消息，趋势与一次性分析一致"""
+        from datetime import datetime, timedelta
+        from ml.db_utils import Database
+        from ml.services.emotion_model_v2 import EmotionAnalysis
+
+        def fake_analyze(messages):
+            # 不加载模型: 效价取自消息内容
+            return [
+                EmotionAnalysis(
+                    primary_emotion='neutral', primary_score=1.0, all_emotions={},
+                    intensity=0.5, valence=float(msg['content']), arousal=0.5,
+                    is_sarcastic=False, mixed_emotions=None, confidence=1.0,
+                    timestamp=datetime.now()
+                )
+                for msg in messages
+            ]
+
+        def make_db(name):
+            db = Database(str(tmp_path / name))
+            db.initialize_ml_schema()
+            db.execute_update(
+                "CREATE TABLE IF NOT EXISTS conversation_memory (id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "user_id TEXT, conversation_id TEXT, role TEXT, content TEXT, timestamp TEXT, "
+                "context_metadata TEXT)"
+            )
+            now = datetime.now()
+            # 30天内每天一条消息，效价逐日下降
+            for day in range(29, -1, -1):
+                db.execute_update(
+                    "INSERT INTO conversation_memory (user_id, conversation_id, role, content, timestamp) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    ('test_user', 'c1', 'user', str(day / 30), (now - timedelta(days=day)).isoformat())
+                )
+            return db
+
+        analyzer = TransformerEmotionAnalyzer(cache_size=0)
+        monkeypatch.setattr(analyzer, '_analyze_messages', fake_analyze)
+
+        expected = analyzer.build_emotional_trajectory('test_user', days=30, db=make_db('once.db'))
+
+        db = make_db('widened.db')
+        # 窗口按天截断: 包含7天前当天的消息
+        assert analyzer.get_emotional_baseline('test_user', days=7, db=db)['data_points'] == 8
+        # 小窗口只需要汇总，不回填
+        assert analyzer.update_emotion_history('test_user', db, batch_limit=4, days=7) == 0
+
+        # 分页回填其余22天
+        assert analyzer.update_emotion_history('test_user', db, batch_limit=4, days=30) == 22
+
+        widened = analyzer.build_emotional_trajectory('test_user', days=30, db=db)
+        assert widened['data_points'] == expected['data_points'] == 30
+        assert widened['days_analyzed'] == 30
+        assert widened['trend_slope'] == pytest.approx(expected['trend_slope'])
+        assert widened['trend'] == 'declining'
+        assert [p['valence'] for p in widened['trajectory']] == \
+            [p['valence'] for p in expected['trajectory']]
+
+        # 已覆盖的窗口不再分析; 可以只要统计量
+        assert analyzer.update_emotion_history('test_user', db, batch_limit=4, days=30) == 0
+        summary = analyzer.build_emotional_trajectory(
+            'test_user', days=30, db=db, include_points=False
+        )
+        assert 'trajectory' not in summary
+        assert summary['baseline_valence'] == pytest.approx(expected['baseline_valence'])
+
     def test_anomaly_detection(self, analyzer):
         """测试情感异常检测"""
         # 模拟用户基线 (通常比较积极)
@@ -220,6 +351,58 @@ class TestPerformance:
         # 放宽限制，因为首次加载模型较慢
         assert avg_time < 2.0, f"Inference too slow: {avg_time*1000:.2f}ms"
 
+    def test_batch_matches_single(self, analyzer):
+        """测试批量推理与逐条推理结果一致"""
+        texts = [
+            "I'm happy.",
+            "This is frustrating.",
+            "I'm happy.",  # 重复文本
+            "I'm not sure how I feel."
+        ]
+        contexts = [None, ["I've been feeling down lately."], None, ["I'm happy."]]
+
+        batch = analyzer.analyze_batch(texts, contexts)
+        single = [analyzer.analyze(t, c) for t, c in zip(texts, contexts)]
+
+        assert len(batch) == len(texts)
+        for b, s in zip(batch, single):
+            assert b.primary_emotion == s.primary_emotion
+            assert b.valence == pytest.approx(s.valence, abs=1e-3)
+            assert b.is_sarcastic == s.is_sarcastic
+
+    def test_result_cache(self, analyzer):
+        """测试重复文本命中结果缓存"""
+        first = analyzer.analyze("I'm thrilled about the results!")
+        misses = analyzer.get_cache_stats()['misses']
+
+        second = analyzer.analyze("I'm thrilled about the results!")
+        stats = analyzer.get_cache_stats()
+
+        assert stats['misses'] == misses
+        assert stats['hits'] >= 2  # 情感 + 讽刺
+        assert second.primary_emotion == first.primary_emotion
+        assert second.valence == first.valence
+
+    def test_cache_namespace_after_backend_fallback(self, monkeypatch):
+        """测试ONNX不可用时首次查询就使用回退后端的缓存 (不加载模型)"""
+        from ml.optimization import onnx_runtime
+
+        monkeypatch.setattr(onnx_runtime, 'onnx_backend_available', lambda *args, **kwargs: False)
+
+        analyzer = TransformerEmotionAnalyzer(device='cpu', backend='onnx')
+        scores = [{'label': 'joy', 'score': 0.9}]
+        analyzer.result_cache.put_many(
+            f"{TransformerEmotionAnalyzer.EMOTION_MODEL}@pytorch", {'hello': scores}
+        )
+
+        def fail_load():
+            raise AssertionError("models should not be loaded on a cache hit")
+
+        monkeypatch.setattr(analyzer, '_load_models', fail_load)
+
+        assert analyzer._classify_batch('emotion_classifier', ['hello']) == {'hello': scores}
+        assert analyzer.backend == 'pytorch'
+
 
 # 运行测试示例
 if __name__ == "__main__":
@@ -0,0 +1,143 @@
+"""
+Tests for the chunked, incremental iter_* builders
+
+An aborted stream must keep what its finished chunks committed (watermark
+and running state included), so resuming it ends where an uninterrupted
+run does without processing any message twice.
+"""
+
+import importlib
+
+import pytest
+
+from src.ml.db_utils import Database
+
+# The package re-exports instances under the module names
+reasoning_extractor = importlib.import_module("src.ml.services.reasoning_extractor")
+value_builder = importlib.import_module("src.ml.services.value_builder")
+narrative_builder = importlib.import_module("src.ml.services.narrative_builder")
+
+
+MESSAGE = (
+    "Last year I moved to a new city because my old job was stressful, and I learned "
+    "that family and honesty matter more to me than success or status. When I was "
+    "young I wanted to win, but I remember realizing that helping friends was better. {i}"
+)
+
+BUILDERS = {
+    # module: (service module, builder factory, stream method, method to break)
+    'reasoning': (
+        reasoning_extractor, reasoning_extractor.ReasoningChainExtractor,
+        'iter_reasoning_chains', '_scan_message'
+    ),
+    'values': (
+        value_builder, value_builder.ValueHierarchyBuilder,
+        'iter_value_hierarchy', '_identify_values'
+    ),
+    'narrative': (
+        narrative_builder, narrative_builder.NarrativeIdentityBuilder,
+        'iter_narrative_identity', '_extract_life_events'
+    ),
+}
+
+
+@pytest.fixture
+def ml_database(tmp_path):
+    database = Database(str(tmp_path / "test.db"), pool_size=4)
+    database.initialize_ml_schema()
+    database.execute_update("""
+        CREATE TABLE conversation_memory (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT, conversation_id TEXT, role TEXT,
+            content TEXT, timestamp TEXT, context_metadata TEXT
+        )
+    """)
+    rows = []
+    for user_id in ("streamed", "aborted"):
+        for i in range(6):
+            rows.append((user_id, f"c{i}", "user", MESSAGE.format(i=i), f"2025-01-0{i + 1}"))
+            rows.append((user_id, f"c{i}", "assistant", "I see.", f"2025-01-0{i + 1}"))
+    database.execute_many(
+        "INSERT INTO conversation_memory (user_id, conversation_id, role, content, timestamp) "
+        "VALUES (?, ?, ?, ?, ?)",
+        rows
+    )
+    yield database
+    database.close()
+
+
+def _run(builder, method, user_id):
+    return list(getattr(builder, method)(user_id, incremental=True, chunk_size=4))
+
+
+def _saved_counts(database, user_id):
+    counts = {}
+    for table in ("reasoning_chains", "value_conflicts", "narrative_identity"):
+        row = database.execute_query(
+            f"SELECT COUNT(*) AS n FROM {table} WHERE user_id = ?", (user_id,), fetch_one=True
+        )
+        counts[table] = row["n"]
+    return counts
+
+
+@pytest.mark.parametrize("module", sorted(BUILDERS))
+def test_stream_advances_watermark(module, ml_database, monkeypatch):
+    service, factory, method, _ = BUILDERS[module]
+    monkeypatch.setattr(service, "db", ml_database)
+
+    _run(factory(), method, "streamed")
+
+    watermark = ml_database.get_watermark("streamed", module)
+    assert watermark["last_conversation_id"] == 12
+
+    # Nothing left to process
+    new, _ = ml_database.get_new_conversations("streamed", module)
+    assert new == []
+
+
+@pytest.mark.parametrize("module", sorted(BUILDERS))
+def test_aborted_stream_resumes_after_last_chunk(module, ml_database, monkeypatch):
+    service, factory, method, broken = BUILDERS[module]
+    monkeypatch.setattr(service, "db", ml_database)
+
+    _run(factory(), method, "streamed")
+
+    builder = factory()
+    original = getattr(builder, broken)
+    calls = []
+
+    def fail_in_second_chunk(*args, **kwargs):
+        calls.append(args)
+        # reasoning scans per message, the others per chunk
+        if len(calls) == (3 if module == 'reasoning' else 2):
+            raise RuntimeError("worker died")
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(builder, broken, fail_in_second_chunk)
+    with pytest.raises(RuntimeError):
+        _run(builder, method, "aborted")
+
+    # The first chunk (conversation ids 13-16) committed with its watermark
+    watermark = ml_database.get_watermark("aborted", module)
+    assert watermark["last_conversation_id"] == 16
+
+    resumed_builder = factory()
+    original = getattr(resumed_builder, broken)
+    processed = []
+
+    def record_processed(arg, *args, **kwargs):
+        # reasoning scans one message, the others a chunk of messages
+        processed.extend(m['id'] for m in ([arg] if isinstance(arg, dict) else arg))
+        return original(arg, *args, **kwargs)
+
+    monkeypatch.setattr(resumed_builder, broken, record_processed)
+    _run(resumed_builder, method, "aborted")
+
+    # Only the user messages past the first chunk were processed again
+    assert processed == [17, 19, 21, 23]
+
+    resumed = ml_database.get_watermark("aborted", module)
+    expected = ml_database.get_watermark("streamed", module)
+    assert resumed["last_conversation_id"] == 24
+    assert resumed["state"] == expected["state"]
+    assert _saved_counts(ml_database, "aborted") == _saved_counts(ml_database, "streamed")
@@ -0,0 +1,149 @@
+"""
+Tests for the per-user knowledge graph LRU cache
+"""
+
+import importlib
+import threading
+
+import networkx as nx
+import pytest
+
+from src.ml.config import settings
+from src.ml.db_utils import Database
+
+# The package re-exports instances under the module names
+reasoning_extractor = importlib.import_module("src.ml.services.reasoning_extractor")
+KnowledgeGraphCache = reasoning_extractor.KnowledgeGraphCache
+
+
+def _graph(edges):
+    graph = nx.DiGraph()
+    graph.add_edges_from((f"a{i}", f"b{i}") for i in range(edges))
+    return graph
+
+
+class FakeLoader:
+    """Graph of a fixed size per user, counting loads."""
+    
+    def __init__(self, sizes=None):
+        self.sizes = sizes or {}
+        self.loads = []
+    
+    def __call__(self, user_id):
+        self.loads.append(user_id)
+        return _graph(self.sizes.get(user_id, 1))
+
+
+class TestKnowledgeGraphCache:
+    """Test LRU eviction, the edge budget and invalidation."""
+    
+    def test_lru_eviction_by_users(self):
+        loader = FakeLoader()
+        cache = KnowledgeGraphCache(loader, max_users=2)
+        
+        cache.get('u1')
+        cache.get('u2')
+        cache.get('u1')  # u2 is now least recently used
+        cache.get('u3')
+        
+        assert cache.get_stats()['users'] == 2
+        cache.get('u1')
+        cache.get('u2')
+        assert loader.loads == ['u1', 'u2', 'u3', 'u2']
+    
+    def test_edge_budget(self):
+        loader = FakeLoader({'small': 10, 'medium': 40, 'huge': 500})
+        cache = KnowledgeGraphCache(loader, max_edges=60)
+        
+        cache.get('small')
+        cache.get('medium')
+        assert cache.get_stats()['edges'] == 50
+        
+        cache.get('small')
+        cache.get('medium')
+        assert loader.loads == ['small', 'medium']
+        
+        # Over budget: everything else is evicted, the newest graph is kept
+        cache.get('huge')
+        assert cache.get_stats() == {'users': 1, 'edges': 500, 'hits': 2, 'misses': 3}
+        cache.get('huge')
+        assert loader.loads == ['small', 'medium', 'huge']
+    
+    def test_invalidate_reloads(self):
+        loader = FakeLoader()
+        cache = KnowledgeGraphCache(loader)
+        
+        first = cache.get('u1')
+        assert cache.get('u1') is first
+        cache.invalidate('u1')
+        assert cache.get('u1') is not first
+        assert loader.loads == ['u1', 'u1']
+        assert cache.get_stats()['edges'] == 1
+    
+    def test_load_racing_invalidate_is_not_cached(self):
+        loading = threading.Event()
+        release = threading.Event()
+        
+        def slow_loader(user_id):
+            loading.set()
+            release.wait(5)
+            return _graph(1)
+        
+        cache = KnowledgeGraphCache(slow_loader)
+        reader = threading.Thread(target=cache.get, args=('u1',))
+        reader.start()
+        assert loading.wait(5)
+        cache.invalidate('u1')  # A write lands while the old graph is loading
+        release.set()
+        reader.join()
+        
+        assert cache.get_stats()['users'] == 0
+    
+    def test_max_age_reloads(self, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(reasoning_extractor.time, 'time', lambda: now[0])
+        loader = FakeLoader()
+        cache = KnowledgeGraphCache(loader, max_age_seconds=5)
+        
+        cache.get('u1')
+        now[0] += 4
+        cache.get('u1')
+        now[0] += 2
+        cache.get('u1')
+        assert loader.loads == ['u1', 'u1']
+
+
+class TestExtractorGraphCache:
+    """Test the extractor keeps its cached graphs in step with the table."""
+    
+    @pytest.fixture
+    def extractor(self, tmp_path, monkeypatch):
+        database = Database(str(tmp_path / "test.db"), pool_size=2)
+        database.initialize_ml_schema()
+        monkeypatch.setattr(reasoning_extractor, "db", database)
+        yield reasoning_extractor.ReasoningChainExtractor()
+        database.close()
+    
+    def test_write_invalidates(self, extractor):
+        assert extractor.get_knowledge_graph('u1').number_of_edges() == 0
+        
+        extractor._add_or_update_edges('u1', [('stress', 'causes', 'insomnia', 0.7)])
+        
+        graph = extractor.get_knowledge_graph('u1')
+        assert graph.has_edge('stress', 'insomnia')
+        assert extractor.graph_cache.get_stats()['misses'] == 2
+    
+    def test_sees_writes_from_other_processes(self, extractor, monkeypatch):
+        now = [1000.0]
+        monkeypatch.setattr(reasoning_extractor.time, 'time', lambda: now[0])
+        assert extractor.get_knowledge_graph('u1').number_of_edges() == 0
+        
+        # A worker process writes without touching this process's cache
+        reasoning_extractor.db.execute_update(
+            "INSERT INTO knowledge_graph (user_id, source_concept, relation_type, target_concept) "
+            "VALUES ('u1', 'work', 'causes', 'stress')"
+        )
+        assert extractor.get_knowledge_graph('u1').number_of_edges() == 0
+        
+        now[0] += settings.KG_CACHE_MAX_AGE_SECONDS + 1
+        assert extractor.get_knowledge_graph('u1').has_edge('work', 'stress')
@@ -0,0 +1,383 @@
+"""
+Tests for the model server (framing, micro-batching, client, adapter pool)
+
+The server runs on a temporary Unix socket with a fake emotion analyzer,
+so no model weights are needed.
+"""
+
+import asyncio
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import pytest
+
+from src.ml.model_server import (
+    MAX_FRAME_BYTES,
+    MicroBatcher,
+    ModelServer,
+    ModelServerClient,
+    ModelServerError,
+    PersonalityModelPool,
+    _HEADER,
+    encode_frame,
+    read_frame,
+    read_frame_sync,
+)
+from src.ml.services.emotion_model_v2 import EmotionAnalysis
+
+
+class FakeAnalyzer:
+    """analyze_batch returning a fixed analysis per text"""
+
+    def __init__(self):
+        self.batches = []
+
+    def analyze_batch(self, texts, contexts=None, user_baseline=None):
+        self.batches.append(list(texts))
+        return [
+            EmotionAnalysis(
+                primary_emotion='joy', primary_score=0.9, all_emotions={'joy': 0.9},
+                intensity=0.5, valence=0.8, arousal=0.6, is_sarcastic=False,
+                mixed_emotions=None, confidence=0.9, timestamp=datetime(2025, 1, 1)
+            )
+            for _ in texts
+        ]
+
+    def get_cache_stats(self):
+        return {}
+
+
+class ServerThread:
+    """Run an asyncio server on its own loop in a background thread"""
+
+    def __init__(self, start_server):
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.run(start_server())
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(timeout=5)
+
+    def close(self, stop_server):
+        self.run(stop_server())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        self.loop.close()
+
+
+@pytest.fixture
+def socket_path(tmp_path):
+    return str(tmp_path / "models.sock")
+
+
+@pytest.fixture
+def model_server(socket_path):
+    server = ModelServer(socket_path, max_batch=8, max_wait_ms=50)
+    server._analyzer = FakeAnalyzer()
+    thread = ServerThread(server.start)
+    yield server
+    thread.close(server.stop)
+
+
+# ============================================================================
+# Framing
+# ============================================================================
+
+class TestFraming:
+    """Length-prefixed JSON frames"""
+
+    def test_sync_round_trip(self):
+        left, right = socket.socketpair()
+        with left, right:
+            message = {'id': 1, 'method': 'analyze', 'params': {'texts': ['héllo']}}
+            left.sendall(encode_frame(message))
+            assert read_frame_sync(right) == message
+
+    def test_async_round_trip(self):
+        async def read(data):
+            reader = asyncio.StreamReader()
+            reader.feed_data(data)
+            reader.feed_eof()
+            return await read_frame(reader)
+
+        frames = encode_frame({'id': 1}) + encode_frame({'id': 2})
+        assert asyncio.run(read(frames)) == {'id': 1}
+
+    def test_oversized_frame_rejected(self):
+        async def read():
+            reader = asyncio.StreamReader()
+            reader.feed_data(_HEADER.pack(MAX_FRAME_BYTES + 1))
+            return await read_frame(reader)
+
+        with pytest.raises(ModelServerError):
+            asyncio.run(read())
+
+    def test_closed_connection(self):
+        left, right = socket.socketpair()
+        with right:
+            left.sendall(encode_frame({'id': 1})[:3])
+            left.close()
+            with pytest.raises(ConnectionError):
+                read_frame_sync(right)
+
+
+# ============================================================================
+# MicroBatcher
+# ============================================================================
+
+class TestMicroBatcher:
+    """Request coalescing"""
+
+    @pytest.fixture
+    def executor(self):
+        executor = ThreadPoolExecutor(max_workers=1)
+        yield executor
+        executor.shutdown(wait=True)
+
+    def test_timer_flush(self, executor):
+        calls = []
+
+        def run_batch(items):
+            calls.append(list(items))
+            return [item * 2 for item in items]
+
+        async def main():
+            batcher = MicroBatcher(run_batch, executor, max_batch=10, max_wait_ms=20)
+            results = await asyncio.gather(*[batcher.submit(i) for i in range(3)])
+            return results, batcher.get_stats()
+
+        results, stats = asyncio.run(main())
+
+        assert results == [0, 2, 4]
+        assert calls == [[0, 1, 2]]
+        assert stats['batches'] == 1 and stats['pending'] == 0
+
+    def test_max_batch_flush(self, executor):
+        calls = []
+
+        def run_batch(items):
+            calls.append(list(items))
+            return list(items)
+
+        async def main():
+            batcher = MicroBatcher(run_batch, executor, max_batch=2, max_wait_ms=10_000)
+            return await asyncio.wait_for(
+                asyncio.gather(*[batcher.submit(i) for i in range(4)]), timeout=2
+            )
+
+        # Full batches run without waiting for the (10s) timer
+        assert asyncio.run(main()) == [0, 1, 2, 3]
+        assert calls == [[0, 1], [2, 3]]
+
+    def test_per_item_exceptions(self, executor):
+        def run_batch(items):
+            return [ValueError(f"bad {item}") if item < 0 else item for item in items]
+
+        async def main():
+            batcher = MicroBatcher(run_batch, executor, max_batch=10, max_wait_ms=5)
+            return await asyncio.gather(
+                *[batcher.submit(i) for i in (1, -1, 2)], return_exceptions=True
+            )
+
+        results = asyncio.run(main())
+
+        assert results[0] == 1 and results[2] == 2
+        assert isinstance(results[1], ValueError)
+
+    def test_failed_batch_fails_every_item(self, executor):
+        def run_batch(items):
+            raise RuntimeError("model crashed")
+
+        async def main():
+            batcher = MicroBatcher(run_batch, executor, max_batch=10, max_wait_ms=5)
+            return await asyncio.gather(
+                *[batcher.submit(i) for i in range(2)], return_exceptions=True
+            )
+
+        assert all(isinstance(r, RuntimeError) for r in asyncio.run(main()))
+
+
+# ============================================================================
+# Server + client
+# ============================================================================
+
+class TestServerClient:
+    """Requests over a real Unix socket"""
+
+    def test_ping_and_analyze(self, model_server, socket_path):
+        client = ModelServerClient(socket_path, timeout=5)
+
+        assert client.ping()
+        results = client.analyze_batch(['a', 'b'], [['ctx'], None])
+
+        assert [r['primary_emotion'] for r in results] == ['joy', 'joy']
+        assert model_server.analyzer.batches == [['a', 'b']]
+
+    def test_concurrent_requests_share_a_batch(self, model_server, socket_path):
+        client = ModelServerClient(socket_path, timeout=5)
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda i: client.analyze_batch([f"text {i}"]), range(4)))
+
+        # 4 clients within max_wait_ms: fewer model calls than requests
+        assert sum(len(b) for b in model_server.analyzer.batches) == 4
+        assert len(model_server.analyzer.batches) < 4
+
+    def test_mismatched_contexts_rejected(self, model_server, socket_path):
+        client = ModelServerClient(socket_path, timeout=5)
+
+        with pytest.raises(ModelServerError, match="contexts"):
+            client.analyze_batch(['a', 'b'], [['only one']])
+
+        assert model_server.analyzer.batches == []
+
+    def test_reconnects_after_server_restart(self, socket_path):
+        client = ModelServerClient(socket_path, timeout=5)
+
+        for _ in range(2):
+            server = ModelServer(socket_path, max_wait_ms=1)
+            server._analyzer = FakeAnalyzer()
+            thread = ServerThread(server.start)
+            try:
+                # The second pass reuses a connection the old server closed
+                assert client.call('ping') == 'pong'
+            finally:
+                thread.close(server.stop)
+
+    def test_unavailable_server(self, tmp_path):
+        client = ModelServerClient(str(tmp_path / "missing.sock"), timeout=1)
+        assert client.ping() is False
+
+    def test_request_not_resent_after_send(self, socket_path):
+        received = []
+
+        async def handle(reader, writer):
+            # Read the request, then drop the connection without answering
+            received.append(await read_frame(reader))
+            writer.close()
+
+        servers = []
+
+        async def start():
+            servers.append(await asyncio.start_unix_server(handle, path=socket_path))
+
+        async def stop():
+            servers[0].close()
+            await servers[0].wait_closed()
+
+        thread = ServerThread(start)
+        try:
+            client = ModelServerClient(socket_path, timeout=5)
+            with pytest.raises(ModelServerError, match="connection lost"):
+                client.call('generate_response', user_id='u1')
+            time.sleep(0.05)
+            assert len(received) == 1
+        finally:
+            thread.close(stop)
+
+
+# ============================================================================
+# PersonalityModelPool
+# ============================================================================
+
+class FakeEngine:
+    """PersonalityInferenceEngine stand-in recording adapter loads"""
+
+    created = []
+
+    def __init__(self, user_id, db_path, base_model, model_path=None,
+                 shared_model=None, tokenizer=None):
+        if model_path is None:
+            raise ValueError(f"No trained model found for user {user_id}")
+        self.user_id = user_id
+        self.model_path = model_path
+        self.shared = shared_model is not None
+        self.model = shared_model or object()
+        self.tokenizer = tokenizer
+        self.released = False
+        FakeEngine.created.append(self)
+
+    def generate_response(self, message, **kwargs):
+        return f"{self.user_id}:{self.model_path}", {'model_path': self.model_path}
+
+    def release(self):
+        self.released = True
+
+
+class FakePersonalityModule:
+    PersonalityInferenceEngine = FakeEngine
+
+    class InferenceConfig:
+        def __init__(self, **kwargs):
+            self.__dict__.update(kwargs)
+
+
+class TestPersonalityModelPool:
+    """Adapter caching on the shared base model"""
+
+    @pytest.fixture
+    def pool(self, tmp_path):
+        FakeEngine.created = []
+        db_path = str(tmp_path / "self_agent.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute(
+            "CREATE TABLE personality_models (user_id TEXT, model_path TEXT, "
+            "is_active INTEGER, created_at TEXT)"
+        )
+        conn.commit()
+        conn.close()
+
+        pool = PersonalityModelPool(db_path=db_path, max_adapters=2)
+        pool._module = FakePersonalityModule
+        return pool
+
+    def _add_model(self, pool, user_id, model_path, created_at):
+        conn = sqlite3.connect(pool.db_path)
+        conn.execute(
+            "INSERT INTO personality_models VALUES (?, ?, 1, ?)",
+            (user_id, model_path, created_at)
+        )
+        conn.commit()
+        conn.close()
+
+    def _generate(self, pool, user_id, model_path=None):
+        return pool.generate({'user_id': user_id, 'message': 'hi', 'model_path': model_path})
+
+    def test_shared_base_and_eviction(self, pool):
+        for user_id in ('owner', 'u1', 'u2', 'u3'):
+            self._generate(pool, user_id, f"/models/{user_id}")
+
+        owner, u1, u2, u3 = FakeEngine.created
+        assert not owner.shared and u1.shared and u3.shared
+        # Least recently used extra adapter evicted; the base owner is kept
+        assert u1.released and not u2.released and not owner.released
+        assert pool.get_stats() == {'engines': 3, 'base_loaded': True}
+
+        # Cached engines are reused
+        self._generate(pool, 'u2', "/models/u2")
+        assert len(FakeEngine.created) == 4
+
+    def test_retrained_adapter_replaces_old(self, pool):
+        self._generate(pool, 'owner', "/models/owner")
+        self._add_model(pool, 'u1', "/models/u1-v1", "2025-01-01")
+
+        response = self._generate(pool, 'u1')
+        assert response['metadata']['model_path'] == "/models/u1-v1"
+        first = FakeEngine.created[-1]
+
+        self._add_model(pool, 'u1', "/models/u1-v2", "2025-02-01")
+        response = self._generate(pool, 'u1')
+
+        assert response['metadata']['model_path'] == "/models/u1-v2"
+        assert first.released
+        assert pool.get_stats()['engines'] == 2
+
+    def test_missing_model_not_cached(self, pool):
+        with pytest.raises(ValueError):
+            self._generate(pool, 'nobody')
+        assert pool.get_stats()['engines'] == 0
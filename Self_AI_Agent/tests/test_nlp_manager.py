@@ -0,0 +1,22 @@
+"""
+Tests for the shared spaCy pipeline manager
+"""
+
+import importlib
+import logging
+
+# Imported by path like the other service tests (the package re-exports instances)
+nlp_manager = importlib.import_module("src.ml.services.nlp_manager")
+
+
+def test_missing_model_warns_once(caplog):
+    manager = nlp_manager.NLPManager()
+
+    with caplog.at_level(logging.WARNING, logger=nlp_manager.__name__):
+        assert manager.load("no_such_spacy_model") is None
+        assert manager.load("no_such_spacy_model") is None
+        assert not manager.is_available("no_such_spacy_model")
+
+    warnings = [r for r in caplog.records if "no_such_spacy_model" in r.getMessage()]
+    assert len(warnings) == 1
+    assert warnings[0].levelno == logging.WARNING
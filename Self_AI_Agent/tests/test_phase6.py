@@ -93,6 +93,128 @@ class TestModelOptimizer:
         avg_time = elapsed / 5
         assert avg_time < 0.5  # <500ms per request on average
 
+    class FakeModule:
+        """Module with a batch method and a per-request-only method."""
+
+        BATCH_METHODS = {'score': 'score_batch'}
+
+        def __init__(self):
+            self.batch_calls = []
+
+        def score(self, value):
+            return value * 2
+
+        def score_batch(self, kwargs_list):
+            self.batch_calls.append(len(kwargs_list))
+            return [
+                ValueError("bad value") if kwargs['value'] < 0 else kwargs['value'] * 2
+                for kwargs in kwargs_list
+            ]
+
+        def check(self, value):
+            if value < 0:
+                raise ValueError("bad value")
+            return value
+
+    def _optimizer(self, **config):
+        from src.ml.services.model_optimizer import ModelOptimizer
+
+        optimizer = ModelOptimizer(config)
+        module = self.FakeModule()
+        optimizer.loaded_modules['fake'] = module
+        return optimizer, module
+
+    @pytest.mark.asyncio
+    async def test_batch_single_timer_per_key(self):
+        """Requests queued behind one timer go through one batch call."""
+        optimizer, module = self._optimizer(batch_size=10, batch_timeout=0.05)
+
+        first = asyncio.ensure_future(optimizer.batch_process('fake', 'score', 'r1', value=1))
+        second = asyncio.ensure_future(optimizer.batch_process('fake', 'score', 'r2', value=2))
+        await asyncio.sleep(0)
+
+        assert len(optimizer.batch_timers) == 1
+        timer = optimizer.batch_timers['fake.score']
+
+        assert await asyncio.gather(first, second) == [2, 4]
+        assert module.batch_calls == [2]
+        assert timer.done()
+        assert optimizer.batch_timers == {}
+
+    @pytest.mark.asyncio
+    async def test_full_batch_cancels_timer(self):
+        """A full batch runs at once and cancels the pending timer."""
+        optimizer, module = self._optimizer(batch_size=3, batch_timeout=10)
+
+        start = time.time()
+        results = await asyncio.wait_for(asyncio.gather(*[
+            optimizer.batch_process('fake', 'score', f'r{i}', value=i)
+            for i in range(3)
+        ]), timeout=2)
+
+        assert results == [0, 2, 4]
+        assert time.time() - start < 2
+        assert module.batch_calls == [3]
+        assert optimizer.batch_timers == {}
+
+        # The next request starts a fresh timer
+        pending = asyncio.ensure_future(optimizer.batch_process('fake', 'score', 'r3', value=3))
+        await asyncio.sleep(0)
+        assert len(optimizer.batch_timers) == 1
+        pending.cancel()
+        optimizer.batch_timers.pop('fake.score').cancel()
+
+    @pytest.mark.asyncio
+    async def test_batch_exception_isolation(self):
+        """A failing request only fails its own future."""
+        optimizer, _ = self._optimizer(batch_size=3, batch_timeout=0.05)
+
+        for method in ('score', 'check'):  # batch method / per-request fallback
+            results = await asyncio.gather(*[
+                optimizer.batch_process('fake', method, f'r{i}', value=value)
+                for i, value in enumerate([1, -1, 2])
+            ], return_exceptions=True)
+
+            assert isinstance(results[1], ValueError)
+            assert results[0] != results[1] and not isinstance(results[0], Exception)
+            assert not isinstance(results[2], Exception)
+
+    def test_emotion_model_batch_requests(self):
+        """analyze requests become one analyze_batch per baseline."""
+        from src.ml.services.emotion_model_v2 import batch_analyze_requests
+
+        class FakeAnalyzer:
+            def __init__(self):
+                self.batches = []
+
+            def analyze(self, text, context=None, user_baseline=None):
+                if text == 'boom':
+                    raise RuntimeError("model failure")
+                return (text, context, user_baseline)
+
+            def analyze_batch(self, texts, contexts=None, user_baseline=None):
+                self.batches.append(list(texts))
+                if 'boom' in texts:
+                    raise RuntimeError("model failure")
+                return [(t, c, user_baseline) for t, c in zip(texts, contexts)]
+
+        analyzer = FakeAnalyzer()
+        results = batch_analyze_requests(analyzer, [
+            {'text': 'a'},
+            {'text': 'b', 'context': ['x'], 'user_baseline': {'valence': 0.1}},
+            {'text': 'c'},
+            {'txt': 'typo'},
+        ])
+
+        assert results[:3] == [('a', None, None), ('b', ['x'], {'valence': 0.1}), ('c', None, None)]
+        assert isinstance(results[3], TypeError)
+        assert analyzer.batches == [['a', 'c'], ['b']]
+
+        # A failing group is retried one by one
+        results = batch_analyze_requests(analyzer, [{'text': 'ok'}, {'text': 'boom'}])
+        assert results[0] == ('ok', None, None)
+        assert isinstance(results[1], RuntimeError)
+
 
 # Test Session Manager
 class TestSessionManager:
@@ -170,6 +292,70 @@ class TestSessionManager:
         except Exception as e:
             # Expected if module not fully initialized
             assert 'module' in str(e).lower() or 'method' in str(e).lower()
+    
+    def test_loop_change_fails_queued_requests(self):
+        """Test requests queued on a previous event loop are failed, not left hanging."""
+        from src.ml.services.session_manager import SessionManager
+        
+        # No workers: the request stays queued
+        manager = SessionManager({'workers_per_priority': 0})
+        old_loop = asyncio.new_event_loop()
+        try:
+            pending = old_loop.create_task(manager.submit_request(
+                request_id='stranded', user_id='loop_user',
+                module_name='reasoning', method_name='extract_reasoning_chains'
+            ))
+            old_loop.run_until_complete(asyncio.sleep(0))
+            assert sum(q.qsize() for q in manager.request_queues.values()) == 1
+            
+            async def use_from_new_loop():
+                manager._ensure_started()
+                await manager.shutdown()
+            
+            asyncio.run(use_from_new_loop())
+            
+            old_loop.run_until_complete(asyncio.wait([pending], timeout=5))
+            with pytest.raises(RuntimeError, match='new event loop'):
+                pending.result()
+        finally:
+            old_loop.close()
+    
+    @pytest.mark.asyncio
+    async def test_broken_process_pool_replaced_once(self, monkeypatch):
+        """Test concurrent BrokenProcessPool failures replace the pool once."""
+        from concurrent.futures import Future
+        from concurrent.futures.process import BrokenProcessPool
+        from src.ml.services import session_manager as sm
+        
+        class DeadPool:
+            def __init__(self, *args, **kwargs):
+                self.shutdown_args = None
+            
+            def submit(self, fn, *args, **kwargs):
+                future = Future()
+                future.set_exception(BrokenProcessPool('worker died'))
+                return future
+            
+            def shutdown(self, wait=True, cancel_futures=False):
+                self.shutdown_args = (wait, cancel_futures)
+        
+        monkeypatch.setattr(sm, 'create_process_pool', DeadPool)
+        manager = sm.SessionManager({'executor': 'process'})
+        broken = manager.process_executor
+        request = sm.Request(
+            request_id='r', user_id='u', module_name='reasoning',
+            method_name='extract_reasoning_chains', kwargs={}, priority=sm.Priority.STANDARD
+        )
+        
+        results = await asyncio.gather(
+            *[manager._execute_in_process(request) for _ in range(4)],
+            return_exceptions=True
+        )
+        
+        assert all(isinstance(r, BrokenProcessPool) for r in results)
+        assert manager.process_executor is not broken
+        assert manager.process_executor.shutdown_args is None
+        assert broken.shutdown_args == (False, True)
 
 
 # Test Cache Manager
@@ -256,6 +442,181 @@ class TestCacheManager:
         
         except Exception as e:
             pytest.skip(f"Redis not available: {e}")
+    
+    def test_get_or_compute_coalesces(self):
+        """Test concurrent misses compute once."""
+        import threading
+        from src.ml.cache_manager import get_cache_manager
+        
+        manager = get_cache_manager('redis://localhost:6379')
+        manager.delete('test', 'coalesce_user', {'query': 'herd'})
+        calls = []
+        
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return {'output': 'computed'}
+        
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                manager.get_or_compute('test', 'coalesce_user', {'query': 'herd'}, compute)
+            ))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        # Works with or without Redis: in-process callers share one future
+        assert len(calls) == 1
+        assert [r['output'] for r in results] == ['computed'] * 8
+        
+        manager.delete('test', 'coalesce_user', {'query': 'herd'})
+
+
+# Test L1 Cache
+class TestLocalCache:
+    """Test the in-process L1 in front of Redis."""
+
+    def test_lru_eviction(self):
+        """Test size bound evicts least recently used entries."""
+        from src.ml.cache_manager import LocalCache
+
+        cache = LocalCache(max_entries=2, ttl=60)
+        cache.put('k1', {'v': 1}, time.time(), 'values', 'u1')
+        cache.put('k2', {'v': 2}, time.time(), 'values', 'u1')
+
+        # Touch k1 so k2 is the eviction candidate
+        assert cache.get('k1') is not None
+        cache.put('k3', {'v': 3}, time.time(), 'values', 'u1')
+
+        assert cache.get('k2') is None
+        assert cache.get('k1')[0] == {'v': 1}
+        assert cache.get('k3')[0] == {'v': 3}
+
+    def test_expiry(self):
+        """Test entries expire with the shorter of L1 and Redis TTL."""
+        from src.ml.cache_manager import LocalCache
+
+        cache = LocalCache(max_entries=10, ttl=60)
+        cache.put('k1', {'v': 1}, time.time(), 'values', 'u1', max_age=0.05)
+        assert cache.get('k1') is not None
+
+        time.sleep(0.1)
+        assert cache.get('k1') is None
+
+        # Already expired in Redis: not stored
+        cache.put('k2', {'v': 2}, time.time(), 'values', 'u1', max_age=-1)
+        assert cache.get('k2') is None
+
+    def test_invalidate_where(self):
+        """Test user and module invalidation."""
+        from src.ml.cache_manager import LocalCache
+
+        cache = LocalCache(max_entries=10, ttl=60)
+        cache.put('a', {}, None, 'values', 'u1')
+        cache.put('b', {}, None, 'reasoning', 'u1')
+        cache.put('c', {}, None, 'values', 'u2')
+
+        assert cache.invalidate_where(user_id='u1') == 2
+        assert cache.get('c') is not None
+
+        assert cache.invalidate_where(module='values') == 1
+        assert cache.get('c') is None
+
+
+# Test Cache Codec
+class TestCacheCodec:
+    """Test binary serialization of cache entries."""
+
+    def test_round_trip(self):
+        """Test every installed serializer/compression pair."""
+        from src.ml.cache_codec import CacheCodec, available_serializers, available_compressions
+
+        payload = {'values': [{'value_name': 'honesty', 'priority_score': 0.9}] * 100, 'total': 100}
+
+        for serializer in available_serializers():
+            for compression in available_compressions():
+                codec = CacheCodec(serializer=serializer, compression=compression, compress_min_bytes=64)
+                encoded = codec.encode(payload)
+                assert encoded[0] & 0x80
+                assert codec.decode(encoded) == payload
+
+    def test_small_payloads_uncompressed(self):
+        """Test entries below the threshold skip compression."""
+        from src.ml.cache_codec import CacheCodec
+
+        codec = CacheCodec(serializer='json', compression='zlib', compress_min_bytes=1024)
+        small = codec.encode({'emotion': 'joy'})
+        large = codec.encode({'text': 'joy ' * 1000})
+
+        assert codec.parse_header(small[0])[2] == 'none'
+        assert codec.parse_header(large[0])[2] == 'zlib'
+
+    def test_legacy_json(self):
+        """Test entries written as JSON text still decode."""
+        from src.ml.cache_codec import CacheCodec
+
+        codec = CacheCodec()
+        assert codec.decode('{"emotion": "joy"}') == {'emotion': 'joy'}
+        assert codec.decode(b'{"emotion": "joy"}') == {'emotion': 'joy'}
+        assert codec.decode(None) is None
+
+    def test_unknown_version(self):
+        """Test a future format version is rejected, not misread."""
+        from src.ml.cache_codec import CacheCodec, CacheCodecError
+
+        codec = CacheCodec()
+        with pytest.raises(CacheCodecError):
+            codec.decode(bytes((0x80 | (1 << 5),)) + b'{}')
+
+    def test_missing_serializer_logs_warning(self, monkeypatch, caplog):
+        """Test an uninstalled serializer falls back to json with a logged warning."""
+        import logging
+        from src.ml import cache_codec
+
+        monkeypatch.setattr(cache_codec, 'available_serializers', lambda: ['json'])
+
+        with caplog.at_level(logging.WARNING, logger=cache_codec.__name__):
+            codec = cache_codec.CacheCodec(serializer='msgpack')
+
+        assert codec.serializer == 'json'
+        assert any('msgpack' in r.getMessage() for r in caplog.records)
+
+    def test_benchmark_cached_payloads(self, tmp_path):
+        """Test the benchmark can run on entries of an existing cognitive_cache."""
+        import json
+        from src.ml.cache_codec import CacheCodec, benchmark, load_cached_payloads
+        from src.ml.db_utils import Database
+
+        db_path = str(tmp_path / "cache.db")
+        database = Database(db_path)
+        database.initialize_ml_schema()
+        codec = CacheCodec(compression='none')  # Entry size grows with the payload
+        rows = [
+            ('u1', 'values', 'h1', codec.encode({'values': ['honesty'] * 10})),
+            ('u2', 'values', 'h2', codec.encode({'values': ['family'] * 500})),
+            ('u3', 'values', 'h3', codec.encode({'values': ['growth'] * 50})),
+            ('u1', 'narrative', 'h4', json.dumps({'themes': ['agency']})),  # Legacy row
+        ]
+        database.execute_many(
+            "INSERT INTO cognitive_cache (user_id, module_name, input_hash, output_data) "
+            "VALUES (?, ?, ?, ?)",
+            rows
+        )
+        database.close()
+
+        payloads = load_cached_payloads(db_path)
+
+        assert payloads == {
+            'narrative (largest)': {'themes': ['agency']},
+            'values (median)': {'values': ['growth'] * 50},
+            'values (largest)': {'values': ['family'] * 500},
+        }
+        rows = benchmark(iterations=1, payloads=payloads)
+        assert {row['payload'] for row in rows} == set(payloads)
 
 
 # Test Monitoring
@@ -0,0 +1,86 @@
+"""
+Tests for ProfilePipeline.run event streaming
+"""
+
+import asyncio
+import importlib
+
+import pytest
+
+# Imported by path like the other service tests (the package re-exports instances)
+profile_pipeline = importlib.import_module("src.ml.services.profile_pipeline")
+
+
+class FakeDatabase:
+    def __init__(self, targets=(), fail=False):
+        self.targets = targets
+        self.fail = fail
+
+    def get_relationship_profiles(self, user_id):
+        if self.fail:
+            raise RuntimeError("no such table: relationship_profiles")
+        return [{'user_id': user_id, 'target_person': target} for target in self.targets]
+
+
+def fake_worker(module, method, kwargs):
+    if module == 'values':
+        raise RuntimeError("values failed")
+    return {'method': method, 'target': kwargs.get('target_person')}
+
+
+def _collect(pipeline, **kwargs):
+    async def collect():
+        return [event async for event in pipeline.run("u1", conversations=[], **kwargs)]
+    return asyncio.run(collect())
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    monkeypatch.setattr(profile_pipeline, "run_in_worker", fake_worker)
+    pipeline = profile_pipeline.ProfilePipeline(max_workers=2)
+    yield pipeline
+    pipeline.shutdown()
+
+
+def test_event_order_and_errors(pipeline, monkeypatch):
+    monkeypatch.setattr(profile_pipeline, "db", FakeDatabase())
+
+    events = _collect(pipeline, tom_targets=["Alice", "Bob"])
+
+    assert events[0]['event'] == 'start'
+    assert events[0]['modules'] == ['reasoning', 'values', 'narrative', 'tom:Alice', 'tom:Bob']
+    assert events[-1]['event'] == 'done'
+
+    middle = {e['module']: e for e in events[1:-1]}
+    assert len(middle) == len(events) - 2 == 5
+    assert middle['values']['event'] == 'error'
+    assert middle['values']['error'] == "values failed"
+    assert middle['tom:Bob']['data'] == {'method': 'build_mental_model', 'target': 'Bob'}
+    assert all(middle[m]['event'] == 'result' for m in ('reasoning', 'narrative', 'tom:Alice'))
+
+    assert events[-1]['errors'] == 1
+    assert set(events[-1]['timings']) == set(middle)
+
+
+def test_tom_targets_from_relationship_profiles(pipeline, monkeypatch):
+    monkeypatch.setattr(profile_pipeline, "db", FakeDatabase(targets=["Carol", "Alice", "Carol"]))
+
+    events = _collect(pipeline, modules=['tom'])
+
+    assert events[0]['modules'] == ['tom:Alice', 'tom:Carol']
+    assert [e['event'] for e in events] == ['start', 'result', 'result', 'done']
+    assert events[-1]['errors'] == 0
+
+
+@pytest.mark.parametrize("database", [FakeDatabase(), FakeDatabase(fail=True)])
+def test_tom_without_targets_is_an_error(pipeline, monkeypatch, database):
+    monkeypatch.setattr(profile_pipeline, "db", database)
+
+    events = _collect(pipeline, modules=['reasoning', 'tom'])
+
+    assert events[0]['modules'] == ['reasoning']
+    assert [(e['event'], e.get('module')) for e in events] == [
+        ('start', None), ('error', 'tom'), ('result', 'reasoning'), ('done', None)
+    ]
+    assert 'tom_targets' in events[1]['error']
+    assert events[-1]['errors'] == 1
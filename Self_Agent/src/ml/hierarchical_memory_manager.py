@@ -10,8 +10,10 @@ Target: 95%+ Turing Test Pass Rate
 import json
 import numpy as np
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Callable
 import sqlite3
+import threading
+import time
 from dataclasses import dataclass, asdict
 import logging
 
@@ -20,12 +22,20 @@ try:
     from sklearn.cluster import HDBSCAN
     from umap import UMAP
     from sentence_transformers import SentenceTransformer
-    import spacy
     from textblob import TextBlob
 except ImportError as e:
     print(f"Warning: Missing dependencies: {e}")
     print("Install with: pip install scikit-learn umap-learn sentence-transformers spacy textblob")
 
+# 可选: HNSW 近似最近邻索引 (缺失时退化为 numpy 精确搜索)
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+from nlp_manager import nlp_manager
+
 logger = logging.getLogger(__name__)
 
 
@@ -92,6 +102,187 @@ class L2Biography:
     quality_score: float
 
 
+# ============================================
+# Layer 0: 向量索引
+# ============================================
+
+class _ExactUserIndex:
+    """单用户精确余弦搜索 (hnswlib 不可用时的后备实现)"""
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        self._labels: List[int] = []
+        self._chunks: List[np.ndarray] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._label_array: Optional[np.ndarray] = None
+
+    @property
+    def count(self) -> int:
+        return len(self._labels)
+
+    def add(self, labels: List[int], vectors: np.ndarray):
+        self._labels.extend(int(l) for l in labels)
+        self._chunks.append(_normalize(vectors))
+        self._matrix = None
+
+    def knn(self, vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        if self._matrix is None:
+            self._matrix = np.vstack(self._chunks)
+            self._chunks = [self._matrix]
+            self._label_array = np.asarray(self._labels, dtype=np.int64)
+
+        k = min(k, self.count)
+        scores = self._matrix @ _normalize(vector.reshape(1, -1))[0]
+        if k < self.count:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(self.count)
+        top = top[np.argsort(-scores[top])]
+        return [(int(self._label_array[i]), float(scores[i])) for i in top]
+
+
+class _HnswUserIndex:
+    """单用户 HNSW 近似最近邻索引 (余弦距离)"""
+
+    def __init__(self, dim: int, capacity: int, ef_construction: int, M: int, ef_search: int):
+        self.dim = dim
+        self.ef_search = ef_search
+        self._index = hnswlib.Index(space="cosine", dim=dim)
+        self._index.init_index(max_elements=capacity, ef_construction=ef_construction, M=M)
+        self._index.set_ef(ef_search)
+
+    @property
+    def count(self) -> int:
+        return self._index.get_current_count()
+
+    def add(self, labels: List[int], vectors: np.ndarray):
+        needed = self.count + len(labels)
+        capacity = self._index.get_max_elements()
+        if needed > capacity:
+            self._index.resize_index(max(needed, capacity * 2))
+        self._index.add_items(vectors, np.asarray(labels, dtype=np.int64))
+
+    def knn(self, vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        k = min(k, self.count)
+        # ef 必须不小于 k, 否则 hnswlib 会报错
+        self._index.set_ef(max(self.ef_search, k))
+        labels, distances = self._index.knn_query(vector.reshape(1, -1), k=k)
+        return [(int(l), 1.0 - float(d)) for l, d in zip(labels[0], distances[0])]
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+class L0VectorIndex:
+    """
+    L0 记忆的按用户向量索引
+
+    - 标签为 l0_raw_memories 的 rowid, 查询结果再按 rowid 回表
+    - 首次检索某用户时从 embedding_768 懒加载构建
+    - store_memory 写入后增量追加
+    - 安装了 hnswlib 时使用 HNSW, 否则退化为 numpy 精确搜索
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        ef_construction: int = 200,
+        M: int = 16,
+        ef_search: int = 64,
+        initial_capacity: int = 1024
+    ):
+        self.db_path = db_path
+        self.ef_construction = ef_construction
+        self.M = M
+        self.ef_search = ef_search
+        self.initial_capacity = initial_capacity
+        self._indexes: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def search(self, user_id: str, query_embedding: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """返回 [(rowid, cosine_similarity)], 按相似度降序"""
+        query_embedding = np.asarray(query_embedding, dtype=np.float32)
+        with self._lock:
+            index = self._get_or_build(user_id)
+            if index is None or index.count == 0 or k <= 0:
+                return []
+            if index.dim != query_embedding.shape[-1]:
+                logger.warning(
+                    f"Query embedding dim {query_embedding.shape[-1]} != index dim {index.dim} "
+                    f"for user {user_id}"
+                )
+                return []
+            return index.knn(query_embedding, k)
+
+    def add(self, user_id: str, rowids: List[int], embeddings: List[np.ndarray]):
+        """增量追加; 尚未构建的用户索引会在下次检索时从数据库完整加载"""
+        if not rowids:
+            return
+        vectors = np.vstack([np.asarray(e, dtype=np.float32) for e in embeddings])
+        with self._lock:
+            index = self._indexes.get(user_id)
+            if index is None:
+                return
+            if index.dim != vectors.shape[1]:
+                logger.warning(f"Skipping index add for user {user_id}: embedding dim mismatch")
+                return
+            index.add(rowids, vectors)
+
+    def invalidate(self, user_id: Optional[str] = None):
+        """丢弃索引 (例如记忆被删除后), 下次检索时重建"""
+        with self._lock:
+            if user_id is None:
+                self._indexes.clear()
+            else:
+                self._indexes.pop(user_id, None)
+
+    def _get_or_build(self, user_id: str):
+        if user_id in self._indexes:
+            return self._indexes[user_id]
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute("""
+                SELECT rowid, embedding_768
+                FROM l0_raw_memories
+                WHERE user_id = ? AND processed = 1 AND embedding_768 IS NOT NULL
+            """, (user_id,)).fetchall()
+        finally:
+            conn.close()
+
+        if not rows:
+            return None
+
+        dim = len(rows[0][1]) // 4  # float32
+        labels = [r[0] for r in rows if len(r[1]) == dim * 4]
+        vectors = np.vstack([np.frombuffer(r[1], dtype=np.float32) for r in rows if len(r[1]) == dim * 4])
+
+        index = self._new_index(dim, len(labels))
+        index.add(labels, vectors)
+        self._indexes[user_id] = index
+
+        logger.info(
+            f"Built L0 vector index for user {user_id}: {len(labels)} vectors "
+            f"({'hnsw' if HNSWLIB_AVAILABLE else 'exact'})"
+        )
+        return index
+
+    def _new_index(self, dim: int, size: int):
+        if HNSWLIB_AVAILABLE:
+            return _HnswUserIndex(
+                dim,
+                capacity=max(self.initial_capacity, size * 2),
+                ef_construction=self.ef_construction,
+                M=self.M,
+                ef_search=self.ef_search
+            )
+        return _ExactUserIndex(dim)
+
+
 # ============================================
 # Layer 0: 原始记忆管理器
 # ============================================
@@ -99,14 +290,17 @@ class L2Biography:
 class L0MemoryManager:
     """管理原始记忆的存储、检索和嵌入"""
     
-    def __init__(self, db_path: str, embedding_model: str = "all-MiniLM-L6-v2"):
+    def __init__(
+        self,
+        db_path: str,
+        embedding_model: str = "all-MiniLM-L6-v2",
+        vector_index: Optional[L0VectorIndex] = None
+    ):
         self.db_path = db_path
         self.embedding_model = SentenceTransformer(embedding_model)
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except OSError:
-            logger.warning("spaCy model not found. Run: python -m spacy download en_core_web_sm")
-            self.nlp = None
+        self.vector_index = vector_index or L0VectorIndex(db_path)
+        # 进程内共享的 spaCy 实例 (见 nlp_manager.py)
+        self.nlp = nlp_manager.load()
     
     def store_memory(self, memory: L0Memory) -> str:
         """
@@ -134,14 +328,107 @@ class L0MemoryManager:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        cursor.execute("""
-            INSERT INTO l0_raw_memories (
-                id, user_id, content, content_type, source, timestamp,
-                conversation_id, participants, location,
-                embedding_768, sentiment_score, sentiment_label,
-                emotion_labels, entities, keywords, metadata, processed
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
-        """, (
+        cursor.execute(self._INSERT_SQL, self._memory_row(memory))
+        rowid = cursor.lastrowid
+        
+        conn.commit()
+        conn.close()
+        
+        if memory.embedding_768 is not None:
+            self.vector_index.add(memory.user_id, [rowid], [memory.embedding_768])
+        
+        logger.info(f"Stored L0 memory: {memory.id[:8]}... ({memory.content[:50]}...)")
+        return memory.id
+    
+    def store_memories_batch(
+        self,
+        memories: List[L0Memory],
+        n_process: int = 1,
+        encode_batch_size: int = 64
+    ) -> List[str]:
+        """
+        批量存储原始记忆
+        
+        与 store_memory 相同的 pipeline, 但:
+            1. 嵌入向量批量编码
+            2. spaCy 通过 nlp.pipe 处理 (可多进程)
+            3. 单个事务内 executemany 写入
+        """
+        if not memories:
+            return []
+        
+        # 1. 批量生成嵌入
+        pending = [m for m in memories if m.embedding_768 is None]
+        if pending:
+            embeddings = self.embedding_model.encode(
+                [m.content for m in pending],
+                batch_size=encode_batch_size,
+                convert_to_numpy=True
+            )
+            for memory, embedding in zip(pending, embeddings):
+                memory.embedding_768 = embedding
+        
+        # 2. 批量提取实体和关键词
+        pending = [m for m in memories if m.entities is None or m.keywords is None]
+        if pending:
+            if self.nlp:
+                docs = nlp_manager.pipe(
+                    (m.content for m in pending), profile="entities_keywords",
+                    n_process=n_process, batch_size=256
+                )
+                for memory, doc in zip(pending, docs):
+                    memory.entities, memory.keywords = self._entities_keywords_from_doc(doc)
+            else:
+                for memory in pending:
+                    memory.entities, memory.keywords = [], []
+        
+        # 3. 情感分析
+        for memory in memories:
+            if memory.sentiment_score is None:
+                memory.sentiment_score, memory.emotion_labels = self._analyze_sentiment(memory.content)
+        
+        # 4. 单事务批量写入
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                conn.executemany(self._INSERT_SQL, [self._memory_row(m) for m in memories])
+            
+            # executemany 不返回每行 rowid, 回查后追加到向量索引
+            rowids = {}
+            ids = [m.id for m in memories]
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rowids.update(conn.execute(
+                    f"SELECT id, rowid FROM l0_raw_memories WHERE id IN ({placeholders})", chunk
+                ).fetchall())
+        finally:
+            conn.close()
+        
+        by_user: Dict[str, Tuple[List[int], List[np.ndarray]]] = {}
+        for memory in memories:
+            if memory.embedding_768 is not None and memory.id in rowids:
+                labels, vectors = by_user.setdefault(memory.user_id, ([], []))
+                labels.append(rowids[memory.id])
+                vectors.append(memory.embedding_768)
+        for user_id, (labels, vectors) in by_user.items():
+            self.vector_index.add(user_id, labels, vectors)
+        
+        logger.info(f"Stored {len(memories)} L0 memories in batch")
+        return [m.id for m in memories]
+    
+    _INSERT_SQL = """
+        INSERT INTO l0_raw_memories (
+            id, user_id, content, content_type, source, timestamp,
+            conversation_id, participants, location,
+            embedding_768, sentiment_score, sentiment_label,
+            emotion_labels, entities, keywords, metadata, processed
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+    """
+    
+    def _memory_row(self, memory: L0Memory) -> tuple:
+        """L0Memory → INSERT 参数"""
+        return (
             memory.id,
             memory.user_id,
             memory.content,
@@ -151,20 +438,14 @@ class L0MemoryManager:
             memory.conversation_id,
             json.dumps(memory.participants) if memory.participants else None,
             memory.location,
-            memory.embedding_768.tobytes() if memory.embedding_768 is not None else None,
+            memory.embedding_768.astype(np.float32).tobytes() if memory.embedding_768 is not None else None,
             memory.sentiment_score,
             self._sentiment_label(memory.sentiment_score),
             json.dumps(memory.emotion_labels) if memory.emotion_labels else None,
             json.dumps(memory.entities) if memory.entities else None,
             json.dumps(memory.keywords) if memory.keywords else None,
             json.dumps(memory.metadata) if memory.metadata else None
-        ))
-        
-        conn.commit()
-        conn.close()
-        
-        logger.info(f"Stored L0 memory: {memory.id[:8]}... ({memory.content[:50]}...)")
-        return memory.id
+        )
     
     def _generate_embedding(self, text: str) -> np.ndarray:
         """生成文本嵌入向量"""
@@ -172,27 +453,29 @@ class L0MemoryManager:
     
     def _extract_entities_keywords(self, text: str) -> Tuple[List[Dict], List[str]]:
         """提取实体和关键词"""
-        entities = []
-        keywords = []
-        
         if self.nlp:
-            doc = self.nlp(text)
-            
-            # 提取命名实体
-            for ent in doc.ents:
-                entities.append({
-                    "text": ent.text,
-                    "type": ent.label_,
-                    "start": ent.start_char,
-                    "end": ent.end_char
-                })
-            
-            # 提取关键词 (名词和动词)
-            keywords = [
-                token.text.lower() 
-                for token in doc 
-                if token.pos_ in ["NOUN", "VERB", "ADJ"] and not token.is_stop
-            ]
+            return self._entities_keywords_from_doc(nlp_manager(text, profile="entities_keywords"))
+        return [], []
+    
+    def _entities_keywords_from_doc(self, doc) -> Tuple[List[Dict], List[str]]:
+        """从 spaCy Doc 提取实体和关键词"""
+        # 提取命名实体
+        entities = [
+            {
+                "text": ent.text,
+                "type": ent.label_,
+                "start": ent.start_char,
+                "end": ent.end_char
+            }
+            for ent in doc.ents
+        ]
+        
+        # 提取关键词 (名词和动词)
+        keywords = [
+            token.text.lower() 
+            for token in doc 
+            if token.pos_ in ["NOUN", "VERB", "ADJ"] and not token.is_stop
+        ]
         
         return entities, keywords[:20]  # 限制关键词数量
     
@@ -235,80 +518,105 @@ class L0MemoryManager:
         
         支持:
             - 语义搜索 (query)
-            - 时间范围过滤
+            - 时间范围过滤 (可与 query 组合)
             - 分页
         """
+        if query:
+            # 语义搜索: 向量索引取 top-k, 再按 rowid 回表
+            query_embedding = self._generate_embedding(query)
+            k = limit
+            while True:
+                hits = self.vector_index.search(user_id, query_embedding, k)
+                if not hits:
+                    break  # 该用户还没有嵌入向量时退化为全文匹配
+                memories = self._fetch_by_rowids(hits, time_range)
+                # 时间过滤后不足 limit 条时扩大 k, 直到取尽该用户的索引
+                if len(memories) >= limit or len(hits) < k:
+                    return memories[:limit]
+                k *= 4
+        
+        conditions = ["user_id = ?", "processed = 1"]
+        params: List[Any] = [user_id]
+        if query:
+            conditions.append("content LIKE ?")
+            params.append(f"%{query}%")
+        if time_range:
+            start, end = time_range
+            conditions.append("timestamp BETWEEN ? AND ?")
+            params.extend([start.isoformat(), end.isoformat()])
+        
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {self._MEMORY_COLUMNS}
+            FROM l0_raw_memories
+            WHERE {" AND ".join(conditions)}
+            ORDER BY timestamp DESC
+            LIMIT ?
+        """, (*params, limit))
         
-        if query:
-            # 语义搜索
-            query_embedding = self._generate_embedding(query)
-            # TODO: 实现向量相似度搜索 (需要 sqlite-vss 或外部向量数据库)
-            # 现在先用全文搜索代替
-            cursor.execute("""
-                SELECT id, user_id, content, content_type, source, timestamp,
+        rows = cursor.fetchall()
+        conn.close()
+        
+        return [self._row_to_memory(row) for row in rows]
+    
+    _MEMORY_COLUMNS = """id, user_id, content, content_type, source, timestamp,
                        conversation_id, participants, location,
                        embedding_768, sentiment_score, emotion_labels,
-                       entities, keywords, metadata
-                FROM l0_raw_memories
-                WHERE user_id = ? AND processed = 1
-                AND content LIKE ?
-                ORDER BY timestamp DESC
-                LIMIT ?
-            """, (user_id, f"%{query}%", limit))
-        else:
-            # 时间范围查询
-            if time_range:
-                start, end = time_range
-                cursor.execute("""
-                    SELECT id, user_id, content, content_type, source, timestamp,
-                           conversation_id, participants, location,
-                           embedding_768, sentiment_score, emotion_labels,
-                           entities, keywords, metadata
-                    FROM l0_raw_memories
-                    WHERE user_id = ? AND processed = 1
-                    AND timestamp BETWEEN ? AND ?
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                """, (user_id, start.isoformat(), end.isoformat(), limit))
-            else:
-                cursor.execute("""
-                    SELECT id, user_id, content, content_type, source, timestamp,
-                           conversation_id, participants, location,
-                           embedding_768, sentiment_score, emotion_labels,
-                           entities, keywords, metadata
-                    FROM l0_raw_memories
-                    WHERE user_id = ? AND processed = 1
-                    ORDER BY timestamp DESC
-                    LIMIT ?
-                """, (user_id, limit))
+                       entities, keywords, metadata"""
+    
+    def _fetch_by_rowids(
+        self,
+        hits: List[Tuple[int, float]],
+        time_range: Optional[Tuple[datetime, datetime]] = None
+    ) -> List[L0Memory]:
+        """按向量检索结果回表, 保持相似度顺序 (可选时间范围过滤)"""
+        rowids = [rowid for rowid, _ in hits]
+        placeholders = ",".join("?" * len(rowids))
+        time_filter, params = "", rowids
+        if time_range:
+            start, end = time_range
+            time_filter = "AND timestamp BETWEEN ? AND ?"
+            params = [*rowids, start.isoformat(), end.isoformat()]
         
-        rows = cursor.fetchall()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT rowid, {self._MEMORY_COLUMNS}
+            FROM l0_raw_memories
+            WHERE rowid IN ({placeholders}) {time_filter}
+        """, params)
+        rows = {row[0]: row[1:] for row in cursor.fetchall()}
         conn.close()
         
         memories = []
-        for row in rows:
-            memory = L0Memory(
-                id=row[0],
-                user_id=row[1],
-                content=row[2],
-                content_type=row[3],
-                source=row[4],
-                timestamp=datetime.fromisoformat(row[5]),
-                conversation_id=row[6],
-                participants=json.loads(row[7]) if row[7] else None,
-                location=row[8],
-                embedding_768=np.frombuffer(row[9], dtype=np.float32) if row[9] else None,
-                sentiment_score=row[10],
-                emotion_labels=json.loads(row[11]) if row[11] else None,
-                entities=json.loads(row[12]) if row[12] else None,
-                keywords=json.loads(row[13]) if row[13] else None,
-                metadata=json.loads(row[14]) if row[14] else None
-            )
+        for rowid, score in hits:
+            row = rows.get(rowid)
+            if row is None:
+                continue  # 已删除的记忆
+            memory = self._row_to_memory(row)
+            memory.metadata = {**(memory.metadata or {}), "similarity": score}
             memories.append(memory)
-        
         return memories
+    
+    def _row_to_memory(self, row) -> L0Memory:
+        return L0Memory(
+            id=row[0],
+            user_id=row[1],
+            content=row[2],
+            content_type=row[3],
+            source=row[4],
+            timestamp=datetime.fromisoformat(row[5]),
+            conversation_id=row[6],
+            participants=json.loads(row[7]) if row[7] else None,
+            location=row[8],
+            embedding_768=np.frombuffer(row[9], dtype=np.float32) if row[9] else None,
+            sentiment_score=row[10],
+            emotion_labels=json.loads(row[11]) if row[11] else None,
+            entities=json.loads(row[12]) if row[12] else None,
+            keywords=json.loads(row[13]) if row[13] else None,
+            metadata=json.loads(row[14]) if row[14] else None
+        )
 
 
 # ============================================
@@ -869,8 +1177,62 @@ class HierarchicalMemoryManager:
         Returns:
             memory_id
         """
+        memory = self._conversation_to_memory(user_id, conversation)
+        return self.l0_manager.store_memory(memory)
+    
+    def import_conversations(
+        self,
+        user_id: str,
+        conversations: Iterable[Dict],
+        batch_size: int = 512,
+        n_process: int = 1,
+        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        流式批量导入对话记忆 (用于大规模微信等导出)
+        
+        Args:
+            user_id: 用户ID
+            conversations: 可迭代的对话 (格式同 import_conversation), 可以是生成器
+            batch_size: 每批写入条数 (每批一个事务)
+            n_process: spaCy nlp.pipe 进程数
+            progress_callback: 每批完成后回调, 参数为进度统计
+        
+        Returns:
+            {"imported": ..., "batches": ..., "elapsed_seconds": ..., "throughput": ...}
+        """
+        start = time.perf_counter()
+        stats = {"imported": 0, "batches": 0, "elapsed_seconds": 0.0, "throughput": 0.0}
+        
+        def flush(batch: List[L0Memory]):
+            self.l0_manager.store_memories_batch(batch, n_process=n_process)
+            elapsed = time.perf_counter() - start
+            stats["imported"] += len(batch)
+            stats["batches"] += 1
+            stats["elapsed_seconds"] = elapsed
+            stats["throughput"] = stats["imported"] / elapsed if elapsed > 0 else 0.0
+            logger.info(
+                f"Imported {stats['imported']} memories for user {user_id} "
+                f"({stats['throughput']:.1f} msg/s)"
+            )
+            if progress_callback:
+                progress_callback(dict(stats))
+        
+        batch: List[L0Memory] = []
+        for conversation in conversations:
+            batch.append(self._conversation_to_memory(user_id, conversation))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+        
+        return stats
+    
+    def _conversation_to_memory(self, user_id: str, conversation: Dict) -> L0Memory:
+        """对话字典 → L0Memory"""
         import uuid
-        memory = L0Memory(
+        return L0Memory(
             id=str(uuid.uuid4()),
             user_id=user_id,
             content=conversation["content"],
@@ -882,8 +1244,6 @@ class HierarchicalMemoryManager:
             location=conversation.get("location"),
             metadata=conversation.get("metadata")
         )
-        
-        return self.l0_manager.store_memory(memory)
     
     def build_memory_hierarchy(self, user_id: str, llm_generate_fn):
         """
@@ -918,7 +1278,10 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Hierarchical Memory Manager CLI")
     parser.add_argument("--db-path", required=True, help="Database path")
     parser.add_argument("--user-id", required=True, help="User ID")
-    parser.add_argument("--action", required=True, choices=["cluster", "biography", "full"])
+    parser.add_argument("--action", required=True, choices=["cluster", "biography", "full", "import"])
+    parser.add_argument("--input", help="JSONL file of conversations (for --action import)")
+    parser.add_argument("--batch-size", type=int, default=512, help="Import batch size")
+    parser.add_argument("--workers", type=int, default=1, help="spaCy processes for import")
     
     args = parser.parse_args()
     
@@ -936,6 +1299,17 @@ if __name__ == "__main__":
         biography = manager.l2_manager.generate_biography(args.user_id, mock_llm_generate)
         print(f"✓ Generated biography (quality: {biography.quality_score:.2f})")
     
+    elif args.action == "import":
+        with open(args.input, encoding="utf-8") as f:
+            result = manager.import_conversations(
+                args.user_id,
+                (json.loads(line) for line in f if line.strip()),
+                batch_size=args.batch_size,
+                n_process=args.workers
+            )
+        print(f"✓ Imported {result['imported']} memories in {result['elapsed_seconds']:.1f}s "
+              f"({result['throughput']:.1f} msg/s)")
+    
     elif args.action == "full":
         result = manager.build_memory_hierarchy(args.user_id, mock_llm_generate)
         print(f"✓ Built full hierarchy:")
@@ -0,0 +1,127 @@
+"""
+spaCy 管线管理器 - 每个进程每个模型只加载一次
+
+L0MemoryManager、PersonalityFeatureExtractor 等共用同一个 spaCy 实例。
+调用方通过 profile 声明实际用到的组件, 其余组件在该次调用中禁用
+(spaCy 的逐次调用 disable 参数, 不修改共享管线, 多线程安全)。
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, Iterator, List
+
+try:
+    import spacy
+    SPACY_AVAILABLE = True
+except ImportError:
+    SPACY_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "en_core_web_sm"
+
+# profile → 所需组件 (含依赖)
+#   concepts: noun_chunks (依存句法 + 词性) 和命名实体
+#   keywords: token.pos_ / is_stop
+#   entities: 仅命名实体
+#   entities_keywords: 命名实体 + token.pos_
+PROFILES = {
+    "concepts": {"tok2vec", "tagger", "attribute_ruler", "parser", "ner"},
+    "keywords": {"tok2vec", "tagger", "attribute_ruler"},
+    "entities": {"tok2vec", "ner"},
+    "entities_keywords": {"tok2vec", "tagger", "attribute_ruler", "ner"},
+    "full": None,
+}
+
+
+class NLPManager:
+    """进程级 spaCy 模型注册表"""
+
+    def __init__(self):
+        self._models: Dict[str, object] = {}
+        self._failed: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def load(self, model_name: str = DEFAULT_MODEL):
+        """
+        返回共享的 spaCy 管线, 首次调用时加载
+
+        spaCy 或模型未安装时返回 None (只警告一次)
+        """
+        nlp = self._models.get(model_name)
+        if nlp is not None or model_name in self._failed:
+            return nlp
+
+        with self._lock:
+            if model_name in self._models or model_name in self._failed:
+                return self._models.get(model_name)
+
+            if not SPACY_AVAILABLE:
+                self._failed[model_name] = "spaCy not installed"
+            else:
+                try:
+                    self._models[model_name] = spacy.load(model_name)
+                    logger.info(f"Loaded spaCy model '{model_name}' "
+                                f"(pipes: {', '.join(self._models[model_name].pipe_names)})")
+                except OSError as e:
+                    self._failed[model_name] = str(e)
+
+            if model_name in self._failed:
+                logger.warning(f"spaCy model '{model_name}' not available "
+                               f"({self._failed[model_name]}). "
+                               f"Run: python -m spacy download {model_name}")
+
+        return self._models.get(model_name)
+
+    def is_available(self, model_name: str = DEFAULT_MODEL) -> bool:
+        return self.load(model_name) is not None
+
+    def disabled_for(self, profile: str, model_name: str = DEFAULT_MODEL) -> List[str]:
+        """该 profile 不需要的组件"""
+        nlp = self.load(model_name)
+        required = PROFILES[profile]
+        if nlp is None or required is None:
+            return []
+        return [name for name in nlp.pipe_names if name not in required]
+
+    def __call__(self, text: str, profile: str = "full", model_name: str = DEFAULT_MODEL):
+        """处理单条文本, 只运行 profile 所需组件"""
+        return self.load(model_name)(text, disable=self.disabled_for(profile, model_name))
+
+    def pipe(
+        self,
+        texts: Iterable[str],
+        profile: str = "full",
+        model_name: str = DEFAULT_MODEL,
+        batch_size: int = 256,
+        n_process: int = 1
+    ) -> Iterator:
+        """
+        通过 nlp.pipe 批量处理
+
+        Args:
+            texts: 文本序列
+            profile: PROFILES 中的键
+            model_name: spaCy 模型名
+            batch_size: 每批文本数
+            n_process: 工作进程数 (>1 时 spaCy fork 子进程)
+
+        Returns:
+            与输入同序的 Doc 迭代器
+        """
+        return self.load(model_name).pipe(
+            texts,
+            disable=self.disabled_for(profile, model_name),
+            batch_size=batch_size,
+            n_process=n_process
+        )
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "loaded": {name: nlp.pipe_names for name, nlp in self._models.items()},
+            "failed": dict(self._failed)
+        }
+
+
+# 全局实例
+nlp_manager = NLPManager()
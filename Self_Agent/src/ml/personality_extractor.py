@@ -10,9 +10,10 @@ from datetime import datetime, timedelta
 from collections import Counter, defaultdict
 import numpy as np
 
+from nlp_manager import nlp_manager
+
 # 第三方库（需要安装）
 try:
-    import spacy
     from textblob import TextBlob
     import nltk
     from nltk.sentiment import SentimentIntensityAnalyzer
@@ -27,12 +28,6 @@ class PersonalityFeatureExtractor:
     
     def __init__(self):
         """初始化 NLP 模型和工具"""
-        try:
-            self.nlp = spacy.load("en_core_web_sm")
-        except:
-            print("Warning: spaCy model not loaded")
-            self.nlp = None
-        
         try:
             nltk.download('vader_lexicon', quiet=True)
             self.sentiment_analyzer = SentimentIntensityAnalyzer()
@@ -40,6 +35,11 @@ class PersonalityFeatureExtractor:
             print("Warning: NLTK VADER not loaded")
             self.sentiment_analyzer = None
     
+    @property
+    def nlp(self):
+        """进程内共享的 spaCy 实例, 首次访问时加载 (见 nlp_manager.py)"""
+        return nlp_manager.load()
+    
     def extract_all_features(
         self, 
         conversations: List[Dict[str, Any]],
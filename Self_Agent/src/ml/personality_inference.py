@@ -6,8 +6,11 @@
 
 import os
 import json
+import hashlib
+import socket
 import sqlite3
-from typing import List, Dict, Optional, Tuple
+import struct
+from typing import Any, List, Dict, Optional, Tuple
 import sys
 from dataclasses import dataclass
 
@@ -41,7 +44,9 @@ class PersonalityInferenceEngine:
         user_id: str,
         db_path: str = './self_agent.db',
         base_model: str = "google/gemma-2b",
-        model_path: Optional[str] = None
+        model_path: Optional[str] = None,
+        shared_model=None,
+        tokenizer=None
     ):
         """
         初始化推理引擎
@@ -51,6 +56,9 @@ class PersonalityInferenceEngine:
             db_path: 数据库路径
             base_model: 基础模型名称
             model_path: LoRA模型路径（如果为None，从数据库查找最新版本）
+            shared_model: 已加载的PeftModel（可选）。多个用户共用同一个基础模型，
+                          本用户的LoRA作为单独的adapter加载（模型服务使用）
+            tokenizer: 与shared_model配套的tokenizer
         """
         if not HAS_TORCH:
             raise ImportError("PyTorch not installed. Cannot perform inference.")
@@ -69,6 +77,19 @@ class PersonalityInferenceEngine:
                 )
         
         self.model_path = model_path
+        self.adapter_name = None
+        
+        if shared_model is not None:
+            # 共享基础模型: 只加载本用户的adapter
+            # (名称包含模型路径，同一用户的不同版本不会冲突)
+            path_digest = hashlib.sha1(model_path.encode()).hexdigest()[:8]
+            self.adapter_name = f"user_{user_id}_{path_digest}"
+            self.tokenizer = tokenizer
+            self.base = None
+            self.model = shared_model
+            self.model.load_adapter(model_path, adapter_name=self.adapter_name)
+            print(f"✅ Adapter loaded for user: {user_id} ({model_path})")
+            return
         
         # 加载模型
         print(f"🔄 Loading personality model for user: {user_id}")
@@ -90,6 +111,8 @@ class PersonalityInferenceEngine:
         # 加载LoRA权重
         self.model = PeftModel.from_pretrained(self.base, model_path)
         self.model.eval()  # 设置为评估模式
+        # 本用户的adapter (PEFT默认名 "default")；其他用户共享本模型时需切换回来
+        self.adapter_name = self.model.active_adapter
         
         print(f"✅ Model loaded successfully!")
         print(f"   Device: {'CUDA' if torch.cuda.is_available() else 'CPU'}")
@@ -135,6 +158,9 @@ class PersonalityInferenceEngine:
         if config is None:
             config = InferenceConfig()
         
+        # 每次请求都切换到本用户的adapter (模型可能被其他用户共享)
+        self.model.set_adapter(self.adapter_name)
+        
         # 构建输入提示
         prompt = self._build_prompt(message, conversation_history, relevant_memories, persona_prompt)
         
@@ -234,6 +260,12 @@ class PersonalityInferenceEngine:
         
         return response
     
+    def release(self):
+        """释放本用户的adapter（仅共享模型时；基础模型的所有者不释放）"""
+        if self.base is None and self.adapter_name is not None:
+            self.model.delete_adapter(self.adapter_name)
+            self.adapter_name = None
+    
     def batch_generate(
         self,
         messages: List[str],
@@ -263,6 +295,35 @@ class PersonalityInferenceEngine:
         return results
 
 
+def generate_via_model_server(socket_path: str, params: Dict[str, Any]) -> Tuple[str, Dict]:
+    """
+    通过模型服务生成回复（不在本进程加载模型）
+    
+    协议: 4字节大端长度 + UTF-8 JSON（见 Self_AI_Agent/src/ml/model_server.py）
+    """
+    request = json.dumps({'id': 1, 'method': 'generate_response', 'params': params}).encode('utf-8')
+    
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        sock.sendall(struct.pack('>I', len(request)) + request)
+        
+        def recv_exactly(size: int) -> bytes:
+            data = b''
+            while len(data) < size:
+                chunk = sock.recv(size - len(data))
+                if not chunk:
+                    raise ConnectionError("Model server closed the connection")
+                data += chunk
+            return data
+        
+        (length,) = struct.unpack('>I', recv_exactly(4))
+        response = json.loads(recv_exactly(length))
+    
+    if 'error' in response:
+        raise RuntimeError(f"Model server error: {response['error']}")
+    return response['result']['response'], response['result']['metadata']
+
+
 def test_inference():
     """测试推理引擎"""
     import argparse
@@ -273,6 +334,8 @@ def test_inference():
     parser.add_argument('--db-path', default='./self_agent.db', help='Database path')
     parser.add_argument('--temperature', type=float, default=0.8, help='Sampling temperature')
     parser.add_argument('--stdin-json', action='store_true', help='Read JSON context from stdin')
+    parser.add_argument('--model-server', default=os.environ.get('MODEL_SERVER_SOCKET'),
+                        help='Model server Unix socket (default: $MODEL_SERVER_SOCKET)')
     
     args = parser.parse_args()
 
@@ -294,21 +357,33 @@ def test_inference():
         except Exception as e:
             print(f"Warning: failed to parse stdin JSON: {e}")
 
-    # 创建推理引擎
-    engine = PersonalityInferenceEngine(
-        user_id=args.user_id,
-        db_path=args.db_path
-    )
-    
-    # 生成回复
     config = InferenceConfig(temperature=args.temperature)
-    response, metadata = engine.generate_response(
-        args.message,
-        conversation_history=conversation_history,
-        relevant_memories=relevant_memories,
-        persona_prompt=persona_prompt,
-        config=config
-    )
+    
+    if args.model_server:
+        # 模型由模型服务持有，本进程不加载
+        response, metadata = generate_via_model_server(args.model_server, {
+            'user_id': args.user_id,
+            'message': args.message,
+            'conversation_history': conversation_history,
+            'relevant_memories': relevant_memories,
+            'persona_prompt': persona_prompt,
+            'config': {'temperature': args.temperature}
+        })
+    else:
+        # 创建推理引擎
+        engine = PersonalityInferenceEngine(
+            user_id=args.user_id,
+            db_path=args.db_path
+        )
+        
+        # 生成回复
+        response, metadata = engine.generate_response(
+            args.message,
+            conversation_history=conversation_history,
+            relevant_memories=relevant_memories,
+            persona_prompt=persona_prompt,
+            config=config
+        )
     
     print(f"\n{'='*60}")
     print(f"💬 输入: {args.message}")
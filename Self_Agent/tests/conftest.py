@@ -0,0 +1,11 @@
+"""
+测试公共设置
+
+src/ml 下的模块以同级模块方式互相导入 (如 `from nlp_manager import nlp_manager`),
+因此把 src/ml 加入 sys.path。
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src" / "ml"))
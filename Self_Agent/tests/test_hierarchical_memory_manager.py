@@ -0,0 +1,200 @@
+"""
+L0 向量索引与批量导入测试
+"""
+
+import sqlite3
+import zlib
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import hierarchical_memory_manager as hmm
+from hierarchical_memory_manager import HierarchicalMemoryManager, L0VectorIndex
+
+SCHEMA = Path(__file__).resolve().parent.parent / "src" / "db" / "ai_native_memory_schema.sql"
+DIM = 16
+
+
+def _embed(text: str) -> np.ndarray:
+    """按文本确定的伪嵌入"""
+    rng = np.random.default_rng(zlib.crc32(text.encode("utf-8")))
+    return rng.standard_normal(DIM).astype(np.float32)
+
+
+class FakeEncoder:
+    """SentenceTransformer 的替身, 记录每次 encode 的条数"""
+
+    def __init__(self, *args, **kwargs):
+        self.calls = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        if isinstance(texts, str):
+            return _embed(texts)
+        self.calls.append(len(texts))
+        return np.vstack([_embed(t) for t in texts])
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "memory.db")
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA.read_text(encoding="utf-8"))
+    conn.close()
+    return path
+
+
+@pytest.fixture(params=["exact", "hnsw"])
+def backend(request, monkeypatch):
+    if request.param == "hnsw" and not hmm.HNSWLIB_AVAILABLE:
+        pytest.skip("hnswlib not installed")
+    monkeypatch.setattr(hmm, "HNSWLIB_AVAILABLE", request.param == "hnsw")
+    return request.param
+
+
+@pytest.fixture
+def manager(db_path, monkeypatch):
+    monkeypatch.setattr(hmm, "SentenceTransformer", FakeEncoder, raising=False)
+    manager = HierarchicalMemoryManager(db_path)
+    manager.l0_manager.nlp = None  # 不跑 spaCy
+    return manager
+
+
+def _conversations(n, day=1):
+    return [
+        {"content": f"message {i}", "timestamp": f"2025-01-{day:02d}T10:00:{i % 60:02d}"}
+        for i in range(n)
+    ]
+
+
+def _insert(db_path, user_id, texts):
+    conn = sqlite3.connect(db_path)
+    with conn:
+        rowids = [
+            conn.execute(
+                "INSERT INTO l0_raw_memories (user_id, content, content_type, source, timestamp, "
+                "embedding_768, processed) VALUES (?, ?, 'text', 'manual', '2025-01-01', ?, 1)",
+                (user_id, text, _embed(text).tobytes())
+            ).lastrowid
+            for text in texts
+        ]
+    conn.close()
+    return rowids
+
+
+class TestL0VectorIndex:
+    """按用户的向量索引"""
+
+    def test_lazy_build_and_search(self, db_path, backend):
+        texts = [f"memory {i}" for i in range(50)]
+        rowids = _insert(db_path, "u1", texts)
+        _insert(db_path, "u2", ["other user"])
+        index = L0VectorIndex(db_path)
+
+        hits = index.search("u1", _embed("memory 7"), k=5)
+        assert hits[0][0] == rowids[7]
+        assert hits[0][1] == pytest.approx(1.0, abs=1e-4)
+        assert len(hits) == 5
+        assert [s for _, s in hits] == sorted((s for _, s in hits), reverse=True)
+        # 用户之间互不可见
+        assert rowids[7] not in [r for r, _ in index.search("u2", _embed("memory 7"), k=5)]
+
+        built = index._indexes["u1"]
+        assert isinstance(built, hmm._HnswUserIndex if backend == "hnsw" else hmm._ExactUserIndex)
+
+    def test_add_and_invalidate(self, db_path, backend):
+        _insert(db_path, "u1", ["first"])
+        index = L0VectorIndex(db_path, initial_capacity=1)
+
+        # 尚未构建: add 不做任何事, 首次检索时从数据库加载
+        index.add("u2", [999], [_embed("ignored")])
+        assert "u2" not in index._indexes
+
+        assert index.search("u1", _embed("first"), k=10)[0][1] == pytest.approx(1.0, abs=1e-4)
+
+        # 已构建: 增量追加 (hnsw 超出容量时自动扩容)
+        added = _insert(db_path, "u1", ["second", "third"])
+        index.add("u1", added, [_embed("second"), _embed("third")])
+        assert index.search("u1", _embed("third"), k=1)[0][0] == added[1]
+        assert len(index.search("u1", _embed("third"), k=10)) == 3
+
+        # 失效后从数据库重建
+        conn = sqlite3.connect(db_path)
+        with conn:
+            conn.execute("DELETE FROM l0_raw_memories WHERE rowid = ?", (added[1],))
+        conn.close()
+        index.invalidate("u1")
+        assert [r for r, _ in index.search("u1", _embed("third"), k=10)] != []
+        assert added[1] not in [r for r, _ in index.search("u1", _embed("third"), k=10)]
+
+    def test_unknown_user_and_dim_mismatch(self, db_path, backend):
+        _insert(db_path, "u1", ["first"])
+        index = L0VectorIndex(db_path)
+
+        assert index.search("nobody", _embed("first"), k=3) == []
+        assert index.search("u1", np.ones(DIM + 1, dtype=np.float32), k=3) == []
+
+
+class TestImportConversations:
+    """流式批量导入"""
+
+    def test_batches_and_progress(self, manager):
+        progress = []
+
+        stats = manager.import_conversations(
+            "u1", iter(_conversations(25)), batch_size=10, progress_callback=progress.append
+        )
+
+        assert stats["imported"] == 25
+        assert stats["batches"] == 3
+        assert [p["imported"] for p in progress] == [10, 20, 25]
+        assert [p["batches"] for p in progress] == [1, 2, 3]
+        # 每批只编码一次
+        assert manager.l0_manager.embedding_model.calls == [10, 10, 5]
+
+    def test_rowids_map_to_memories(self, manager, backend):
+        # 先构建索引, 之后导入的向量经 rowid 映射增量追加
+        manager.import_conversations("u1", _conversations(5), batch_size=5)
+        assert manager.l0_manager.retrieve_memories("u1", query="message 0", limit=1)
+
+        manager.import_conversations("u1", _conversations(40)[5:], batch_size=8)
+
+        index = manager.l0_manager.vector_index._indexes["u1"]
+        assert index.count == 40
+        for i in (5, 17, 39):
+            found = manager.l0_manager.retrieve_memories("u1", query=f"message {i}", limit=1)
+            assert found[0].content == f"message {i}"
+            assert found[0].metadata["similarity"] == pytest.approx(1.0, abs=1e-4)
+
+
+class TestRetrieveMemories:
+    """检索过滤"""
+
+    def test_query_respects_time_range(self, manager, backend):
+        manager.import_conversations("u1", _conversations(30, day=1))
+        manager.import_conversations("u1", _conversations(30, day=2))
+
+        day_two = (datetime(2025, 1, 2), datetime(2025, 1, 2, 23, 59))
+        found = manager.l0_manager.retrieve_memories(
+            "u1", query="message 3", limit=10, time_range=day_two
+        )
+
+        assert len(found) == 10
+        assert all(m.timestamp.day == 2 for m in found)
+        assert found[0].content == "message 3"
+
+    def test_time_range_without_embeddings(self, manager):
+        manager.import_conversations("u1", _conversations(3, day=1) + _conversations(3, day=2))
+        conn = sqlite3.connect(manager.l0_manager.db_path)
+        with conn:
+            conn.execute("UPDATE l0_raw_memories SET embedding_768 = NULL")
+        conn.close()
+        manager.l0_manager.vector_index.invalidate()
+
+        # 退化为全文匹配, 仍按时间过滤
+        found = manager.l0_manager.retrieve_memories(
+            "u1", query="message", time_range=(datetime(2025, 1, 1), datetime(2025, 1, 1, 23, 59))
+        )
+        assert len(found) == 3
+        assert all(m.timestamp.day == 1 for m in found)